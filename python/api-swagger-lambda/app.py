@@ -2,23 +2,46 @@
 
 from constructs import Construct
 from aws_cdk import (
-    App, Stack, Fn,
+    App, Aws, CfnOutput, Duration, Stack,
     aws_lambda as _lambda,
     aws_apigateway as apigw,
+    aws_applicationautoscaling as appscaling,
     aws_iam as iam,
-    aws_s3_assets as assets,
+    custom_resources as cr,
 )
 
+import lambda_bundling
+import swagger_definition
+
+# The cached method, its cache key is the itemId path parameter declared in swagger/swagger.yaml
+GET_ITEM_PATH = '/items/{itemId}'
+# The longest time API Gateway caches a response
+MAX_CACHE_TTL_SECONDS = 3600
+# The pseudo parameters of the `Fn::Sub` integration URIs in swagger/swagger.yaml
+PSEUDO_PARAMETERS = {
+    'AWS::AccountId': Aws.ACCOUNT_ID,
+    'AWS::Partition': Aws.PARTITION,
+    'AWS::Region': Aws.REGION,
+    'AWS::URLSuffix': Aws.URL_SUFFIX,
+}
+
 
 class ApiSwaggerLambdaStack(Stack):
 
     def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        settings = self.node.try_get_context('item-api:get-item') or {}
+        runtime = _lambda.Runtime(settings.get('runtime', 'python3.12'), _lambda.RuntimeFamily.PYTHON)
+        architecture = _lambda.Architecture.X86_64 if settings.get('architecture') == 'x86_64' \
+            else _lambda.Architecture.ARM_64
+
         get_item = _lambda.Function(
             self, 'GetItem',
-            runtime=_lambda.Runtime.PYTHON_3_7,
-            code=_lambda.Code.from_asset('lambda'),
+            runtime=runtime,
+            architecture=architecture,
+            memory_size=settings.get('memory_size', 256),
+            code=lambda_bundling.get_code('lambda', runtime, settings.get('precompile', False)),
             handler='index.handler',
         )
 
@@ -27,18 +50,29 @@ class ApiSwaggerLambdaStack(Stack):
         update_lambda_id = get_item.node.default_child
         update_lambda_id.override_logical_id('GetItem')
 
-        asset = assets.Asset(self, "SwaggerAsset",
-            path="swagger/swagger.yaml"
-        )
+        # API Gateway invokes the alias of the provisioned concurrency, the function otherwise
+        alias = self.add_provisioned_concurrency(get_item, settings.get('provisioned_concurrency'))
+        if alias is not None:
+            alias.grant_invoke(grantee=iam.ServicePrincipal('apigateway.amazonaws.com'))
+
+        self.output_settings(runtime, architecture, settings)
 
-        data = Fn.transform('AWS::Include', {'Location': asset.s3_object_url})
+        # Parsed and validated at synth, the template holds the definition with the ARN of GetItem
+        definition = swagger_definition.substitute(
+            swagger_definition.parse('swagger/swagger.yaml'),
+            dict(PSEUDO_PARAMETERS,
+                 **{'GetItem.Arn': alias.function_arn if alias is not None else get_item.function_arn})
+        )
 
-        swagger_definition = apigw.AssetApiDefinition.from_inline(definition=data)
+        cache = self.node.try_get_context('item-api:cache') or {}
 
         api = apigw.SpecRestApi(self, 'item-api', 
-            api_definition=swagger_definition
+            api_definition=apigw.ApiDefinition.from_inline(definition),
+            deploy_options=self.stage_options(cache)
         )
 
+        if cache.get('enabled', False):
+            self.add_cache_invalidation(api, get_item)
         
 
         # get_item.add_permission('NoAuthLambdaPermission',
@@ -47,7 +81,114 @@ class ApiSwaggerLambdaStack(Stack):
         #     source_arn=api.arn_for_execute_api()
         # )
 
+    def add_provisioned_concurrency(self, get_item: _lambda.Function, concurrency: dict) -> _lambda.Alias:
+        """
+        Create the `live` alias of the current version with the provisioned concurrency of the
+        `item-api:get-item` context, None without it. The concurrency scales between `min_capacity` and
+        `max_capacity` on the `utilization_target` and the `schedules`.
+        """
+        if not concurrency:
+            return None
+
+        min_capacity = concurrency.get('min_capacity', 1)
+        alias = _lambda.Alias(self, 'GetItemLive',
+            alias_name='live',
+            version=get_item.current_version,
+            provisioned_concurrent_executions=min_capacity
+        )
+
+        max_capacity = concurrency.get('max_capacity', min_capacity)
+        schedules = concurrency.get('schedules') or []
+        if max_capacity > min_capacity or schedules:
+            scaling = alias.add_auto_scaling(min_capacity=min_capacity, max_capacity=max_capacity)
+            if 'utilization_target' in concurrency:
+                scaling.scale_on_utilization(utilization_target=concurrency['utilization_target'])
+            # e.g. {"name": "business-hours", "expression": "cron(0 8 ? * MON-FRI *)", "min_capacity": 5}
+            for schedule in schedules:
+                scaling.scale_on_schedule(schedule['name'],
+                    schedule=appscaling.Schedule.expression(schedule['expression']),
+                    min_capacity=schedule.get('min_capacity'),
+                    max_capacity=schedule.get('max_capacity')
+                )
+        return alias
+
+    def output_settings(self, runtime: _lambda.Runtime, architecture: _lambda.Architecture, settings: dict) -> None:
+        """Output the settings of GetItem, to compare the cold starts of the configurations."""
+        concurrency = settings.get('provisioned_concurrency') or {}
+        outputs = {
+            'GetItemRuntime': runtime.name,
+            'GetItemArchitecture': architecture.name,
+            'GetItemMemorySize': str(settings.get('memory_size', 256)),
+            'GetItemPrecompiled': str(settings.get('precompile', False)).lower(),
+            'GetItemProvisionedConcurrency': f"{concurrency.get('min_capacity', 1)}-"
+                                             f"{concurrency.get('max_capacity', concurrency.get('min_capacity', 1))}"
+                                             if concurrency else '0',
+        }
+        for name, value in outputs.items():
+            CfnOutput(self, name, value=value)
+
+    def stage_options(self, cache: dict) -> apigw.StageOptions:
+        """Stage options of the `item-api:cache` context, a stage without a cache if it is not enabled."""
+        ttl_seconds = cache.get('ttl_seconds', 300)
+        if isinstance(ttl_seconds, bool) or not isinstance(ttl_seconds, int) or \
+                not 0 <= ttl_seconds <= MAX_CACHE_TTL_SECONDS:
+            raise ValueError(f"'item-api:cache' 'ttl_seconds' must be between 0 and {MAX_CACHE_TTL_SECONDS}, "
+                             f"got {ttl_seconds!r}")
+        if not cache.get('enabled', False):
+            return None
+
+        return apigw.StageOptions(
+            cache_cluster_enabled=True,
+            cache_cluster_size=cache.get('cluster_size', '0.5'),
+            # Only GetItem is cached, its response depends on the itemId alone
+            method_options={
+                f'{GET_ITEM_PATH}/GET': apigw.MethodDeploymentOptions(
+                    caching_enabled=True,
+                    cache_ttl=Duration.seconds(ttl_seconds),
+                    cache_data_encrypted=True,
+                )
+            }
+        )
+
+    def add_cache_invalidation(self, api: apigw.SpecRestApi, get_item: _lambda.Function) -> None:
+        """
+        Flush the stage cache when a new version of GetItem is deployed, and allow the callers holding the
+        invalidation policy to refresh one item with a signed request and a `Cache-Control: max-age=0` header.
+        """
+        stage_name = api.deployment_stage.stage_name
+        flush = cr.AwsCustomResource(self, 'FlushItemCache',
+            on_update=cr.AwsSdkCall(
+                service='APIGateway',
+                action='flushStageCache',
+                parameters={'restApiId': api.rest_api_id, 'stageName': stage_name},
+                physical_resource_id=cr.PhysicalResourceId.of(f'item-cache-{get_item.current_version.version}')
+            ),
+            policy=cr.AwsCustomResourcePolicy.from_statements([
+                iam.PolicyStatement(
+                    actions=['apigateway:DELETE'],
+                    resources=[
+                        f'arn:{Aws.PARTITION}:apigateway:{Aws.REGION}::/restapis/{api.rest_api_id}'
+                        f'/stages/{stage_name}/cache/data'
+                    ]
+                )
+            ])
+        )
+        flush.node.add_dependency(api.deployment_stage)
+
+        invalidation_policy = iam.ManagedPolicy(self, 'ItemCacheInvalidationPolicy',
+            description='Allows to invalidate the cached item of a GET /items/{itemId} request',
+            statements=[
+                iam.PolicyStatement(
+                    actions=['execute-api:InvalidateCache'],
+                    resources=[api.arn_for_execute_api('GET', '/items/*', stage_name)]
+                )
+            ]
+        )
+
+        CfnOutput(self, 'ItemCacheInvalidationPolicyArn', value=invalidation_policy.managed_policy_arn)
+
 
-app = App()
-ApiSwaggerLambdaStack(app, "api-swagger-lambda")
-app.synth()
\ No newline at end of file
+if __name__ == '__main__':
+    app = App()
+    ApiSwaggerLambdaStack(app, "api-swagger-lambda")
+    app.synth()
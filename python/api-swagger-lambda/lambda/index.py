@@ -1,10 +1,32 @@
 import json
 
+
+def get_item(item_id):
+    return {"itemId": item_id, "itemName": f"Sample Item {item_id}"}
+
+
+def batch_get_items(event):
+    # The body is validated against the itemIds schema by API Gateway. Every distinct id is looked up once, the
+    # response has an item per requested id, in the order of the request
+    ids = json.loads(event["body"])["ids"]
+    items = {item_id: get_item(item_id) for item_id in set(ids)}
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Content-Type': 'application/json'
+        },
+        'body': json.dumps([items[item_id] for item_id in ids])
+    }
+
+
 def handler(event, context):
+    if event.get("resource") == "/items:batchGet":
+        return batch_get_items(event)
+
     return {
         'statusCode': 200,
         'headers': {
             'Content-Type': 'text/plain'
         },
-        'body': json.dumps({"message": {"itemId": event["pathParameters"]["itemId"], "itemName": "Sample Item 1"}})
-    }
\ No newline at end of file
+        'body': json.dumps({"message": get_item(event["pathParameters"]["itemId"])})
+    }
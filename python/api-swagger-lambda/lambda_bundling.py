@@ -0,0 +1,68 @@
+"""
+Bundling of the Lambda code with its bytecode.
+
+The asset holds the sources of `lambda/` and their bytecode compiled in `unchecked-hash` mode, so the runtime
+imports the handler without compiling it or checking the sources at a cold start, and without the files that are
+not code. The bytecode is specific to the Python version: it is compiled locally when the Python of the synth is
+the one of the runtime, in the bundling image of the runtime otherwise.
+"""
+import os
+import py_compile
+import shutil
+import sys
+
+import jsii
+from aws_cdk import BundlingOptions, ILocalBundling, aws_lambda as _lambda
+
+# The files of the asset, tests and caches are left out
+EXCLUDE = ['__pycache__', '*.pyc', 'tests', '*.md']
+COMPILE_COMMAND = 'cp -r /asset-input/. /asset-output && cd /asset-output && ' \
+                  'find . \\( ' + ' -o '.join(f"-name '{pattern}'" for pattern in EXCLUDE) + ' \\) ' \
+                  '-prune -exec rm -rf {} + && ' \
+                  'python -m compileall -q --invalidation-mode unchecked-hash .'
+
+
+@jsii.implements(ILocalBundling)
+class LocalBundling:
+
+    def __init__(self, source: str, runtime: _lambda.Runtime) -> None:
+        self.source = source
+        self.runtime = runtime
+
+    def try_bundle(self, output_dir: str, **options) -> bool:
+        if self.runtime.name != f'python{sys.version_info.major}.{sys.version_info.minor}':
+            return False
+
+        shutil.copytree(self.source, output_dir, dirs_exist_ok=True,
+                        ignore=shutil.ignore_patterns(*EXCLUDE))
+        for directory, _, files in os.walk(output_dir):
+            for name in files:
+                if name.endswith('.py'):
+                    py_compile.compile(os.path.join(directory, name), doraise=True,
+                                       invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+        return True
+
+
+def get_code(source: str, runtime: _lambda.Runtime, precompile: bool) -> _lambda.Code:
+    """
+    Return the code of the function, the sources of `source` and their bytecode if `precompile`.
+
+    Args:
+        source: the directory of the code.
+        runtime: the runtime of the function, the bytecode is compiled by its Python version.
+        precompile: whether the asset holds the bytecode.
+
+    Returns:
+        _lambda.Code: the asset of the code.
+    """
+    if not precompile:
+        return _lambda.Code.from_asset(source, exclude=EXCLUDE)
+
+    return _lambda.Code.from_asset(source,
+        exclude=EXCLUDE,
+        bundling=BundlingOptions(
+            image=runtime.bundling_image,
+            command=['bash', '-c', COMPILE_COMMAND],
+            local=LocalBundling(source, runtime),
+        )
+    )
@@ -0,0 +1,261 @@
+"""
+Synth-time pipeline of the OpenAPI definition of the API.
+
+The definition is parsed, validated and its external `$ref`s are resolved when the app is synthesized, so a broken
+spec fails `cdk synth` instead of the deployment, and the template holds the definition inline instead of an S3
+asset expanded by the `AWS::Include` transform at every deploy.
+
+    parse      loads the YAML or JSON definition and the files it references, the result is cached by the hash of
+               the file and of this module.
+    get_errors returns the errors of the definition, `parse` raises a ValueError listing them.
+    substitute replaces the `Fn::Sub` of the integrations with the ARNs of the functions.
+
+The module only depends on PyYAML, the stack passes the values of the CDK tokens.
+"""
+import copy
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List, Mapping, Tuple
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as Loader
+except ImportError:
+    from yaml import SafeLoader as Loader
+
+CACHE_DIR = '.swagger-cache'
+HTTP_METHODS = ('get', 'put', 'post', 'delete', 'options', 'head', 'patch', 'trace')
+# A variable of `Fn::Sub`, `${!Literal}` is the literal `${Literal}`
+SUB_VARIABLE = re.compile(r'\$\{([^}]+)\}')
+PATH_PARAMETER = re.compile(r'\{([^}+]+)\+?\}')
+
+# The parsed definitions of this process by cache key, the stacks of an app share them
+_definitions = {}
+
+
+def get_file_hash(path: str) -> str:
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+# A change of the parsing, the validation or the substitution invalidates the cached definitions
+CODE_HASH = get_file_hash(__file__)
+
+
+def get_cache_key(path: str) -> str:
+    """Return the cache key of the definition, the hash of the file and of this module."""
+    return hashlib.sha256(f'{CODE_HASH}:{get_file_hash(path)}'.encode()).hexdigest()
+
+
+def load_file(path: str):
+    with open(path, 'rb') as file:
+        document = yaml.load(file, Loader=Loader)
+    # YAML reads the response codes as int, the keys of a CloudFormation template are strings
+    return normalize(document)
+
+
+def normalize(node):
+    if isinstance(node, dict):
+        return {str(key): normalize(value) for key, value in node.items()}
+    if isinstance(node, list):
+        return [normalize(value) for value in node]
+    return node
+
+
+def get_pointer(document, pointer: str, ref: str):
+    node = document
+    for token in pointer.lstrip('/').split('/') if pointer.strip('/') else []:
+        token = token.replace('~1', '/').replace('~0', '~')
+        if isinstance(node, dict) and token in node:
+            node = node[token]
+        elif isinstance(node, list) and token.isdigit() and int(token) < len(node):
+            node = node[int(token)]
+        else:
+            raise ValueError(f"unresolved $ref '{ref}'")
+    return node
+
+
+def resolve_refs(path: str) -> Tuple[Dict, List[str]]:
+    """
+    Load the definition and inline the `$ref`s to other files. The local `$ref`s, e.g. to `#/components/schemas`,
+    are checked and kept, API Gateway creates a model of every schema of the components.
+
+    Args:
+        path: the path of the definition.
+
+    Returns:
+        Tuple[Dict, List[str]]: the resolved definition and the files it was read from.
+    """
+    path = os.path.normpath(path)
+    documents = {}
+
+    def get_document(file_path: str):
+        if file_path not in documents:
+            documents[file_path] = load_file(file_path)
+        return documents[file_path]
+
+    def resolve(node, file_path: str, stack: Tuple[str, ...]):
+        if isinstance(node, list):
+            return [resolve(value, file_path, stack) for value in node]
+        if not isinstance(node, dict):
+            return node
+        ref = node.get('$ref')
+        if isinstance(ref, str):
+            location, _, pointer = ref.partition('#')
+            # A local $ref is a node of the file it is in
+            target = os.path.normpath(os.path.join(os.path.dirname(file_path), location)) if location else file_path
+            if not os.path.isfile(target):
+                raise ValueError(f"unresolved $ref '{ref}' in {file_path}")
+            if target == path:
+                get_pointer(get_document(path), pointer, ref)
+                return {'$ref': f'#{pointer}'}
+            key = f'{target}#{pointer}'
+            if key in stack:
+                raise ValueError(f"circular $ref '{ref}' in {file_path}")
+            return resolve(get_pointer(get_document(target), pointer, ref), target, stack + (key,))
+        return {key: resolve(value, file_path, stack) for key, value in node.items()}
+
+    definition = resolve(get_document(path), path, ())
+    return definition, sorted(documents)
+
+
+def get_local(definition: Mapping, node):
+    """Return the node a local `$ref` points to, the node itself if it is not a `$ref`."""
+    if isinstance(node, dict) and str(node.get('$ref', '')).startswith('#'):
+        return get_pointer(definition, node['$ref'][1:], node['$ref'])
+    return node
+
+
+def get_errors(definition: Mapping) -> List[str]:
+    """
+    Return the errors of the definition: the OpenAPI version, the paths and their operations, the path
+    parameters, the request validators and the API Gateway integrations.
+    """
+    if not isinstance(definition, dict):
+        return ['the definition must be a mapping']
+
+    errors = []
+    if not str(definition.get('openapi', '')).startswith('3.0'):
+        errors.append(f"'openapi' must be 3.0.x, got {definition.get('openapi')!r}")
+    if not (definition.get('info') or {}).get('title'):
+        errors.append("missing key 'info.title'")
+    validators = definition.get('x-amazon-apigateway-request-validators') or {}
+    default_validator = definition.get('x-amazon-apigateway-request-validator')
+    if default_validator is not None and default_validator not in validators:
+        errors.append(f"unknown request validator {default_validator!r}")
+    paths = definition.get('paths') or {}
+    if not paths:
+        errors.append("'paths' must not be empty")
+
+    operation_ids = set()
+    for path, item in paths.items():
+        if not path.startswith('/'):
+            errors.append(f"path {path!r} must start with '/'")
+        operations = {method: operation for method, operation in (item or {}).items() if method in HTTP_METHODS}
+        if not operations:
+            errors.append(f"path {path!r} has no operation")
+        for method, operation in operations.items():
+            name = f'{method.upper()} {path}'
+            operation_id = operation.get('operationId')
+            if operation_id is not None and operation_id in operation_ids:
+                errors.append(f"{name}: duplicate operationId {operation_id!r}")
+            operation_ids.add(operation_id)
+            if not operation.get('responses'):
+                errors.append(f"{name}: missing key 'responses'")
+
+            parameters = [get_local(definition, parameter)
+                          for parameter in (item.get('parameters') or []) + (operation.get('parameters') or [])]
+            declared = {parameter.get('name') for parameter in parameters if parameter.get('in') == 'path'}
+            for parameter in PATH_PARAMETER.findall(path):
+                if parameter not in declared:
+                    errors.append(f"{name}: path parameter {parameter!r} is not declared")
+
+            validator = operation.get('x-amazon-apigateway-request-validator')
+            if validator is not None and validator not in validators:
+                errors.append(f"{name}: unknown request validator {validator!r}")
+
+            integration = operation.get('x-amazon-apigateway-integration')
+            if integration is None:
+                errors.append(f"{name}: missing key 'x-amazon-apigateway-integration'")
+                continue
+            integration_type = integration.get('type')
+            if integration_type not in ('aws', 'aws_proxy', 'http', 'http_proxy', 'mock'):
+                errors.append(f"{name}: invalid integration type {integration_type!r}")
+            elif integration_type != 'mock' and not integration.get('uri'):
+                errors.append(f"{name}: missing key 'x-amazon-apigateway-integration.uri'")
+            for key in integration.get('cacheKeyParameters') or []:
+                parameter = key.split('.')[-1]
+                if not any(parameter == candidate.get('name') for candidate in parameters):
+                    errors.append(f"{name}: cache key parameter {key!r} is not declared")
+    return errors
+
+
+def parse(path: str, cache_dir: str = CACHE_DIR) -> Dict:
+    """
+    Return the validated definition with its external `$ref`s resolved. The result is cached by the hash of the
+    definition and of this module in memory and in `cache_dir`, it is parsed again when the definition, a file it
+    references or this module changes.
+
+    Args:
+        path: the path of the definition.
+        cache_dir: the directory of the parsed definitions, None to only cache them in memory.
+
+    Returns:
+        Dict: the definition.
+    """
+    cache_key = get_cache_key(path)
+    cache_path = os.path.join(cache_dir, f'{cache_key}.json') if cache_dir else None
+
+    cached = _definitions.get(cache_key)
+    if cached is None and cache_path and os.path.isfile(cache_path):
+        with open(cache_path) as file:
+            cached = json.load(file)
+    if cached is not None and all(os.path.isfile(name) and get_file_hash(name) == digest
+                                  for name, digest in cached['files'].items()):
+        _definitions[cache_key] = cached
+        return copy.deepcopy(cached['definition'])
+
+    definition, files = resolve_refs(path)
+    errors = get_errors(definition)
+    if errors:
+        raise ValueError(f"Invalid definition {path}:\n" + '\n'.join(f' - {error}' for error in errors))
+
+    cached = {'definition': definition, 'files': {name: get_file_hash(name) for name in files}}
+    _definitions[cache_key] = cached
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_path, 'w') as file:
+            json.dump(cached, file)
+    return copy.deepcopy(definition)
+
+
+def substitute(definition, variables: Mapping[str, str]):
+    """
+    Replace the `Fn::Sub` of the definition by strings, e.g. `${GetItem.Arn}` by the ARN of the function and
+    `${!Literal}` by `${Literal}`. CloudFormation only takes a literal template in `Fn::Sub`, the values are tokens
+    of the stack instead.
+
+    Args:
+        definition: the definition or a node of it.
+        variables: the values of the variables, including the pseudo parameters, e.g.
+            {'AWS::Region': Aws.REGION, 'GetItem.Arn': get_item.function_arn}.
+
+    Returns:
+        The definition without `Fn::Sub`.
+    """
+    if isinstance(definition, list):
+        return [substitute(value, variables) for value in definition]
+    if not isinstance(definition, dict):
+        return definition
+    if set(definition) == {'Fn::Sub'} and isinstance(definition['Fn::Sub'], str):
+        template = definition['Fn::Sub']
+        unknown = [name for name in SUB_VARIABLE.findall(template)
+                   if not name.startswith('!') and name not in variables]
+        if unknown:
+            raise ValueError(f"unknown Fn::Sub variables {', '.join(unknown)} in {template!r}")
+        return SUB_VARIABLE.sub(lambda match: '${' + match.group(1)[1:] + '}' if match.group(1).startswith('!')
+                                else variables[match.group(1)], template)
+    return {key: substitute(value, variables) for key, value in definition.items()}
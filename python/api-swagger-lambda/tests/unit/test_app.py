@@ -0,0 +1,128 @@
+import json
+import os
+
+import pytest
+
+# The stack needs CDK v2, unlike the pipeline and the handler, CDK v1 has no assertions module
+pytest.importorskip('aws_cdk.assertions')
+
+from aws_cdk import App, assertions  # noqa: E402
+
+import app  # noqa: E402
+
+PROJECT_DIR = os.path.join(os.path.dirname(__file__), '..', '..')
+
+
+def synth(monkeypatch, **context):
+    """Synthesize the stack with the given context, the code and the definition are read relative to the project."""
+    monkeypatch.chdir(PROJECT_DIR)
+    stack = app.ApiSwaggerLambdaStack(App(context=context), 'api-swagger-lambda')
+    return assertions.Template.from_stack(stack)
+
+
+def test_stage_without_cache(monkeypatch):
+    template = synth(monkeypatch)
+
+    for stage in template.find_resources('AWS::ApiGateway::Stage').values():
+        assert 'CacheClusterEnabled' not in stage['Properties']
+    template.resource_count_is('Custom::AWS', 0)
+    template.resource_count_is('AWS::IAM::ManagedPolicy', 0)
+
+
+def test_stage_cache(monkeypatch):
+    template = synth(monkeypatch, **{'item-api:cache': {'enabled': True, 'ttl_seconds': 600}})
+
+    template.has_resource_properties('AWS::ApiGateway::Stage', {
+        'CacheClusterEnabled': True,
+        'CacheClusterSize': '0.5',
+        'MethodSettings': assertions.Match.array_with([
+            assertions.Match.object_like({
+                'ResourcePath': '/~1items~1{itemId}',
+                'HttpMethod': 'GET',
+                'CachingEnabled': True,
+                'CacheTtlInSeconds': 600,
+                'CacheDataEncrypted': True,
+            })
+        ]),
+    })
+
+
+def test_cache_invalidation(monkeypatch):
+    template = synth(monkeypatch, **{'item-api:cache': {'enabled': True}})
+
+    template.resource_count_is('Custom::AWS', 1)
+    flush = next(iter(template.find_resources('Custom::AWS').values()))
+    # The SDK call is serialized, with the tokens of the API id and the stage name joined in
+    assert 'flushStageCache' in json.dumps(flush['Properties']['Update'])
+    template.has_resource_properties('AWS::IAM::Policy', {
+        'PolicyDocument': {
+            'Statement': assertions.Match.array_with([
+                assertions.Match.object_like({'Action': 'apigateway:DELETE', 'Effect': 'Allow'})
+            ])
+        }
+    })
+    template.has_resource_properties('AWS::IAM::ManagedPolicy', {
+        'PolicyDocument': {
+            'Statement': [assertions.Match.object_like({'Action': 'execute-api:InvalidateCache'})]
+        }
+    })
+    template.has_output('ItemCacheInvalidationPolicyArn', {})
+
+
+@pytest.mark.parametrize('ttl_seconds', [-1, app.MAX_CACHE_TTL_SECONDS + 1, '300', True])
+def test_invalid_cache_ttl(monkeypatch, ttl_seconds):
+    with pytest.raises(ValueError, match='ttl_seconds'):
+        synth(monkeypatch, **{'item-api:cache': {'enabled': True, 'ttl_seconds': ttl_seconds}})
+
+
+def test_without_provisioned_concurrency(monkeypatch):
+    template = synth(monkeypatch)
+
+    template.resource_count_is('AWS::Lambda::Alias', 0)
+    template.resource_count_is('AWS::ApplicationAutoScaling::ScalableTarget', 0)
+    # The integrations invoke the function
+    body = json.dumps(template.find_resources('AWS::ApiGateway::RestApi'))
+    assert json.dumps({'Fn::GetAtt': ['GetItem', 'Arn']}) in body
+    template.has_output('GetItemProvisionedConcurrency', {'Value': '0'})
+
+
+def test_provisioned_concurrency(monkeypatch):
+    template = synth(monkeypatch, **{'item-api:get-item': {'provisioned_concurrency': {
+        'min_capacity': 2,
+        'max_capacity': 10,
+        'utilization_target': 0.7,
+        'schedules': [{'name': 'business-hours', 'expression': 'cron(0 8 ? * MON-FRI *)', 'min_capacity': 5}],
+    }}})
+
+    template.has_resource_properties('AWS::Lambda::Alias', {
+        'Name': 'live',
+        'ProvisionedConcurrencyConfig': {'ProvisionedConcurrentExecutions': 2},
+    })
+    template.has_resource_properties('AWS::ApplicationAutoScaling::ScalableTarget', {
+        'MinCapacity': 2,
+        'MaxCapacity': 10,
+        'ScalableDimension': 'lambda:function:ProvisionedConcurrency',
+        'ScheduledActions': [{
+            'ScheduledActionName': 'business-hours',
+            'Schedule': 'cron(0 8 ? * MON-FRI *)',
+            'ScalableTargetAction': {'MinCapacity': 5},
+        }],
+    })
+    template.has_resource_properties('AWS::ApplicationAutoScaling::ScalingPolicy', {
+        'TargetTrackingScalingPolicyConfiguration': assertions.Match.object_like({'TargetValue': 0.7}),
+    })
+    # The integrations invoke the alias, its Ref is its ARN
+    alias_id = next(iter(template.find_resources('AWS::Lambda::Alias')))
+    body = json.dumps(template.find_resources('AWS::ApiGateway::RestApi'))
+    assert json.dumps({'Ref': alias_id}) in body
+    assert json.dumps({'Fn::GetAtt': ['GetItem', 'Arn']}) not in body
+    template.has_output('GetItemProvisionedConcurrency', {'Value': '2-10'})
+
+
+def test_provisioned_concurrency_without_scaling(monkeypatch):
+    template = synth(monkeypatch, **{'item-api:get-item': {'provisioned_concurrency': {'min_capacity': 3}}})
+
+    template.has_resource_properties('AWS::Lambda::Alias', {
+        'ProvisionedConcurrencyConfig': {'ProvisionedConcurrentExecutions': 3},
+    })
+    template.resource_count_is('AWS::ApplicationAutoScaling::ScalableTarget', 0)
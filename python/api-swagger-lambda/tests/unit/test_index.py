@@ -0,0 +1,30 @@
+import importlib.util
+import json
+import os
+
+# lambda is a keyword, the handler is loaded from its file
+spec = importlib.util.spec_from_file_location(
+    'index', os.path.join(os.path.dirname(__file__), '..', '..', 'lambda', 'index.py'))
+index = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(index)
+
+
+def test_get_item():
+    response = index.handler({'resource': '/items/{itemId}', 'pathParameters': {'itemId': '101885'}}, None)
+
+    assert response['statusCode'] == 200
+    assert json.loads(response['body']) == {'message': {'itemId': '101885', 'itemName': 'Sample Item 101885'}}
+
+
+def test_batch_get_items_follows_the_request(monkeypatch):
+    lookups = []
+    get_item = index.get_item
+    monkeypatch.setattr(index, 'get_item', lambda item_id: lookups.append(item_id) or get_item(item_id))
+
+    response = index.handler({'resource': '/items:batchGet', 'body': json.dumps({'ids': [3, 1, 3, 2]})}, None)
+
+    assert response['statusCode'] == 200
+    assert response['headers']['Content-Type'] == 'application/json'
+    assert [item['itemId'] for item in json.loads(response['body'])] == [3, 1, 3, 2]
+    # A duplicate id is looked up once
+    assert sorted(lookups) == [1, 2, 3]
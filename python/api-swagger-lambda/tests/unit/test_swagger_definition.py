@@ -0,0 +1,141 @@
+import json
+import os
+
+import pytest
+
+import swagger_definition
+
+OPERATION = {
+    'operationId': 'getItem',
+    'parameters': [{'name': 'itemId', 'in': 'path', 'required': True, 'schema': {'type': 'string'}}],
+    'responses': {'200': {'description': 'The item'}},
+    'x-amazon-apigateway-integration': {
+        'type': 'aws_proxy',
+        'httpMethod': 'POST',
+        'uri': {'Fn::Sub': 'arn:aws:apigateway:${AWS::Region}:lambda:path/2015-03-31/functions/'
+                           '${GetItem.Arn}/invocations'},
+        'cacheKeyParameters': ['method.request.path.itemId'],
+    },
+}
+
+
+def get_definition(**overrides):
+    return dict({
+        'openapi': '3.0.1',
+        'info': {'title': 'Items', 'version': '0.1.0'},
+        'paths': {'/items/{itemId}': {'get': OPERATION}},
+    }, **overrides)
+
+
+def write(path, document):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(document))
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def clear_definitions(monkeypatch):
+    monkeypatch.setattr(swagger_definition, '_definitions', {})
+
+
+def test_refs_across_files(tmp_path):
+    write(tmp_path / 'paths' / 'items.json', {
+        'item': {'get': dict(OPERATION, responses={'200': {'$ref': '../api.json#/components/responses/item'}})}
+    })
+    path = write(tmp_path / 'api.json', get_definition(
+        paths={'/items/{itemId}': {'$ref': 'paths/items.json#/item'}},
+        components={'responses': {'item': {'description': 'The item'}}}
+    ))
+
+    definition = swagger_definition.parse(path, cache_dir=None)
+
+    operation = definition['paths']['/items/{itemId}']['get']
+    assert operation['operationId'] == 'getItem'
+    # A $ref back to the main file stays local, API Gateway resolves it
+    assert operation['responses']['200'] == {'$ref': '#/components/responses/item'}
+
+    write(tmp_path / 'paths' / 'items.json', {'item': {'$ref': '#/item'}})
+    with pytest.raises(ValueError) as error:
+        swagger_definition.parse(path, cache_dir=None)
+    assert 'circular $ref' in str(error.value)
+    write(tmp_path / 'api.json', get_definition(paths={'/items/{itemId}': {'$ref': 'paths/missing.json#/item'}}))
+    with pytest.raises(ValueError) as error:
+        swagger_definition.parse(path, cache_dir=None)
+    assert "unresolved $ref 'paths/missing.json#/item'" in str(error.value)
+
+
+def test_validation_errors(tmp_path):
+    operation = dict(OPERATION, operationId='getItem', parameters=[],
+                     **{'x-amazon-apigateway-request-validator': 'unknown'})
+    operation.pop('responses')
+    path = write(tmp_path / 'api.json', get_definition(openapi='2.0', paths={
+        '/items/{itemId}': {'get': operation, 'put': dict(OPERATION, **{'x-amazon-apigateway-integration': {
+            'type': 'lambda'}})},
+        'items': {}
+    }))
+
+    with pytest.raises(ValueError) as error:
+        swagger_definition.parse(path, cache_dir=None)
+
+    message = str(error.value)
+    assert "'openapi' must be 3.0.x, got '2.0'" in message
+    assert "GET /items/{itemId}: missing key 'responses'" in message
+    assert "GET /items/{itemId}: path parameter 'itemId' is not declared" in message
+    assert "GET /items/{itemId}: unknown request validator 'unknown'" in message
+    assert "GET /items/{itemId}: cache key parameter 'method.request.path.itemId' is not declared" in message
+    assert "PUT /items/{itemId}: duplicate operationId 'getItem'" in message
+    assert "PUT /items/{itemId}: invalid integration type 'lambda'" in message
+    assert "path 'items' must start with '/'" in message
+    assert "path 'items' has no operation" in message
+
+
+def test_substitute():
+    definition = {'uri': {'Fn::Sub': 'arn:${AWS::Partition}:apigateway:${AWS::Region}:${GetItem.Arn}'},
+                  'literal': [{'Fn::Sub': '${!Literal}-${AWS::Region}'}],
+                  'join': {'Fn::Join': ['', ['a', 'b']]}}
+    variables = {'AWS::Partition': 'aws', 'AWS::Region': 'us-east-1', 'GetItem.Arn': 'arn:function'}
+
+    assert swagger_definition.substitute(definition, variables) == {
+        'uri': 'arn:aws:apigateway:us-east-1:arn:function',
+        'literal': ['${Literal}-us-east-1'],
+        'join': {'Fn::Join': ['', ['a', 'b']]},
+    }
+    with pytest.raises(ValueError) as error:
+        swagger_definition.substitute(definition, {'AWS::Region': 'us-east-1'})
+    assert 'unknown Fn::Sub variables AWS::Partition, GetItem.Arn' in str(error.value)
+
+
+def test_cache_invalidation(tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    write(tmp_path / 'paths' / 'items.json', {'item': {'get': OPERATION}})
+    path = write(tmp_path / 'api.json', get_definition(paths={'/items/{itemId}': {'$ref': 'paths/items.json#/item'}}))
+    calls = []
+    resolve_refs = swagger_definition.resolve_refs
+    monkeypatch.setattr(swagger_definition, 'resolve_refs', lambda name: calls.append(name) or resolve_refs(name))
+
+    first = swagger_definition.parse(path, cache_dir)
+    assert len(os.listdir(cache_dir)) == 1
+    # From the cache of the process, then from the cache directory of the next synth
+    assert swagger_definition.parse(path, cache_dir) == first
+    monkeypatch.setattr(swagger_definition, '_definitions', {})
+    assert swagger_definition.parse(path, cache_dir) == first
+    assert len(calls) == 1
+
+    # A referenced file changes
+    write(tmp_path / 'paths' / 'items.json', {'item': {'get': dict(OPERATION, summary='get an item')}})
+    assert swagger_definition.parse(path, cache_dir)['paths']['/items/{itemId}']['get']['summary'] == 'get an item'
+    assert len(calls) == 2
+
+    # The code changes
+    monkeypatch.setattr(swagger_definition, 'CODE_HASH', 'next-version')
+    monkeypatch.setattr(swagger_definition, '_definitions', {})
+    swagger_definition.parse(path, cache_dir)
+    assert len(calls) == 3
+    assert len(os.listdir(cache_dir)) == 2
+
+
+def test_swagger_definition():
+    definition = swagger_definition.parse(os.path.join(os.path.dirname(__file__), '..', '..', 'swagger',
+                                                       'swagger.yaml'), cache_dir=None)
+
+    assert set(definition['paths']) == {'/items/{itemId}', '/items:batchGet'}
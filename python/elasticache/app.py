@@ -1,16 +1,26 @@
 #!/usr/bin/env python3
 
 from aws_cdk import core
-from config.config import config
+from config import config_util
 from cache.elasticache_stack import ElastiCacheStack
+from cache.helper import fleet
 
 app = core.App()
-env = core.Environment(account=str(config["account_id"]), region=config["region"])
 
-stack_name = config['stack_name'].lower()
-stack_description = "CDK Managed CF template for deploying ElastiCache."
+# Fleet mode, a stack per cluster of config/fleet.py
+fleet_configs = config_util.load_fleet()
+if fleet_configs:
+    fleet.create_fleet(app, fleet_configs)
+else:
+    # Parse and validate config/config.py once, before anything is synthesized
+    cache_config = config_util.load()
+    env = core.Environment(account=str(cache_config.account_id), region=cache_config.region)
 
-# Create the ElastiCache stack
-ElastiCacheStack(app, stack_name, env=env, description=stack_description)
+    stack_name = cache_config.stack_name.lower()
+    stack_description = "CDK Managed CF template for deploying ElastiCache."
+
+    # Create the ElastiCache stack, and the stacks of the secondary regions of its Global Datastore
+    stack = ElastiCacheStack(app, stack_name, cache_config=cache_config, env=env, description=stack_description)
+    fleet.create_secondaries(app, stack, stack_name, description=stack_description)
 
 app.synth()
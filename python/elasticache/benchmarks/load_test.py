@@ -0,0 +1,418 @@
+"""
+Offline load test of the connection settings of config/config.py: in-transit encryption, the AUTH token and the
+ACL users of `secrets.users` and `secrets.tenants`.
+
+Every variant drives the same mixed GET/SET workload through asyncio connections sending pipelined batches, and
+reports the throughput and the p50, p99 and p999 latency of the batches. The variants compare the settings with
+the plain connection of the default user: `tls` when `transit_encryption_enabled` is set, `acl` with the access
+string of a configured user and `tls+acl` with both, so the cost of TLS or of a restrictive ACL is measured before
+it is rolled out. By default the Redis stand-in of functions/resp/server.py is started in a child process with the
+same settings, a self-signed certificate is created with `openssl` for TLS. `--host` targets a Redis server
+instead, e.g. a local redis-server, the users are created with ACL SETUSER.
+
+    python -m benchmarks.load_test --requests 200000 --connections 8 --pipeline 16
+    python -m benchmarks.load_test --host 127.0.0.1 --port 6379 --tls-port 6380 --tls-ca ca.crt --user user-name-1
+
+The latencies of the stand-in include its pure-Python command processing, compare the variants with each other
+rather than with ElastiCache.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import secrets
+import socket
+import ssl as ssl_
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from functions.resp.client import RespClient, RespError
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_REQUESTS = 100000
+DEFAULT_CONNECTIONS = 4
+DEFAULT_PIPELINE = 16
+DEFAULT_READ_RATIO = 0.8
+DEFAULT_VALUE_SIZE = 100
+DEFAULT_KEYSPACE = 10000
+# Seconds to wait for the stand-in to accept connections.
+SERVER_START_SECONDS = 10
+# Characters ending the literal prefix of an ACL key pattern.
+GLOB_CHARACTERS = "*?[\\"
+STAND_IN_NOTE = "The stand-in processes the commands, TLS and the ACL checks in pure Python, its TLS and ACL costs " \
+                "are not representative of Redis or ElastiCache, compare the variants with each other only."
+
+
+class Variant(NamedTuple):
+    name: str
+    tls: bool
+    # The ACL user, with `user_name` and `user_acl`, the default user if None
+    user: Optional[Dict] = None
+
+
+class Workload(NamedTuple):
+    requests: int = DEFAULT_REQUESTS
+    connections: int = DEFAULT_CONNECTIONS
+    pipeline: int = DEFAULT_PIPELINE
+    read_ratio: float = DEFAULT_READ_RATIO
+    value_size: int = DEFAULT_VALUE_SIZE
+    keyspace: int = DEFAULT_KEYSPACE
+
+
+class Target(NamedTuple):
+    host: str
+    port: int
+    ssl: Optional[ssl_.SSLContext] = None
+    # The password of the default user, the AUTH token, None if the default user needs no password
+    auth_token: Optional[str] = None
+    # The passwords of the ACL users by user name
+    passwords: Dict[str, str] = {}
+
+
+def get_variants(transit_encryption: bool, users: List[Dict], user_name: str = None) -> List[Variant]:
+    """
+    Return the variants of the settings, the plain connection of the default user first.
+
+    Args:
+        transit_encryption: whether the cluster requires TLS.
+        users: the ACL users of the cluster.
+        user_name: the user of the ACL variants, the first user if None.
+
+    Returns:
+        List[Variant]: the variants.
+    """
+    user = None
+    if user_name is not None:
+        user = next((user for user in users if user['user_name'] == user_name), None)
+        if user is None:
+            raise ValueError(f"Unknown user '{user_name}', the users are: "
+                             f"{', '.join(user['user_name'] for user in users) or 'none'}")
+    elif users:
+        user = users[0]
+
+    variants = [Variant("plain", False)]
+    if transit_encryption:
+        variants.append(Variant("tls", True))
+    if user is not None:
+        variants.append(Variant("acl", False, user))
+        if transit_encryption:
+            variants.append(Variant("tls+acl", True, user))
+    return variants
+
+
+def get_key_prefix(acl: str) -> str:
+    """
+    Return a key prefix the access string allows, the literal part of its first key pattern,
+    e.g. `tenant:acme:` for `on ~tenant:acme:* +@read`, empty for `allkeys`, `~*` or without key pattern.
+    """
+    for rule in acl.split():
+        if rule.startswith("~"):
+            pattern = rule[1:]
+            end = min([pattern.index(char) for char in GLOB_CHARACTERS if char in pattern] + [len(pattern)])
+            return pattern[:end]
+    return ""
+
+
+def get_batches(workload: Workload, prefix: str, count: int, rng: random.Random) -> List[List[tuple]]:
+    """
+    Return `count` commands in pipelined batches, GET with the probability `read_ratio`, SET otherwise,
+    on keys drawn uniformly from the keyspace.
+    """
+    value = b"x" * workload.value_size
+    commands = []
+    for _ in range(count):
+        key = f"{prefix}load:{rng.randrange(workload.keyspace)}"
+        commands.append(("GET", key) if rng.random() < workload.read_ratio else ("SET", key, value))
+    return [commands[start:start + workload.pipeline] for start in range(0, count, workload.pipeline)]
+
+
+def percentile(values: List[float], rank: float) -> float:
+    """
+    Return the nearest-rank percentile of the sorted values, e.g. `rank=99.9` for p999.
+    """
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(rank * len(values) / 100) - 1)]
+
+
+def summarize(latencies: List[float], operations: int, errors: int, seconds: float) -> Dict:
+    """
+    Return the throughput in operations per second and the batch latency percentiles in milliseconds.
+    """
+    latencies = sorted(latencies)
+    return {
+        "operations": operations,
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "ops_per_second": round(operations / seconds, 1) if seconds > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "p999_ms": round(percentile(latencies, 99.9) * 1000, 3)
+    }
+
+
+async def connect(target: Target, variant: Variant) -> RespClient:
+    if variant.user is None:
+        return await RespClient.connect(target.host, target.port, ssl=target.ssl or False,
+                                        password=target.auth_token)
+    user_name = variant.user['user_name']
+    return await RespClient.connect(target.host, target.port, ssl=target.ssl or False, user=user_name,
+                                    password=target.passwords[user_name])
+
+
+async def run_connection(client: RespClient, batches: List[List[tuple]], latencies: List[float]) -> int:
+    """
+    Send the batches one after the other, record the round trip of every batch and return the error replies.
+    """
+    errors = 0
+    for batch in batches:
+        started = time.perf_counter()
+        replies = await client.pipeline(batch)
+        latencies.append(time.perf_counter() - started)
+        errors += sum(isinstance(reply, RespError) for reply in replies)
+    return errors
+
+
+async def run_variant(target: Target, variant: Variant, workload: Workload, seed: int = 0) -> Dict:
+    """
+    Fill the keyspace and run the workload of the variant.
+
+    Args:
+        target: the server, its port matches the TLS setting of the variant.
+        variant: the variant.
+        workload: the workload.
+        seed: the seed of the key and command draws, every variant draws the same commands.
+
+    Returns:
+        Dict: the summary of the variant, see summarize.
+    """
+    prefix = get_key_prefix(variant.user['user_acl']) if variant.user is not None else ""
+    clients = [await connect(target, variant) for _ in range(workload.connections)]
+    try:
+        value = b"x" * workload.value_size
+        keys = [f"{prefix}load:{idx}" for idx in range(workload.keyspace)]
+        # A denied fill, e.g. by a read-only ACL, turns every GET into a miss, the errors are reported
+        fill_errors = []
+        for start in range(0, len(keys), 1000):
+            replies = await clients[0].pipeline([("SET", key, value) for key in keys[start:start + 1000]])
+            fill_errors += [reply for reply in replies if isinstance(reply, RespError)]
+        if fill_errors:
+            print(f"{variant.name}: {len(fill_errors)} of {len(keys)} keys not filled, the GETs of these keys "
+                  f"miss: {fill_errors[0]}", file=sys.stderr)
+
+        rng = random.Random(seed)
+        per_connection = [workload.requests // workload.connections +
+                          (idx < workload.requests % workload.connections) for idx in range(workload.connections)]
+        latencies = []
+        started = time.perf_counter()
+        errors = await asyncio.gather(*[
+            run_connection(client, get_batches(workload, prefix, count, rng), latencies)
+            for client, count in zip(clients, per_connection)
+        ])
+        seconds = time.perf_counter() - started
+    finally:
+        for client in clients:
+            await client.close()
+    return dict(name=variant.name, user=variant.user['user_name'] if variant.user is not None else "default",
+                fill_errors=len(fill_errors), **summarize(latencies, workload.requests, sum(errors), seconds))
+
+
+async def create_users(target: Target, users: List[Dict], admin_user: str = None,
+                       admin_password: str = None) -> Dict[str, str]:
+    """
+    Create the users with a random password and their access string, as the user group of the stack does.
+
+    Returns:
+        Dict[str, str]: the passwords by user name.
+    """
+    passwords = {}
+    admin = await RespClient.connect(target.host, target.port, ssl=target.ssl or False, user=admin_user,
+                                     password=admin_password if admin_password is not None else target.auth_token)
+    try:
+        for user in users:
+            password = secrets.token_urlsafe(24)
+            await admin.execute("ACL", "SETUSER", user['user_name'], "reset", *user['user_acl'].split(),
+                                f">{password}")
+            passwords[user['user_name']] = password
+    finally:
+        await admin.close()
+    return passwords
+
+
+def create_certificate(directory: str) -> Dict[str, str]:
+    """
+    Create a self-signed certificate for 127.0.0.1 and localhost with openssl.
+
+    Returns:
+        Dict[str, str]: the `cert` and `key` file paths.
+    """
+    cert = os.path.join(directory, "stand-in.crt")
+    key = os.path.join(directory, "stand-in.key")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=localhost",
+         "-addext", "subjectAltName=IP:127.0.0.1,DNS:localhost", "-keyout", key, "-out", cert],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return {"cert": cert, "key": key}
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stand_in(port: int, auth_token: str = None, certificate: Dict[str, str] = None) -> subprocess.Popen:
+    """
+    Start the stand-in in a child process, so that it does not share the interpreter with the clients,
+    and wait until it accepts connections.
+    """
+    command = [sys.executable, "-m", "functions.resp.server", "--host", "127.0.0.1", "--port", str(port)]
+    if auth_token is not None:
+        command += ["--auth-token", auth_token]
+    if certificate is not None:
+        command += ["--tls-cert", certificate['cert'], "--tls-key", certificate['key']]
+    process = subprocess.Popen(command, cwd=APP_DIR)
+
+    deadline = time.monotonic() + SERVER_START_SECONDS
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError(f"The stand-in did not start on port {port}")
+            time.sleep(0.05)
+
+
+def get_ssl_context(cafile: str = None) -> ssl_.SSLContext:
+    """
+    Return the client SSL context, verifying the server certificate against `cafile` if any.
+    """
+    if cafile is not None:
+        return ssl_.create_default_context(cafile=cafile)
+    context = ssl_.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl_.CERT_NONE
+    return context
+
+
+async def run_load_test(targets: Dict[bool, Target], variants: List[Variant], users: List[Dict],
+                        workload: Workload, admin_user: str = None, admin_password: str = None,
+                        seed: int = 0) -> Dict:
+    """
+    Create the users on every target and run every variant on the target of its TLS setting.
+
+    Args:
+        targets: the targets by TLS setting.
+        variants: the variants.
+        users: the ACL users to create.
+        workload: the workload.
+        admin_user: the user creating the users, the default user if None.
+        admin_password: its password, the AUTH token of the target if None.
+        seed: the seed of the key and command draws.
+
+    Returns:
+        Dict: the environment, the workload and the summary of every variant.
+    """
+    for tls, target in list(targets.items()):
+        if users and any(variant.tls == tls for variant in variants):
+            passwords = await create_users(target, users, admin_user, admin_password)
+            targets[tls] = target._replace(passwords=passwords)
+
+    results = []
+    for variant in variants:
+        result = await run_variant(targets[variant.tls], variant, workload, seed)
+        results.append(result)
+        print(f"{result['name']}: {result['ops_per_second']} ops/s, p50 {result['p50_ms']} ms, "
+              f"p99 {result['p99_ms']} ms, p999 {result['p999_ms']} ms, {result['errors']} errors", file=sys.stderr)
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "workload": workload._asdict(),
+        "variants": results
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline load test of the connection settings of the cluster.")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS, help="operations per variant")
+    parser.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS, help="concurrent connections")
+    parser.add_argument("--pipeline", type=int, default=DEFAULT_PIPELINE, help="commands per pipelined batch")
+    parser.add_argument("--read-ratio", type=float, default=DEFAULT_READ_RATIO, help="share of GET commands")
+    parser.add_argument("--value-size", type=int, default=DEFAULT_VALUE_SIZE, help="bytes per SET value")
+    parser.add_argument("--keyspace", type=int, default=DEFAULT_KEYSPACE, help="number of distinct keys")
+    parser.add_argument("--user", help="user name of the ACL variants, the first user by default")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the key and command draws")
+    parser.add_argument("--host", help="Redis server to target instead of the stand-in")
+    parser.add_argument("--port", type=int,
+                        help="plain port, the port_number of the config for --host, a free port for the stand-in")
+    parser.add_argument("--tls-port", type=int, help="TLS port of --host, the plain port by default")
+    parser.add_argument("--tls-ca", help="CA file verifying the certificate of --host")
+    parser.add_argument("--auth-token", help="password of the default user of --host")
+    parser.add_argument("--admin-user", help="user of --host creating the ACL users, the default user by default")
+    parser.add_argument("--admin-password", help="password of --admin-user")
+    parser.add_argument("--output", help="JSON results file, stdout by default")
+    args = parser.parse_args(argv)
+
+    from cache.helper import secret
+    from config import config_util as config
+
+    workload = Workload(args.requests, args.connections, args.pipeline, args.read_ratio, args.value_size,
+                        args.keyspace)
+    users = secret.get_users() or []
+    transit_encryption = config.get_transit_encryption()
+    variants = get_variants(transit_encryption, users, args.user)
+
+    processes = []
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            if args.host:
+                port = args.port or int(config.get_port_number())
+                targets = {False: Target(args.host, port, auth_token=args.auth_token)}
+                if transit_encryption:
+                    targets[True] = Target(args.host, args.tls_port or port, get_ssl_context(args.tls_ca),
+                                           args.auth_token)
+            else:
+                auth_token = secrets.token_urlsafe(24) if config.get_auth_token_enabled() else None
+                # A free port, a Redis server already listening on the port of the config would be measured instead
+                port = args.port or get_free_port()
+                processes.append(start_stand_in(port, auth_token))
+                targets = {False: Target("127.0.0.1", port, auth_token=auth_token)}
+                if transit_encryption:
+                    certificate = create_certificate(directory)
+                    tls_port = args.tls_port or get_free_port()
+                    processes.append(start_stand_in(tls_port, auth_token, certificate))
+                    targets[True] = Target("127.0.0.1", tls_port, get_ssl_context(certificate['cert']), auth_token)
+
+            results = asyncio.run(run_load_test(targets, variants, users, workload, args.admin_user,
+                                                args.admin_password, args.seed))
+            results["environment"]["server"] = args.host or "stand-in"
+            if not args.host:
+                results["note"] = STAND_IN_NOTE
+                print(STAND_IN_NOTE, file=sys.stderr)
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait()
+
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(results, fp, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""
+Offline synth benchmark of the ElastiCache stack.
+
+Every scenario synthesizes the stack of config/config.py with `users` users in `secrets.users`, `cidrs` entries in
+`allowed_cidrs` and `clusters` clusters in a fleet, in its own process so that the peak RSS of the scenario, the
+jsii node process included, is measured on its own. The VPC lookups are answered from the app context, nothing
+is called over the network.
+
+    python -m benchmarks.synth_benchmark --output benchmarks/results.json
+    python -m benchmarks.synth_benchmark --baseline benchmarks/baseline.json --tolerance 0.25
+
+The scenarios sweep one dimension at a time, the other dimensions stay at their first value.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, NamedTuple
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ACCOUNT = "123456789012"
+REGION = "us-east-1"
+DEFAULT_USERS = (1, 10, 50, 100)
+DEFAULT_CIDRS = (1, 10, 50)
+DEFAULT_CLUSTERS = (1, 4, 16)
+# Metrics compared against the baseline, lower is better
+METRICS = ("wall_seconds", "synth_seconds", "peak_rss_mb", "template_bytes")
+
+
+class Scenario(NamedTuple):
+    users: int
+    cidrs: int
+    clusters: int
+
+    @property
+    def name(self) -> str:
+        return f"users={self.users},cidrs={self.cidrs},clusters={self.clusters}"
+
+
+def get_scenarios(users: List[int], cidrs: List[int], clusters: List[int]) -> List[Scenario]:
+    """
+    Return the scenarios sweeping each dimension while the other dimensions stay at their first value.
+    """
+    scenarios = []
+    for scenario in ([Scenario(count, cidrs[0], clusters[0]) for count in users] +
+                     [Scenario(users[0], count, clusters[0]) for count in cidrs] +
+                     [Scenario(users[0], cidrs[0], count) for count in clusters]):
+        if scenario not in scenarios:
+            scenarios.append(scenario)
+    return scenarios
+
+
+def get_vpc_lookup_key(account: str, region: str, vpc_id: str) -> str:
+    """
+    Return the context key of the `ec2.Vpc.from_lookup` call in cache/helper/vpc.py.
+    """
+    return (f"vpc-provider:account={account}:filter.isDefault=false:filter.vpc-id={vpc_id}:"
+            f"region={region}:returnAsymmetricSubnets=true")
+
+
+def get_vpc_context(account: str, region: str, vpc_id: str, subnet_ids: List[str]) -> Dict:
+    """
+    Return the app context answering the VPC lookup with a VPC of private subnets, one per availability zone.
+    """
+    subnets = [
+        {
+            "subnetId": subnet_id,
+            "cidr": f"10.0.{idx}.0/24",
+            "availabilityZone": f"{region}{'abc'[idx % 3]}",
+            "routeTableId": f"rtb-{idx:017d}"
+        }
+        for idx, subnet_id in enumerate(subnet_ids)
+    ]
+    return {
+        get_vpc_lookup_key(account, region, vpc_id): {
+            "vpcId": vpc_id,
+            "vpcCidrBlock": "10.0.0.0/16",
+            "ownerAccountId": account,
+            "availabilityZones": [],
+            "subnetGroups": [{"name": "Private", "type": "Private", "subnets": subnets}]
+        }
+    }
+
+
+def get_entries(scenario: Scenario) -> List[Dict]:
+    """
+    Return the fleet entries of the scenario, overrides of config/config.py.
+    """
+    users = [
+        {"user_id": f"user-id-{idx}", "user_name": f"user-name-{idx}", "user_acl": "on ~* +@all"}
+        for idx in range(scenario.users)
+    ]
+    cidrs = [f"10.{idx // 256}.{idx % 256}.0/24" for idx in range(scenario.cidrs)]
+    return [
+        {
+            "account_id": ACCOUNT,
+            "region": REGION,
+            "cluster_name": f"benchmark-{idx}",
+            "allowed_cidrs": cidrs,
+            "secrets": {"cmk": True, "auth_token_enabled": False, "user_group_id": f"benchmark-{idx}",
+                        "users": users}
+        }
+        for idx in range(scenario.clusters)
+    ]
+
+
+def run_scenario(scenario: Scenario, outdir: str) -> Dict:
+    """
+    Synthesize the scenario in this process.
+
+    Args:
+        scenario: the scenario.
+        outdir: the cloud assembly directory.
+
+    Returns:
+        Dict: the synth time, the template size and the number of resources.
+    """
+    from aws_cdk import core
+    from cache.helper import fleet
+    from config import config_util
+
+    cache_configs = config_util.load_fleet(get_entries(scenario))
+    context = fleet.get_context(APP_DIR)
+    for cache_config in cache_configs:
+        context.update(get_vpc_context(ACCOUNT, REGION, cache_config.vpc_id, list(cache_config.subnet_ids)))
+
+    started = time.perf_counter()
+    app = core.App(outdir=outdir, context=context)
+    fleet.create_fleet(app, cache_configs)
+    app.synth()
+    synth_seconds = time.perf_counter() - started
+
+    with open(os.path.join(outdir, "manifest.json")) as fp:
+        missing = json.load(fp).get("missing", [])
+    if missing:
+        raise RuntimeError(f"Lookups without context: {', '.join(item['key'] for item in missing)}")
+
+    template_bytes = 0
+    resources = 0
+    for name in os.listdir(outdir):
+        if name.endswith(".template.json"):
+            path = os.path.join(outdir, name)
+            template_bytes += os.path.getsize(path)
+            with open(path) as fp:
+                resources += len(json.load(fp).get("Resources", {}))
+    return {"synth_seconds": round(synth_seconds, 3), "template_bytes": template_bytes, "resources": resources}
+
+
+def measure_scenario(scenario: Scenario) -> Dict:
+    """
+    Run the scenario in a child process and measure its wall time and its peak RSS, children included.
+
+    Args:
+        scenario: the scenario.
+
+    Returns:
+        Dict: the scenario result.
+    """
+    with tempfile.TemporaryDirectory() as outdir, tempfile.TemporaryFile("w+") as output:
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.synth_benchmark", "--run-scenario", json.dumps(scenario._asdict()),
+             "--outdir", outdir],
+            cwd=APP_DIR, stdout=output, stderr=subprocess.DEVNULL
+        )
+        # wait4 reports the peak RSS of the child and of its waited-for descendants, i.e. the jsii node process
+        _, status, rusage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status) if hasattr(os, "waitstatus_to_exitcode") else status
+        wall_seconds = time.perf_counter() - started
+        if process.returncode != 0:
+            raise RuntimeError(f"Scenario {scenario.name} failed with exit code {process.returncode}")
+
+        output.seek(0)
+        result = json.loads(output.read().strip().splitlines()[-1])
+
+    # ru_maxrss is in KB on Linux, in bytes on macOS
+    rss_unit = 1 if sys.platform == "darwin" else 1024
+    return dict(
+        name=scenario.name,
+        **scenario._asdict(),
+        wall_seconds=round(wall_seconds, 3),
+        peak_rss_mb=round(rusage.ru_maxrss * rss_unit / 2 ** 20, 1),
+        **result
+    )
+
+
+def run_benchmark(scenarios: List[Scenario], repeat: int = 1) -> Dict:
+    """
+    Measure every scenario, the best of `repeat` runs is kept for every metric.
+    """
+    results = []
+    for scenario in scenarios:
+        runs = [measure_scenario(scenario) for _ in range(repeat)]
+        best = dict(runs[0])
+        for metric in METRICS:
+            best[metric] = min(run[metric] for run in runs)
+        results.append(best)
+        print(f"{scenario.name}: {best['wall_seconds']}s wall, {best['synth_seconds']}s synth, "
+              f"{best['peak_rss_mb']} MB, {best['template_bytes']} bytes", file=sys.stderr)
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "scenarios": results
+    }
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Return the regressions of the results against the baseline, a metric regresses when it exceeds the baseline
+    by more than the tolerance, e.g. 0.25 for 25%. Scenarios missing from the baseline are not compared.
+
+    Args:
+        results: the benchmark results.
+        baseline: the baseline results.
+        tolerance: the relative tolerance.
+
+    Returns:
+        List[str]: the regressions.
+    """
+    baseline_scenarios = {scenario["name"]: scenario for scenario in baseline.get("scenarios", [])}
+    regressions = []
+    for scenario in results["scenarios"]:
+        reference = baseline_scenarios.get(scenario["name"])
+        if reference is None:
+            continue
+        for metric in METRICS:
+            if metric in reference and scenario[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(f"{scenario['name']}: {metric} {scenario[metric]} > "
+                                   f"{reference[metric]} (+{tolerance:.0%})")
+    return regressions
+
+
+def parse_counts(value: str) -> List[int]:
+    return [int(count) for count in value.split(",")]
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline synth benchmark of the ElastiCache stack.")
+    parser.add_argument("--users", type=parse_counts, default=list(DEFAULT_USERS), help="e.g. 1,10,50,100")
+    parser.add_argument("--cidrs", type=parse_counts, default=list(DEFAULT_CIDRS), help="e.g. 1,10,50")
+    parser.add_argument("--clusters", type=parse_counts, default=list(DEFAULT_CLUSTERS), help="e.g. 1,4,16")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per scenario, the best run is kept")
+    parser.add_argument("--output", help="JSON results file, stdout by default")
+    parser.add_argument("--baseline", help="JSON results file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="relative regression tolerance")
+    parser.add_argument("--run-scenario", help=argparse.SUPPRESS)
+    parser.add_argument("--outdir", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_scenario:
+        print(json.dumps(run_scenario(Scenario(**json.loads(args.run_scenario)), args.outdir)))
+        return 0
+
+    results = run_benchmark(get_scenarios(args.users, args.cidrs, args.clusters), args.repeat)
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(results, fp, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as fp:
+            regressions = compare(results, json.load(fp), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,13 @@
+"""
+Runtime helpers reading the ElastiCache credentials the stack stores in AWS Secrets Manager, for the services
+connecting to the cluster. Only the standard library is needed, boto3 is imported when Secrets Manager is called.
+"""
+from .backend import CredentialError, InMemoryBackend, SecretBackend, SecretsManagerBackend
+from .credential_cache import CredentialCache
+from .secrets import (
+    UserCredentials,
+    get_auth_token_secret_name,
+    get_user_secret_name,
+    parse_auth_token,
+    parse_user_secret
+)
@@ -0,0 +1,141 @@
+"""
+Backends fetching secret values by secret name, in batches.
+
+SecretsManagerBackend  AWS Secrets Manager, BatchGetSecretValue with a fallback to GetSecretValue on older SDKs.
+InMemoryBackend        a dict of secret values for tests and local development, records its batches.
+"""
+import abc
+from typing import Dict, List, Sequence, Tuple
+
+# BatchGetSecretValue takes up to 20 secret ids per call
+MAX_BATCH_SIZE = 20
+
+
+class CredentialError(Exception):
+    """
+    Raised when secrets cannot be fetched, with the error of every failed secret.
+    """
+    def __init__(self, errors: Dict[str, str]) -> None:
+        super().__init__("Cannot fetch ElastiCache secrets:\n  " +
+                         "\n  ".join(f"{secret_id}: {error}" for secret_id, error in sorted(errors.items())))
+        self.errors = errors
+
+
+def get_batches(secret_ids: Sequence[str], batch_size: int = MAX_BATCH_SIZE) -> List[List[str]]:
+    secret_ids = list(dict.fromkeys(secret_ids))
+    return [secret_ids[idx:idx + batch_size] for idx in range(0, len(secret_ids), batch_size)]
+
+
+class SecretBackend(abc.ABC):
+    """
+    Base class of the backends, fetch_batch is called with at most batch_size secret ids.
+    """
+    batch_size = MAX_BATCH_SIZE
+
+    @abc.abstractmethod
+    def fetch_batch(self, secret_ids: List[str]) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """
+        Fetch a batch of secrets.
+
+        Args:
+            secret_ids: the secret names.
+
+        Returns:
+            Tuple[Dict[str, str], Dict[str, str]]: the SecretString and the error of every secret, by secret name.
+        """
+
+    def fetch(self, secret_ids: Sequence[str]) -> Dict[str, str]:
+        """
+        Fetch secrets in as few calls as the batch size allows.
+
+        Args:
+            secret_ids: the secret names.
+
+        Returns:
+            Dict[str, str]: the SecretString by secret name.
+
+        Raises:
+            CredentialError: if any secret cannot be fetched, after all batches are fetched.
+        """
+        values = {}
+        errors = {}
+        for batch in get_batches(secret_ids, self.batch_size):
+            batch_values, batch_errors = self.fetch_batch(batch)
+            values.update(batch_values)
+            errors.update(batch_errors)
+        errors.update({secret_id: "not returned" for secret_id in secret_ids
+                       if secret_id not in values and secret_id not in errors})
+        if errors:
+            raise CredentialError(errors)
+        return values
+
+
+class SecretsManagerBackend(SecretBackend):
+    """
+    Fetch the secrets from AWS Secrets Manager, boto3 is imported on first use so the package imports without it.
+    """
+    def __init__(self, client=None, region_name: str = None) -> None:
+        """
+        Constructor for SecretsManagerBackend class
+
+        Args:
+            client: a boto3 secretsmanager client, created with adaptive retries if None.
+            region_name: the region of the client created, the default region of the environment if None.
+        """
+        self._client = client
+        self.region_name = region_name
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            from botocore.config import Config
+            # Adaptive retries back off client side when a fleet restart hits the API rate limit
+            self._client = boto3.client("secretsmanager", region_name=self.region_name,
+                                        config=Config(retries={"mode": "adaptive", "max_attempts": 10}))
+        return self._client
+
+    def fetch_batch(self, secret_ids: List[str]) -> Tuple[Dict[str, str], Dict[str, str]]:
+        if not hasattr(self.client, "batch_get_secret_value"):
+            return self.fetch_each(secret_ids)
+
+        values = {}
+        errors = {}
+        kwargs = {"SecretIdList": secret_ids}
+        while True:
+            response = self.client.batch_get_secret_value(**kwargs)
+            for secret_value in response.get("SecretValues", []):
+                values[secret_value["Name"]] = secret_value["SecretString"]
+            for error in response.get("Errors", []):
+                errors[error["SecretId"]] = f"{error.get('ErrorCode')}: {error.get('Message')}"
+            if not response.get("NextToken"):
+                return values, errors
+            kwargs["NextToken"] = response["NextToken"]
+
+    def fetch_each(self, secret_ids: List[str]) -> Tuple[Dict[str, str], Dict[str, str]]:
+        from botocore.exceptions import ClientError
+
+        values = {}
+        errors = {}
+        for secret_id in secret_ids:
+            try:
+                values[secret_id] = self.client.get_secret_value(SecretId=secret_id)["SecretString"]
+            except ClientError as error:
+                errors[secret_id] = str(error)
+        return values, errors
+
+
+class InMemoryBackend(SecretBackend):
+    """
+    Serve the secrets from a dict, e.g. `InMemoryBackend({"/elasticache/my-cluster/auth-token": '{"token": "x"}'})`.
+    """
+    def __init__(self, secrets: Dict[str, str] = None, batch_size: int = MAX_BATCH_SIZE) -> None:
+        self.secrets = dict(secrets or {})
+        self.batch_size = batch_size
+        self.batches = []
+
+    def fetch_batch(self, secret_ids: List[str]) -> Tuple[Dict[str, str], Dict[str, str]]:
+        self.batches.append(list(secret_ids))
+        values = {secret_id: self.secrets[secret_id] for secret_id in secret_ids if secret_id in self.secrets}
+        errors = {secret_id: "ResourceNotFoundException" for secret_id in secret_ids if secret_id not in values}
+        return values, errors
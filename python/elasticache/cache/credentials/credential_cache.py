@@ -0,0 +1,217 @@
+"""
+In-process TTL cache of the ElastiCache secrets.
+
+A secret is fetched once per TTL. Shortly before it expires the next read schedules a refresh in a background
+thread and keeps returning the cached value, so that only the first connection of a process waits for Secrets
+Manager. The refresh point of every secret is jittered so that a fleet started at once does not refresh at once.
+Secrets missing from the cache are fetched together in batches.
+"""
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+from .backend import SecretBackend, SecretsManagerBackend
+from .secrets import (
+    UserCredentials,
+    get_auth_token_secret_name,
+    get_user_secret_name,
+    parse_auth_token,
+    parse_user_secret
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 300.0
+DEFAULT_REFRESH_AHEAD = 60.0
+# Wait before refreshing again after a failed background refresh
+RETRY_INTERVAL = 10.0
+
+
+class CacheEntry(NamedTuple):
+    value: str
+    refresh_at: float
+    expires_at: float
+
+
+class CredentialCache:
+    """
+    Cache of secret values by secret name, e.g.
+
+        cache = CredentialCache()
+        credentials = cache.get_user("dev-my-cluster", "user-name-1")
+        credentials_by_user = cache.get_users("dev-my-cluster", ["tenant-acme", "tenant-globex"])
+    """
+    def __init__(self, backend: SecretBackend = None, ttl: float = DEFAULT_TTL,
+                 refresh_ahead: float = DEFAULT_REFRESH_AHEAD, background_refresh: bool = True,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Constructor for CredentialCache class
+
+        Args:
+            backend: the backend fetching the secrets, AWS Secrets Manager if None.
+            ttl: the seconds a secret is served from the cache.
+            refresh_ahead: the seconds before the expiry the refresh starts, jittered down to half of it.
+            background_refresh: refresh in a background thread, otherwise refresh_pending refreshes.
+            clock: the monotonic clock in seconds.
+        """
+        if not 0 <= refresh_ahead < ttl:
+            raise ValueError(f"refresh_ahead must be between 0 and the ttl {ttl}, got {refresh_ahead}")
+        self.backend = backend or SecretsManagerBackend()
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.background_refresh = background_refresh
+        self.clock = clock
+        self._entries = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        # Serializes the fetches of missing secrets, callers waiting for the same secret fetch it once
+        self._fetch_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+    def get_secret_strings(self, secret_ids: Iterable[str]) -> Dict[str, str]:
+        """
+        Return the SecretString of the secrets, the missing and expired secrets are fetched in batches.
+
+        Args:
+            secret_ids: the secret names.
+
+        Returns:
+            Dict[str, str]: the SecretString by secret name.
+
+        Raises:
+            CredentialError: if any secret cannot be fetched.
+        """
+        values, missing = self._lookup(list(dict.fromkeys(secret_ids)), schedule=True)
+        if missing:
+            values.update(self._fetch(missing))
+        return values
+
+    def get_user(self, cluster_name: str, user_name: str) -> UserCredentials:
+        return self.get_users(cluster_name, [user_name])[user_name]
+
+    def get_users(self, cluster_name: str, user_names: Sequence[str]) -> Dict[str, UserCredentials]:
+        """
+        Return the credentials of the users of a cluster, fetched in batches.
+
+        Args:
+            cluster_name: the replication group id.
+            user_names: the user names.
+
+        Returns:
+            Dict[str, UserCredentials]: the credentials by user name.
+        """
+        secret_names = {user_name: get_user_secret_name(cluster_name, user_name) for user_name in user_names}
+        values = self.get_secret_strings(secret_names.values())
+        return {user_name: parse_user_secret(values[secret_name]) for user_name, secret_name in secret_names.items()}
+
+    def get_auth_token(self, cluster_name: str) -> str:
+        secret_name = get_auth_token_secret_name(cluster_name)
+        return parse_auth_token(self.get_secret_strings([secret_name])[secret_name])
+
+    def invalidate(self, secret_ids: Iterable[str] = None) -> None:
+        """
+        Drop secrets from the cache, e.g. after an authentication failure following a rotation, all if None.
+        """
+        with self._lock:
+            if secret_ids is None:
+                self._entries.clear()
+            else:
+                for secret_id in secret_ids:
+                    self._entries.pop(secret_id, None)
+
+    def refresh_pending(self) -> int:
+        """
+        Refresh the secrets scheduled for a refresh, the background thread calls it when it is enabled.
+        A failed refresh keeps serving the cached values until they expire and is retried later.
+
+        Args: None
+
+        Returns:
+            int: the number of secrets refreshed.
+        """
+        with self._lock:
+            secret_ids = sorted(self._pending)
+        if not secret_ids:
+            return 0
+
+        try:
+            self._store(self.backend.fetch(secret_ids))
+        except Exception:
+            logger.warning("Background refresh of %d ElastiCache secrets failed", len(secret_ids), exc_info=True)
+            retry_at = self.clock() + RETRY_INTERVAL
+            with self._lock:
+                for secret_id in secret_ids:
+                    entry = self._entries.get(secret_id)
+                    if entry is not None:
+                        self._entries[secret_id] = entry._replace(refresh_at=min(retry_at, entry.expires_at))
+            return 0
+        finally:
+            with self._lock:
+                self._pending.difference_update(secret_ids)
+        return len(secret_ids)
+
+    def close(self) -> None:
+        """
+        Stop the background refresh thread.
+        """
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _lookup(self, secret_ids: List[str], schedule: bool) -> Tuple[Dict[str, str], List[str]]:
+        now = self.clock()
+        values = {}
+        missing = []
+        with self._lock:
+            for secret_id in secret_ids:
+                entry = self._entries.get(secret_id)
+                if entry is None or now >= entry.expires_at:
+                    missing.append(secret_id)
+                    continue
+                values[secret_id] = entry.value
+                if schedule and now >= entry.refresh_at and secret_id not in self._pending:
+                    self._pending.add(secret_id)
+                    self._start_refresh()
+        return values, missing
+
+    def _fetch(self, secret_ids: List[str]) -> Dict[str, str]:
+        with self._fetch_lock:
+            # Another caller may have fetched some of the secrets while this one waited
+            values, missing = self._lookup(secret_ids, schedule=False)
+            if missing:
+                fetched = self.backend.fetch(missing)
+                self._store(fetched)
+                values.update(fetched)
+        return values
+
+    def _store(self, values: Dict[str, str]) -> None:
+        now = self.clock()
+        with self._lock:
+            for secret_id, value in values.items():
+                refresh_at = now + self.ttl - self.refresh_ahead * random.uniform(0.5, 1.0)
+                self._entries[secret_id] = CacheEntry(value, refresh_at, now + self.ttl)
+
+    def _start_refresh(self) -> None:
+        # Called with the lock held
+        if not self.background_refresh or self._closed:
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="elasticache-credential-refresh", daemon=True)
+            self._thread.start()
+        self._wakeup.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._pending and not self._closed:
+                    self._wakeup.wait()
+                if self._closed:
+                    return
+            self.refresh_pending()
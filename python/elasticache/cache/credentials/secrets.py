@@ -0,0 +1,49 @@
+"""
+Names and JSON shapes of the secrets written by cache/elasticache_secret.py.
+
+    /elasticache/<cluster>/<user name>  {"user-name": "...", "password": "..."}
+    /elasticache/<cluster>/auth-token   {"token": "..."}
+"""
+import json
+from typing import NamedTuple
+
+SECRET_PREFIX = "/elasticache"
+AUTH_TOKEN_SECRET = "auth-token"
+
+
+class UserCredentials(NamedTuple):
+    user_name: str
+    password: str
+
+
+def get_user_secret_name(cluster_name: str, user_name: str) -> str:
+    return f"{SECRET_PREFIX}/{cluster_name}/{user_name}"
+
+
+def get_auth_token_secret_name(cluster_name: str) -> str:
+    return f"{SECRET_PREFIX}/{cluster_name}/{AUTH_TOKEN_SECRET}"
+
+
+def parse_user_secret(secret_string: str) -> UserCredentials:
+    """
+    Return the user name and password of a user secret.
+
+    Args:
+        secret_string: the SecretString of the secret.
+
+    Returns: UserCredentials
+    """
+    value = json.loads(secret_string)
+    return UserCredentials(value["user-name"], value["password"])
+
+
+def parse_auth_token(secret_string: str) -> str:
+    """
+    Return the token of the auth token secret.
+
+    Args:
+        secret_string: the SecretString of the secret.
+
+    Returns: str
+    """
+    return json.loads(secret_string)["token"]
@@ -0,0 +1,139 @@
+import json
+
+from aws_cdk.core import Construct, Stack
+import aws_cdk.aws_iam as iam
+import aws_cdk.aws_kms as kms
+
+# cluster: one CMK for every secret of the cluster
+# secret-type: one CMK for the user secrets and one for the auth token
+# secret: one CMK per secret
+KEY_SCOPES = ("cluster", "secret-type", "secret")
+KEY_ACTIONS = (
+    "kms:Decrypt",
+    "kms:DescribeKey",
+    "kms:Encrypt",
+    "kms:ReEncrypt*",
+    "kms:GenerateDataKey*"
+)
+
+
+class ElastiCacheKeyPool(Construct):
+    """
+    Class handing out the CMKs of the secrets of a cluster, one per scope instead of one per secret.
+    Fewer keys mean fewer KMS calls when the clients read their secrets and a better reuse of the data keys
+    they cache. Every principal is granted access once per key, whichever secret asks for it.
+    """
+    def __init__(self, scope: Construct, construct_id: str, cluster_name: str, key_scope: str = "cluster",
+                 kms_key: kms.IKey = None, **kwargs) -> None:
+        """
+        Constructor for ElastiCacheKeyPool class
+
+        Args:
+            scope (core.Construct): the stack owning the keys.
+            construct_id (str): id for the construct which is used to uniquely identify it.
+            cluster_name (str): the replication group id, the key aliases are prefixed with it.
+            key_scope (str): the secrets sharing a key, one of KEY_SCOPES.
+            kms_key (kms.IKey): an existing CMK handed out for every scope, e.g. the key shared by a fleet.
+        """
+        super().__init__(scope, construct_id, **kwargs)
+
+        if key_scope not in KEY_SCOPES:
+            raise ValueError(f"Unsupported KMS key scope {key_scope}, "
+                             f"supported scopes are: {', '.join(KEY_SCOPES)}")
+        self.cluster_name = cluster_name
+        self.key_scope = key_scope
+        self.shared_key = kms_key
+        self.keys = {}
+        self.principals = {}
+
+    def get_key_name(self, key_type: str, key_id: str) -> str:
+        """
+        Return the name of the key of a secret in the scope of the pool.
+
+        Args:
+            key_type: the type of the secret, e.g. users or auth-token.
+            key_id: the id of the secret, e.g. the user id.
+
+        Returns: str
+        """
+        if self.key_scope == "cluster":
+            return self.cluster_name
+        if self.key_scope == "secret-type":
+            return f"{self.cluster_name}-{key_type}"
+        return f"{self.cluster_name}-{key_type}-{key_id}"
+
+    def get_key(self, key_type: str, key_id: str) -> kms.IKey:
+        """
+        Return the key of a secret, created on first use and granted to the principals granted so far.
+
+        Args:
+            key_type: the type of the secret, e.g. users or auth-token.
+            key_id: the id of the secret, e.g. the user id.
+
+        Returns: kms.IKey
+        """
+        if self.shared_key is not None:
+            return self.shared_key
+
+        name = self.get_key_name(key_type, key_id)
+        if name not in self.keys:
+            key = kms.Key(
+                self, f"Key-{name}",
+                alias=f"elasticache/kms/key/{name}",
+                enable_key_rotation=True,
+                description=f"Encrypts the secrets of the ElastiCache cluster {self.cluster_name}."
+            )
+            for principal in self.principals.values():
+                add_key_access(key, principal)
+            self.keys[name] = key
+        return self.keys[name]
+
+    def grant(self, principal: iam.IPrincipal) -> None:
+        """
+        Grant a principal access to every key of the pool, once however many secrets share a key.
+        The access to an imported key is granted in the principal policy, see `add_key_access`.
+
+        Args:
+            principal: the aws iam principal to grant access to the kms keys.
+
+        Returns: None
+        """
+        principal_key = json.dumps(principal.policy_fragment.principal_json, sort_keys=True)
+        if principal_key in self.principals:
+            return
+        self.principals[principal_key] = principal
+        for key in ([self.shared_key] if self.shared_key is not None else self.keys.values()):
+            add_key_access(key, principal)
+
+
+def add_key_access(key: kms.IKey, principal: iam.IPrincipal) -> None:
+    """
+    Add the statement allowing a principal to use the key to the key policy. The policy of an imported key, e.g.
+    the key shared by a fleet, can not be changed, the key trusts the IAM policies of its account and the statement
+    goes to the principal policy instead.
+
+    Raises:
+        ValueError: if the key is imported and the principal has no policy of the key account.
+    """
+    result = key.add_to_resource_policy(
+        iam.PolicyStatement(
+            principals=[principal],
+            actions=list(KEY_ACTIONS)
+        )
+    )
+    if result.statement_added:
+        return
+
+    result = principal.add_to_principal_policy(
+        iam.PolicyStatement(
+            actions=list(KEY_ACTIONS),
+            resources=[key.key_arn]
+        )
+    )
+    if result.statement_added:
+        return
+    # The account of the key is trusted by the key policy already
+    if isinstance(principal, iam.AccountPrincipal) and principal.account_id == Stack.of(key).account:
+        return
+    raise ValueError(f"Can not grant {json.dumps(principal.policy_fragment.principal_json)} access to the imported "
+                     f"key {key.node.path}, grant it in the key policy of the stack owning the key")
@@ -0,0 +1,273 @@
+from typing import Dict, List
+
+from aws_cdk.core import NestedStack
+from aws_cdk import (
+    aws_cloudwatch as cloudwatch,
+    aws_cloudwatch_actions as cloudwatch_actions,
+    aws_sns as sns,
+    aws_sns_subscriptions as subscriptions,
+    core
+)
+
+from cache.helper.topology import NodeGroup
+from config.config_model import MAX_TEMPLATE_RESOURCES, get_monitoring_resource_count
+
+NAMESPACE = "AWS/ElastiCache"
+
+# Alarm per metric: the configuration key of its threshold, the statistic and whether it only applies
+# to replicas. Thresholds are configured in the `alarms` entry of the `monitoring` section.
+# An alarm watches every member node of a node group through the MAX, or for the cache hit rate the MIN,
+# of their metrics, a node group has at most 6 members, below the 10 metrics of an alarm.
+ALARMS = {
+    "EngineCPUUtilization": ("engine_cpu_utilization", "Average", False),
+    "DatabaseMemoryUsagePercentage": ("database_memory_usage_percentage", "Average", False),
+    "GetTypeCmdsLatency": ("get_latency_us", "Average", False),
+    "SetTypeCmdsLatency": ("set_latency_us", "Average", False),
+    "CacheHitRate": ("cache_hit_rate_min", "Average", False),
+    "Evictions": ("evictions", "Sum", False),
+    "CurrConnections": ("curr_connections", "Maximum", False),
+    "NetworkBandwidthInAllowanceExceeded": ("network_bandwidth_allowance_exceeded", "Sum", False),
+    "NetworkBandwidthOutAllowanceExceeded": ("network_bandwidth_allowance_exceeded", "Sum", False),
+    "ReplicationLag": ("replication_lag_seconds", "Maximum", True),
+}
+
+
+class ElastiCacheMonitoring(NestedStack):
+    """
+    Class for the CloudWatch dashboard and alarms of a replication group, in a nested stack so that the alarms
+    of hundreds of nodes do not count against the resource limit of the cluster stack.
+    Every node group gets a row of graphs with one series per member node, every node gets a
+    single value widget, and every node group gets its own alarms notifying the SNS topic.
+    """
+    def __init__(self, scope: core.Construct, construct_id: str, cluster_name: str,
+                 node_groups: List[NodeGroup], monitoring_config: Dict, **kwargs) -> None:
+        """
+        Constructor for ElastiCacheMonitoring class
+
+        Args:
+            scope (core.Construct): the parent construct.
+            construct_id (str): id for the construct which is used to uniquely identify it.
+            cluster_name (str): the replication group id.
+            node_groups (List[NodeGroup]): the node groups and member nodes of the replication group.
+            monitoring_config (Dict): the `monitoring` section in config/config.py.
+        """
+        resources = get_monitoring_resource_count(monitoring_config, len(node_groups), len(node_groups[0].replicas))
+        if resources > MAX_TEMPLATE_RESOURCES:
+            raise ValueError(f"The monitoring of {len(node_groups)} node groups needs {resources} resources, above "
+                             f"the {MAX_TEMPLATE_RESOURCES} resources of a template, configure fewer "
+                             f"'monitoring.alarms' thresholds")
+
+        super().__init__(scope, construct_id, **kwargs)
+        self.cluster_name = cluster_name
+        self.node_groups = node_groups
+        self.period = core.Duration.seconds(monitoring_config.get('period_seconds', 60))
+
+        self.topic = self.get_alarm_topic(monitoring_config)
+        self.dashboard = cloudwatch.Dashboard(
+            self, "ElastiCacheDashboard",
+            dashboard_name=f"elasticache-{cluster_name}",
+            widgets=self.get_widgets()
+        )
+        self.alarms = self.create_alarms(
+            monitoring_config.get('alarms', {}),
+            evaluation_periods=monitoring_config.get('evaluation_periods', 5),
+            datapoints_to_alarm=monitoring_config.get('datapoints_to_alarm', 3)
+        )
+
+    def get_alarm_topic(self, monitoring_config: Dict) -> sns.ITopic:
+        """
+        Return the SNS topic the alarms notify, either the configured topic or a new one.
+
+        Args:
+            monitoring_config: the `monitoring` section in config/config.py.
+
+        Returns:
+            sns.ITopic: the alarm topic.
+        """
+        topic_arn = monitoring_config.get('alarm_topic_arn', None)
+        if topic_arn is not None:
+            return sns.Topic.from_topic_arn(self, "ElastiCacheAlarmTopic", topic_arn)
+
+        topic = sns.Topic(
+            self, "ElastiCacheAlarmTopic",
+            topic_name=f"elasticache-{self.cluster_name}-alarms",
+            display_name=f"ElastiCache {self.cluster_name} alarms"
+        )
+        for email in monitoring_config.get('alarm_emails', []):
+            topic.add_subscription(subscriptions.EmailSubscription(email))
+        return topic
+
+    def metric(self, metric_name: str, node_id: str, statistic: str = "Average",
+               label: str = None) -> cloudwatch.Metric:
+        """
+        Return the host or engine level metric of a node.
+
+        Args:
+            metric_name: the ElastiCache metric name.
+            node_id: the cache cluster id of the node.
+            statistic: the statistic to apply.
+            label: the label of the metric in graphs.
+
+        Returns:
+            cloudwatch.Metric: the node metric.
+        """
+        return cloudwatch.Metric(
+            namespace=NAMESPACE,
+            metric_name=metric_name,
+            dimensions_map={"CacheClusterId": node_id},
+            statistic=statistic,
+            period=self.period,
+            label=label
+        )
+
+    def get_widgets(self) -> List[List[cloudwatch.IWidget]]:
+        """
+        Return the dashboard rows, one block of graphs per node group followed by a row of
+        single value widgets with one widget per node.
+
+        Args: None
+
+        Returns:
+            List[List[cloudwatch.IWidget]]: the dashboard rows.
+        """
+        rows = [[cloudwatch.TextWidget(
+            markdown=f"# ElastiCache {self.cluster_name}\n"
+                     f"{len(self.node_groups)} node groups, "
+                     f"{len(self.node_groups[0].replicas)} replicas per node group",
+            width=24, height=2
+        )]]
+
+        for node_group in self.node_groups:
+            nodes = node_group.nodes
+            title = f"Node group {node_group.node_group_id}"
+            rows.append([
+                self.graph(f"{title} EngineCPUUtilization (%)", "EngineCPUUtilization", nodes),
+                self.graph(f"{title} GetTypeCmdsLatency (us)", "GetTypeCmdsLatency", nodes),
+                self.graph(f"{title} SetTypeCmdsLatency (us)", "SetTypeCmdsLatency", nodes),
+                self.graph(f"{title} CacheHitRate (%)", "CacheHitRate", nodes),
+            ])
+            rows.append([
+                self.graph(f"{title} DatabaseMemoryUsagePercentage (%)", "DatabaseMemoryUsagePercentage", nodes),
+                self.graph(f"{title} Evictions", "Evictions", nodes, statistic="Sum"),
+                self.graph(f"{title} CurrConnections", "CurrConnections", nodes, statistic="Maximum"),
+                cloudwatch.GraphWidget(
+                    title=f"{title} NetworkBandwidthAllowanceExceeded",
+                    left=[self.metric("NetworkBandwidthInAllowanceExceeded", node, "Sum", f"{node} in")
+                          for node in nodes],
+                    right=[self.metric("NetworkBandwidthOutAllowanceExceeded", node, "Sum", f"{node} out")
+                           for node in nodes],
+                    width=6
+                ),
+            ])
+            if node_group.replicas:
+                rows.append([
+                    self.graph(f"{title} ReplicationLag (s)", "ReplicationLag", node_group.replicas,
+                               statistic="Maximum", width=24)
+                ])
+            single_values = [
+                cloudwatch.SingleValueWidget(
+                    title=f"{node} ({'primary' if node == node_group.primary else 'replica'})",
+                    metrics=[
+                        self.metric("EngineCPUUtilization", node, label="EngineCPUUtilization"),
+                        self.metric("DatabaseMemoryUsagePercentage", node, label="DatabaseMemoryUsagePercentage"),
+                        self.metric("GetTypeCmdsLatency", node, label="GetTypeCmdsLatency"),
+                        self.metric("SetTypeCmdsLatency", node, label="SetTypeCmdsLatency"),
+                    ],
+                    width=6
+                )
+                for node in nodes
+            ]
+            # A dashboard row is 24 units wide, four widgets of width 6 per row.
+            rows.extend(single_values[idx:idx + 4] for idx in range(0, len(single_values), 4))
+        return rows
+
+    def graph(self, title: str, metric_name: str, nodes: List[str], statistic: str = "Average",
+              width: int = 6) -> cloudwatch.GraphWidget:
+        """
+        Return a graph with one series per node.
+
+        Args:
+            title: the widget title.
+            metric_name: the ElastiCache metric name.
+            nodes: the cache cluster ids of the nodes.
+            statistic: the statistic to apply.
+            width: the widget width.
+
+        Returns:
+            cloudwatch.GraphWidget: the graph.
+        """
+        return cloudwatch.GraphWidget(
+            title=title,
+            left=[self.metric(metric_name, node, statistic, node) for node in nodes],
+            width=width
+        )
+
+    def node_group_metric(self, metric_name: str, node_group: NodeGroup, nodes: List[str],
+                          statistic: str) -> cloudwatch.MathExpression:
+        """
+        Return the worst value of a metric across the nodes of a node group, the lowest cache hit rate
+        and the highest value of every other metric.
+
+        Args:
+            metric_name: the ElastiCache metric name.
+            node_group: the node group.
+            nodes: the cache cluster ids of the member nodes to watch.
+            statistic: the statistic to apply to every node metric.
+
+        Returns:
+            cloudwatch.MathExpression: the node group metric.
+        """
+        function = "MIN" if metric_name == "CacheHitRate" else "MAX"
+        using_metrics = {f"m{idx}": self.metric(metric_name, node, statistic) for idx, node in enumerate(nodes)}
+        return cloudwatch.MathExpression(
+            expression=f"{function}([{', '.join(using_metrics)}])",
+            using_metrics=using_metrics,
+            label=f"{metric_name} node group {node_group.node_group_id}",
+            period=self.period
+        )
+
+    def create_alarms(self, thresholds: Dict, evaluation_periods: int,
+                      datapoints_to_alarm: int) -> List[cloudwatch.Alarm]:
+        """
+        Create an alarm per node group for each metric with a configured threshold, the alarm watches every
+        member node so that the alarm count grows with the node groups and not with the nodes.
+        The cache hit rate alarms when it drops below its threshold, every other metric when it rises above.
+
+        Args:
+            thresholds: the `alarms` entry of the `monitoring` section.
+            evaluation_periods: the number of periods to evaluate.
+            datapoints_to_alarm: the number of breaching periods that trigger the alarm.
+
+        Returns:
+            List[cloudwatch.Alarm]: the alarms.
+        """
+        alarms = []
+        action = cloudwatch_actions.SnsAction(self.topic)
+        for node_group in self.node_groups:
+            for metric_name, (threshold_key, statistic, replicas_only) in ALARMS.items():
+                threshold = thresholds.get(threshold_key, None)
+                nodes = node_group.replicas if replicas_only else node_group.nodes
+                if threshold is None or not nodes:
+                    continue
+
+                if metric_name == "CacheHitRate":
+                    comparison_operator = cloudwatch.ComparisonOperator.LESS_THAN_THRESHOLD
+                else:
+                    comparison_operator = cloudwatch.ComparisonOperator.GREATER_THAN_OR_EQUAL_TO_THRESHOLD
+
+                alarm_name = f"{self.cluster_name}-{node_group.node_group_id}-{metric_name}"
+                alarm = self.node_group_metric(metric_name, node_group, nodes, statistic).create_alarm(
+                    self, f"{alarm_name}-alarm",
+                    alarm_name=alarm_name,
+                    alarm_description=f"{metric_name} of a node of node group {node_group.node_group_id} "
+                                      f"({', '.join(nodes)}) breached {threshold}",
+                    threshold=threshold,
+                    comparison_operator=comparison_operator,
+                    evaluation_periods=evaluation_periods,
+                    datapoints_to_alarm=datapoints_to_alarm,
+                    treat_missing_data=cloudwatch.TreatMissingData.NOT_BREACHING
+                )
+                alarm.add_alarm_action(action)
+                alarm.add_ok_action(action)
+                alarms.append(alarm)
+        return alarms
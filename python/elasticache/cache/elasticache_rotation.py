@@ -0,0 +1,143 @@
+from typing import Dict, List
+
+from aws_cdk.core import Construct
+from aws_cdk import (
+    aws_ec2 as ec2,
+    aws_events as events,
+    aws_events_targets as targets,
+    aws_iam as iam,
+    aws_lambda as lambda_,
+    aws_secretsmanager as sm,
+    core
+)
+
+from cache.elasticache_secret import ElastiCacheSecret
+from cache.elasticache_slowlog import FUNCTIONS_PATH
+from config.default import default
+
+# A step waits for ModifyUser and ModifyReplicationGroup to be applied, within the 15 minutes of a Lambda
+TIMEOUT_MINUTES = 15
+MAX_WAIT_SECONDS = 780
+
+
+class ElastiCacheRotation(Construct):
+    """
+    Class for the rotation of the user secrets and of the auth token secret.
+    The rotation function adds the new password next to the current one, both are accepted until a scheduled
+    prune removes the old one once the clients had the grace period to pick up the new one, so connection pools
+    never see a wave of WRONGPASS errors.
+    """
+    def __init__(self, scope: core.Construct, construct_id: str, cluster_name: str, vpc: ec2.IVpc,
+                 cluster_security_group: ec2.SecurityGroup, endpoint: str, port: int, transit_encryption: bool,
+                 secrets: List[ElastiCacheSecret], rotation_config: Dict, serverless: bool = False,
+                 **kwargs) -> None:
+        """
+        Constructor for ElastiCacheRotation class
+
+        Args:
+            scope (core.Construct): the parent construct.
+            construct_id (str): id for the construct which is used to uniquely identify it.
+            cluster_name (str): the replication group id.
+            vpc (ec2.IVpc): the vpc of the cluster, the function connects to the cluster to test the passwords.
+            cluster_security_group (ec2.SecurityGroup): the security group of the cluster.
+            endpoint (str): the primary or configuration endpoint address of the cluster.
+            port (int): the port of the cluster.
+            transit_encryption (bool): whether the cluster requires TLS.
+            secrets (List[ElastiCacheSecret]): the secrets to rotate.
+            rotation_config (Dict): the `secrets.rotation` section in config/config.py.
+            serverless (bool): whether the cache is a serverless cache, the steps wait for it instead of a
+                replication group.
+        """
+        super().__init__(scope, construct_id, **kwargs)
+
+        self.security_group = ec2.SecurityGroup(
+            self, "ElastiCacheRotationSecurityGroup",
+            vpc=vpc,
+            allow_all_outbound=True,
+            description=f"Security Group of the secret rotation of {cluster_name} ElastiCache Cluster"
+        )
+        cluster_security_group.add_ingress_rule(
+            self.security_group,
+            ec2.Port.tcp(port),
+            f"Allows the secret rotation to test the passwords on ElastiCache cluster {cluster_name}."
+        )
+
+        self.function = lambda_.Function(
+            self, "ElastiCacheRotationFunction",
+            runtime=lambda_.Runtime.PYTHON_3_9,
+            code=lambda_.Code.from_asset(FUNCTIONS_PATH, exclude=["**/__pycache__"]),
+            handler="rotation.handler.handler",
+            memory_size=rotation_config.get('memory_size', 256),
+            timeout=core.Duration.minutes(TIMEOUT_MINUTES),
+            vpc=vpc,
+            security_groups=[self.security_group],
+            environment={
+                "REPLICATION_GROUP_ID": cluster_name,
+                "REDIS_HOST": endpoint,
+                "REDIS_PORT": str(port),
+                "REDIS_TLS": "true" if transit_encryption else "false",
+                "SERVERLESS": "true" if serverless else "false",
+                "GRACE_MINUTES": str(rotation_config.get('grace_minutes', default['rotation_grace_minutes'])),
+                "MAX_WAIT_SECONDS": str(MAX_WAIT_SECONDS)
+            },
+            description=f"Rotates the secrets of ElastiCache cluster {cluster_name}"
+        )
+        self.function.grant_invoke(iam.ServicePrincipal("secretsmanager.amazonaws.com"))
+        self.add_permissions(cluster_name)
+
+        # One statement per cluster instead of one per secret, the role policy stays small with hundreds of users
+        days = rotation_config.get('schedule_days', default['rotation_schedule_days'])
+        self.schedules = []
+        for secret in secrets:
+            schedule = sm.CfnRotationSchedule(
+                secret, "RotationSchedule",
+                secret_id=secret.secret.secret_arn,
+                rotation_lambda_arn=self.function.function_arn,
+                rotation_rules=sm.CfnRotationSchedule.RotationRulesProperty(automatically_after_days=days)
+            )
+            # The first rotation waits for the schedule, the users and the cluster may not exist yet
+            schedule.add_property_override("RotateImmediatelyOnUpdate", False)
+            self.schedules.append(schedule)
+
+        interval = rotation_config.get('prune_interval_minutes', default['rotation_prune_interval_minutes'])
+        events.Rule(
+            self, "ElastiCacheRotationPruneSchedule",
+            schedule=events.Schedule.rate(core.Duration.minutes(interval)),
+            targets=[targets.LambdaFunction(self.function)]
+        )
+
+    def add_permissions(self, cluster_name: str) -> None:
+        stack = core.Stack.of(self)
+        self.function.add_to_role_policy(iam.PolicyStatement(
+            actions=[
+                "secretsmanager:DescribeSecret",
+                "secretsmanager:GetSecretValue",
+                "secretsmanager:PutSecretValue",
+                "secretsmanager:UpdateSecretVersionStage"
+            ],
+            resources=[stack.format_arn(service="secretsmanager", resource="secret", sep=":",
+                                        resource_name=f"/elasticache/{cluster_name}/*")]
+        ))
+        self.function.add_to_role_policy(iam.PolicyStatement(
+            actions=["secretsmanager:GetRandomPassword", "secretsmanager:ListSecrets"],
+            resources=["*"]
+        ))
+        self.function.add_to_role_policy(iam.PolicyStatement(
+            actions=["kms:Decrypt", "kms:Encrypt", "kms:GenerateDataKey*"],
+            resources=["*"],
+            conditions={"StringEquals": {"kms:ViaService": f"secretsmanager.{stack.region}.amazonaws.com"}}
+        ))
+        self.function.add_to_role_policy(iam.PolicyStatement(
+            actions=["elasticache:ModifyUser", "elasticache:ModifyReplicationGroup"],
+            resources=[
+                stack.format_arn(service="elasticache", resource="user", sep=":", resource_name="*"),
+                stack.format_arn(service="elasticache", resource="replicationgroup", sep=":",
+                                 resource_name=cluster_name)
+            ]
+        ))
+        # The steps wait for the changes to be applied
+        self.function.add_to_role_policy(iam.PolicyStatement(
+            actions=["elasticache:DescribeUsers", "elasticache:DescribeReplicationGroups",
+                     "elasticache:DescribeServerlessCaches"],
+            resources=["*"]
+        ))
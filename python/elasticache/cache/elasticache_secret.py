@@ -8,6 +8,10 @@ from aws_cdk import (
     core
 )
 
+from cache.elasticache_key_pool import ElastiCacheKeyPool, add_key_access
+# Tags identifying the secrets for the rotation function in functions/rotation
+from functions.rotation.tags import TAG_REPLICATION_GROUP, TAG_SECRET_TYPE, TAG_USER_ID
+
 
 class ElastiCacheSecret(Construct):
     """
@@ -18,7 +22,11 @@ class ElastiCacheSecret(Construct):
     TokenSecret extends from ElastiCacheSecret, it contains token name and
     auto-generated token which are stored in AWS SecretsManager.
     """
-    def __init__(self, scope: core.Construct, construct_id: str, key_id: str, cmk: bool = False, **kwargs) -> None:
+    # The type of the secret, the secrets of a type share a key of a pool scoped by secret type
+    key_type = "secret"
+
+    def __init__(self, scope: core.Construct, construct_id: str, key_id: str, cmk: bool = False,
+                 kms_key: kms.IKey = None, key_pool: ElastiCacheKeyPool = None, **kwargs) -> None:
         """
         Constructor for ElastiCacheSecret class
 
@@ -26,32 +34,61 @@ class ElastiCacheSecret(Construct):
             scope (core.App):  the app object, all child constructs are defined within this app object.
             construct_id (str): id for the construct which is used to uniquely identify it.
             cmk (bool): flag indicate to use AWS managed CMK (True) or not (False).
+            kms_key (kms.IKey): an existing CMK to use instead of creating one, e.g. the key shared by a fleet.
+            key_pool (ElastiCacheKeyPool): the pool handing out the CMK instead of creating one per secret.
         """
         super().__init__(scope, construct_id, **kwargs)
-        self.set_kms_key(key_id, cmk)
+        self.key_pool = key_pool
+        self.set_kms_key(key_id, cmk, kms_key)
         self.secret = None
 
-    def set_kms_key(self, key_id: str, cmk: bool) -> None:
+    def set_kms_key(self, key_id: str, cmk: bool, kms_key: kms.IKey = None) -> None:
         """
         Indicate whether to use the default key or create new key in encrypting the secret in SecretsManager.
         If cmk is False then the default master key that is shared across account are used in encrypting the secret in
         SecretsManager.
 
         Args:
-            key_id:
+            key_id: the id of the secret the key is created for.
             cmk: indicate if default key (False) or create new AWS managed CMK key (True) is used in encrypting
             the secret.
+            kms_key: an existing CMK used when cmk is True instead of creating a new key.
 
         Returns: None
         """
-        if cmk is True:
-            self.kms_key = kms.Key(self, f"aws-elasticache-kms-key-{id}", alias=f"elasticache/kms/key/{key_id}")
+        if cmk is True and kms_key is not None:
+            self.kms_key = kms_key
+        elif cmk is True and self.key_pool is not None:
+            self.kms_key = self.key_pool.get_key(self.key_type, key_id)
+        elif cmk is True:
+            self.kms_key = kms.Key(self, f"aws-elasticache-kms-key-{key_id}", alias=f"elasticache/kms/key/{key_id}")
         else:
             self.kms_key = None
 
+    def grant_read(self, grantee: iam.IGrantable) -> None:
+        """
+        Grant a principal read access to the secret and decrypt access to its key through Secrets Manager.
+        The key grant is a statement of the principal policy, the policy of an imported key, e.g. the key shared
+        by a fleet, can not be changed and `Secret.grant_read` would drop it.
+
+        Args:
+            grantee: the principal reading the secret, e.g. a Lambda function.
+        """
+        self.secret.grant_read(grantee)
+        if self.kms_key is None:
+            return
+
+        stack = core.Stack.of(self)
+        grantee.grant_principal.add_to_principal_policy(iam.PolicyStatement(
+            actions=["kms:Decrypt"],
+            resources=[self.kms_key.key_arn],
+            conditions={"StringEquals": {"kms:ViaService": f"secretsmanager.{stack.region}.{stack.url_suffix}"}}
+        ))
+
     def grant_kms_access(self, principal: iam.AccountPrincipal):
         """
-        Method to grant access to the KMS key, this supports both usernames of IAM users and IAM Roles
+        Method to grant access to the KMS key, this supports both usernames of IAM users and IAM Roles.
+        With a key pool the principal is granted once per pooled key, however many secrets share it.
 
         Args:
             principal: the aws iam principal to grant access to the kms key.
@@ -59,18 +96,10 @@ class ElastiCacheSecret(Construct):
         if self.kms_key is None:
             return
 
-        self.kms_key.add_to_resource_policy(
-            iam.PolicyStatement(
-                principals=[principal],
-                actions=[
-                    "kms:Decrypt",
-                    "kms:DescribeKey",
-                    "kms:Encrypt",
-                    "kms:ReEncrypt*",
-                    "kms:GenerateDataKey*"
-                ]
-            )
-        )
+        if self.key_pool is not None:
+            self.key_pool.grant(principal)
+        else:
+            add_key_access(self.kms_key, principal)
 
 
 class UserSecret(ElastiCacheSecret):
@@ -78,9 +107,12 @@ class UserSecret(ElastiCacheSecret):
     Class for generate username, password and meanwhile store them in
     AWS SecretsManager.
     """
+    key_type = "users"
+
     def __init__(self, scope: core.Construct, id: str, secret_name: str, user_id: str, 
                  user_name: str, user_acl: str, 
-                 cluster_name: str, cmk: bool, **kwargs) -> None:
+                 cluster_name: str, cmk: bool, kms_key: kms.IKey = None,
+                 key_pool: ElastiCacheKeyPool = None, **kwargs) -> None:
         """
         Constructor for UserSecret class
 
@@ -90,7 +122,7 @@ class UserSecret(ElastiCacheSecret):
             secret_name (str): the string representing secret name in SecretsManager.
             user_name (str): username associated to the generated password.
         """
-        super().__init__(scope, id, user_id, cmk, **kwargs)
+        super().__init__(scope, id, user_id, cmk, kms_key, key_pool, **kwargs)
 
         self.secret = sm.Secret(
             self, id,
@@ -106,6 +138,9 @@ class UserSecret(ElastiCacheSecret):
             ),
             encryption_key=self.kms_key
         )
+        core.Tags.of(self.secret).add(TAG_REPLICATION_GROUP, cluster_name)
+        core.Tags.of(self.secret).add(TAG_SECRET_TYPE, "user")
+        core.Tags.of(self.secret).add(TAG_USER_ID, user_id)
         self.user_id = user_id
         self.user_name = user_name
         self.user_acl = user_acl
@@ -117,8 +152,11 @@ class TokenSecret(ElastiCacheSecret):
     Class for generate token/code that is associated with a name and 
     meanwhile store them in AWS SecretsManager.
     """
+    key_type = "auth-token"
+
     def __init__(self, scope: core.Construct, id: str, secret_name: str, 
-                 cluster_name: str, cmk: bool, **kwargs) -> None:
+                 cluster_name: str, cmk: bool, kms_key: kms.IKey = None,
+                 key_pool: ElastiCacheKeyPool = None, **kwargs) -> None:
         """
         Constructor for TokenSecret class
 
@@ -129,7 +167,7 @@ class TokenSecret(ElastiCacheSecret):
             uniquely identify it.
             secret_name (str): the string secret name in SecretsManager.
         """
-        super().__init__(scope, id, secret_name, cmk, **kwargs)
+        super().__init__(scope, id, secret_name, cmk, kms_key, key_pool, **kwargs)
 
         self.secret = sm.Secret(
             self, id,
@@ -144,4 +182,6 @@ class TokenSecret(ElastiCacheSecret):
             ),
             encryption_key=self.kms_key
         )
+        core.Tags.of(self.secret).add(TAG_REPLICATION_GROUP, cluster_name)
+        core.Tags.of(self.secret).add(TAG_SECRET_TYPE, "auth-token")
         self.token = self.secret.secret_value_from_json('token').to_string()
@@ -0,0 +1,40 @@
+from aws_cdk.core import (
+    App,
+    CfnOutput,
+    Stack
+)
+from aws_cdk import aws_kms as kms
+
+
+class ElastiCacheSharedStack(Stack):
+    """
+    Class for the constructs shared by the clusters of a fleet in one account and region.
+    The clusters encrypt their secrets with one CMK instead of one key per secret and import it by ARN. The key
+    policy trusts the IAM policies of the account, the cluster stacks grant their principals access in their own
+    policies, as the policy of an imported key can not be changed.
+    """
+    def __init__(self, scope: App, construct_id: str, kms_alias_name: str, **kwargs) -> None:
+        """
+        Constructor for ElastiCacheSharedStack class
+
+        Args:
+            scope (core.App):  the app object, all child constructs are defined within this app object.
+            construct_id (str): id for the construct which is used to uniquely identify it.
+            kms_alias_name (str): the alias of the shared CMK, e.g. alias/elasticache/fleet.
+        """
+        super().__init__(scope, construct_id, **kwargs)
+
+        self.kms_alias_name = kms_alias_name
+        self.kms_key = kms.Key(
+            self, "ElastiCacheFleetKmsKey",
+            alias=kms_alias_name,
+            enable_key_rotation=True,
+            trust_account_identities=True,
+            description="Encrypts the secrets of the ElastiCache clusters of the fleet."
+        )
+
+        CfnOutput(
+            self, "output-fleet-kms-key-arn",
+            description="The ARN of the CMK shared by the ElastiCache clusters.",
+            value=self.kms_key.key_arn
+        )
@@ -0,0 +1,104 @@
+import os
+from typing import Dict
+
+from aws_cdk.core import Construct
+from aws_cdk import (
+    aws_events as events,
+    aws_events_targets as targets,
+    aws_iam as iam,
+    aws_lambda as lambda_,
+    aws_logs as logs,
+    aws_s3 as s3,
+    core
+)
+
+from cache.helper import log_group as log_group_helper
+
+FUNCTIONS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "functions")
+
+
+class ElastiCacheSlowLogAnalytics(Construct):
+    """
+    Class for the slow-log analytics pipeline.
+    A Lambda aggregator subscribed to the slow-log CloudWatch log group groups slow commands by command
+    name and key pattern, publishes their duration distribution as custom metrics and stores a summary
+    per batch in S3. A daily Lambda merges the summaries into a top-N report.
+    """
+    def __init__(self, scope: core.Construct, construct_id: str, cluster_name: str,
+                 log_group: logs.ILogGroup, analytics_config: Dict, **kwargs) -> None:
+        """
+        Constructor for ElastiCacheSlowLogAnalytics class
+
+        Args:
+            scope (core.Construct): the parent construct.
+            construct_id (str): id for the construct which is used to uniquely identify it.
+            cluster_name (str): the replication group id.
+            log_group (logs.ILogGroup): the slow-log CloudWatch log group.
+            analytics_config (Dict): the `slowlog_analytics` section in config/config.py.
+        """
+        super().__init__(scope, construct_id, **kwargs)
+
+        self.bucket = s3.Bucket(
+            self, "ElastiCacheSlowLogBucket",
+            encryption=s3.BucketEncryption.S3_MANAGED,
+            block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+            enforce_ssl=True,
+            lifecycle_rules=[
+                s3.LifecycleRule(
+                    prefix="summaries/",
+                    expiration=core.Duration.days(analytics_config.get('summary_retention_days', 7))
+                ),
+                s3.LifecycleRule(
+                    prefix="reports/",
+                    expiration=core.Duration.days(analytics_config.get('report_retention_days', 90))
+                )
+            ]
+        )
+
+        environment = {
+            "BUCKET_NAME": self.bucket.bucket_name,
+            "REPLICATION_GROUP_ID": cluster_name,
+            "MAX_GROUPS": str(analytics_config.get('max_groups', 1000)),
+            "TOP_N": str(analytics_config.get('top_n', 20))
+        }
+        code = lambda_.Code.from_asset(FUNCTIONS_PATH, exclude=["**/__pycache__"])
+
+        self.aggregator = lambda_.Function(
+            self, "ElastiCacheSlowLogAggregator",
+            runtime=lambda_.Runtime.PYTHON_3_9,
+            code=code,
+            handler="slowlog.handler.handler",
+            memory_size=analytics_config.get('memory_size', 256),
+            timeout=core.Duration.minutes(1),
+            environment=environment,
+            description=f"Aggregates the slow-log of ElastiCache cluster {cluster_name}"
+        )
+        self.bucket.grant_put(self.aggregator, "summaries/*")
+        self.aggregator.add_to_role_policy(iam.PolicyStatement(
+            actions=["cloudwatch:PutMetricData"],
+            resources=["*"],
+            conditions={"StringEquals": {"cloudwatch:namespace": "ElastiCache/SlowLog"}}
+        ))
+
+        self.report = lambda_.Function(
+            self, "ElastiCacheSlowLogReport",
+            runtime=lambda_.Runtime.PYTHON_3_9,
+            code=code,
+            handler="slowlog.handler.report_handler",
+            memory_size=analytics_config.get('memory_size', 256),
+            timeout=core.Duration.minutes(15),
+            environment=environment,
+            description=f"Reports the top slow commands of ElastiCache cluster {cluster_name}"
+        )
+        self.bucket.grant_read(self.report, "summaries/*")
+        self.bucket.grant_put(self.report, "reports/*")
+
+        events.Rule(
+            self, "ElastiCacheSlowLogReportSchedule",
+            schedule=events.Schedule.cron(minute="15", hour="0"),
+            targets=[targets.LambdaFunction(self.report)]
+        )
+
+        self.subscription_filter = log_group_helper.add_subscription_filter(
+            self, log_group, self.aggregator, analytics_config.get('filter_pattern', None)
+        )
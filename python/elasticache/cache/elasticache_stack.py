@@ -1,48 +1,179 @@
+from typing import List, Tuple
+
 from aws_cdk.core import (
     App,
     CfnOutput,
+    Fn,
     Tags,
-    Stack
+    Stack,
+    Token
+)
+from aws_cdk import (
+    aws_elasticache as elasticache,
+    aws_kms as kms,
+    aws_ssm as ssm
 )
-from aws_cdk import aws_elasticache as elasticache
 
 from config import config_util as config
+from config.config_model import ElastiCacheConfig
+from cache.elasticache_key_pool import ElastiCacheKeyPool
+from cache.elasticache_monitoring import ElastiCacheMonitoring
+from cache.elasticache_rotation import ElastiCacheRotation
+from cache.elasticache_slowlog import ElastiCacheSlowLogAnalytics
+from cache.elasticache_user_stack import ElastiCacheUserStack
+from cache.elasticache_warm_up import ElastiCacheWarmUp
 from cache.helper import (
+    autoscaling,
+    global_datastore,
+    log_delivery_stream,
     log_group,
+    parameter_group,
     secret,
+    serverless,
+    sizing,
+    topology,
     user_group,
     vpc
 )
 
 
+# Node groups with an output of their slots and endpoints, a template has at most 200 outputs.
+MAX_NODE_GROUP_OUTPUTS = 90
+
+
 class ElastiCacheStack(Stack):
     # Class for the ReplicationGroup stack
-    def __init__(self, scope: App, construct_id: str, **kwargs) -> None:
+    def __init__(self, scope: App, construct_id: str, cache_config: ElastiCacheConfig = None,
+                 kms_key_arn: str = None, primary_region: str = None, **kwargs) -> None:
         """
         Constructor for ReplicationStack class
 
         Args:
             scope (core.App):  the app object, all child constructs are defined within this app object.
             construct_id (str): Id for the construct which is used to uniquely identify it.
+            cache_config (ElastiCacheConfig): the validated configuration, parsed from config/config.py if None.
+            kms_key_arn (str): ARN of an existing CMK for the secrets, e.g. the key shared by a fleet.
+            primary_region (str): the region of the primary cluster for a secondary cluster of a Global Datastore.
         """
         super().__init__(scope, construct_id, **kwargs)
 
-        self.cluster_name = config.get_cluster_name()
-        self.transit_encryption = config.get_transit_encryption()
+        self.cache_config = cache_config or config.load()
+        self.primary_region = primary_region
+        with config.use(self.cache_config):
+            self.cluster_name = config.get_cluster_name()
+            self.transit_encryption = config.get_transit_encryption()
+            self.serverless = config.get_serverless()
+            # An imported key trusts the IAM policies of the account, the grants go to the principals
+            if kms_key_arn is None:
+                self.kms_key = None
+            else:
+                self.kms_key = kms.Key.from_key_arn(self, "ElastiCacheSharedKmsKey", kms_key_arn)
+            # The secrets share the CMKs of the pool, one per cluster by default instead of one per secret
+            if config.get_cmk():
+                self.key_pool = ElastiCacheKeyPool(
+                    self, "ElastiCacheKeyPool",
+                    cluster_name=self.cluster_name,
+                    key_scope=config.get_kms_key_scope(),
+                    kms_key=self.kms_key
+                )
+            else:
+                self.key_pool = None
+
+            # Size the cluster from the declared workload, or take the sizing from the config as is. A secondary
+            # cluster takes the node type and shards of the Global Datastore and the replicas of its region
+            self.sizing_plan = sizing.get_sizing_plan() if self.primary_region is None else None
+            if self.sizing_plan is None:
+                self.node_type = config.get_node_type()
+                self.num_node_groups = config.get_num_node_groups()
+                self.replicas_per_node_group = config.get_replicas_per_node_group()
+            else:
+                self.node_type = self.sizing_plan.node_type
+                self.num_node_groups = self.sizing_plan.num_node_groups
+                self.replicas_per_node_group = self.sizing_plan.replicas_per_node_group
+            # Data tiering node types only run with data tiering, the sizing may pick them for a workload
+            self.data_tiering = sizing.is_data_tiering(self.node_type)
+            # A serverless cache spreads the keys by itself, its single endpoint behaves as cluster mode disabled
+            self.cluster_mode = not self.serverless and self.num_node_groups > 1
+            # Custom slot ranges, e.g. from cache/helper/slot_analyzer.py, or the even split of ElastiCache
+            if self.cluster_mode:
+                self.node_group_slots = topology.get_node_group_slots(
+                    config.get_node_group_configuration(), self.num_node_groups
+                )
+            else:
+                self.node_group_slots = [[(0, topology.SLOT_COUNT - 1)]]
+
+            self.vpc = vpc.get_vpc(self)
+            self.security_group = vpc.get_security_group(self, self.vpc)
+            # A serverless cache takes the subnets, and has no engine parameters
+            self.subnet_group = vpc.get_subnet_group(self) if not self.serverless else None
+            # A secondary cluster takes the engine settings of the Global Datastore
+            if self.primary_region is None and not self.serverless:
+                self.parameter_group = parameter_group.get_parameter_group(
+                    self, cluster_mode=self.cluster_mode, data_tiering=self.data_tiering
+                )
+            else:
+                self.parameter_group = None
+
+            self.create_log_delivery()
+            if self.log_group is not None and config.get_slowlog_analytics_enabled():
+                self.slowlog_analytics = ElastiCacheSlowLogAnalytics(
+                    self, "ElastiCacheSlowLogAnalytics",
+                    cluster_name=self.cluster_name,
+                    log_group=self.log_group,
+                    analytics_config=config.get_slowlog_analytics_config()
+                )
 
-        self.security_group = vpc.get_security_group(self)
-        self.subnet_group = vpc.get_subnet_group(self)
+            if self.serverless:
+                self.create_serverless_cache()
+            elif self.primary_region is None:
+                self.create_cache()
+            else:
+                self.create_secondary_cache()
+            self.create_global_datastore()
+            self.create_rotation()
+            self.create_warm_up()
+            self.autoscaling_targets = autoscaling.create_autoscaling(
+                self, self.cluster, self.node_type, self.num_node_groups, self.replicas_per_node_group
+            )
+            self.create_monitoring()
+            self.output_cache()
 
-        # Only Redis 6.x supports the Redis slow-log delivery
-        if config.get_engine_version() != "6.x":
-            self.log_delivery_configuration_request = None
-        else:
-            log_group_name = f"/aws/elasticache/redis-slowlog/{self.cluster_name}"
-            self.log_group = log_group.get_log_group(self, log_group_name)
-            self.log_delivery_configuration_request = [log_group.get_log_delivery_configuration_request(log_group_name)]
+    def create_log_delivery(self) -> None:
+        """
+        Create the destination of every log type in the `log_delivery` section the engine version supports,
+        a CloudWatch log group or a Kinesis Data Firehose delivery stream to S3.
 
-        self.create_cache()
-        self.output_cache()
+        Args: None
+
+        Returns: None
+
+        """
+        self.log_groups = {}
+        self.delivery_streams = {}
+        log_delivery_configuration_request = []
+        # A serverless cache delivers no slow-log nor engine log
+        log_delivery = config.get_log_delivery() if not self.serverless else {}
+        for log_type, delivery in log_delivery.items():
+            if not log_group.supports_log_delivery(config.get_engine_version(), log_type):
+                continue
+
+            destination_type = delivery.get('destination', "cloudwatch-logs")
+            if destination_type == "kinesis-firehose":
+                delivery_stream = log_delivery_stream.get_delivery_stream(self, log_type, delivery)
+                self.delivery_streams[log_type] = delivery_stream
+                destination = delivery_stream.ref
+            else:
+                destination = log_group.get_log_group_name(log_type, self.cluster_name)
+                construct_id = "ElastiCacheCloudWatchLogGroup" if log_type == "slow-log" \
+                    else "ElastiCacheEngineLogCloudWatchLogGroup"
+                self.log_groups[log_type] = log_group.get_log_group(self, destination, construct_id)
+
+            log_delivery_configuration_request.append(
+                log_group.get_log_delivery_configuration_request(destination, log_type, destination_type)
+            )
+
+        self.log_delivery_configuration_request = log_delivery_configuration_request or None
+        self.log_group = self.log_groups.get("slow-log")
 
     def create_cache(self) -> None:
         """
@@ -53,11 +184,9 @@ class ElastiCacheStack(Stack):
         Returns: None
 
         """
-        self.user_secrets = secret.get_user_secrets(self)
-        if hasattr(self, "user_secrets") and self.user_secrets:
-            user_group.create_user_group(self, self.user_secrets)
-
-        if hasattr(self, "user_group"):
+        self.create_users()
+        self.token_secret = secret.get_token_secret(self, self.key_pool)
+        if self.user_group is not None:
             user_group_ids = [config.get_user_group_id()]
         else:
             user_group_ids = None
@@ -65,31 +194,292 @@ class ElastiCacheStack(Stack):
         self.cluster = elasticache.CfnReplicationGroup(
             self, "ElastiCacheReplicationGroup",
             multi_az_enabled=config.get_multi_az(),
-            auth_token=secret.get_auth_token(self),
+            auth_token=self.token_secret.token if self.token_secret else None,
             at_rest_encryption_enabled=config.get_at_rest_encryption(),
             transit_encryption_enabled=self.transit_encryption,
-            cache_node_type=config.get_node_type(),
+            cache_node_type=self.node_type,
             engine="redis",
             engine_version=config.get_engine_version(),
             auto_minor_version_upgrade=True,
             port=config.get_port_number(),
             cache_subnet_group_name=self.subnet_group.ref,
+            cache_parameter_group_name=self.parameter_group.ref if self.parameter_group else None,
             security_group_ids=[self.security_group.security_group_id],
             log_delivery_configurations=self.log_delivery_configuration_request,
-            num_node_groups=config.get_num_node_groups(),
-            replicas_per_node_group=config.get_replicas_per_node_group(),
+            num_node_groups=self.num_node_groups,
+            replicas_per_node_group=self.replicas_per_node_group,
+            node_group_configuration=self.get_node_group_configuration(),
             automatic_failover_enabled=config.get_automatic_failover(),
             replication_group_description=f"Replication group for {self.cluster_name}",
             user_group_ids=user_group_ids,
             snapshot_window=config.get_snapshot_window(),
             snapshot_retention_limit=config.get_snapshot_retension_limit(),
+            # Seed the new cluster from RDB files in S3 or from a backup instead of starting empty
+            snapshot_arns=config.get_snapshot_arns(),
+            snapshot_name=config.get_snapshot_name(),
             replication_group_id=self.cluster_name
         )
         Tags.of(self.cluster).add("Name", self.cluster_name)
+        if self.data_tiering:
+            # Not a property of CfnReplicationGroup in this CDK version
+            self.cluster.add_property_override("DataTieringEnabled", True)
 
         self.cluster.add_depends_on(self.subnet_group)
-        if hasattr(self, "user_group"):
+        if self.parameter_group:
+            self.cluster.add_depends_on(self.parameter_group)
+        if self.user_group is not None:
             self.cluster.add_depends_on(self.user_group)
+        for delivery_stream in self.delivery_streams.values():
+            self.cluster.add_depends_on(delivery_stream)
+
+    def create_serverless_cache(self) -> None:
+        """
+        Create the serverless cache, with the security group, the subnets, the CMK and the user group of the
+        provisioned Replication Group.
+
+        Args: None
+
+        Returns: None
+
+        """
+        self.create_users()
+        self.token_secret = None
+        kms_key = self.key_pool.get_key("cache", self.cluster_name) if self.key_pool is not None else None
+        self.cluster = serverless.create_serverless_cache(self, self.security_group, self.user_group, kms_key)
+
+    def get_endpoints(self) -> Tuple[str, str, str, str]:
+        """
+        Return the endpoint and the reader endpoint of the cache with their ports, the same in every mode:
+        the configuration endpoint in cluster mode, the primary and the reader endpoints otherwise, and the
+        endpoint and the reader endpoint of a serverless cache.
+
+        Args: None
+
+        Returns:
+            Tuple[str, str, str, str]: the endpoint, its port, the reader endpoint and its port.
+        """
+        if self.serverless:
+            return (
+                Token.as_string(self.cluster.get_att("Endpoint.Address")),
+                Token.as_string(self.cluster.get_att("Endpoint.Port")),
+                Token.as_string(self.cluster.get_att("ReaderEndpoint.Address")),
+                Token.as_string(self.cluster.get_att("ReaderEndpoint.Port"))
+            )
+        if self.cluster_mode:
+            # The configuration endpoint routes the READONLY reads to the replicas in cluster mode
+            port = self.cluster.attr_configuration_end_point_port
+            endpoint = self.cluster.attr_configuration_end_point_address
+            return endpoint, port, endpoint, port
+        port = self.cluster.attr_primary_end_point_port
+        return (self.cluster.attr_primary_end_point_address, port,
+                self.cluster.attr_reader_end_point_address, port)
+
+    def get_port(self) -> int:
+        """
+        Return the port of the endpoint, the `port_number` of a provisioned cluster.
+        """
+        return serverless.PORT if self.serverless else config.get_port_number()
+
+    def get_node_group_configuration(self) -> List[elasticache.CfnReplicationGroup.NodeGroupConfigurationProperty]:
+        """
+        Return the node group configuration with the configured slots of every node group.
+
+        Args: None
+
+        Returns:
+            List[elasticache.CfnReplicationGroup.NodeGroupConfigurationProperty]: the node group configuration,
+            None to let ElastiCache split the slots evenly.
+        """
+        if self.num_node_groups == 1 or not config.get_node_group_configuration():
+            return None
+
+        return [
+            elasticache.CfnReplicationGroup.NodeGroupConfigurationProperty(
+                node_group_id=f"{idx:04d}",
+                slots=topology.format_slots(slot_ranges),
+                replica_count=self.replicas_per_node_group
+            )
+            for idx, slot_ranges in enumerate(self.node_group_slots, start=1)
+        ]
+
+    def create_secondary_cache(self) -> None:
+        """
+        Create the Replication Group as a secondary cluster of the Global Datastore of the primary region.
+        The engine, node type, shards, parameter group, encryption and auth token are the ones of the Global
+        Datastore, the network, the users and the replicas are per region.
+
+        Args: None
+
+        Returns: None
+
+        """
+        self.create_users()
+        self.token_secret = None
+
+        self.cluster = elasticache.CfnReplicationGroup(
+            self, "ElastiCacheReplicationGroup",
+            global_replication_group_id=global_datastore.get_global_replication_group_id(self, self.primary_region),
+            multi_az_enabled=config.get_multi_az(),
+            port=config.get_port_number(),
+            cache_subnet_group_name=self.subnet_group.ref,
+            security_group_ids=[self.security_group.security_group_id],
+            log_delivery_configurations=self.log_delivery_configuration_request,
+            replicas_per_node_group=self.replicas_per_node_group,
+            automatic_failover_enabled=config.get_automatic_failover(),
+            replication_group_description=f"Secondary replication group for {self.cluster_name}",
+            user_group_ids=[config.get_user_group_id()] if self.user_group is not None else None,
+            snapshot_window=config.get_snapshot_window(),
+            snapshot_retention_limit=config.get_snapshot_retension_limit(),
+            replication_group_id=self.cluster_name
+        )
+        Tags.of(self.cluster).add("Name", self.cluster_name)
+
+        self.cluster.add_depends_on(self.subnet_group)
+        if self.user_group is not None:
+            self.cluster.add_depends_on(self.user_group)
+        for delivery_stream in self.delivery_streams.values():
+            self.cluster.add_depends_on(delivery_stream)
+
+    def create_global_datastore(self) -> None:
+        """
+        Create the Global Datastore with the Replication Group as its primary when `global_datastore` lists
+        secondary regions, the secondary clusters are stacks of their own, see create_secondaries in
+        cache/helper/fleet.py.
+
+        Args: None
+
+        Returns: None
+
+        """
+        if self.primary_region is not None or config.get_global_datastore_config() is None:
+            self.global_replication_group = None
+            return
+
+        self.global_replication_group = global_datastore.create_global_replication_group(self, self.cluster)
+
+    def create_users(self) -> None:
+        """
+        Create the user secrets, the Redis users and the user group. With `users_per_stack` set the secrets and
+        users are split across nested stacks of that many users each.
+
+        Args: None
+
+        Returns: None
+
+        """
+        self.user_stacks = []
+        self.user_group = None
+        users = secret.get_users()
+        if not users:
+            self.user_secrets = None
+            return
+
+        users_per_stack = config.get_users_per_stack()
+        if users_per_stack is None:
+            self.user_secrets = secret.get_user_secrets(self, self.key_pool, users=users)
+            self.user_group = user_group.create_user_group(self, self.user_secrets)
+            return
+
+        for start in range(0, len(users), users_per_stack):
+            self.user_stacks.append(ElastiCacheUserStack(
+                self, f"ElastiCacheUserStack-{start // users_per_stack + 1}",
+                users=users[start:start + users_per_stack],
+                start=start,
+                key_pool=self.key_pool
+            ))
+        self.user_secrets = [user_secret for user_stack in self.user_stacks for user_secret in user_stack.user_secrets]
+        self.user_group = user_group.create_user_group(self, self.user_secrets, dependencies=self.user_stacks)
+
+    def create_rotation(self) -> None:
+        """
+        Create the rotation of the user secrets and of the auth token secret.
+
+        Args: None
+
+        Returns: None
+
+        """
+        secrets = list(self.user_secrets or []) + ([self.token_secret] if self.token_secret else [])
+        if not config.get_rotation_enabled() or not secrets:
+            self.rotation = None
+            return
+
+        endpoint = self.get_endpoints()[0]
+        self.rotation = ElastiCacheRotation(
+            self, "ElastiCacheRotation",
+            cluster_name=self.cluster_name,
+            vpc=self.vpc,
+            cluster_security_group=self.security_group,
+            endpoint=endpoint,
+            port=self.get_port(),
+            transit_encryption=self.transit_encryption,
+            secrets=secrets,
+            rotation_config=config.get_rotation_config(),
+            serverless=self.serverless
+        )
+
+    def create_warm_up(self) -> None:
+        """
+        Create the warm-up loading the hot keys of the manifest once the cluster is created.
+        The writes authenticate with the auth token, with the `user_name` of the `warm_up` section, or as the
+        default user.
+
+        Args: None
+
+        Returns: None
+
+        """
+        # A secondary cluster of a Global Datastore is read-only, the primary replicates the hot keys to it
+        if not config.get_warm_up_enabled() or self.primary_region is not None:
+            self.warm_up = None
+            return
+
+        warm_up_config = config.get_warm_up_config()
+        user_name = warm_up_config.get('user_name', None)
+        if self.token_secret is not None:
+            warm_up_secret = self.token_secret
+        elif user_name is not None:
+            warm_up_secret = next((user_secret for user_secret in self.user_secrets or []
+                                   if user_secret.user_name == user_name), None)
+            if warm_up_secret is None:
+                raise ValueError(f"'warm_up.user_name' {user_name!r} is not a user of the 'secrets' section")
+        else:
+            warm_up_secret = None
+
+        self.warm_up = ElastiCacheWarmUp(
+            self, "ElastiCacheWarmUp",
+            cluster_name=self.cluster_name,
+            vpc=self.vpc,
+            cluster_security_group=self.security_group,
+            endpoint=self.get_endpoints()[0],
+            port=self.get_port(),
+            transit_encryption=self.transit_encryption,
+            cluster_mode=self.cluster_mode,
+            secret=warm_up_secret,
+            warm_up_config=warm_up_config
+        )
+
+    def create_monitoring(self) -> None:
+        """
+        Create the CloudWatch dashboard and alarms for every node group and node of the Replication Group.
+
+        Args: None
+
+        Returns: None
+
+        """
+        if not config.get_monitoring_enabled():
+            self.monitoring = None
+            return
+
+        self.monitoring = ElastiCacheMonitoring(
+            self, "ElastiCacheMonitoring",
+            cluster_name=self.cluster_name,
+            node_groups=topology.get_node_groups(
+                self.cluster_name, self.num_node_groups, self.replicas_per_node_group
+            ),
+            monitoring_config=config.get_monitoring_config()
+        )
 
     def output_cache(self):
         """
@@ -103,6 +493,9 @@ class ElastiCacheStack(Stack):
         self.output_security_group()
         self.output_secret()
         self.output_cache_cluster()
+        self.output_topology()
+        self.output_global_datastore()
+        self.output_sizing()
 
     def output_security_group(self) -> None:
         """
@@ -116,7 +509,7 @@ class ElastiCacheStack(Stack):
         separator = ","
         CfnOutput(
             self, "output-security-group",
-            value=separator.join(self.cluster.security_group_ids),
+            value=separator.join([self.security_group.security_group_id]),
             description="Redis security group id for the cluster",
             export_name=f"{self.cluster_name}-security-group-id"
         )
@@ -130,7 +523,15 @@ class ElastiCacheStack(Stack):
         Returns: None
 
         """
-        if hasattr(self, "user_secrets"):
+        if self.user_stacks:
+            # Hundreds of users would exceed the outputs of a template, the secret names follow the user names
+            CfnOutput(
+                self, "output-user-secret-prefix",
+                value=f"/elasticache/{self.cluster_name}/",
+                description="Replication group configuration user secret name prefix for cluster",
+                export_name=f"{self.cluster_name}-configuration-user-secret-prefix"
+            )
+        elif self.user_secrets:
             for idx, user_secret in enumerate(self.user_secrets):
                 CfnOutput(
                     self, f"output-user-secret-name-{idx + 1}",
@@ -139,7 +540,7 @@ class ElastiCacheStack(Stack):
                     export_name=f"{self.cluster_name}-configuration-user-secret-name-{idx}"
                 )
 
-        if hasattr(self, "token_secret"):
+        if self.token_secret is not None:
             CfnOutput(
                 self, "output-token-secret-name",
                 value=self.token_secret.secret.secret_name,
@@ -150,28 +551,165 @@ class ElastiCacheStack(Stack):
     def output_cache_cluster(self) -> None:
         """
         Output specific CloudFormation stack items for replication group.
-        The items are group id, port number, and configuration endpoint.
+        The items are group id, port number, the configuration endpoint in cluster mode, the primary endpoint
+        otherwise, and the reader endpoint.
 
         Args: None
 
         Returns: None
 
         """
+        endpoint, port, reader_endpoint, reader_port = self.get_endpoints()
         CfnOutput(
             self, "output-port-number",
-            value=self.cluster.attr_configuration_end_point_port,
-            description="Replication group configuration port for cluster",
+            value=port,
+            description="Replication group port for cluster",
             export_name=f"{self.cluster_name}-port-number"
         )
         CfnOutput(
             self, "output-endpoint",
-            value=self.cluster.attr_configuration_end_point_address,
-            description="Replication group configuration endpoint for cluster",
+            value=endpoint,
+            description="Replication group configuration endpoint in cluster mode, primary endpoint otherwise",
             export_name=f"{self.cluster_name}-endpoint"
         )
+        CfnOutput(
+            self, "output-reader-endpoint",
+            value=reader_endpoint,
+            description=f"Reader endpoint of the cluster in {self.region}",
+            export_name=f"{self.cluster_name}-reader-endpoint"
+        )
+        CfnOutput(
+            self, "output-reader-port-number",
+            value=reader_port,
+            description="Port of the reader endpoint, the port of the endpoint unless the cache is serverless",
+            export_name=f"{self.cluster_name}-reader-port-number"
+        )
         CfnOutput(
             self, "output-id",
             value=self.cluster.ref,
             description="Replication group id for cluster",
             export_name=f"{self.cluster_name}-id"
         )
+
+    def output_topology(self) -> None:
+        """
+        Output the slots and the member endpoints of every node group in cluster mode, and publish the topology
+        document in the SSM parameter `/elasticache/<cluster>/topology`, so that clients warm their slot map
+        at startup without a CLUSTER SLOTS call. A document larger than an SSM parameter is split into pages
+        `/elasticache/<cluster>/topology/<page>`.
+
+        Args: None
+
+        Returns: None
+
+        """
+        port = self.get_port()
+        parameter_name = f"/elasticache/{self.cluster_name}/topology"
+        if not self.cluster_mode:
+            endpoint, _, reader_endpoint, _ = self.get_endpoints()
+            documents = [{
+                "cluster_mode": False,
+                "port": port,
+                "primary_endpoint": endpoint,
+                "reader_endpoint": reader_endpoint,
+                "reader_port": serverless.READER_PORT if self.serverless else port
+            }]
+        else:
+            node_groups = topology.get_node_groups(
+                self.cluster_name, self.num_node_groups, self.replicas_per_node_group
+            )
+            # The node endpoints share the domain of the configuration endpoint:
+            # clustercfg.<id>.<hash>.<region>.cache.amazonaws.com and <member>.<id>.<hash>.<region>...
+            suffix = Fn.select(1, Fn.split("clustercfg.", self.cluster.attr_configuration_end_point_address))
+            documents = topology.get_topology_documents(node_groups, self.node_group_slots, {
+                "cluster_mode": True,
+                "port": port,
+                "configuration_endpoint": self.cluster.attr_configuration_end_point_address,
+                "node_endpoint_suffix": suffix
+            })
+            self.output_node_groups(node_groups, suffix)
+
+        self.topology_parameters = []
+        for idx, document in enumerate(documents):
+            name = parameter_name if idx == 0 else f"{parameter_name}/{idx}"
+            self.topology_parameters.append(ssm.StringParameter(
+                self, "ElastiCacheTopologyParameter" if idx == 0 else f"ElastiCacheTopologyParameter{idx}",
+                parameter_name=name,
+                string_value=self.to_json_string(document),
+                tier=ssm.ParameterTier.STANDARD
+                if topology.get_document_bytes(document) <= topology.MAX_STANDARD_DOCUMENT_BYTES
+                else ssm.ParameterTier.ADVANCED,
+                description=f"Topology of {self.cluster_name}" if idx == 0 else
+                f"Topology of {self.cluster_name}, page {idx} of {len(documents) - 1}"
+            ))
+
+    def output_node_groups(self, node_groups: List[topology.NodeGroup], suffix: str) -> None:
+        """
+        Output the slots, the primary and the replicas of every node group, e.g.
+        `slots=0-8191;primary=<endpoint>;replicas=<endpoint>,<endpoint>`, for the first MAX_NODE_GROUP_OUTPUTS node
+        groups, a template has at most 200 outputs. The primary is the one at creation, a failover swaps the roles.
+
+        Args:
+            node_groups: the node groups.
+            suffix: the domain of the node endpoints.
+
+        Returns: None
+
+        """
+        for node_group, slot_ranges in list(zip(node_groups, self.node_group_slots))[:MAX_NODE_GROUP_OUTPUTS]:
+            primary = Fn.join(".", [node_group.primary, suffix])
+            replicas = [Fn.join(".", [replica, suffix]) for replica in node_group.replicas]
+            CfnOutput(
+                self, f"output-node-group-{node_group.node_group_id}",
+                value=Fn.join("", [f"slots={topology.format_slots(slot_ranges)};primary=", primary, ";replicas=",
+                                   Fn.join(",", replicas) if replicas else ""]),
+                description=f"Slots and member endpoints of node group {node_group.node_group_id}",
+                export_name=f"{self.cluster_name}-node-group-{node_group.node_group_id}"
+            )
+
+    def output_global_datastore(self) -> None:
+        """
+        Output the Global Datastore id in the primary region.
+
+        Args: None
+
+        Returns: None
+
+        """
+        if self.global_replication_group is None:
+            return
+
+        CfnOutput(
+            self, "output-global-replication-group-id",
+            value=self.global_replication_group.ref,
+            description="Global datastore id of the cluster",
+            export_name=f"{self.cluster_name}-global-replication-group-id"
+        )
+
+    def output_sizing(self) -> None:
+        """
+        Output the sizing plan and the headroom computed for the declared workload.
+
+        Args: None
+
+        Returns: None
+
+        """
+        if self.sizing_plan is None:
+            return
+
+        CfnOutput(
+            self, "output-sizing-plan",
+            value=f"{self.node_type} x {self.num_node_groups} node groups x "
+                  f"{self.replicas_per_node_group} replicas, ~${self.sizing_plan.hourly_price}/hour",
+            description="Node type, node groups and replicas picked for the declared workload",
+            export_name=f"{self.cluster_name}-sizing-plan"
+        )
+        CfnOutput(
+            self, "output-sizing-headroom",
+            value=f"memory={self.sizing_plan.memory_headroom:.1%}, "
+                  f"cpu={self.sizing_plan.cpu_headroom:.1%}, "
+                  f"network={self.sizing_plan.network_headroom:.1%}",
+            description="Headroom per node at the declared peak workload",
+            export_name=f"{self.cluster_name}-sizing-headroom"
+        )
@@ -0,0 +1,32 @@
+from typing import Dict, List
+
+from aws_cdk.core import (
+    Construct,
+    NestedStack
+)
+
+from cache.elasticache_key_pool import ElastiCacheKeyPool
+from cache.helper import secret, user_group
+
+
+class ElastiCacheUserStack(NestedStack):
+    """
+    Class for a chunk of the users of a bulk provisioning, the secrets and the Redis users of hundreds of tenants
+    are split across nested stacks so that no template hits the CloudFormation resource limit.
+    """
+    def __init__(self, scope: Construct, construct_id: str, users: List[Dict], start: int,
+                 key_pool: ElastiCacheKeyPool = None, **kwargs) -> None:
+        """
+        Constructor for ElastiCacheUserStack class
+
+        Args:
+            scope (core.Construct): the cluster stack.
+            construct_id (str): id for the construct which is used to uniquely identify it.
+            users (List[Dict]): the validated users of the chunk.
+            start (int): the index of the first user of the chunk among all the users.
+            key_pool (ElastiCacheKeyPool): the pool of the CMKs of the user secrets when cmk is enabled.
+        """
+        super().__init__(scope, construct_id, **kwargs)
+
+        self.user_secrets = secret.get_user_secrets(self, key_pool, users=users, start=start)
+        self.users = user_group.create_users(self, self.user_secrets, start=start) or []
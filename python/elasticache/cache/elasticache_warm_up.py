@@ -0,0 +1,103 @@
+from typing import Dict
+
+from aws_cdk.core import Construct
+from aws_cdk import (
+    aws_ec2 as ec2,
+    aws_lambda as lambda_,
+    aws_s3 as s3,
+    custom_resources as cr,
+    core
+)
+
+from cache.elasticache_secret import ElastiCacheSecret
+from cache.elasticache_slowlog import FUNCTIONS_PATH
+from config.default import default
+
+
+class ElastiCacheWarmUp(Construct):
+    """
+    Class for the warm-up of a new cluster.
+    A custom resource created after the replication group runs a Lambda in the cluster VPC loading a manifest of
+    hot keys from S3 with pipelined writes and several connections per shard, so a new or replaced cluster does not
+    start cold and send a thundering herd to the databases behind it.
+    """
+    def __init__(self, scope: core.Construct, construct_id: str, cluster_name: str, vpc: ec2.IVpc,
+                 cluster_security_group: ec2.SecurityGroup, endpoint: str, port: int, transit_encryption: bool,
+                 cluster_mode: bool, secret: ElastiCacheSecret, warm_up_config: Dict, **kwargs) -> None:
+        """
+        Constructor for ElastiCacheWarmUp class
+
+        Args:
+            scope (core.Construct): the parent construct.
+            construct_id (str): id for the construct which is used to uniquely identify it.
+            cluster_name (str): the replication group id.
+            vpc (ec2.IVpc): the vpc of the cluster, the function connects to every shard of the cluster.
+            cluster_security_group (ec2.SecurityGroup): the security group of the cluster.
+            endpoint (str): the primary or configuration endpoint address of the cluster.
+            port (int): the port of the cluster.
+            transit_encryption (bool): whether the cluster requires TLS.
+            cluster_mode (bool): whether the keys are spread across the shards.
+            secret (ElastiCacheSecret): the user or auth token secret of the writes, the default user if None.
+            warm_up_config (Dict): the `warm_up` section in config/config.py.
+        """
+        super().__init__(scope, construct_id, **kwargs)
+
+        self.security_group = ec2.SecurityGroup(
+            self, "ElastiCacheWarmUpSecurityGroup",
+            vpc=vpc,
+            allow_all_outbound=True,
+            description=f"Security Group of the warm-up of {cluster_name} ElastiCache Cluster"
+        )
+        cluster_security_group.add_ingress_rule(
+            self.security_group,
+            ec2.Port.tcp(port),
+            f"Allows the warm-up to load the hot keys into ElastiCache cluster {cluster_name}."
+        )
+
+        environment = {
+            "REPLICATION_GROUP_ID": cluster_name,
+            "REDIS_HOST": endpoint,
+            "REDIS_PORT": str(port),
+            "REDIS_TLS": "true" if transit_encryption else "false",
+            "CLUSTER_MODE": "true" if cluster_mode else "false",
+            "PARALLELISM": str(warm_up_config.get('parallelism_per_shard', default['warm_up_parallelism_per_shard'])),
+            "PIPELINE": str(warm_up_config.get('pipeline', default['warm_up_pipeline']))
+        }
+        if secret is not None:
+            environment["SECRET_ARN"] = secret.secret.secret_arn
+
+        self.function = lambda_.Function(
+            self, "ElastiCacheWarmUpFunction",
+            runtime=lambda_.Runtime.PYTHON_3_9,
+            code=lambda_.Code.from_asset(FUNCTIONS_PATH, exclude=["**/__pycache__"]),
+            handler="warmup.handler.handler",
+            memory_size=warm_up_config.get('memory_size', 512),
+            timeout=core.Duration.minutes(
+                warm_up_config.get('timeout_minutes', default['warm_up_timeout_minutes'])
+            ),
+            vpc=vpc,
+            security_groups=[self.security_group],
+            environment=environment,
+            description=f"Loads the hot keys into ElastiCache cluster {cluster_name}"
+        )
+
+        manifest_bucket = warm_up_config['manifest_bucket']
+        manifest_key = warm_up_config['manifest_key']
+        s3.Bucket.from_bucket_name(self, "ElastiCacheWarmUpManifestBucket", manifest_bucket).grant_read(
+            self.function, manifest_key
+        )
+        if secret is not None:
+            secret.grant_read(self.function)
+
+        provider = cr.Provider(self, "ElastiCacheWarmUpProvider", on_event_handler=self.function)
+        # Created once the endpoint of the replication group exists, and again when the manifest changes
+        self.resource = core.CustomResource(
+            self, "ElastiCacheWarmUpResource",
+            service_token=provider.service_token,
+            resource_type="Custom::ElastiCacheWarmUp",
+            properties={
+                "ManifestBucket": manifest_bucket,
+                "ManifestKey": manifest_key,
+                "Endpoint": endpoint
+            }
+        )
@@ -0,0 +1,181 @@
+from typing import Dict, List
+
+from aws_cdk import (
+    core as cdk,
+    aws_applicationautoscaling as appscaling,
+    aws_elasticache as elasticache
+)
+
+from config.default import default
+from config import config_util as config
+from config.config_model import parse_engine_version
+
+# ElastiCache Auto Scaling is only available for cluster mode enabled replication groups running
+# Redis 6.0 onward on the following node families.
+# https://docs.aws.amazon.com/AmazonElastiCache/latest/red-ug/AutoScaling.html
+AUTOSCALING_NODE_FAMILIES = ("cache.m5.", "cache.m6g.", "cache.r5.", "cache.r6g.", "cache.r6gd.")
+
+NODE_GROUPS_DIMENSION = "elasticache:replication-group:NodeGroups"
+REPLICAS_DIMENSION = "elasticache:replication-group:Replicas"
+
+PRIMARY_ENGINE_CPU_METRIC = "ElastiCachePrimaryEngineCPUUtilization"
+REPLICA_ENGINE_CPU_METRIC = "ElastiCacheReplicaEngineCPUUtilization"
+DATABASE_MEMORY_USAGE_METRIC = "ElastiCacheDatabaseMemoryUsageCountedForEvictPercentage"
+
+
+def validate_autoscaling(node_type: str, num_node_groups: int, replicas_per_node_group: int) -> None:
+    """
+    Validate that the replication group supports ElastiCache Auto Scaling and that the initial
+    shard and replica counts are in the configured capacity ranges.
+
+    Args:
+        node_type: the cache node type.
+        num_node_groups: the initial number of node groups.
+        replicas_per_node_group: the initial number of replicas per node group.
+
+    Returns: None
+    """
+    if num_node_groups <= 1:
+        raise ValueError("Auto Scaling requires cluster mode enabled, set num_node_groups > 1")
+
+    engine_version = config.get_engine_version()
+    if parse_engine_version(engine_version)[0] < 6:
+        raise ValueError(f"Auto Scaling requires Redis 6.0 onward, engine version is {engine_version}")
+
+    if not node_type.startswith(AUTOSCALING_NODE_FAMILIES):
+        raise ValueError(f"Auto Scaling does not support node type {node_type}, "
+                         f"supported families are: {', '.join(AUTOSCALING_NODE_FAMILIES)}")
+
+    for name, capacity, initial in (
+        ("node_groups", config.get_autoscaling_capacity("node_groups"), num_node_groups),
+        ("replicas", config.get_autoscaling_capacity("replicas"), replicas_per_node_group)
+    ):
+        if capacity is None:
+            continue
+        min_capacity, max_capacity = capacity
+        if not min_capacity <= initial <= max_capacity:
+            raise ValueError(f"Auto Scaling {name} capacity {min_capacity}-{max_capacity} "
+                             f"does not include the initial count {initial}")
+
+
+def get_role_arn(scope: cdk.Construct) -> str:
+    """
+    Return the ARN of the service-linked role Application Auto Scaling uses for ElastiCache.
+
+    Args:
+        scope: the cdk construct.
+
+    Returns:
+        str: the role ARN.
+    """
+    return cdk.Stack.of(scope).format_arn(
+        service="iam",
+        region="",
+        resource="role",
+        resource_name="aws-service-role/elasticache.application-autoscaling.amazonaws.com/"
+                      "AWSServiceRoleForApplicationAutoScaling_ElastiCacheRG"
+    )
+
+
+def create_scalable_target(scope: cdk.Construct, cluster: elasticache.CfnReplicationGroup,
+                           construct_id: str, dimension: str, policies: Dict[str, float],
+                           scaling_config: Dict) -> appscaling.CfnScalableTarget:
+    """
+    Create a scalable target for the replication group and a target tracking policy per metric.
+
+    Args:
+        scope: the cdk construct.
+        cluster: the replication group to scale.
+        construct_id: id for the scalable target construct.
+        dimension: the scalable dimension, node groups or replicas.
+        policies: the target value per predefined metric type.
+        scaling_config: the `node_groups` or `replicas` entry of the `autoscaling` section.
+
+    Returns:
+        appscaling.CfnScalableTarget: the scalable target.
+    """
+    scalable_target = appscaling.CfnScalableTarget(
+        scope, construct_id,
+        service_namespace="elasticache",
+        scalable_dimension=dimension,
+        resource_id=f"replication-group/{cluster.replication_group_id}",
+        role_arn=get_role_arn(scope),
+        min_capacity=scaling_config['min_capacity'],
+        max_capacity=scaling_config['max_capacity']
+    )
+    scalable_target.add_depends_on(cluster)
+
+    scale_in_cooldown = scaling_config.get('scale_in_cooldown', default['autoscaling_scale_in_cooldown'])
+    scale_out_cooldown = scaling_config.get('scale_out_cooldown', default['autoscaling_scale_out_cooldown'])
+    for metric, target_value in policies.items():
+        appscaling.CfnScalingPolicy(
+            scope, f"{construct_id}{metric}Policy",
+            policy_name=f"{cluster.replication_group_id}-{dimension.split(':')[-1]}-{metric}",
+            policy_type="TargetTrackingScaling",
+            scaling_target_id=scalable_target.ref,
+            target_tracking_scaling_policy_configuration=appscaling.CfnScalingPolicy.TargetTrackingScalingPolicyConfigurationProperty(
+                target_value=target_value,
+                predefined_metric_specification=appscaling.CfnScalingPolicy.PredefinedMetricSpecificationProperty(
+                    predefined_metric_type=metric
+                ),
+                scale_in_cooldown=scale_in_cooldown,
+                scale_out_cooldown=scale_out_cooldown
+            )
+        )
+    return scalable_target
+
+
+def create_autoscaling(scope: cdk.Construct, cluster: elasticache.CfnReplicationGroup,
+                       node_type: str, num_node_groups: int,
+                       replicas_per_node_group: int) -> List[appscaling.CfnScalableTarget]:
+    """
+    Create the Auto Scaling for the replication group if it is configured.
+    Node groups (shards) are added for write load on the primaries and for memory pressure,
+    replicas are added for read load on the replicas.
+
+    Args:
+        scope: the cdk construct.
+        cluster: the replication group to scale.
+        node_type: the cache node type.
+        num_node_groups: the initial number of node groups.
+        replicas_per_node_group: the initial number of replicas per node group.
+
+    Returns:
+        List[appscaling.CfnScalableTarget]: the scalable targets, None if Auto Scaling is not enabled.
+    """
+    if not config.get_autoscaling_enabled():
+        return None
+
+    validate_autoscaling(node_type, num_node_groups, replicas_per_node_group)
+    autoscaling_config = config.get_autoscaling_config()
+
+    scalable_targets = []
+    node_groups_config = autoscaling_config.get('node_groups', None)
+    if node_groups_config is not None:
+        scalable_targets.append(create_scalable_target(
+            scope, cluster, "ElastiCacheNodeGroupsScalableTarget", NODE_GROUPS_DIMENSION,
+            policies={
+                PRIMARY_ENGINE_CPU_METRIC: node_groups_config.get(
+                    'target_engine_cpu', default['autoscaling_target_engine_cpu']),
+                DATABASE_MEMORY_USAGE_METRIC: node_groups_config.get(
+                    'target_memory_usage', default['autoscaling_target_memory_usage'])
+            },
+            scaling_config=node_groups_config
+        ))
+
+    replicas_config = autoscaling_config.get('replicas', None)
+    if replicas_config is not None:
+        scalable_targets.append(create_scalable_target(
+            scope, cluster, "ElastiCacheReplicasScalableTarget", REPLICAS_DIMENSION,
+            policies={
+                REPLICA_ENGINE_CPU_METRIC: replicas_config.get(
+                    'target_engine_cpu', default['autoscaling_target_engine_cpu'])
+            },
+            scaling_config=replicas_config
+        ))
+
+    # Register the scalable targets one after the other, both modify the same replication group.
+    for previous, scalable_target in zip(scalable_targets, scalable_targets[1:]):
+        scalable_target.add_depends_on(previous)
+
+    return scalable_targets
@@ -0,0 +1,190 @@
+import json
+import os
+from typing import Dict, List, Tuple
+
+from aws_cdk import core as cdk
+
+from cache.elasticache_shared_stack import ElastiCacheSharedStack
+from cache.elasticache_stack import ElastiCacheStack
+from config import config_util
+from config.config_model import ElastiCacheConfig
+
+FLEET_KMS_ALIAS = "alias/elasticache/fleet"
+STACK_DESCRIPTION = "CDK Managed CF template for deploying ElastiCache."
+
+
+def get_environment_key(cache_config: ElastiCacheConfig) -> Tuple[str, str]:
+    """
+    Return the account and region the cluster is deployed to, the constructs shared by a fleet are per key.
+
+    Args:
+        cache_config: the cluster configuration.
+
+    Returns:
+        Tuple[str, str]: the account and region.
+    """
+    return str(cache_config.account_id), cache_config.region
+
+
+def get_stack_name(cache_config: ElastiCacheConfig) -> str:
+    return f"{cache_config.stack_name}-{cache_config.replication_group_id}".lower()
+
+
+def get_shared_stack_name(environment_key: Tuple[str, str]) -> str:
+    account, region = environment_key
+    return f"elasticache-shared-{account}-{region}"
+
+
+def validate_fleet(cache_configs: List[ElastiCacheConfig]) -> None:
+    """
+    Validate that the replication group ids and the stack names are unique per account and region.
+
+    Args:
+        cache_configs: the cluster configurations.
+
+    Returns: None
+    """
+    errors = []
+    seen_clusters = set()
+    seen_stacks = set()
+    for cache_config in cache_configs:
+        cluster_key = get_environment_key(cache_config) + (cache_config.replication_group_id,)
+        if cluster_key in seen_clusters:
+            errors.append(f"duplicate cluster '{cluster_key[2]}' in {cluster_key[0]}/{cluster_key[1]}")
+        seen_clusters.add(cluster_key)
+
+        stack_key = get_environment_key(cache_config) + (get_stack_name(cache_config),)
+        if stack_key in seen_stacks:
+            errors.append(f"duplicate stack name '{stack_key[2]}' in {stack_key[0]}/{stack_key[1]}")
+        seen_stacks.add(stack_key)
+
+    if errors:
+        raise ValueError("Invalid ElastiCache fleet:\n  " + "\n  ".join(errors))
+
+
+def get_weight(cache_config: ElastiCacheConfig) -> int:
+    """
+    Return the relative synth cost of a cluster, dominated by the per node monitoring and the per user secrets.
+    """
+    secrets = cache_config.secrets or {}
+    users = len(secrets.get('users', None) or ()) + len(secrets.get('tenants', None) or ())
+    return 1 + cache_config.num_nodes + 2 * users
+
+
+def partition(cache_configs: List[ElastiCacheConfig], workers: int) -> List[List[ElastiCacheConfig]]:
+    """
+    Split the fleet into at most `workers` partitions of similar synth cost, the heaviest cluster first goes to
+    the lightest partition so that the whole fleet takes about as long as its slowest partition.
+
+    Args:
+        cache_configs: the cluster configurations.
+        workers: the number of partitions.
+
+    Returns:
+        List[List[ElastiCacheConfig]]: the non empty partitions, in the fleet order within each partition.
+    """
+    partitions = [[] for _ in range(max(1, min(workers, len(cache_configs))))]
+    weights = [0] * len(partitions)
+    order = {id(cache_config): idx for idx, cache_config in enumerate(cache_configs)}
+    for cache_config in sorted(cache_configs, key=get_weight, reverse=True):
+        lightest = weights.index(min(weights))
+        partitions[lightest].append(cache_config)
+        weights[lightest] += get_weight(cache_config)
+    return [sorted(items, key=lambda item: order[id(item)]) for items in partitions if items]
+
+
+def create_fleet(app: cdk.App, cache_configs: List[ElastiCacheConfig]) -> List[ElastiCacheStack]:
+    """
+    Create a stack per cluster and, per account and region with clusters using a CMK, a shared stack with the
+    CMK of their secrets. The VPC lookups of clusters in the same VPC resolve to a single context entry.
+
+    Args:
+        app: the cdk app.
+        cache_configs: the cluster configurations.
+
+    Returns:
+        List[ElastiCacheStack]: the cluster stacks, in the fleet order.
+    """
+    validate_fleet(cache_configs)
+
+    shared_stacks = {}
+    stacks = []
+    for cache_config in cache_configs:
+        environment_key = get_environment_key(cache_config)
+        env = cdk.Environment(account=environment_key[0], region=environment_key[1])
+
+        cmk = bool((cache_config.secrets or {}).get('cmk', False))
+        shared_stack = shared_stacks.get(environment_key) if cmk else None
+        if cmk and shared_stack is None:
+            shared_stack = shared_stacks[environment_key] = ElastiCacheSharedStack(
+                app, get_shared_stack_name(environment_key), kms_alias_name=FLEET_KMS_ALIAS, env=env
+            )
+
+        # The same cluster may be deployed to several regions, the construct ids are unique per app
+        stack = ElastiCacheStack(
+            app, f"{get_stack_name(cache_config)}-{environment_key[0]}-{environment_key[1]}",
+            stack_name=get_stack_name(cache_config),
+            cache_config=cache_config,
+            kms_key_arn=shared_stack.kms_key.key_arn if shared_stack else None,
+            env=env,
+            description=STACK_DESCRIPTION
+        )
+        if shared_stack is not None:
+            stack.add_dependency(shared_stack)
+        stacks.append(stack)
+        create_secondaries(app, stack, get_stack_name(cache_config), description=STACK_DESCRIPTION)
+
+    return stacks
+
+
+def create_secondaries(app: cdk.App, primary_stack: ElastiCacheStack, stack_name: str,
+                       **kwargs) -> List[ElastiCacheStack]:
+    """
+    Create a stack per secondary region of the Global Datastore of the primary stack, deployed after it.
+
+    Args:
+        app: the cdk app.
+        primary_stack: the stack of the primary cluster.
+        stack_name: the stack name of the primary cluster, the secondary stacks are suffixed with their region.
+        kwargs: the remaining ElastiCacheStack arguments, e.g. the description.
+
+    Returns:
+        List[ElastiCacheStack]: the secondary stacks, in the order of `global_datastore.regions`.
+    """
+    stacks = []
+    for cache_config in config_util.load_secondaries(primary_stack.cache_config):
+        env = cdk.Environment(account=primary_stack.account, region=cache_config.region)
+        stack = ElastiCacheStack(
+            app, f"{primary_stack.node.id}-{cache_config.region}",
+            stack_name=f"{stack_name}-{cache_config.region}",
+            cache_config=cache_config,
+            primary_region=primary_stack.region,
+            env=env,
+            **kwargs
+        )
+        stack.add_dependency(primary_stack)
+        stacks.append(stack)
+    return stacks
+
+
+def get_context(app_dir: str) -> Dict:
+    """
+    Return the context of the cdk app, the feature flags of cdk.json and the lookups cached in cdk.context.json,
+    the worker processes of a parallel synth run without the cdk CLI and need the lookups resolved beforehand.
+
+    Args:
+        app_dir: the directory of cdk.json.
+
+    Returns:
+        Dict: the context.
+    """
+    context = {}
+    cdk_json = os.path.join(app_dir, "cdk.json")
+    if os.path.exists(cdk_json):
+        with open(cdk_json) as fp:
+            context.update(json.load(fp).get("context", {}))
+    context_json = os.path.join(app_dir, "cdk.context.json")
+    if os.path.exists(context_json):
+        with open(context_json) as fp:
+            context.update(json.load(fp))
+    return context
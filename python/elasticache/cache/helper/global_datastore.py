@@ -0,0 +1,79 @@
+from aws_cdk import (
+    core as cdk,
+    aws_elasticache as elasticache,
+    aws_ssm as ssm,
+    custom_resources as cr
+)
+
+from config import config_util as config
+
+
+def get_parameter_name(cluster_name: str) -> str:
+    """
+    Return the name of the SSM parameter holding the Global Datastore id, in the region of the primary cluster.
+    """
+    return f"/elasticache/{cluster_name}/global-replication-group-id"
+
+
+def create_global_replication_group(scope: cdk.Construct,
+                                    cluster: elasticache.CfnReplicationGroup) -> elasticache.CfnGlobalReplicationGroup:
+    """
+    Create the Global Datastore with the replication group as its primary member, and publish its id in an SSM
+    parameter for the secondary clusters.
+
+    Args:
+        scope: the cdk construct.
+        cluster: the primary replication group.
+
+    Returns:
+        elasticache.CfnGlobalReplicationGroup: The Global Datastore.
+    """
+    cluster_name = config.get_cluster_name()
+    global_replication_group = elasticache.CfnGlobalReplicationGroup(
+        scope, "ElastiCacheGlobalReplicationGroup",
+        members=[elasticache.CfnGlobalReplicationGroup.GlobalReplicationGroupMemberProperty(
+            replication_group_id=cluster.ref,
+            replication_group_region=cdk.Stack.of(scope).region,
+            role="PRIMARY"
+        )],
+        global_replication_group_id_suffix=config.get_global_datastore_config().get('id_suffix', cluster_name),
+        global_replication_group_description=f"Global datastore for {cluster_name}",
+        automatic_failover_enabled=config.get_automatic_failover()
+    )
+    ssm.StringParameter(
+        scope, "ElastiCacheGlobalReplicationGroupIdParameter",
+        parameter_name=get_parameter_name(cluster_name),
+        string_value=global_replication_group.ref,
+        description=f"Global datastore id of {cluster_name}, read by the secondary clusters"
+    )
+    return global_replication_group
+
+
+def get_global_replication_group_id(scope: cdk.Construct, primary_region: str) -> str:
+    """
+    Return the id of the Global Datastore, read from the SSM parameter in the region of the primary cluster.
+    CloudFormation exports do not cross regions, the secondary stacks read the parameter at deployment.
+
+    Args:
+        scope: the cdk construct.
+        primary_region: the region of the primary cluster.
+
+    Returns:
+        str: the token of the Global Datastore id.
+    """
+    parameter_name = get_parameter_name(config.get_cluster_name())
+    parameter = cr.AwsCustomResource(
+        scope, "ElastiCacheGlobalReplicationGroupId",
+        on_update=cr.AwsSdkCall(
+            service="SSM",
+            action="getParameter",
+            parameters={"Name": parameter_name},
+            region=primary_region,
+            physical_resource_id=cr.PhysicalResourceId.of(parameter_name)
+        ),
+        policy=cr.AwsCustomResourcePolicy.from_sdk_calls(resources=[
+            cdk.Stack.of(scope).format_arn(service="ssm", region=primary_region, resource="parameter",
+                                           resource_name=parameter_name.lstrip("/"))
+        ])
+    )
+    return parameter.get_response_field("Parameter.Value")
@@ -0,0 +1,227 @@
+from typing import Dict
+
+from aws_cdk import (
+    core as cdk,
+    aws_glue as glue,
+    aws_iam as iam,
+    aws_kinesisfirehose as firehose,
+    aws_s3 as s3
+)
+from aws_cdk.core import Tags
+
+from config.default import default
+from config import config_util as config
+
+# Columns of the Redis logs in the ElastiCache JSON log format, used for the Parquet conversion.
+# The JSON keys are matched case-insensitively, keys that are not valid column names are mapped explicitly.
+LOG_COLUMNS = {
+    "slow-log": [
+        ("cacheclusterid", "string"),
+        ("cachenodeid", "string"),
+        ("id", "bigint"),
+        ("timestamp", "bigint"),
+        ("duration_us", "bigint"),
+        ("command", "string"),
+        ("clientaddress", "string"),
+        ("clientname", "string"),
+    ],
+    "engine-log": [
+        ("cacheclusterid", "string"),
+        ("cachenodeid", "string"),
+        ("loglevel", "string"),
+        ("role", "string"),
+        ("timestamp", "string"),
+        ("message", "string"),
+    ],
+}
+COLUMN_TO_JSON_KEY_MAPPINGS = {
+    "slow-log": {"duration_us": "Duration (us)"},
+    "engine-log": {},
+}
+
+LOG_FORMATS = ("gzip-json", "parquet")
+# Firehose needs buffers of at least 64 MB to convert records to Parquet.
+PARQUET_MIN_BUFFER_SIZE_MB = 64
+
+
+def get_log_bucket(scope: cdk.Construct) -> s3.Bucket:
+    """
+    Return the S3 bucket the delivery streams of all log types write to, created on first use.
+
+    Args:
+        scope: the cdk construct.
+
+    Returns:
+        s3.Bucket: the log bucket.
+    """
+    bucket = scope.node.try_find_child("ElastiCacheLogBucket")
+    if bucket is not None:
+        return bucket
+
+    return s3.Bucket(
+        scope, "ElastiCacheLogBucket",
+        encryption=s3.BucketEncryption.S3_MANAGED,
+        block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+        enforce_ssl=True,
+        lifecycle_rules=[s3.LifecycleRule(
+            expiration=cdk.Duration.days(config.get_log_bucket_retention_days())
+        )]
+    )
+
+
+def get_log_table(scope: cdk.Construct, log_type: str, bucket: s3.Bucket) -> glue.CfnTable:
+    """
+    Create and return the Glue table describing the schema of the log type, the Parquet conversion reads it.
+
+    Args:
+        scope: the cdk construct.
+        log_type: the log type, slow-log or engine-log.
+        bucket: the log bucket.
+
+    Returns:
+        glue.CfnTable: the Glue table.
+    """
+    cluster_name = config.get_cluster_name()
+    database = scope.node.try_find_child("ElastiCacheLogDatabase")
+    if database is None:
+        database = glue.CfnDatabase(
+            scope, "ElastiCacheLogDatabase",
+            catalog_id=cdk.Aws.ACCOUNT_ID,
+            database_input=glue.CfnDatabase.DatabaseInputProperty(
+                name=f"elasticache_{cluster_name}".replace("-", "_"),
+                description=f"Redis logs of ElastiCache cluster {cluster_name}"
+            )
+        )
+
+    table_name = log_type.replace("-", "_")
+    table = glue.CfnTable(
+        scope, f"ElastiCacheLogTable-{log_type}",
+        catalog_id=cdk.Aws.ACCOUNT_ID,
+        database_name=database.ref,
+        table_input=glue.CfnTable.TableInputProperty(
+            name=table_name,
+            table_type="EXTERNAL_TABLE",
+            parameters={"classification": "parquet"},
+            partition_keys=[glue.CfnTable.ColumnProperty(name="dt", type="string")],
+            storage_descriptor=glue.CfnTable.StorageDescriptorProperty(
+                columns=[glue.CfnTable.ColumnProperty(name=name, type=column_type)
+                         for name, column_type in LOG_COLUMNS[log_type]],
+                location=f"s3://{bucket.bucket_name}/{log_type}/",
+                input_format="org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat",
+                output_format="org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat",
+                serde_info=glue.CfnTable.SerdeInfoProperty(
+                    serialization_library="org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe"
+                )
+            )
+        )
+    )
+    return table
+
+
+def get_data_format_conversion(scope: cdk.Construct, log_type: str, table: glue.CfnTable,
+                               role: iam.Role) -> firehose.CfnDeliveryStream.DataFormatConversionConfigurationProperty:
+    """
+    Return the conversion of the JSON log records to Parquet with the schema of the Glue table.
+
+    Args:
+        scope: the cdk construct.
+        log_type: the log type, slow-log or engine-log.
+        table: the Glue table.
+        role: the role of the delivery stream.
+
+    Returns:
+        firehose.CfnDeliveryStream.DataFormatConversionConfigurationProperty: the conversion.
+    """
+    stack = cdk.Stack.of(scope)
+    table_name = log_type.replace("-", "_")
+    role.add_to_policy(iam.PolicyStatement(
+        actions=["glue:GetTable", "glue:GetTableVersion", "glue:GetTableVersions"],
+        resources=[
+            stack.format_arn(service="glue", resource="catalog"),
+            stack.format_arn(service="glue", resource="database", resource_name=table.database_name),
+            stack.format_arn(service="glue", resource="table", resource_name=f"{table.database_name}/{table_name}"),
+        ]
+    ))
+    return firehose.CfnDeliveryStream.DataFormatConversionConfigurationProperty(
+        enabled=True,
+        input_format_configuration=firehose.CfnDeliveryStream.InputFormatConfigurationProperty(
+            deserializer=firehose.CfnDeliveryStream.DeserializerProperty(
+                open_x_json_ser_de=firehose.CfnDeliveryStream.OpenXJsonSerDeProperty(
+                    case_insensitive=True,
+                    column_to_json_key_mappings=COLUMN_TO_JSON_KEY_MAPPINGS[log_type] or None
+                )
+            )
+        ),
+        output_format_configuration=firehose.CfnDeliveryStream.OutputFormatConfigurationProperty(
+            serializer=firehose.CfnDeliveryStream.SerializerProperty(
+                parquet_ser_de=firehose.CfnDeliveryStream.ParquetSerDeProperty(compression="SNAPPY")
+            )
+        ),
+        schema_configuration=firehose.CfnDeliveryStream.SchemaConfigurationProperty(
+            catalog_id=cdk.Aws.ACCOUNT_ID,
+            database_name=table.database_name,
+            table_name=table_name,
+            region=cdk.Aws.REGION,
+            role_arn=role.role_arn,
+            version_id="LATEST"
+        )
+    )
+
+
+def get_delivery_stream(scope: cdk.Construct, log_type: str, delivery: Dict) -> firehose.CfnDeliveryStream:
+    """
+    Create and return the Kinesis Data Firehose delivery stream that batches the log records of the log type
+    into S3, either as GZIP compressed JSON or as Parquet.
+
+    Args:
+        scope: the cdk construct.
+        log_type: the log type, slow-log or engine-log.
+        delivery: the log type entry of the `log_delivery` section.
+
+    Returns:
+        firehose.CfnDeliveryStream: the delivery stream.
+    """
+    log_format = delivery.get('format', default['log_delivery_format'])
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"Unknown log delivery format '{log_format}' for {log_type}, "
+                         f"supported formats are: {', '.join(LOG_FORMATS)}")
+
+    cluster_name = config.get_cluster_name()
+    bucket = get_log_bucket(scope)
+    role = iam.Role(
+        scope, f"ElastiCacheLogDeliveryRole-{log_type}",
+        assumed_by=iam.ServicePrincipal("firehose.amazonaws.com")
+    )
+    bucket.grant_read_write(role, f"{log_type}/*")
+    bucket.grant_read_write(role, f"errors/{log_type}/*")
+
+    buffer_size = delivery.get('buffer_size_mb', default['log_delivery_buffer_size_mb'])
+    if log_format == "parquet":
+        buffer_size = max(buffer_size, PARQUET_MIN_BUFFER_SIZE_MB)
+        conversion = get_data_format_conversion(scope, log_type, get_log_table(scope, log_type, bucket), role)
+        compression_format = "UNCOMPRESSED"
+    else:
+        conversion = None
+        compression_format = "GZIP"
+
+    delivery_stream = firehose.CfnDeliveryStream(
+        scope, f"ElastiCacheLogDeliveryStream-{log_type}",
+        delivery_stream_name=f"elasticache-{cluster_name}-{log_type}"[:64],
+        delivery_stream_type="DirectPut",
+        extended_s3_destination_configuration=firehose.CfnDeliveryStream.ExtendedS3DestinationConfigurationProperty(
+            bucket_arn=bucket.bucket_arn,
+            role_arn=role.role_arn,
+            prefix=f"{log_type}/dt=!{{timestamp:yyyy-MM-dd}}/",
+            error_output_prefix=f"errors/{log_type}/!{{firehose:error-output-type}}/dt=!{{timestamp:yyyy-MM-dd}}/",
+            compression_format=compression_format,
+            buffering_hints=firehose.CfnDeliveryStream.BufferingHintsProperty(
+                interval_in_seconds=delivery.get('buffer_interval', default['log_delivery_buffer_interval']),
+                size_in_m_bs=buffer_size
+            ),
+            data_format_conversion_configuration=conversion
+        )
+    )
+    # ElastiCache only delivers logs to delivery streams with this tag.
+    Tags.of(delivery_stream).add("LogDeliveryEnabled", "true")
+    delivery_stream.node.add_dependency(role)
+    return delivery_stream
@@ -1,52 +1,130 @@
 from aws_cdk import (
     core as cdk,
     aws_elasticache as elasticache,
-    aws_logs as logs
+    aws_lambda as lambda_,
+    aws_logs as logs,
+    aws_logs_destinations as logs_destinations
 )
 
 from config import config_util as config
+from config.config_model import LOG_DELIVERY_MIN_VERSIONS, parse_engine_version
 
+LOG_GROUP_PREFIXES = {
+    "slow-log": "/aws/elasticache/redis-slowlog",
+    "engine-log": "/aws/elasticache/redis-enginelog",
+}
+DESTINATION_TYPES = ("cloudwatch-logs", "kinesis-firehose")
 
-def get_log_delivery_configuration_request(log_group_name: str) -> \
+
+def supports_log_delivery(engine_version: str, log_type: str) -> bool:
+    """
+    Return whether the Redis engine version supports the delivery of the log type.
+    A version such as 6.x stands for the latest minor version of the major version.
+
+    Args:
+        engine_version: the Redis engine version, e.g. 5.0.6, 6.x, 6.2.
+        log_type: the log type, slow-log or engine-log.
+
+    Returns: bool
+    """
+    if log_type not in LOG_DELIVERY_MIN_VERSIONS:
+        raise ValueError(f"Unknown log type '{log_type}', "
+                         f"supported log types are: {', '.join(LOG_DELIVERY_MIN_VERSIONS)}")
+
+    return parse_engine_version(engine_version)[:2] >= LOG_DELIVERY_MIN_VERSIONS[log_type]
+
+
+def get_log_group_name(log_type: str, cluster_name: str) -> str:
+    """
+    Return the CloudWatch log group name of the log type for the cluster.
+
+    Args:
+        log_type: the log type, slow-log or engine-log.
+        cluster_name: the cluster name.
+
+    Returns: str
+    """
+    return f"{LOG_GROUP_PREFIXES[log_type]}/{cluster_name}"
+
+
+def get_log_delivery_configuration_request(destination: str, log_type: str = "slow-log",
+                                           destination_type: str = "cloudwatch-logs") -> \
         elasticache.CfnReplicationGroup.LogDeliveryConfigurationRequestProperty:
     """
     Method to create and return ElastiCache log delivery configuration request.
 
     Args:
-        log_group_name: the CloudWatch group name.
+        destination: the CloudWatch group name or the Kinesis Data Firehose delivery stream name.
+        log_type: the log type, slow-log or engine-log.
+        destination_type: the destination type, cloudwatch-logs or kinesis-firehose.
 
     Returns: elasticache.CfnCacheCluster.LogDeliveryConfigurationRequestProperty
 
     """
-    log_destination_details = elasticache.CfnReplicationGroup.DestinationDetailsProperty(
-        cloud_watch_logs_details=elasticache.CfnReplicationGroup.CloudWatchLogsDestinationDetailsProperty(
-            log_group=log_group_name
+    if destination_type == "cloudwatch-logs":
+        log_destination_details = elasticache.CfnReplicationGroup.DestinationDetailsProperty(
+            cloud_watch_logs_details=elasticache.CfnReplicationGroup.CloudWatchLogsDestinationDetailsProperty(
+                log_group=destination
+            )
         )
-    )
+    elif destination_type == "kinesis-firehose":
+        log_destination_details = elasticache.CfnReplicationGroup.DestinationDetailsProperty(
+            kinesis_firehose_details=elasticache.CfnReplicationGroup.KinesisFirehoseDestinationDetailsProperty(
+                delivery_stream=destination
+            )
+        )
+    else:
+        raise ValueError(f"Unknown log destination type '{destination_type}', "
+                         f"supported destination types are: {', '.join(DESTINATION_TYPES)}")
+
     log_delivery_configuration_request = elasticache.CfnReplicationGroup.LogDeliveryConfigurationRequestProperty(
-        log_type="slow-log",
+        log_type=log_type,
         log_format="json",
-        destination_type="cloudwatch-logs",
+        destination_type=destination_type,
         destination_details=log_destination_details
     )
     return log_delivery_configuration_request
 
 
-def get_log_group(scope: cdk.Construct, log_group_name: str) -> logs.LogGroup:
+def get_log_group(scope: cdk.Construct, log_group_name: str,
+                  construct_id: str = "ElastiCacheCloudWatchLogGroup") -> logs.LogGroup:
     """
-    Return the CloudWatch log group for Redis Slow Logs.
+    Return the CloudWatch log group for Redis Slow Logs or Engine Logs.
 
     Args:
         scope: the cdk construct.
         log_group_name: the CloudWatch log group name.
+        construct_id: id for the log group construct.
     Returns:
-        logs.LogGroup: The CloudWatch log group for the Redis slow log.
+        logs.LogGroup: The CloudWatch log group for the Redis log.
     """
     log_group_retention = config.get_log_group_retention_limit()
     log_group = logs.LogGroup(
-        scope, "ElastiCacheCloudWatchLogGroup",
+        scope, construct_id,
         log_group_name=log_group_name,
         removal_policy=cdk.RemovalPolicy.DESTROY,
         retention=logs.RetentionDays(log_group_retention)
     )
     return log_group
+
+
+def add_subscription_filter(scope: cdk.Construct, log_group: logs.ILogGroup, function: lambda_.IFunction,
+                            filter_pattern: str = None) -> logs.SubscriptionFilter:
+    """
+    Stream the events of the CloudWatch log group for Redis Slow Logs to a Lambda function.
+
+    Args:
+        scope: the cdk construct.
+        log_group: the CloudWatch log group.
+        function: the Lambda function the log events are delivered to.
+        filter_pattern: the CloudWatch Logs filter pattern, all events if not provided.
+    Returns:
+        logs.SubscriptionFilter: The subscription filter on the log group.
+    """
+    subscription_filter = logs.SubscriptionFilter(
+        scope, "ElastiCacheSlowLogSubscriptionFilter",
+        log_group=log_group,
+        destination=logs_destinations.LambdaDestination(function),
+        filter_pattern=logs.FilterPattern.literal(filter_pattern) if filter_pattern else logs.FilterPattern.all_events()
+    )
+    return subscription_filter
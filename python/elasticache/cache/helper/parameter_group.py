@@ -0,0 +1,150 @@
+from typing import Dict
+
+from aws_cdk import (
+    core as cdk,
+    aws_elasticache as elasticache
+)
+
+from config import config_util as config
+
+# Performance profiles for the Redis engine. Values are strings as expected by the
+# AWS::ElastiCache::ParameterGroup Properties map. Any key can be overridden through the
+# `parameters` entry of the `parameter_group` section in config/config.py.
+#
+# Refer to the following link for the parameters supported by each parameter group family
+# https://docs.aws.amazon.com/AmazonElastiCache/latest/red-ug/ParameterGroups.Redis.html
+PROFILES = {
+    # Keep tail latency flat: evict and free memory in the background, defragment with a small
+    # CPU budget so the main thread is never blocked for long, and log anything slower than 1ms.
+    "low-latency": {
+        "maxmemory-policy": "allkeys-lru",
+        "activedefrag": "yes",
+        "active-defrag-cycle-min": "1",
+        "active-defrag-cycle-max": "10",
+        "lazyfree-lazy-eviction": "yes",
+        "lazyfree-lazy-expire": "yes",
+        "lazyfree-lazy-server-del": "yes",
+        "tcp-keepalive": "60",
+        "timeout": "300",
+        "slowlog-log-slower-than": "1000",
+        "slowlog-max-len": "1024",
+        "client-output-buffer-limit-normal-hard-limit": "0",
+        "client-output-buffer-limit-normal-soft-limit": "0",
+        "client-output-buffer-limit-normal-soft-seconds": "0",
+        "client-output-buffer-limit-pubsub-hard-limit": "33554432",
+        "client-output-buffer-limit-pubsub-soft-limit": "8388608",
+        "client-output-buffer-limit-pubsub-soft-seconds": "60"
+    },
+    # Maximise operations per second: cheaper eviction sampling, background freeing, and larger
+    # output buffers so pipelined and pub/sub clients are not disconnected during bursts.
+    "high-throughput": {
+        "maxmemory-policy": "allkeys-lru",
+        "maxmemory-samples": "3",
+        "activedefrag": "yes",
+        "active-defrag-cycle-min": "5",
+        "active-defrag-cycle-max": "25",
+        "lazyfree-lazy-eviction": "yes",
+        "lazyfree-lazy-expire": "yes",
+        "lazyfree-lazy-server-del": "yes",
+        "tcp-keepalive": "300",
+        "timeout": "0",
+        "slowlog-log-slower-than": "10000",
+        "slowlog-max-len": "128",
+        "client-output-buffer-limit-normal-hard-limit": "0",
+        "client-output-buffer-limit-normal-soft-limit": "0",
+        "client-output-buffer-limit-normal-soft-seconds": "0",
+        "client-output-buffer-limit-pubsub-hard-limit": "67108864",
+        "client-output-buffer-limit-pubsub-soft-limit": "16777216",
+        "client-output-buffer-limit-pubsub-soft-seconds": "60"
+    },
+    # Values of hundreds of KB or more: free big values off the main thread, defragment
+    # aggressively to fight fragmentation from large allocations and cap per-client buffers.
+    "large-values": {
+        "maxmemory-policy": "volatile-lru",
+        "activedefrag": "yes",
+        "active-defrag-ignore-bytes": "209715200",
+        "active-defrag-threshold-lower": "10",
+        "active-defrag-cycle-min": "5",
+        "active-defrag-cycle-max": "50",
+        "lazyfree-lazy-eviction": "yes",
+        "lazyfree-lazy-expire": "yes",
+        "lazyfree-lazy-server-del": "yes",
+        "tcp-keepalive": "60",
+        "timeout": "300",
+        "slowlog-log-slower-than": "5000",
+        "slowlog-max-len": "512",
+        "client-output-buffer-limit-normal-hard-limit": "536870912",
+        "client-output-buffer-limit-normal-soft-limit": "268435456",
+        "client-output-buffer-limit-normal-soft-seconds": "60",
+        "client-output-buffer-limit-pubsub-hard-limit": "67108864",
+        "client-output-buffer-limit-pubsub-soft-limit": "16777216",
+        "client-output-buffer-limit-pubsub-soft-seconds": "60"
+    }
+}
+
+# Data tiering moves the least recently used values to SSD, an LFU or TTL eviction policy would evict values the
+# SSD could still hold, so the profiles of a data tiering cluster are limited to the LRU policies.
+# https://docs.aws.amazon.com/AmazonElastiCache/latest/red-ug/data-tiering.html
+DATA_TIERING_POLICIES = ("allkeys-lru", "volatile-lru")
+
+
+def get_parameters(profile: str, overrides: Dict = None, cluster_mode: bool = False,
+                   data_tiering: bool = False) -> Dict[str, str]:
+    """
+    Resolve the Redis parameters for a named performance profile.
+
+    Args:
+        profile: the name of the performance profile, one of the keys of PROFILES.
+        overrides: parameters that take precedence over the profile values.
+        cluster_mode: whether the replication group runs with cluster mode enabled.
+        data_tiering: whether the replication group runs on data tiering node types.
+
+    Returns:
+        Dict[str, str]: the parameter names and their values.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown parameter group profile '{profile}', "
+                         f"supported profiles are: {', '.join(sorted(PROFILES))}")
+
+    parameters = dict(PROFILES[profile])
+    if cluster_mode:
+        parameters["cluster-enabled"] = "yes"
+    for name, value in (overrides or {}).items():
+        parameters[name] = str(value)
+    if data_tiering and parameters.get("maxmemory-policy") not in DATA_TIERING_POLICIES:
+        raise ValueError(f"Data tiering needs a maxmemory-policy of {' or '.join(DATA_TIERING_POLICIES)}, "
+                         f"got '{parameters.get('maxmemory-policy')}'")
+    return parameters
+
+
+def get_parameter_group(scope: cdk.Construct, cluster_mode: bool,
+                        data_tiering: bool = False) -> elasticache.CfnParameterGroup:
+    """
+    Create and return the parameter group for the Replication group.
+
+    Args:
+        scope: the cdk construct.
+        cluster_mode: whether the replication group runs with cluster mode enabled.
+        data_tiering: whether the replication group runs on data tiering node types.
+
+    Returns:
+        elasticache.CfnParameterGroup: The parameter group tuned by the configured profile,
+        None if the parameter group is not configured.
+    """
+    if config.get_parameter_group_config() is None:
+        return None
+
+    cluster_name = config.get_cluster_name()
+    profile = config.get_parameter_group_profile()
+    parameter_group = elasticache.CfnParameterGroup(
+        scope, "ElastiCacheParameterGroup",
+        cache_parameter_group_family=config.get_parameter_group_family(),
+        description=f"{profile} parameter group for {cluster_name}",
+        properties=get_parameters(
+            profile,
+            overrides=config.get_parameter_group_overrides(),
+            cluster_mode=cluster_mode,
+            data_tiering=data_tiering
+        )
+    )
+    return parameter_group
@@ -1,20 +1,23 @@
-from typing import List
+from typing import Dict, List
 
 from aws_cdk import core as cdk
 
 from cache import elasticache_secret as secret
+from cache.elasticache_key_pool import ElastiCacheKeyPool
+from cache.helper import tenant
 from config.default import default
 from config import config_util as config
 
 
-def get_user_secrets(scope: cdk.Construct) -> List:
+def get_users() -> List[Dict]:
     """
-    Create and store username as well as autogenerated password in AWS SecretsManager.
+    Return the users to create in the user group, the `users` and the expanded `tenants` of the `secrets` section.
+    The users are validated together and every error is reported at once.
 
-    Args:
-        scope: the cdk construct.
+    Args: None
 
-    Returns: None
+    Returns:
+        List[Dict]: the users, None when the cluster authenticates with the AUTH token or has no users.
     """
     secret_config = config.get_secret_config()
     if secret_config is None:
@@ -24,44 +27,61 @@ def get_user_secrets(scope: cdk.Construct) -> List:
     if auth_token_enabled is True:
         return None
 
-    users = secret_config.get('users', None)
+    if not secret_config.get('users', None) and not secret_config.get('tenants', None):
+        return None
+
+    return tenant.get_users()
+
+
+def get_user_secrets(scope: cdk.Construct, key_pool: ElastiCacheKeyPool = None, users: List[Dict] = None,
+                     start: int = 0) -> List:
+    """
+    Create and store username as well as autogenerated password in AWS SecretsManager.
+
+    Args:
+        scope: the cdk construct.
+        key_pool: the pool of the CMKs to encrypt the secrets with when cmk is enabled, a key per secret is
+        created if None.
+        users: the users to create the secrets of, the users of the `secrets` section if None.
+        start: the index of the first user, the construct ids stay unique when the users are split across stacks.
+
+    Returns:
+        List: the user secrets, None when there are no users.
+    """
     if users is None:
+        users = get_users()
+    if not users:
         return None
 
     cluster_name = config.get_cluster_name()
     user_secrets = []
-    for idx, user in enumerate(users):
-        user_id = config.get_user_id(user)
-        if user_id is None:
-            return None
-
+    for idx, user in enumerate(users, start=start):
         user_name = config.get_user_name(user)
-        if user_name is None:
-            return None
-
         user_secret = secret.UserSecret(
             scope, f"ElasticacheUserSecret-{idx}",
             secret_name=f"/elasticache/{cluster_name}/{user_name}",
-            user_id=user_id,
+            user_id=config.get_user_id(user),
             user_name=user_name,
             user_acl=config.get_user_acl(user),
             cluster_name=cluster_name,
             cmk=config.get_cmk(),
+            key_pool=key_pool
         )
         user_secrets.append(user_secret)
 
     return user_secrets
 
 
-def get_auth_token(scope: cdk.Construct) -> str:
+def get_token_secret(scope: cdk.Construct, key_pool: ElastiCacheKeyPool = None) -> secret.TokenSecret:
     """
     Create and store the auto generated Redis Auth Token/Password in AWS SecretsManager.
     AuthToken can be specified only on replication groups where TransitEncryptionEnabled is true
 
     Args:
         scope: the cdk construct.
+        key_pool: the pool of the CMKs to encrypt the secret with when cmk is enabled, a key is created if None.
 
-    Returns: str
+    Returns: TokenSecret, None when the AUTH token is not enabled
     """
 
     auth_token_enabled = config.get_auth_token_enabled();
@@ -77,6 +97,7 @@ def get_auth_token(scope: cdk.Construct) -> str:
         scope, "ElasticacheTokenSecret",
         secret_name=f"/elasticache/{cluster_name}/auth-token",
         cluster_name=cluster_name,
-        cmk=config.get_cmk()
+        cmk=config.get_cmk(),
+        key_pool=key_pool
     )
-    return token_secret.secret.secret_value_from_json("token").to_string()
+    return token_secret
@@ -0,0 +1,77 @@
+from typing import Dict, Mapping
+
+from aws_cdk import (
+    core as cdk,
+    aws_ec2 as ec2,
+    aws_elasticache as elasticache,
+    aws_kms as kms
+)
+
+from config import config_util as config
+
+# A serverless cache serves the writes and the reads of the primary on 6379 and the reads of the replicas on 6380,
+# whatever the `port_number`.
+PORT = 6379
+READER_PORT = 6380
+
+
+def get_cache_usage_limits(limits: Mapping) -> Dict:
+    """
+    Return the CacheUsageLimits of the `cache_usage_limits` section, a missing bound is left to ElastiCache.
+
+    Args:
+        limits: the `cache_usage_limits` section in config/config.py.
+
+    Returns:
+        Dict: the CacheUsageLimits property, None without limits.
+    """
+    usage_limits = {}
+    data_storage = {key.capitalize(): value for key, value in (limits.get('data_storage', None) or {}).items()}
+    if data_storage:
+        usage_limits["DataStorage"] = dict(data_storage, Unit="GB")
+    ecpu_per_second = {key.capitalize(): value for key, value in (limits.get('ecpu_per_second', None) or {}).items()}
+    if ecpu_per_second:
+        usage_limits["ECPUPerSecond"] = ecpu_per_second
+    return usage_limits or None
+
+
+def create_serverless_cache(scope: cdk.Construct, security_group: ec2.SecurityGroup,
+                            user_group: elasticache.CfnUserGroup = None, kms_key: kms.IKey = None) -> cdk.CfnResource:
+    """
+    Create the serverless cache in the subnets and the security group of the cluster.
+    AWS::ElastiCache::ServerlessCache has no construct in this CDK version, it is created as a CfnResource.
+
+    Args:
+        scope: the cdk construct.
+        security_group: the security group of the cluster.
+        user_group: the user group of the users, the default user only if None.
+        kms_key: the CMK encrypting the data at rest, a key owned by ElastiCache if None.
+
+    Returns:
+        cdk.CfnResource: The serverless cache.
+    """
+    cluster_name = config.get_cluster_name()
+    properties = {
+        "ServerlessCacheName": cluster_name,
+        "Description": f"Serverless cache for {cluster_name}",
+        "Engine": "redis",
+        "MajorEngineVersion": str(config.get_config().engine_major_version),
+        "CacheUsageLimits": get_cache_usage_limits(config.get_cache_usage_limits() or {}),
+        "SecurityGroupIds": [security_group.security_group_id],
+        "SubnetIds": config.get_subnet_ids(),
+        "KmsKeyId": kms_key.key_arn if kms_key is not None else None,
+        "UserGroupId": config.get_user_group_id() if user_group is not None else None,
+        "SnapshotArnsToRestore": config.get_snapshot_arns(),
+        "SnapshotRetentionLimit": config.get_snapshot_retension_limit() or None,
+        # The daily snapshot starts at the start of the snapshot window
+        "DailySnapshotTime": config.get_snapshot_window().split("-")[0] if config.get_snapshot_window() else None,
+        "Tags": [{"Key": "Name", "Value": cluster_name}]
+    }
+    cache = cdk.CfnResource(
+        scope, "ElastiCacheServerlessCache",
+        type="AWS::ElastiCache::ServerlessCache",
+        properties={key: value for key, value in properties.items() if value is not None}
+    )
+    if user_group is not None:
+        cache.add_depends_on(user_group)
+    return cache
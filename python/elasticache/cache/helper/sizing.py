@@ -0,0 +1,313 @@
+import math
+from typing import Dict, List, NamedTuple
+
+from config import config_util as config
+from config.config_model import (
+    BURSTABLE_FAMILIES,
+    DATA_TIERING_FAMILIES,
+    MAX_NODE_GROUPS,
+    MAX_NODES,
+    MAX_REPLICAS_PER_NODE_GROUP
+)
+
+
+class NodeSpec(NamedTuple):
+    memory_gib: float
+    vcpu: int
+    network_gbps: float
+    hourly_price: float
+    # SSD capacity of the data tiering node types
+    ssd_gib: float = 0
+
+
+class Workload(NamedTuple):
+    dataset_size_gb: float
+    peak_read_ops: int
+    peak_write_ops: int
+    avg_value_size_bytes: int
+    target_p99_latency_ms: float
+    # Share of the dataset read and written regularly, the rest may be served from SSD on data tiering nodes
+    hot_set_fraction: float = 1.0
+
+
+class SizingPlan(NamedTuple):
+    node_type: str
+    num_node_groups: int
+    replicas_per_node_group: int
+    memory_headroom: float
+    cpu_headroom: float
+    network_headroom: float
+    hourly_price: float
+
+
+# Offline table of node baselines: memory (GiB), vCPU, baseline network bandwidth (Gbps) and the
+# approximate us-east-1 on-demand hourly price. The price is only used to rank candidate plans.
+# https://docs.aws.amazon.com/AmazonElastiCache/latest/red-ug/CacheNodes.SupportedTypes.html
+NODE_TYPES = {
+    "cache.t3.micro": NodeSpec(0.5, 2, 0.064, 0.017),
+    "cache.t3.small": NodeSpec(1.37, 2, 0.128, 0.034),
+    "cache.t3.medium": NodeSpec(3.09, 2, 0.256, 0.068),
+    "cache.t4g.micro": NodeSpec(0.5, 2, 0.064, 0.016),
+    "cache.t4g.small": NodeSpec(1.37, 2, 0.128, 0.032),
+    "cache.t4g.medium": NodeSpec(3.09, 2, 0.256, 0.065),
+    "cache.m5.large": NodeSpec(6.38, 2, 0.75, 0.156),
+    "cache.m5.xlarge": NodeSpec(12.93, 4, 1.25, 0.311),
+    "cache.m5.2xlarge": NodeSpec(26.04, 8, 2.5, 0.623),
+    "cache.m5.4xlarge": NodeSpec(52.26, 16, 5.0, 1.245),
+    "cache.m5.12xlarge": NodeSpec(157.12, 48, 12.0, 3.744),
+    "cache.m5.24xlarge": NodeSpec(314.32, 96, 25.0, 7.488),
+    "cache.m6g.large": NodeSpec(6.38, 2, 0.75, 0.149),
+    "cache.m6g.xlarge": NodeSpec(12.93, 4, 1.25, 0.298),
+    "cache.m6g.2xlarge": NodeSpec(26.04, 8, 2.5, 0.595),
+    "cache.m6g.4xlarge": NodeSpec(52.26, 16, 5.0, 1.190),
+    "cache.m6g.8xlarge": NodeSpec(103.68, 32, 12.0, 2.380),
+    "cache.m6g.12xlarge": NodeSpec(157.12, 48, 20.0, 3.570),
+    "cache.m6g.16xlarge": NodeSpec(209.55, 64, 25.0, 4.760),
+    "cache.r5.large": NodeSpec(13.07, 2, 0.75, 0.216),
+    "cache.r5.xlarge": NodeSpec(26.32, 4, 1.25, 0.431),
+    "cache.r5.2xlarge": NodeSpec(52.82, 8, 2.5, 0.862),
+    "cache.r5.4xlarge": NodeSpec(105.81, 16, 5.0, 1.724),
+    "cache.r5.12xlarge": NodeSpec(317.77, 48, 12.0, 5.174),
+    "cache.r5.24xlarge": NodeSpec(635.61, 96, 25.0, 10.348),
+    "cache.r6g.large": NodeSpec(13.07, 2, 0.75, 0.206),
+    "cache.r6g.xlarge": NodeSpec(26.32, 4, 1.25, 0.411),
+    "cache.r6g.2xlarge": NodeSpec(52.82, 8, 2.5, 0.822),
+    "cache.r6g.4xlarge": NodeSpec(105.81, 16, 5.0, 1.645),
+    "cache.r6g.8xlarge": NodeSpec(209.55, 32, 12.0, 3.290),
+    "cache.r6g.12xlarge": NodeSpec(317.77, 48, 20.0, 4.934),
+    "cache.r6g.16xlarge": NodeSpec(419.09, 64, 25.0, 6.579),
+    "cache.r6gd.xlarge": NodeSpec(26.32, 4, 1.25, 0.781, 99.33),
+    "cache.r6gd.2xlarge": NodeSpec(52.82, 8, 2.5, 1.562, 199.07),
+    "cache.r6gd.4xlarge": NodeSpec(105.81, 16, 5.0, 3.123, 398.14),
+    "cache.r6gd.8xlarge": NodeSpec(209.55, 32, 12.0, 6.247, 796.28),
+    "cache.r6gd.12xlarge": NodeSpec(317.77, 48, 20.0, 9.370, 1194.42),
+    "cache.r6gd.16xlarge": NodeSpec(419.09, 64, 25.0, 12.493, 1592.56),
+}
+
+# Share of node memory ElastiCache keeps for backups, replication and failover.
+RESERVED_MEMORY_PERCENT = 25
+# Share of the usable memory the dataset may fill, the rest absorbs fragmentation and growth.
+MEMORY_TARGET_UTILIZATION = 0.8
+# Commands per second a single Redis engine thread sustains for small GET/SET commands.
+ENGINE_OPS_PER_SECOND = 100000
+# Enhanced I/O multiplexing on nodes with 4 or more vCPUs offloads network I/O from the engine.
+ENHANCED_IO_FACTOR = 1.8
+# Burstable nodes only sustain their baseline CPU performance once the credits are spent.
+BURSTABLE_FACTOR = 0.4
+# Protocol, key and header bytes on the wire for every command in addition to the value.
+COMMAND_OVERHEAD_BYTES = 100
+# p99 latency in milliseconds of the reads served from SSD, a tighter target keeps the dataset in memory.
+DATA_TIERING_P99_LATENCY_MS = 2
+
+
+def get_target_utilization(target_p99_latency_ms: float) -> float:
+    """
+    Return the peak CPU and network utilization a node may run at for the given p99 latency target.
+    Queueing delay grows with 1 / (1 - utilization), so tighter latency targets need more headroom.
+
+    Args:
+        target_p99_latency_ms: the p99 latency target in milliseconds.
+
+    Returns:
+        float: the target utilization between 0 and 1.
+    """
+    if target_p99_latency_ms <= 1:
+        return 0.5
+    if target_p99_latency_ms <= 2:
+        return 0.6
+    if target_p99_latency_ms <= 5:
+        return 0.7
+    return 0.8
+
+
+def is_data_tiering(node_type: str) -> bool:
+    """
+    Return whether the node type is a data tiering node type.
+    """
+    return node_type.startswith(DATA_TIERING_FAMILIES)
+
+
+def is_burstable(node_type: str) -> bool:
+    """
+    Return whether the node type is a burstable node type.
+    """
+    return node_type.startswith(BURSTABLE_FAMILIES)
+
+
+def get_node_ops_capacity(node_type: str, avg_value_size_bytes: int) -> float:
+    """
+    Return the commands per second a node can serve, bounded by the engine and the network baseline.
+
+    Args:
+        node_type: the cache node type.
+        avg_value_size_bytes: the average value size in bytes.
+
+    Returns:
+        float: the commands per second at full utilization.
+    """
+    spec = NODE_TYPES[node_type]
+    engine_ops = ENGINE_OPS_PER_SECOND
+    if spec.vcpu >= 4:
+        engine_ops *= ENHANCED_IO_FACTOR
+    if is_burstable(node_type):
+        engine_ops *= BURSTABLE_FACTOR
+
+    network_ops = spec.network_gbps * 1e9 / 8 / (avg_value_size_bytes + COMMAND_OVERHEAD_BYTES)
+    return min(engine_ops, network_ops)
+
+
+def plan_node_type(workload: Workload, node_type: str, min_replicas: int = 1) -> SizingPlan:
+    """
+    Size a replication group of the given node type for the workload.
+    Writes are served by the primary of each shard, reads are spread over all nodes of the shard.
+
+    Args:
+        workload: the declared workload.
+        node_type: the cache node type.
+        min_replicas: the minimal number of replicas per node group.
+
+    Returns:
+        SizingPlan: the plan, None if the workload does not fit the shard, replica and node limits, or if the reads
+        served from SSD by a data tiering node type exceed the latency target.
+    """
+    spec = NODE_TYPES[node_type]
+    utilization = get_target_utilization(workload.target_p99_latency_ms)
+    node_ops = get_node_ops_capacity(node_type, workload.avg_value_size_bytes)
+    usable_memory_gib = spec.memory_gib * (100 - RESERVED_MEMORY_PERCENT) / 100
+    # On a data tiering node the hot set stays in memory and the whole dataset fits in memory and SSD
+    memory_dataset_gb = workload.dataset_size_gb
+    tiered_node_groups = 1
+    if is_data_tiering(node_type):
+        if workload.target_p99_latency_ms < DATA_TIERING_P99_LATENCY_MS and workload.hot_set_fraction < 1:
+            return None
+        memory_dataset_gb = workload.dataset_size_gb * workload.hot_set_fraction
+        tiered_node_groups = math.ceil(
+            workload.dataset_size_gb / ((usable_memory_gib + spec.ssd_gib) * MEMORY_TARGET_UTILIZATION)
+        )
+
+    num_node_groups = max(
+        1,
+        tiered_node_groups,
+        math.ceil(memory_dataset_gb / (usable_memory_gib * MEMORY_TARGET_UTILIZATION)),
+        math.ceil(workload.peak_write_ops / (node_ops * utilization))
+    )
+    while num_node_groups <= MAX_NODE_GROUPS:
+        shard_ops = (workload.peak_read_ops + workload.peak_write_ops) / num_node_groups
+        nodes_per_shard = math.ceil(shard_ops / (node_ops * utilization))
+        replicas = max(min_replicas, nodes_per_shard - 1)
+        if replicas <= MAX_REPLICAS_PER_NODE_GROUP:
+            break
+        num_node_groups += 1
+    else:
+        return None
+
+    nodes_per_shard = replicas + 1
+    # More shards need fewer replicas each but never fewer nodes, the first plan within the replica limit is the
+    # smallest one
+    if num_node_groups * nodes_per_shard > MAX_NODES:
+        return None
+    shard_read_ops = workload.peak_read_ops / num_node_groups
+    shard_write_ops = workload.peak_write_ops / num_node_groups
+    # The primary takes every write of the shard plus its share of the reads.
+    primary_ops = shard_write_ops + shard_read_ops / nodes_per_shard
+    primary_bytes = primary_ops * (workload.avg_value_size_bytes + COMMAND_OVERHEAD_BYTES)
+    network_bytes = spec.network_gbps * 1e9 / 8
+
+    return SizingPlan(
+        node_type=node_type,
+        num_node_groups=num_node_groups,
+        replicas_per_node_group=replicas,
+        memory_headroom=round(1 - memory_dataset_gb / (num_node_groups * usable_memory_gib), 3),
+        cpu_headroom=round(1 - primary_ops / node_ops, 3),
+        network_headroom=round(1 - primary_bytes / network_bytes, 3),
+        hourly_price=round(num_node_groups * nodes_per_shard * spec.hourly_price, 3)
+    )
+
+
+def plan_capacity(workload: Workload, node_types: List[str] = None, min_replicas: int = 1,
+                  data_tiering: bool = False, burstable: bool = True) -> SizingPlan:
+    """
+    Pick the cheapest node type, shard count and replica count that serve the workload.
+    Data tiering node types only win when the hot set fraction lets the SSD hold enough of the dataset
+    to make up for their higher price, and the latency target tolerates the reads served from SSD.
+
+    Args:
+        workload: the declared workload.
+        node_types: the candidate node types, all node types in NODE_TYPES if not provided.
+        min_replicas: the minimal number of replicas per node group.
+        data_tiering: whether the data tiering node types are candidates.
+        burstable: whether the burstable node types are candidates, a Global Datastore does not support them.
+
+    Returns:
+        SizingPlan: the cheapest plan, ties go to the plan with fewer nodes.
+    """
+    candidates = []
+    if node_types is None:
+        node_types = [node_type for node_type in NODE_TYPES
+                      if (data_tiering or not is_data_tiering(node_type)) and (burstable or not is_burstable(node_type))]
+    for node_type in node_types:
+        if node_type not in NODE_TYPES:
+            raise ValueError(f"Node type '{node_type}' is not in the sizing table")
+        if is_data_tiering(node_type) and not data_tiering:
+            raise ValueError(f"Node type '{node_type}' needs 'data_tiering_enabled'")
+        if is_burstable(node_type) and not burstable:
+            raise ValueError(f"Node type '{node_type}' is burstable, a Global Datastore does not support it")
+        plan = plan_node_type(workload, node_type, min_replicas)
+        if plan is not None:
+            candidates.append(plan)
+
+    if not candidates:
+        raise ValueError(f"No node type can serve the workload {workload}")
+
+    return min(candidates, key=lambda plan: (
+        plan.hourly_price, plan.num_node_groups * (plan.replicas_per_node_group + 1)
+    ))
+
+
+def get_workload(workload_config: Dict) -> Workload:
+    """
+    Build the workload from the `workload` section in config/config.py.
+
+    Args:
+        workload_config: the workload configuration.
+
+    Returns:
+        Workload: the declared workload.
+    """
+    return Workload(
+        dataset_size_gb=float(workload_config['dataset_size_gb']),
+        peak_read_ops=int(workload_config.get('peak_read_ops', 0)),
+        peak_write_ops=int(workload_config.get('peak_write_ops', 0)),
+        avg_value_size_bytes=int(workload_config.get('avg_value_size_bytes', 1024)),
+        target_p99_latency_ms=float(workload_config.get('target_p99_latency_ms', 2)),
+        hot_set_fraction=float(workload_config.get('hot_set_fraction', 1.0))
+    )
+
+
+def get_sizing_plan() -> SizingPlan:
+    """
+    Return the sizing plan for the workload declared in config/config.py.
+
+    Args: None
+
+    Returns:
+        SizingPlan: the sizing plan, None if no workload is declared.
+    """
+    workload_config = config.get_workload_config()
+    if workload_config is None:
+        return None
+
+    return plan_capacity(
+        get_workload(workload_config),
+        node_types=workload_config.get('node_types', None),
+        min_replicas=workload_config.get('min_replicas', default_min_replicas()),
+        data_tiering=config.get_data_tiering_enabled(),
+        burstable=config.get_global_datastore_config() is None
+    )
+
+
+def default_min_replicas() -> int:
+    """
+    Multi-AZ and automatic failover need at least one replica per node group.
+    """
+    return 1 if config.get_multi_az() or config.get_automatic_failover() else 0
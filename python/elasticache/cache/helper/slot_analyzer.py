@@ -0,0 +1,244 @@
+"""
+Offline analysis of the hash slot load of a key sample, and a slot layout balancing it across the node groups.
+
+Keys are mapped to slots as Redis Cluster does, CRC16 (XMODEM) of the hash tag, the part between the first `{` and
+the next `}` if not empty, or of the whole key, modulo 16384. A skewed hash tag puts all of its keys in one slot,
+so an even split of the slots leaves some node groups with most of the load. The analyzer counts the keys per hash
+key in batches, hashes every distinct hash key once with `binascii.crc_hqx`, and splits the slots into contiguous
+ranges minimizing the load of the busiest node group.
+
+Every line of the sample is a key, optionally followed by a tab and a weight such as its operations per second or
+its size, the weight defaults to 1. The module only uses the standard library:
+
+    python -m cache.helper.slot_analyzer keys.txt.gz --node-groups 4 > layout.json
+
+The `node_group_configuration` of the output goes into config/config.py.
+"""
+import argparse
+import binascii
+import bisect
+import gzip
+import itertools
+import json
+import sys
+from collections import Counter
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Tuple
+
+from cache.helper.topology import SLOT_COUNT, format_slots, get_slot_ranges
+
+# Lines hashed per batch, the distinct hash keys of a batch are hashed once.
+DEFAULT_BATCH_SIZE = 1000000
+# Hash keys reported as the hottest.
+DEFAULT_TOP = 10
+# Hash keys tracked across batches for the report, the lightest are dropped beyond twice this number, so the
+# hottest hash keys are approximate when a sample has more distinct hash keys.
+MAX_TRACKED_HASH_KEYS = 100000
+# Iterations of the bisection on the load of the busiest node group.
+SPLIT_ITERATIONS = 64
+
+
+def get_hash_key(key: bytes) -> bytes:
+    """
+    Return the part of the key Redis Cluster hashes, the hash tag if any, else the whole key.
+    """
+    start = key.find(b"{")
+    if start != -1:
+        end = key.find(b"}", start + 1)
+        if end > start + 1:
+            return key[start + 1:end]
+    return key
+
+
+def key_slot(key: bytes) -> int:
+    """
+    Return the hash slot of the key, as CLUSTER KEYSLOT.
+    """
+    return binascii.crc_hqx(get_hash_key(key), 0) & (SLOT_COUNT - 1)
+
+
+def read_sample(lines: Iterable[bytes]) -> Iterator[Tuple[bytes, float]]:
+    """
+    Yield the key and the weight of every non empty line, `<key>` or `<key>\\t<weight>`.
+    """
+    for line in lines:
+        line = line.rstrip(b"\r\n")
+        if not line:
+            continue
+        key, separator, weight = line.rpartition(b"\t")
+        if separator:
+            yield key, float(weight)
+        else:
+            yield line, 1.0
+
+
+class SlotLoad:
+    """
+    Load of every hash slot, accumulated per hash key so that every distinct hash key is hashed once per batch.
+    """
+    def __init__(self) -> None:
+        self.loads = [0.0] * SLOT_COUNT
+        self.hash_keys = Counter()
+        self.keys = 0
+
+    def add_batch(self, sample: List[Tuple[bytes, float]]) -> None:
+        batch = Counter()
+        for key, weight in sample:
+            batch[get_hash_key(key) if b"{" in key else key] += weight
+        self.keys += len(sample)
+        loads = self.loads
+        for hash_key, weight in batch.items():
+            loads[binascii.crc_hqx(hash_key, 0) & (SLOT_COUNT - 1)] += weight
+
+        self.hash_keys.update(batch)
+        if len(self.hash_keys) > 2 * MAX_TRACKED_HASH_KEYS:
+            self.hash_keys = Counter(dict(self.hash_keys.most_common(MAX_TRACKED_HASH_KEYS)))
+
+    def add_all(self, sample: Iterable[Tuple[bytes, float]], batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        sample = iter(sample)
+        while True:
+            batch = list(itertools.islice(sample, batch_size))
+            if not batch:
+                return
+            self.add_batch(batch)
+
+    def get_node_group_loads(self, node_group_slots: List[List[Tuple[int, int]]]) -> List[float]:
+        """
+        Return the load of every node group of the slot layout.
+        """
+        return [sum(sum(self.loads[first:last + 1]) for first, last in ranges) for ranges in node_group_slots]
+
+
+def split_slots(loads: List[float], num_node_groups: int) -> List[Tuple[int, int]]:
+    """
+    Split the slots into contiguous ranges, one per node group, minimizing the load of the busiest node group.
+    The load bound is bisected, a bound is feasible if a greedy split with at most that much load per range
+    needs at most `num_node_groups` ranges. A single hot slot bounds the busiest node group from below. Within the
+    bound every range ends as close as it can to the end of the even split, so the slots without load are spread
+    evenly instead of filling the first ranges.
+
+    Args:
+        loads: the load of every slot.
+        num_node_groups: the number of node groups.
+
+    Returns:
+        List[Tuple[int, int]]: the first and last slot of every node group, every range holds at least one slot.
+    """
+    prefix = [0.0] + list(itertools.accumulate(loads))
+
+    def get_bounds(bound: float) -> List[int]:
+        # The end of every range, each range extends as far as the bound allows
+        ends = []
+        start = 0
+        while start < SLOT_COUNT:
+            end = bisect.bisect_right(prefix, prefix[start] + bound, lo=start + 1) - 1
+            end = max(end, start + 1)
+            ends.append(end)
+            start = end
+        return ends
+
+    low, high = max(loads), prefix[-1]
+    for _ in range(SPLIT_ITERATIONS):
+        if high - low <= 1e-9 * max(high, 1):
+            break
+        middle = (low + high) / 2
+        if len(get_bounds(middle)) <= num_node_groups:
+            high = middle
+        else:
+            low = middle
+
+    # The earliest end of every range leaving the next ranges within the bound, the ranges extending backwards
+    # from the last slot as far as the bound allows
+    earliest = [0] * num_node_groups
+    start = SLOT_COUNT
+    for idx in range(num_node_groups - 2, -1, -1):
+        start = max(min(bisect.bisect_left(prefix, prefix[start] - high, 0, start), start - 1), 0)
+        earliest[idx] = start
+
+    even_ends = [last + 1 for _, last in get_slot_ranges(num_node_groups)]
+    ends = []
+    start = 0
+    for idx in range(num_node_groups - 1):
+        latest = max(bisect.bisect_right(prefix, prefix[start] + high, lo=start + 1) - 1, start + 1)
+        latest = min(latest, SLOT_COUNT - (num_node_groups - 1 - idx))
+        end = min(max(even_ends[idx], earliest[idx], start + 1), latest)
+        ends.append(end)
+        start = end
+    ends.append(SLOT_COUNT)
+    starts = [0] + ends[:-1]
+    return [(start, end - 1) for start, end in zip(starts, ends)]
+
+
+def get_node_group_configuration(node_group_slots: List[List[Tuple[int, int]]]) -> List[Dict]:
+    """
+    Return the `node_group_configuration` entries of config/config.py for the slot layout.
+    """
+    return [{"node_group_id": f"{idx:04d}", "slots": format_slots(ranges)}
+            for idx, ranges in enumerate(node_group_slots, start=1)]
+
+
+def report(slot_load: SlotLoad, node_group_slots: List[List[Tuple[int, int]]], top: int = DEFAULT_TOP) -> Dict:
+    """
+    Return the load of every node group of the slot layout and of the even split, and the hottest hash keys.
+
+    Args:
+        slot_load: the load of the sample.
+        node_group_slots: the slot ranges of every node group.
+        top: the number of hash keys to report.
+
+    Returns:
+        Dict: the report, the imbalance is the load of the busiest node group over the mean load.
+    """
+    total = sum(slot_load.loads) or 1.0
+
+    def describe(layout: List[List[Tuple[int, int]]]) -> Dict:
+        loads = slot_load.get_node_group_loads(layout)
+        return {
+            "imbalance": round(max(loads) / (total / len(loads)), 3),
+            "node_groups": [{"slots": format_slots(ranges), "load_share": round(load / total, 4)}
+                            for ranges, load in zip(layout, loads)]
+        }
+
+    even = [[slot_range] for slot_range in get_slot_ranges(len(node_group_slots))]
+    return {
+        "keys": slot_load.keys,
+        "balanced": describe(node_group_slots),
+        "even": describe(even),
+        "hot_hash_keys": [
+            {"hash_key": hash_key.decode("utf-8", "replace"), "slot": key_slot(hash_key),
+             "load_share": round(weight / total, 4)}
+            for hash_key, weight in slot_load.hash_keys.most_common(top)
+        ]
+    }
+
+
+def open_sample(path: str) -> BinaryIO:
+    if path == "-":
+        return sys.stdin.buffer
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Balance the hash slots of a key sample across node groups.")
+    parser.add_argument("files", nargs="+", help="key sample files, optionally gzip compressed, - for stdin")
+    parser.add_argument("--node-groups", type=int, required=True, help="number of node groups")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="lines hashed per batch")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="number of hot hash keys to report")
+    args = parser.parse_args(argv)
+
+    slot_load = SlotLoad()
+    for path in args.files:
+        with open_sample(path) as lines:
+            slot_load.add_all(read_sample(lines), args.batch_size)
+
+    node_group_slots = [[slot_range] for slot_range in split_slots(slot_load.loads, args.node_groups)]
+    json.dump({
+        "node_group_configuration": get_node_group_configuration(node_group_slots),
+        "report": report(slot_load, node_group_slots, args.top)
+    }, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
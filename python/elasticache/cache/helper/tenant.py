@@ -0,0 +1,135 @@
+import re
+from typing import Dict, List, Mapping
+
+from config.default import default
+from config import config_util as config
+
+# ElastiCache user ids start with a letter, hold letters, digits and single hyphens and do not end with a hyphen.
+USER_ID_PATTERN = re.compile(r"^[a-zA-Z](?:-?[a-zA-Z0-9])*$")
+MAX_USER_ID_LENGTH = 40
+RESERVED_USER_IDS = ("default",)
+# Keywords of the Redis ACL rules, the other rules start with a prefix such as ~keys, &channels or +@category.
+# https://redis.io/topics/acl
+ACL_KEYWORDS = ("on", "off", "nopass", "allkeys", "allchannels", "allcommands", "nocommands", "resetkeys",
+                "resetchannels", "resetpass", "reset")
+ACL_RULE_PREFIXES = ("~", "%", "&", "+", "-")
+
+
+def expand_acl(acl_template: str, tenant_id: str) -> str:
+    """
+    Expand an ACL template for a tenant, `{id}` is replaced by the tenant id,
+    e.g. `on ~tenant:{id}:* -@all +@read` becomes `on ~tenant:acme:* -@all +@read`.
+
+    Args:
+        acl_template: the ACL template.
+        tenant_id: the tenant id.
+
+    Returns: str
+    """
+    return acl_template.format(id=tenant_id)
+
+
+def get_acl_errors(acl: str) -> List[str]:
+    """
+    Return the rules of an access string that are not Redis ACL rules.
+    """
+    return [rule for rule in acl.split()
+            if rule not in ACL_KEYWORDS and not rule.startswith(ACL_RULE_PREFIXES)]
+
+
+def get_tenant_users(secret_config: Mapping) -> List[Dict]:
+    """
+    Expand the `tenants` of the `secrets` section into users, every tenant gets the user `tenant-<id>` with the
+    access string of its ACL template.
+
+    Args:
+        secret_config: the `secrets` section in config/config.py.
+
+    Returns:
+        List[Dict]: the users, with `user_id`, `user_name`, `user_acl` and the `tenant_id` they were expanded from,
+        `user_acl` is None when the template cannot be expanded.
+    """
+    acl_templates = dict(default['acl_templates'], **(secret_config.get('acl_templates', None) or {}))
+    users = []
+    for tenant in secret_config.get('tenants', None) or []:
+        tenant_id = str(tenant.get('id', ""))
+        template_name = tenant.get('acl_template', default['tenant_acl_template'])
+        acl_template = acl_templates.get(template_name, None)
+        try:
+            user_acl = None if acl_template is None else expand_acl(acl_template, tenant_id)
+        except (KeyError, IndexError, ValueError):
+            user_acl = None
+        users.append({
+            "tenant_id": tenant_id,
+            "acl_template": template_name,
+            "user_id": tenant.get('user_id', f"tenant-{tenant_id}"),
+            "user_name": tenant.get('user_name', f"tenant-{tenant_id}"),
+            "user_acl": user_acl
+        })
+    return users
+
+
+def get_user_errors(users: List[Mapping]) -> List[str]:
+    """
+    Return the validation errors of every user at once.
+
+    Args:
+        users: the users, from `users` and the expanded `tenants` of the `secrets` section.
+
+    Returns:
+        List[str]: the errors, empty if every user is valid.
+    """
+    errors = []
+    seen_ids = set()
+    seen_names = set()
+    for idx, user in enumerate(users):
+        user_id = config.get_user_id(user)
+        user_name = config.get_user_name(user)
+        label = f"tenant '{user['tenant_id']}'" if 'tenant_id' in user else f"user {idx + 1}"
+
+        if not user_id:
+            errors.append(f"{label}: missing user_id")
+        elif (not USER_ID_PATTERN.match(user_id) or len(user_id) > MAX_USER_ID_LENGTH or
+              user_id in RESERVED_USER_IDS):
+            errors.append(f"{label}: invalid user_id '{user_id}', use up to {MAX_USER_ID_LENGTH} letters, digits "
+                          f"and single hyphens starting with a letter")
+        elif user_id in seen_ids:
+            errors.append(f"{label}: duplicate user_id '{user_id}'")
+        seen_ids.add(user_id)
+
+        if not user_name:
+            errors.append(f"{label}: missing user_name")
+        elif user_name in seen_names:
+            errors.append(f"{label}: duplicate user_name '{user_name}'")
+        seen_names.add(user_name)
+
+        if 'tenant_id' in user and user['user_acl'] is None:
+            errors.append(f"{label}: unknown ACL template '{user['acl_template']}' or placeholder other than {{id}}")
+            continue
+        invalid_rules = get_acl_errors(config.get_user_acl(user))
+        if invalid_rules:
+            errors.append(f"{label}: invalid ACL rules {' '.join(invalid_rules)}")
+    return errors
+
+
+def get_users() -> List[Dict]:
+    """
+    Return the validated users of the `secrets` section, the `users` followed by the expanded `tenants`.
+    All errors are reported at once.
+
+    Args: None
+
+    Returns:
+        List[Dict]: the users.
+    """
+    secret_config = config.get_secret_config() or {}
+    users = [dict(user) for user in secret_config.get('users', None) or []] + get_tenant_users(secret_config)
+
+    errors = get_user_errors(users)
+    # The replication group takes a single user group, which holds the default user as well
+    max_users = config.get_max_users_per_group()
+    if len(users) + 1 > max_users:
+        errors.append(f"{len(users)} users and the default user exceed the {max_users} users of the user group")
+    if errors:
+        raise ValueError("Invalid ElastiCache users:\n  " + "\n  ".join(errors))
+    return users
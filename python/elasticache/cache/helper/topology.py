@@ -0,0 +1,146 @@
+import json
+from typing import Dict, List, NamedTuple, Tuple
+
+from config.config_model import SLOT_COUNT, get_slot_errors, parse_slots
+# Value limits of a standard and of an advanced SSM parameter.
+MAX_STANDARD_DOCUMENT_BYTES = 4096
+MAX_DOCUMENT_BYTES = 8192
+# Room for an endpoint address in place of a token.
+TOKEN_RESERVE_BYTES = 64
+
+
+class NodeGroup(NamedTuple):
+    node_group_id: str
+    primary: str
+    replicas: List[str]
+
+    @property
+    def nodes(self) -> List[str]:
+        return [self.primary] + self.replicas
+
+
+def get_node_groups(replication_group_id: str, num_node_groups: int,
+                    replicas_per_node_group: int) -> List[NodeGroup]:
+    """
+    Return the node groups and the cache cluster ids of their members, as named by ElastiCache when it
+    creates the replication group. The first member of each node group is the primary at creation, a
+    failover can promote any of the replicas afterwards.
+
+    With cluster mode enabled the members are named <replication-group-id>-<node-group>-<member>,
+    e.g. my-cluster-0001-001, with cluster mode disabled <replication-group-id>-<member>, e.g. my-cluster-001.
+
+    Args:
+        replication_group_id: the replication group id.
+        num_node_groups: the number of node groups.
+        replicas_per_node_group: the number of replicas per node group.
+
+    Returns:
+        List[NodeGroup]: the node groups.
+    """
+    node_groups = []
+    for node_group in range(1, num_node_groups + 1):
+        node_group_id = f"{node_group:04d}"
+        prefix = f"{replication_group_id}-{node_group_id}" if num_node_groups > 1 else replication_group_id
+        members = [f"{prefix}-{member:03d}" for member in range(1, replicas_per_node_group + 2)]
+        node_groups.append(NodeGroup(node_group_id, members[0], members[1:]))
+    return node_groups
+
+
+def get_document_bytes(document: Dict) -> int:
+    """
+    Return the size of the document as JSON, with room for the endpoint address each unresolved token stands for.
+    """
+    payload = json.dumps(document)
+    return len(payload) + TOKEN_RESERVE_BYTES * payload.count("${Token[")
+
+
+def get_slot_ranges(num_node_groups: int) -> List[Tuple[int, int]]:
+    """
+    Return the hash slots of every node group, split as ElastiCache splits them when the replication group is
+    created without a node group configuration: contiguous ranges, the first node groups take one slot more when
+    the slots do not divide evenly.
+
+    Args:
+        num_node_groups: the number of node groups.
+
+    Returns:
+        List[Tuple[int, int]]: the first and last slot of every node group.
+    """
+    size, remainder = divmod(SLOT_COUNT, num_node_groups)
+    ranges = []
+    start = 0
+    for node_group in range(num_node_groups):
+        end = start + size + (1 if node_group < remainder else 0)
+        ranges.append((start, end - 1))
+        start = end
+    return ranges
+
+
+def format_slots(ranges: List[Tuple[int, int]]) -> str:
+    """
+    Format the slot ranges as the slots of a node group configuration, e.g. `0-5000,5002`.
+    """
+    return ",".join(f"{first}-{last}" if first != last else str(first) for first, last in ranges)
+
+
+def get_node_group_slots(node_group_configuration: List[Dict], num_node_groups: int) -> List[List[Tuple[int, int]]]:
+    """
+    Return the slot ranges of every node group, the `slots` of the node group configuration, e.g. as computed by
+    cache/helper/slot_analyzer.py, or the even split of ElastiCache without a node group configuration.
+
+    Args:
+        node_group_configuration: the `node_group_configuration` in config/config.py, None for the even split.
+        num_node_groups: the number of node groups.
+
+    Returns:
+        List[List[Tuple[int, int]]]: the first and last slot of the ranges of every node group.
+    """
+    if not node_group_configuration:
+        return [[slot_range] for slot_range in get_slot_ranges(num_node_groups)]
+
+    errors = []
+    if len(node_group_configuration) != num_node_groups:
+        errors.append(f"{len(node_group_configuration)} node groups configured for {num_node_groups} node groups")
+    errors += get_slot_errors(node_group_configuration)
+    if errors:
+        raise ValueError("Invalid node group configuration:\n  " + "\n  ".join(errors))
+    return [parse_slots(entry['slots']) for entry in node_group_configuration]
+
+
+def get_topology_documents(node_groups: List[NodeGroup], node_group_slots: List[List[Tuple[int, int]]],
+                           header: Dict, max_bytes: int = MAX_DOCUMENT_BYTES) -> List[Dict]:
+    """
+    Return the topology documents of a cluster mode enabled replication group, the header keys followed by the
+    node groups with their slots and members. The node groups are split into pages of at most `max_bytes` of JSON
+    when they do not fit a single document, the first document then holds the header and the page count only.
+
+    Args:
+        node_groups: the node groups.
+        node_group_slots: the first and last slot of the ranges of every node group.
+        header: the keys common to every node group, e.g. the port and the node endpoint suffix.
+        max_bytes: the maximal size of a document, the SSM parameter value limit.
+
+    Returns:
+        List[Dict]: the documents, a single one if the node groups fit.
+    """
+    entries = [
+        {"id": node_group.node_group_id, "slots": [list(slot_range) for slot_range in slot_ranges],
+         "primary": node_group.primary, "replicas": node_group.replicas}
+        for node_group, slot_ranges in zip(node_groups, node_group_slots)
+    ]
+    if get_document_bytes(dict(header, node_groups=entries)) <= max_bytes:
+        return [dict(header, node_groups=entries)]
+
+    # The keys of a page besides its node groups, with room for a page number of 3 digits
+    header_bytes = get_document_bytes(dict(header, page=100, node_groups=[]))
+    pages = [[]]
+    page_bytes = header_bytes
+    for entry in entries:
+        entry_bytes = len(json.dumps(entry)) + 2
+        if pages[-1] and page_bytes + entry_bytes > max_bytes:
+            pages.append([])
+            page_bytes = header_bytes
+        pages[-1].append(entry)
+        page_bytes += entry_bytes
+    return [dict(header, pages=len(pages))] + [dict(header, page=idx, node_groups=page)
+                                               for idx, page in enumerate(pages, start=1)]
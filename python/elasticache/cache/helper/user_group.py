@@ -4,31 +4,43 @@ from aws_cdk import core as cdk
 from aws_cdk import aws_elasticache as elasticache
 
 from config import config_util as config
+from config.config_model import parse_engine_version
 
 
-def create_user_group(scope: cdk.Construct, user_secrets: List) -> None:
+def supports_rbac() -> bool:
+    """
+    Return whether the cache supports the Role-Based Access Control (RBAC) with user and user group.
+    Only Redis 6 onward, e.g. 6.x, 6.2 or 7.0, and the serverless caches support it, the versions prior to 6 use
+    the Auth Token/Password.
+    """
+    return parse_engine_version(config.get_engine_version())[0] >= 6 or config.get_serverless()
+
+
+def create_user_group(scope: cdk.Construct, user_secrets: List,
+                      dependencies: List[cdk.Construct] = None) -> elasticache.CfnUserGroup:
     """
     Create user group for the Replication group.
 
     Args:
         scope: the cdk construct.
         user_secrets: the username and password configured and generated in SecretManager.
+        dependencies: the constructs holding the users, e.g. the nested stacks of a bulk provisioning, the users
+        are created in the scope if None.
 
-    Returns: None
+    Returns: CfnUserGroup, None if there are no users
 
     """
-    # Only Redis 6.x supports the Role-Based Access Control (RBAC) with user and user group.
-    # The version prior to 6.x uses Auth Token/Password
-    if config.get_engine_version() != "6.x":
+    if not supports_rbac():
         return
 
-    users = create_users(scope, user_secrets)
-    if users is None or not users:
+    if dependencies is None:
+        dependencies = create_users(scope, user_secrets)
+    if not user_secrets or not dependencies:
         return
 
     user_ids = ['default']
-    for user in users:
-        user_ids.append(user.user_id)
+    for user_secret in user_secrets:
+        user_ids.append(user_secret.user_id)
 
     user_group = elasticache.CfnUserGroup(
         scope, "ElastiCacheRedisUserGroup",
@@ -37,13 +49,13 @@ def create_user_group(scope: cdk.Construct, user_secrets: List) -> None:
         user_ids=user_ids
     )
 
-    for user in users:
-        user_group.node.add_dependency(user)
+    for dependency in dependencies:
+        user_group.node.add_dependency(dependency)
 
     return user_group
 
 
-def create_users(scope: cdk.Construct, user_secrets: List) -> List[str]:
+def create_users(scope: cdk.Construct, user_secrets: List, start: int = 0) -> List[elasticache.CfnUser]:
     """
     Create the Redis user.
     Note: the default user which is to be backward compatible has already been created by the cluster creation.
@@ -51,8 +63,9 @@ def create_users(scope: cdk.Construct, user_secrets: List) -> List[str]:
     Args:
         scope: the cdk construct.
         user_secrets: dictionary contain the username and password to create.
+        start: the index of the first user, the construct ids stay unique when the users are split across stacks.
 
-    Returns: None
+    Returns: List[CfnUser]
 
     Refer to the following links for description of access string
     https://docs.aws.amazon.com/AmazonElastiCache/latest/red-ug/Clusters.RBAC.html
@@ -60,18 +73,18 @@ def create_users(scope: cdk.Construct, user_secrets: List) -> List[str]:
     The following gives permissions to the user for all available keys and all available commands.
     """
 
-    # Only Redis 6.x supports the Role-Based Access Control (RBAC) with user and user group.
-    # The version prior to 6.x uses Auth Token/Password
-    if config.get_engine_version() != "6.x":
+    if not supports_rbac():
         return
 
     users = []
-    for idx, user_secret in enumerate(user_secrets):
+    for idx, user_secret in enumerate(user_secrets, start=start):
         user = elasticache.CfnUser(
             scope, f"ElastiCacheRedisUser-{idx + 1}",
             engine="redis",
             user_id=user_secret.user_id,
             user_name=user_secret.user_name,
+            # The current password only: a stack update changing the user ends the dual password window of a
+            # rotation early, see Rotation in README.md
             passwords=[user_secret.password],
             access_string=user_secret.user_acl
         )
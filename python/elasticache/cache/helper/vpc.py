@@ -5,6 +5,7 @@ from aws_cdk import (
 )
 from aws_cdk.core import Tags
 
+from cache.helper import serverless
 from config import config_util as config
 
 
@@ -24,18 +25,19 @@ def get_vpc(scope: cdk.Construct) -> ec2.Vpc:
     return vpc
 
 
-def get_security_group(scope: cdk.Construct) -> ec2.SecurityGroup:
+def get_security_group(scope: cdk.Construct, vpc: ec2.IVpc = None) -> ec2.SecurityGroup:
     """
     Create and return the security group for the cluster which allows for any ipv4 and configured port number.
 
     Args:
         scope: the cdk construct.
+        vpc: the vpc of the cluster, looked up if None.
 
     Returns:
         ec2.SecurityGroup: The ec2 Security Group object for the cluster.
     """
     cluster_name = config.get_cluster_name()
-    vpc = get_vpc(scope)
+    vpc = vpc or get_vpc(scope)
     security_group = ec2.SecurityGroup(
         scope, "ElastiCacheSecurityGroup",
         vpc=vpc,
@@ -45,12 +47,15 @@ def get_security_group(scope: cdk.Construct) -> ec2.SecurityGroup:
     )
     Tags.of(security_group).add("Name", f"elasticache-sg-{cluster_name}")
 
+    # A serverless cache serves the reads of the replicas on a port of their own
+    ports = [serverless.PORT, serverless.READER_PORT] if config.get_serverless() else [config.get_port_number()]
     for allowed_cidr in config.get_allowed_cidrs():
-        security_group.add_ingress_rule(
-            ec2.Peer.ipv4(allowed_cidr),
-            ec2.Port.tcp(config.get_port_number()),
-            f"Allows connection to ElastiCache cluster {cluster_name}."
-        )
+        for port in ports:
+            security_group.add_ingress_rule(
+                ec2.Peer.ipv4(allowed_cidr),
+                ec2.Port.tcp(port),
+                f"Allows connection to ElastiCache cluster {cluster_name}."
+            )
     return security_group
 
 
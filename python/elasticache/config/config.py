@@ -26,8 +26,65 @@ config = {
     "transit_encryption_enabled": True,
     "multi_az": True,
     "num_node_groups": 2,
-    "replicasPerNodeGroup": 1,
+    "replicas_per_node_group": 1,
     "automatic_failover": True,
+    "autoscaling": {
+        "enabled": False,
+        "node_groups": {
+            "min_capacity": 2,
+            "max_capacity": 10,
+            "target_engine_cpu": 60,
+            "target_memory_usage": 70,
+            "scale_in_cooldown": 600,
+            "scale_out_cooldown": 300
+        },
+        "replicas": {
+            "min_capacity": 1,
+            "max_capacity": 5,
+            "target_engine_cpu": 60,
+            "scale_in_cooldown": 600,
+            "scale_out_cooldown": 300
+        }
+    },
+    "monitoring": {
+        "enabled": False,
+        "alarm_emails": [],
+        "period_seconds": 60,
+        "evaluation_periods": 5,
+        "datapoints_to_alarm": 3,
+        "alarms": {
+            "engine_cpu_utilization": 80,
+            "database_memory_usage_percentage": 85,
+            "get_latency_us": 1000,
+            "set_latency_us": 1000,
+            "cache_hit_rate_min": 80,
+            "evictions": 1000,
+            "curr_connections": 20000,
+            "network_bandwidth_allowance_exceeded": 1,
+            "replication_lag_seconds": 1
+        }
+    },
+    "slowlog_analytics": {
+        "enabled": False,
+        "top_n": 20,
+        "max_groups": 1000,
+        "summary_retention_days": 7,
+        "report_retention_days": 90
+    },
+    "log_delivery": {
+        "slow-log": {
+            "destination": "cloudwatch-logs"
+        },
+        "engine-log": {
+            "destination": "cloudwatch-logs"
+        }
+    },
+    "log_bucket_retention_days": 30,
+    "parameter_group": {
+        "family": "redis6.x",
+        "profile": "low-latency",
+        "parameters": {}
+    },
     "secrets": {
         "cmk": True,
         "auth_token_enabled": False,
@@ -0,0 +1,577 @@
+"""
+Typed, read-only model of config/config.py.
+
+The config dict is parsed and validated once, unknown keys such as `replicasPerNodeGroup` and out of range sizing
+are rejected before anything is synthesized, and the values derived from several keys are computed once.
+"""
+import difflib
+import re
+from dataclasses import MISSING, dataclass, field, fields
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from config.default import default
+
+# Shard, replica and node limits of a replication group with cluster mode enabled, the node limit counts the
+# primaries and the replicas of every shard.
+MAX_NODE_GROUPS = 500
+MAX_REPLICAS_PER_NODE_GROUP = 5
+MAX_NODES = 500
+# Minimal Redis version of a Global Datastore, the burstable node types can not join one.
+GLOBAL_DATASTORE_MIN_VERSION = (5, 0, 6)
+GLOBAL_DATASTORE_REGION_KEYS = ("region", "vpc_id", "subnet_ids")
+# Data tiering node types, which move the least recently used values to SSD, and the minimal Redis version.
+DATA_TIERING_FAMILIES = ("cache.r6gd.",)
+# Burstable node types, a Global Datastore does not support them
+BURSTABLE_FAMILIES = ("cache.t3.", "cache.t4g.")
+DATA_TIERING_MIN_VERSION = (6, 2)
+# Minimal Redis version supporting the delivery of each log type.
+# https://docs.aws.amazon.com/AmazonElastiCache/latest/red-ug/Log_Delivery.html
+LOG_DELIVERY_MIN_VERSIONS = {
+    "slow-log": (6, 0),
+    "engine-log": (6, 2),
+}
+# RDB files seeding a new cluster, e.g. arn:aws:s3:::my-bucket/backups/orders.rdb
+SNAPSHOT_ARN_PATTERN = re.compile(r"^arn:aws[a-z-]*:s3:::[^/]+/.+$")
+# The warm-up runs in a Lambda, at most 15 minutes.
+MAX_WARM_UP_TIMEOUT_MINUTES = 15
+DEPLOYMENT_MODES = ("provisioned", "serverless")
+# A CloudFormation template holds at most 500 resources, the alarms of a node group are created for every threshold of
+# `monitoring.alarms`, the network allowance threshold alarms on the inbound and the outbound metric
+MAX_TEMPLATE_RESOURCES = 500
+ALARMS_PER_THRESHOLD = {"network_bandwidth_allowance_exceeded": 2}
+# Hash slots of a Redis cluster, a node group configuration puts every slot in exactly one node group.
+SLOT_COUNT = 16384
+# Minimal Redis major version of a serverless cache, and the bounds of its cache usage limits.
+SERVERLESS_MIN_MAJOR_VERSION = 7
+CACHE_USAGE_LIMITS = {"data_storage": (1, 5000), "ecpu_per_second": (1000, 15000000)}
+
+# Known keys of the config sections, a section maps to its keys, or to the known keys of its entries.
+AUTOSCALING_DIMENSION_KEYS = ("min_capacity", "max_capacity", "target_engine_cpu", "target_memory_usage",
+                              "scale_in_cooldown", "scale_out_cooldown")
+LOG_DELIVERY_KEYS = ("destination", "format", "buffer_size_mb", "buffer_interval")
+SECTIONS = {
+    "secrets": ("cmk", "auth_token_enabled", "user_group_id", "users", "acl_templates", "tenants",
+                "users_per_stack", "max_users_per_group", "kms_key_scope", "rotation"),
+    "secrets.users": ("user_id", "user_name", "user_acl"),
+    "secrets.tenants": ("id", "acl_template", "user_id", "user_name"),
+    "secrets.rotation": ("enabled", "schedule_days", "grace_minutes", "prune_interval_minutes", "memory_size"),
+    "parameter_group": ("family", "profile", "parameters"),
+    "workload": ("dataset_size_gb", "peak_read_ops", "peak_write_ops", "avg_value_size_bytes",
+                 "target_p99_latency_ms", "hot_set_fraction", "node_types", "min_replicas"),
+    "autoscaling": ("enabled", "node_groups", "replicas"),
+    "autoscaling.node_groups": AUTOSCALING_DIMENSION_KEYS,
+    "autoscaling.replicas": AUTOSCALING_DIMENSION_KEYS,
+    "monitoring": ("enabled", "alarm_topic_arn", "alarm_emails", "period_seconds", "evaluation_periods",
+                   "datapoints_to_alarm", "alarms"),
+    "monitoring.alarms": ("engine_cpu_utilization", "database_memory_usage_percentage", "get_latency_us",
+                          "set_latency_us", "cache_hit_rate_min", "evictions", "curr_connections",
+                          "network_bandwidth_allowance_exceeded", "replication_lag_seconds"),
+    "slowlog_analytics": ("enabled", "top_n", "max_groups", "filter_pattern", "summary_retention_days",
+                          "report_retention_days", "memory_size"),
+    "node_group_configuration": ("node_group_id", "slots"),
+    "global_datastore": ("id_suffix", "regions"),
+    "global_datastore.regions": ("region", "vpc_id", "subnet_ids", "allowed_cidrs", "replicas_per_node_group"),
+    "cache_usage_limits": ("data_storage", "ecpu_per_second"),
+    "cache_usage_limits.data_storage": ("minimum", "maximum"),
+    "cache_usage_limits.ecpu_per_second": ("minimum", "maximum"),
+    "warm_up": ("enabled", "manifest_bucket", "manifest_key", "user_name", "parallelism_per_shard", "pipeline",
+                "memory_size", "timeout_minutes"),
+    "log_delivery": ("slow-log", "engine-log"),
+    "log_delivery.slow-log": LOG_DELIVERY_KEYS,
+    "log_delivery.engine-log": LOG_DELIVERY_KEYS,
+}
+
+
+def parse_engine_version(engine_version: str) -> Tuple[int, int, int]:
+    """
+    Return the (major, minor, patch) version of an engine version, e.g. 6.2 or 6.x, a missing or `x` part is
+    the latest version of its kind and compares above any number.
+    """
+    parts = str(engine_version).split(".")
+    parts += ["x"] * (3 - len(parts))
+    return tuple(99 if part == "x" else int(part) for part in parts[:3])
+
+
+def get_parameter_group_family(engine_version: str) -> str:
+    """
+    Return the parameter group family of an engine version, e.g. redis5.0 for 5.0.6, redis6.x for 6.2 and redis7
+    for 7.1.
+    """
+    major, minor, _ = parse_engine_version(engine_version)
+    if major >= 7:
+        return f"redis{major}"
+    if major == 6:
+        return "redis6.x"
+    return f"redis{major}.{minor}"
+
+
+def freeze(value: Any) -> Any:
+    """
+    Return a read-only copy of the value, dicts become mapping proxies and lists become tuples.
+    """
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """
+    Return a plain dict and list copy of a frozen value.
+    """
+    if isinstance(value, Mapping):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+def get_unknown_keys(path: str, data: Mapping, known: Tuple[str, ...]) -> List[str]:
+    errors = []
+    for key in data:
+        if key not in known:
+            suggestion = difflib.get_close_matches(_normalize(key), known, n=1)
+            hint = f", did you mean '{suggestion[0]}'?" if suggestion else ""
+            errors.append(f"unknown key '{path}{key}'{hint}")
+    return errors
+
+
+def _normalize(key: str) -> str:
+    # camelCase to snake_case, so that `replicasPerNodeGroup` suggests `replicas_per_node_group`
+    return "".join(f"_{char.lower()}" if char.isupper() else char for char in key)
+
+
+@dataclass(frozen=True)
+class ElastiCacheConfig:
+    """
+    Class for the validated ElastiCache configuration.
+    Fields are named after the keys of config/config.py and hold the value of config/default.py for missing keys,
+    sections are read-only mappings.
+    """
+    environment: str
+    cluster_name: str
+    vpc_id: str
+    subnet_ids: Tuple[str, ...]
+    allowed_cidrs: Tuple[str, ...]
+    account_id: Optional[str] = None
+    region: Optional[str] = None
+    stack_name: str = default['stack_name']
+    engine_version: str = default['engine_version']
+    deployment_mode: str = default['deployment_mode']
+    node_type: str = default['node_type']
+    port_number: int = default['port_number']
+    num_node_groups: int = default['num_node_groups']
+    replicas_per_node_group: int = default['replicas_per_node_group']
+    node_group_configuration: Optional[Tuple[Mapping, ...]] = None
+    multi_az: bool = default['multi_az']
+    automatic_failover: bool = default['automatic_failover']
+    data_tiering_enabled: bool = default['data_tiering_enabled']
+    at_rest_encryption_enabled: bool = default['at_rest_encryption_enabled']
+    transit_encryption_enabled: bool = default['transit_encryption_enabled']
+    snapshot_window: Optional[str] = None
+    snapshot_retention_limit: int = default['snapshot_retention_limit']
+    snapshot_arns: Optional[Tuple[str, ...]] = None
+    snapshot_name: Optional[str] = None
+    log_retention: Any = None
+    log_group_retention_limit: str = default['log_group_retention_limit']
+    log_bucket_retention_days: int = default['log_bucket_retention_days']
+    log_delivery: Mapping = field(default_factory=lambda: freeze(default['log_delivery']))
+    secrets: Optional[Mapping] = None
+    parameter_group: Optional[Mapping] = None
+    workload: Optional[Mapping] = None
+    autoscaling: Optional[Mapping] = None
+    monitoring: Optional[Mapping] = None
+    slowlog_analytics: Optional[Mapping] = None
+    global_datastore: Optional[Mapping] = None
+    warm_up: Optional[Mapping] = None
+    cache_usage_limits: Optional[Mapping] = None
+    # Derived values, computed once
+    replication_group_id: str = field(init=False, repr=False, compare=False)
+    engine_major_version: int = field(init=False, repr=False, compare=False)
+    cluster_mode: bool = field(init=False, repr=False, compare=False)
+    num_nodes: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "replication_group_id", f"{self.environment}-{self.cluster_name}".lower())
+        object.__setattr__(self, "engine_major_version", parse_engine_version(self.engine_version)[0])
+        object.__setattr__(self, "cluster_mode", self.num_node_groups > 1)
+        object.__setattr__(self, "num_nodes", self.num_node_groups * (self.replicas_per_node_group + 1))
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ElastiCacheConfig":
+        """
+        Parse and validate the config dict, all errors are reported at once.
+
+        Args:
+            data: the config dict, e.g. `config` in config/config.py.
+
+        Returns:
+            ElastiCacheConfig: the validated configuration.
+        """
+        errors = validate(data)
+        if errors:
+            raise ValueError("Invalid ElastiCache configuration:\n  " + "\n  ".join(errors))
+        return cls(**{key: freeze(value) for key, value in data.items()})
+
+    def to_dict(self) -> Dict:
+        """
+        Return the configuration as a config dict, `from_dict(to_dict())` returns an equal configuration.
+        """
+        return {item.name: thaw(getattr(self, item.name)) for item in fields(self) if item.init}
+
+
+FIELD_NAMES = tuple(item.name for item in fields(ElastiCacheConfig) if item.init)
+REQUIRED = tuple(item.name for item in fields(ElastiCacheConfig)
+                 if item.init and item.default is MISSING and item.default_factory is MISSING)
+TYPES = {
+    "environment": str, "cluster_name": str, "vpc_id": str, "account_id": str, "region": str, "stack_name": str,
+    "engine_version": str, "node_type": str, "snapshot_window": str, "log_group_retention_limit": str,
+    "snapshot_name": str, "deployment_mode": str,
+    "subnet_ids": list, "allowed_cidrs": list, "node_group_configuration": list, "snapshot_arns": list,
+    "port_number": int, "num_node_groups": int, "replicas_per_node_group": int, "snapshot_retention_limit": int,
+    "log_bucket_retention_days": int,
+    "multi_az": bool, "automatic_failover": bool, "at_rest_encryption_enabled": bool,
+    "transit_encryption_enabled": bool, "data_tiering_enabled": bool,
+}
+
+
+def get_data_tiering_errors(data: Dict, node_type: str) -> List[str]:
+    """
+    Return the errors of the data tiering settings, the data tiering node types and data tiering go together.
+    With a workload the sizing picks the node type, a data tiering node type only if it lowers the cost.
+    """
+    errors = []
+    data_tiering = data.get('data_tiering_enabled', default['data_tiering_enabled'])
+    workload = data.get('workload', None)
+    tiered_node_type = node_type.startswith(DATA_TIERING_FAMILIES)
+    if workload is None and data_tiering and not tiered_node_type:
+        errors.append(f"'data_tiering_enabled' needs a data tiering node type such as cache.r6gd.xlarge, "
+                      f"got {node_type!r}")
+    if workload is None and tiered_node_type and not data_tiering:
+        errors.append(f"'node_type' {node_type!r} needs 'data_tiering_enabled'")
+
+    if data_tiering and \
+            parse_engine_version(data.get('engine_version', default['engine_version'])) < DATA_TIERING_MIN_VERSION:
+        errors.append("'data_tiering_enabled' needs Redis 6.2 or later")
+
+    hot_set_fraction = (workload or {}).get('hot_set_fraction', 1.0)
+    if not isinstance(hot_set_fraction, (int, float)) or isinstance(hot_set_fraction, bool) or \
+            not 0 < hot_set_fraction <= 1:
+        errors.append(f"'workload.hot_set_fraction' must be above 0 and at most 1, got {hot_set_fraction!r}")
+    return errors
+
+
+def get_global_datastore_errors(data: Dict, node_type: str) -> List[str]:
+    """
+    Return the errors of the `global_datastore` section, every secondary region needs its own VPC and subnets.
+    """
+    global_datastore = data.get('global_datastore', None)
+    if global_datastore is None:
+        return []
+
+    errors = []
+    regions = global_datastore.get('regions', None) or []
+    if not regions:
+        errors.append("'global_datastore.regions' must list at least one secondary region")
+    seen_regions = {data.get('region', None)}
+    for idx, entry in enumerate(regions):
+        if not isinstance(entry, Mapping):
+            continue
+        for key in GLOBAL_DATASTORE_REGION_KEYS:
+            if not entry.get(key, None):
+                errors.append(f"missing key 'global_datastore.regions[{idx}].{key}'")
+        region = entry.get('region', None)
+        if region in seen_regions:
+            errors.append(f"region '{region}' appears twice in the global datastore")
+        seen_regions.add(region)
+
+    if parse_engine_version(data.get('engine_version', default['engine_version'])) < GLOBAL_DATASTORE_MIN_VERSION:
+        errors.append("'global_datastore' needs Redis 5.0.6 or later")
+    if node_type.startswith(BURSTABLE_FAMILIES):
+        errors.append(f"'global_datastore' does not support the burstable node type {node_type!r}")
+    for candidate in (data.get('workload', None) or {}).get('node_types', None) or []:
+        if isinstance(candidate, str) and candidate.startswith(BURSTABLE_FAMILIES):
+            errors.append(f"'global_datastore' does not support the burstable node type {candidate!r} "
+                          f"of 'workload.node_types'")
+    if ((data.get('autoscaling', None) or {}).get('enabled', default['autoscaling_enabled'])):
+        errors.append("'global_datastore' does not support 'autoscaling'")
+    return errors
+
+
+def get_warm_up_errors(data: Dict) -> List[str]:
+    """
+    Return the errors of the seeding settings, `snapshot_arns` or `snapshot_name`, and of the `warm_up` section.
+    """
+    errors = []
+    snapshot_arns = data.get('snapshot_arns', None) or []
+    if snapshot_arns and data.get('snapshot_name', None):
+        errors.append("'snapshot_arns' and 'snapshot_name' are exclusive, seed the cluster from one of them")
+    for snapshot_arn in snapshot_arns:
+        if not isinstance(snapshot_arn, str) or not SNAPSHOT_ARN_PATTERN.match(snapshot_arn):
+            errors.append(f"'snapshot_arns' must hold S3 object ARNs such as arn:aws:s3:::my-bucket/dump.rdb, "
+                          f"got {snapshot_arn!r}")
+    # ElastiCache restores the RDB files of a cluster mode enabled replication group into the configured slots, the
+    # sizing of a workload may pick several node groups
+    if snapshot_arns and not data.get('node_group_configuration', None) and \
+            (data.get('num_node_groups', default['num_node_groups']) > 1 or data.get('workload', None) is not None):
+        errors.append("'snapshot_arns' in cluster mode needs 'node_group_configuration', the slots of every node group")
+
+    warm_up = data.get('warm_up', None) or {}
+    if not warm_up.get('enabled', default['warm_up_enabled']):
+        return errors
+    for key in ("manifest_bucket", "manifest_key"):
+        if not warm_up.get(key, None):
+            errors.append(f"missing key 'warm_up.{key}'")
+    for key in ("parallelism_per_shard", "pipeline"):
+        value = warm_up.get(key, default[f'warm_up_{key}'])
+        if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+            errors.append(f"'warm_up.{key}' must be a positive int, got {value!r}")
+    timeout = warm_up.get('timeout_minutes', default['warm_up_timeout_minutes'])
+    if not isinstance(timeout, int) or isinstance(timeout, bool) or not 1 <= timeout <= MAX_WARM_UP_TIMEOUT_MINUTES:
+        errors.append(f"'warm_up.timeout_minutes' must be between 1 and {MAX_WARM_UP_TIMEOUT_MINUTES}, "
+                      f"got {timeout!r}")
+    return errors
+
+
+def parse_slots(slots: str) -> List[Tuple[int, int]]:
+    """
+    Parse the slots of a node group configuration, e.g. `0-5000,5002` into [(0, 5000), (5002, 5002)].
+    """
+    ranges = []
+    for part in slots.split(","):
+        first, _, last = part.strip().partition("-")
+        ranges.append((int(first), int(last or first)))
+    return ranges
+
+
+def get_slot_errors(node_group_configuration: List[Mapping]) -> List[str]:
+    """
+    Return the errors of the slot layout of a node group configuration, the node groups must be numbered in order
+    and their slots must cover the slots 0-16383 without overlap.
+    """
+    errors = []
+    owners = [None] * SLOT_COUNT
+    for idx, entry in enumerate(node_group_configuration, start=1):
+        if not isinstance(entry, Mapping):
+            continue
+        node_group_id = entry.get('node_group_id', f"{idx:04d}")
+        if node_group_id != f"{idx:04d}":
+            errors.append(f"node group {idx} must have the id '{idx:04d}', got '{node_group_id}'")
+        try:
+            ranges = parse_slots(entry['slots'])
+        except (AttributeError, KeyError, ValueError):
+            errors.append(f"node group '{node_group_id}' has invalid slots {entry.get('slots')!r}")
+            continue
+        for first, last in ranges:
+            if not 0 <= first <= last < SLOT_COUNT:
+                errors.append(f"node group '{node_group_id}' has invalid slots {first}-{last}")
+                continue
+            for slot in range(first, last + 1):
+                if owners[slot] is not None:
+                    errors.append(f"slot {slot} is in node groups '{owners[slot]}' and '{node_group_id}'")
+                    break
+                owners[slot] = node_group_id
+
+    missing = owners.count(None)
+    if missing and not errors:
+        errors.append(f"{missing} slots are in no node group, starting at slot {owners.index(None)}")
+    return errors
+
+
+def get_slowlog_analytics_errors(data: Dict) -> List[str]:
+    """
+    Return the errors of the `slowlog_analytics` section, the analytics subscribe to the slow-log CloudWatch log
+    group, which needs the slow-log delivered to CloudWatch Logs by a Redis version supporting it.
+    """
+    if not (data.get('slowlog_analytics', None) or {}).get('enabled', default['slowlog_analytics_enabled']):
+        return []
+
+    errors = []
+    slow_log = (data.get('log_delivery', default['log_delivery']) or {}).get('slow-log', None)
+    if slow_log is None or slow_log.get('destination', "cloudwatch-logs") != "cloudwatch-logs":
+        errors.append("'slowlog_analytics' needs 'log_delivery.slow-log.destination' cloudwatch-logs")
+    if parse_engine_version(data.get('engine_version', default['engine_version']))[:2] < \
+            LOG_DELIVERY_MIN_VERSIONS["slow-log"]:
+        errors.append("'slowlog_analytics' needs Redis 6.0 or later, earlier versions do not deliver the slow-log")
+    return errors
+
+
+def get_alarm_count(thresholds: Mapping, num_node_groups: int, replicas_per_node_group: int) -> int:
+    """
+    Return the number of alarms of the monitoring, an alarm per node group for each configured threshold, the
+    replication lag only alarms on node groups with replicas.
+    """
+    alarms = 0
+    for key, threshold in thresholds.items():
+        if threshold is None or (key == "replication_lag_seconds" and replicas_per_node_group == 0):
+            continue
+        alarms += ALARMS_PER_THRESHOLD.get(key, 1)
+    return alarms * num_node_groups
+
+
+def get_monitoring_resource_count(monitoring: Mapping, num_node_groups: int, replicas_per_node_group: int) -> int:
+    """
+    Return the number of resources of the monitoring stack: the dashboard, the alarm topic and its email
+    subscriptions unless an existing topic is configured, and the alarms.
+    """
+    resources = 1
+    if monitoring.get('alarm_topic_arn', None) is None:
+        resources += 1 + len(monitoring.get('alarm_emails', None) or [])
+    return resources + get_alarm_count(monitoring.get('alarms', None) or {}, num_node_groups, replicas_per_node_group)
+
+
+def get_monitoring_errors(data: Dict) -> List[str]:
+    """
+    Return the errors of the `monitoring` section, the dashboard and the alarms must fit in the template of the
+    monitoring stack. With a workload the sizing picks the node groups and the stack checks the count.
+    """
+    monitoring = data.get('monitoring', None) or {}
+    if not monitoring.get('enabled', default['monitoring_enabled']) or data.get('workload', None) is not None:
+        return []
+
+    num_node_groups = data.get('num_node_groups', default['num_node_groups'])
+    replicas = data.get('replicas_per_node_group', default['replicas_per_node_group'])
+    resources = get_monitoring_resource_count(monitoring, num_node_groups, replicas)
+    if resources > MAX_TEMPLATE_RESOURCES:
+        return [f"'monitoring' needs {resources} resources for {num_node_groups} node groups, above the "
+                f"{MAX_TEMPLATE_RESOURCES} resources of a template, configure fewer 'monitoring.alarms' thresholds"]
+    return []
+
+
+def get_serverless_errors(data: Dict) -> List[str]:
+    """
+    Return the errors of the deployment mode. A serverless cache scales by itself, the settings of the nodes, the
+    shards and the engine parameters are ignored, and the features it does not support are rejected.
+    """
+    deployment_mode = data.get('deployment_mode', default['deployment_mode'])
+    if deployment_mode not in DEPLOYMENT_MODES:
+        return [f"'deployment_mode' must be one of {', '.join(DEPLOYMENT_MODES)}, got {deployment_mode!r}"]
+    if deployment_mode != "serverless":
+        return ["'cache_usage_limits' needs 'deployment_mode' serverless"] if data.get('cache_usage_limits') else []
+
+    errors = []
+    if parse_engine_version(data.get('engine_version', default['engine_version']))[0] < SERVERLESS_MIN_MAJOR_VERSION:
+        errors.append(f"'deployment_mode' serverless needs Redis {SERVERLESS_MIN_MAJOR_VERSION} or later")
+    unsupported = {
+        "global_datastore": data.get('global_datastore', None),
+        "workload": data.get('workload', None),
+        "node_group_configuration": data.get('node_group_configuration', None),
+        "parameter_group": data.get('parameter_group', None),
+        "log_delivery": data.get('log_delivery', None),
+        "snapshot_name": data.get('snapshot_name', None),
+        "data_tiering_enabled": data.get('data_tiering_enabled', False),
+        "autoscaling.enabled": (data.get('autoscaling', None) or {}).get('enabled', False),
+        "monitoring.enabled": (data.get('monitoring', None) or {}).get('enabled', False),
+        "slowlog_analytics.enabled": (data.get('slowlog_analytics', None) or {}).get('enabled', False),
+        "secrets.auth_token_enabled": (data.get('secrets', None) or {}).get('auth_token_enabled', False),
+    }
+    for key, value in unsupported.items():
+        if value:
+            errors.append(f"'{key}' is not supported with 'deployment_mode' serverless")
+    for key in ("transit_encryption_enabled", "at_rest_encryption_enabled"):
+        if data.get(key, True) is False:
+            errors.append(f"'{key}' can not be disabled, a serverless cache always encrypts its data")
+
+    for key, (low, high) in CACHE_USAGE_LIMITS.items():
+        limit = (data.get('cache_usage_limits', None) or {}).get(key, None) or {}
+        for bound in ("minimum", "maximum"):
+            value = limit.get(bound, None)
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool) or
+                                      not low <= value <= high):
+                errors.append(f"'cache_usage_limits.{key}.{bound}' must be between {low} and {high}, got {value!r}")
+        if isinstance(limit.get('minimum', None), int) and isinstance(limit.get('maximum', None), int) and \
+                limit['minimum'] > limit['maximum']:
+            errors.append(f"'cache_usage_limits.{key}.minimum' is above 'maximum'")
+    return errors
+
+
+def validate(data: Dict) -> List[str]:
+    """
+    Return the validation errors of the config dict.
+
+    Args:
+        data: the config dict.
+
+    Returns:
+        List[str]: the errors, empty if the configuration is valid.
+    """
+    unknown_keys = get_unknown_keys("", data, FIELD_NAMES)
+    errors = [f"missing key '{key}'" for key in REQUIRED if key not in data]
+
+    for key, expected in TYPES.items():
+        value = data.get(key, None)
+        # bool is an int, a flag is not a count
+        if value is not None and (not isinstance(value, expected) or
+                                  (expected is int and isinstance(value, bool))):
+            errors.append(f"'{key}' must be a {expected.__name__}, got {value!r}")
+    # The checks below read the values and need the keys and types to be right
+    if errors:
+        return unknown_keys + errors
+    errors = unknown_keys
+
+    for path, known in SECTIONS.items():
+        section, _, entry = path.partition(".")
+        values = data.get(section, None) or {}
+        if entry:
+            values = values.get(entry, None) or {}
+        for item in (values if isinstance(values, list) else [values]):
+            if not isinstance(item, Mapping):
+                errors.append(f"'{path}' must be a dict")
+            else:
+                errors += get_unknown_keys(f"{path}.", item, known)
+
+    num_node_groups = data.get('num_node_groups', default['num_node_groups'])
+    if not 1 <= num_node_groups <= MAX_NODE_GROUPS:
+        errors.append(f"'num_node_groups' must be between 1 and {MAX_NODE_GROUPS}, got {num_node_groups}")
+    node_group_configuration = data.get('node_group_configuration', None) or []
+    if node_group_configuration and data.get('workload', None) is None and \
+            len(node_group_configuration) != num_node_groups:
+        errors.append(f"'node_group_configuration' must have an entry per node group, got "
+                      f"{len(node_group_configuration)} entries for {num_node_groups} node groups")
+    if node_group_configuration:
+        errors += [f"'node_group_configuration': {error}" for error in get_slot_errors(node_group_configuration)]
+    replicas = data.get('replicas_per_node_group', default['replicas_per_node_group'])
+    if not 0 <= replicas <= MAX_REPLICAS_PER_NODE_GROUP:
+        errors.append(f"'replicas_per_node_group' must be between 0 and {MAX_REPLICAS_PER_NODE_GROUP}, "
+                      f"got {replicas}")
+    if num_node_groups * (replicas + 1) > MAX_NODES:
+        errors.append(f"'num_node_groups' * ('replicas_per_node_group' + 1) must be at most {MAX_NODES} nodes, "
+                      f"got {num_node_groups * (replicas + 1)}")
+    if replicas == 0 and (data.get('multi_az', default['multi_az']) or
+                          data.get('automatic_failover', default['automatic_failover'])):
+        errors.append("'multi_az' and 'automatic_failover' need at least one replica per node group")
+    node_type = data.get('node_type', default['node_type'])
+    if not node_type.startswith("cache."):
+        errors.append(f"'node_type' must be a cache node type such as cache.r6g.large, got {node_type!r}")
+    errors += get_data_tiering_errors(data, node_type)
+    engine_version = data.get('engine_version', default['engine_version'])
+    family = (data.get('parameter_group', None) or {}).get('family', None)
+    if family is not None and family != get_parameter_group_family(engine_version):
+        errors.append(f"'parameter_group.family' {family!r} does not match the engine version {engine_version!r}, "
+                      f"expected {get_parameter_group_family(engine_version)!r}")
+    errors += get_global_datastore_errors(data, node_type)
+    errors += get_warm_up_errors(data)
+    errors += get_monitoring_errors(data)
+    errors += get_slowlog_analytics_errors(data)
+    errors += get_serverless_errors(data)
+    port = data.get('port_number', default['port_number'])
+    if not 1024 <= port <= 65535:
+        errors.append(f"'port_number' must be between 1024 and 65535, got {port}")
+
+    for dimension in ("node_groups", "replicas"):
+        capacity = (data.get('autoscaling', None) or {}).get(dimension, None) or {}
+        if capacity.get('min_capacity', 0) > capacity.get('max_capacity', float("inf")):
+            errors.append(f"'autoscaling.{dimension}.min_capacity' is above 'max_capacity'")
+
+    users_per_stack = (data.get('secrets', None) or {}).get('users_per_stack', None)
+    if users_per_stack is not None and (not isinstance(users_per_stack, int) or isinstance(users_per_stack, bool) or
+                                        users_per_stack < 1):
+        errors.append(f"'secrets.users_per_stack' must be a positive int, got {users_per_stack!r}")
+
+    users = (data.get('secrets', None) or {}).get('users', None) or []
+    user_names = [user.get('user_name', None) for user in users if isinstance(user, Mapping)]
+    for user_name in sorted({name for name in user_names if user_names.count(name) > 1}):
+        errors.append(f"duplicate user name '{user_name}' in 'secrets.users'")
+    return errors
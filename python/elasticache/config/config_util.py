@@ -1,11 +1,82 @@
-from typing import List, Dict
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator, List, Dict, Tuple
 
 from config.default import default
 from config.config import config
+from config import config_model
+from config.config_model import ElastiCacheConfig, thaw
+from config.fleet import fleet
+
+# The configuration of the stack being constructed, see use().
+_active_config = None
+
+
+def load(data: Dict = None) -> ElastiCacheConfig:
+    """
+    Parse and validate the config dict, `config` in config/config.py by default.
+    config/config.py is parsed once, the configuration is read-only.
+    """
+    if data is None:
+        return load_default()
+    return ElastiCacheConfig.from_dict(data)
+
+
+@lru_cache(maxsize=None)
+def load_default() -> ElastiCacheConfig:
+    return ElastiCacheConfig.from_dict(config)
+
+
+def load_fleet(entries: List[Dict] = None) -> List[ElastiCacheConfig]:
+    """
+    Parse and validate the clusters of the fleet, `fleet` in config/fleet.py by default.
+    Every entry overrides the keys of config/config.py for one cluster.
+    """
+    return [load(dict(config, **entry)) for entry in (fleet if entries is None else entries)]
+
+
+def load_secondaries(cache_config: ElastiCacheConfig) -> List[ElastiCacheConfig]:
+    """
+    Return the configuration of every secondary region of the Global Datastore of the cluster.
+    Every region overrides the network keys of the primary, the engine and the node type come from the Global
+    Datastore.
+    """
+    global_datastore = cache_config.global_datastore
+    if global_datastore is None:
+        return []
+
+    data = cache_config.to_dict()
+    data['global_datastore'] = None
+    # The primary is seeded and warmed up, the secondaries replicate its data
+    data['snapshot_arns'] = data['snapshot_name'] = data['warm_up'] = None
+    return [load(dict(data, **thaw(entry))) for entry in global_datastore['regions']]
+
+
+@contextmanager
+def use(cache_config: ElastiCacheConfig) -> Iterator[ElastiCacheConfig]:
+    """
+    Make the getters of this module read the configuration while the stack is being constructed.
+    """
+    global _active_config
+    previous = _active_config
+    _active_config = cache_config
+    try:
+        yield cache_config
+    finally:
+        _active_config = previous
+
+
+def get_config() -> ElastiCacheConfig:
+    """
+    Return the configuration in use, or the configuration parsed once from config/config.py.
+    """
+    if _active_config is not None:
+        return _active_config
+    return load()
 
 
 def get_secret_config() -> dict:
-    return config.get('secrets', None)
+    return get_config().secrets
 
 
 def get_user_group_id() -> str:
@@ -24,12 +95,60 @@ def get_cmk() -> bool:
         return secret.get('cmk', default['cmk'])
 
 
+def get_kms_key_scope() -> str:
+    secret = get_secret_config() or {}
+    return secret.get('kms_key_scope', default['kms_key_scope'])
+
+
+def get_rotation_config() -> dict:
+    secret = get_secret_config() or {}
+    return secret.get('rotation', None)
+
+
+def get_rotation_enabled() -> bool:
+    rotation = get_rotation_config()
+    if (rotation is None):
+        return False
+    else:
+        return rotation.get('enabled', default['rotation_enabled'])
+
+
+def get_max_users_per_group() -> int:
+    secret = get_secret_config() or {}
+    return secret.get('max_users_per_group', default['max_users_per_group'])
+
+
+def get_users_per_stack() -> int:
+    secret = get_secret_config() or {}
+    return secret.get('users_per_stack', None)
+
+
+def get_parameter_group_config() -> dict:
+    return get_config().parameter_group
+
+
+def get_parameter_group_family() -> str:
+    parameter_group = get_parameter_group_config() or {}
+    # The family of the engine version by default
+    return parameter_group.get('family', config_model.get_parameter_group_family(get_engine_version()))
+
+
+def get_parameter_group_profile() -> str:
+    parameter_group = get_parameter_group_config() or {}
+    return parameter_group.get('profile', default['parameter_group_profile'])
+
+
+def get_parameter_group_overrides() -> Dict:
+    parameter_group = get_parameter_group_config() or {}
+    return parameter_group.get('parameters', {})
+
+
 def get_transit_encryption() -> bool:
-    return config.get('transit_encryption_enabled', default['transit_encryption_enabled'])
+    return get_config().transit_encryption_enabled
 
 
 def get_at_rest_encryption() -> bool:
-    return config.get('at_rest_encryption_enabled', default['at_rest_encryption_enabled'])
+    return get_config().at_rest_encryption_enabled
 
 
 def get_auth_token_enabled() -> bool:
@@ -41,47 +160,150 @@ def get_auth_token_enabled() -> bool:
 
 
 def get_log_group_retention_limit() -> str:
-    return config.get('log_group_retention_limit', default['log_group_retention_limit'])
+    return get_config().log_group_retention_limit
 
 
 def get_snapshot_window() -> str:
-    return config.get('snapshot_window', None)
+    return get_config().snapshot_window
 
 
 def get_snapshot_retension_limit() -> int:
-    return config.get('snapshot_retention_limit', default['snapshot_retention_limit'])
+    return get_config().snapshot_retention_limit
+
+
+def get_deployment_mode() -> str:
+    return get_config().deployment_mode
+
+
+def get_serverless() -> bool:
+    return get_deployment_mode() == "serverless"
+
+
+def get_cache_usage_limits() -> dict:
+    return get_config().cache_usage_limits
+
+
+def get_snapshot_arns() -> List[str]:
+    snapshot_arns = get_config().snapshot_arns
+    return list(snapshot_arns) if snapshot_arns else None
+
+
+def get_snapshot_name() -> str:
+    return get_config().snapshot_name
+
+
+def get_warm_up_config() -> dict:
+    return get_config().warm_up
+
+
+def get_warm_up_enabled() -> bool:
+    warm_up = get_warm_up_config()
+    if (warm_up is None):
+        return False
+    else:
+        return warm_up.get('enabled', default['warm_up_enabled'])
 
 
 def get_port_number() -> str:
-    return config.get('port_number', default['port_number'])
+    return get_config().port_number
 
 
 def get_node_type() -> str:
-    return config.get('node_type', default['node_type'])
+    return get_config().node_type
+
+
+def get_data_tiering_enabled() -> bool:
+    return get_config().data_tiering_enabled
 
 
 def get_engine_version() -> str:
-    return config.get('engine_version', default['engine_version'])
+    return get_config().engine_version
 
 
 def get_cluster_name() -> str:
-    return f"{config['environment']}-{config['cluster_name']}".lower()
+    return get_config().replication_group_id
 
 
 def get_multi_az() -> bool:
-    return config.get('multi_az', default['multi_az'])
+    return get_config().multi_az
 
 
 def get_num_node_groups() -> int:
-    return config.get('num_node_groups', default['num_node_groups'])
+    return get_config().num_node_groups
+
+
+def get_node_group_configuration() -> List[Dict]:
+    node_group_configuration = get_config().node_group_configuration
+    return thaw(node_group_configuration) if node_group_configuration else None
 
 
 def get_replicas_per_node_group() -> int:
-    return config.get('replicas_per_node_group', default['replicas_per_node_group'])
+    return get_config().replicas_per_node_group
+
+
+def get_global_datastore_config() -> dict:
+    return get_config().global_datastore
+
+
+def get_workload_config() -> dict:
+    return get_config().workload
+
+
+def get_autoscaling_config() -> dict:
+    return get_config().autoscaling
+
+
+def get_autoscaling_enabled() -> bool:
+    autoscaling = get_autoscaling_config()
+    if (autoscaling is None):
+        return False
+    else:
+        return autoscaling.get('enabled', default['autoscaling_enabled'])
+
+
+def get_autoscaling_capacity(dimension: str) -> Tuple[int, int]:
+    autoscaling = get_autoscaling_config() or {}
+    scaling = autoscaling.get(dimension, None)
+    if (scaling is None):
+        return None
+    else:
+        return scaling['min_capacity'], scaling['max_capacity']
+
+
+def get_monitoring_config() -> dict:
+    return get_config().monitoring
+
+
+def get_monitoring_enabled() -> bool:
+    monitoring = get_monitoring_config()
+    if (monitoring is None):
+        return False
+    else:
+        return monitoring.get('enabled', default['monitoring_enabled'])
+
+
+def get_slowlog_analytics_config() -> dict:
+    return get_config().slowlog_analytics
+
+
+def get_slowlog_analytics_enabled() -> bool:
+    analytics = get_slowlog_analytics_config()
+    if (analytics is None):
+        return False
+    else:
+        return analytics.get('enabled', default['slowlog_analytics_enabled'])
+
+
+def get_log_delivery() -> Dict:
+    return get_config().log_delivery
+
+
+def get_log_bucket_retention_days() -> int:
+    return get_config().log_bucket_retention_days
 
 
 def get_automatic_failover() -> bool:
-    return config.get('automatic_failover', default['automatic_failover'])
+    return get_config().automatic_failover
 
 
 def get_user_id(user: Dict) -> str:
@@ -97,12 +319,12 @@ def get_user_acl(user: Dict) -> str:
 
 
 def get_vpc_id() -> str:
-    return config['vpc_id']
+    return get_config().vpc_id
 
 
 def get_allowed_cidrs() -> List:
-    return config['allowed_cidrs']
+    return list(get_config().allowed_cidrs)
 
 
 def get_subnet_ids() -> List:
-    return config['subnet_ids']
+    return list(get_config().subnet_ids)
@@ -1,19 +1,51 @@
 default = {
+    "acl_templates": {
+        "tenant-read-write": "on ~tenant:{id}:* -@all +@read +@write -@dangerous",
+        "tenant-read-only": "on ~tenant:{id}:* -@all +@read -@dangerous"
+    },
     "at_rest_encryption_enabled": True,
     "auth_token_enabled": False,
     "automatic_failover": True,
+    "autoscaling_enabled": False,
+    "autoscaling_scale_in_cooldown": 600,
+    "autoscaling_scale_out_cooldown": 300,
+    "autoscaling_target_engine_cpu": 60,
+    "autoscaling_target_memory_usage": 70,
+    "data_tiering_enabled": False,
+    "deployment_mode": "provisioned",
     "engine_version": "5.0.6",
-    "family": "redis5.0",
+    "kms_key_scope": "cluster",
+    "log_bucket_retention_days": 30,
+    "log_delivery": {
+        "slow-log": {"destination": "cloudwatch-logs"}
+    },
+    "log_delivery_buffer_interval": 300,
+    "log_delivery_buffer_size_mb": 5,
+    "log_delivery_format": "gzip-json",
     "log_group_retention_limit": "ONE_MONTH",
+    "max_users_per_group": 100,
+    "monitoring_enabled": False,
     "multi_az": True,
     "node_type": "cache.t3.small",
     "num_cache_nodes": 1,
     "num_node_groups": 1,
+    "parameter_group_profile": "low-latency",
     "port_number": 6379,
     "replicas_per_node_group": 1,
+    "rotation_enabled": False,
+    "rotation_grace_minutes": 60,
+    "rotation_prune_interval_minutes": 15,
+    "rotation_schedule_days": 30,
     "cmk": False,
+    "slowlog_analytics_enabled": False,
     "snapshot_retention_limit": 0,
+    "stack_name": "ElastiCache-Stack",
+    "tenant_acl_template": "tenant-read-write",
     "transit_encryption_enabled": True,
     "user_group_id": "elasticache-user-group",
-    "user_acl": "on ~* +@all"
+    "user_acl": "on ~* +@all",
+    "warm_up_enabled": False,
+    "warm_up_parallelism_per_shard": 4,
+    "warm_up_pipeline": 100,
+    "warm_up_timeout_minutes": 10
 }
@@ -0,0 +1 @@
+fleet = []
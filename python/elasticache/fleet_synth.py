@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Synthesize, and optionally diff, the clusters of config/fleet.py in parallel worker processes.
+
+Every worker synthesizes a partition of the fleet into its own cloud assembly, `<outdir>/partition-<n>`, and
+runs `cdk diff --app <assembly>` on it, so the whole fleet takes about as long as its slowest partition:
+
+    python fleet_synth.py synth --workers 8
+    python fleet_synth.py diff --workers 8
+
+The workers run without the cdk CLI, the VPC lookups must be in cdk.context.json, `cdk synth` resolves them.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def synth_partition(index: int, entries: List[Dict], outdir: str, context: Dict, diff: bool = False) -> Dict:
+    """
+    Synthesize a partition of the fleet into its own cloud assembly and optionally diff it.
+
+    Args:
+        index: the partition index.
+        entries: the cluster configurations of the partition, as config dicts.
+        outdir: the cloud assembly directory of the partition.
+        context: the cdk app context.
+        diff: run `cdk diff` on the cloud assembly.
+
+    Returns:
+        Dict: the partition result.
+    """
+    # Imported in the worker, every worker process runs its own jsii runtime
+    from aws_cdk import core
+    from cache.helper import fleet
+    from config import config_util
+
+    started = time.perf_counter()
+    app = core.App(outdir=outdir, context=context)
+    stacks = fleet.create_fleet(app, [config_util.load(entry) for entry in entries])
+    assembly = app.synth()
+    with open(os.path.join(assembly.directory, "manifest.json")) as fp:
+        missing = [item["key"] for item in json.load(fp).get("missing", [])]
+
+    result = {
+        "partition": index,
+        "outdir": outdir,
+        "stacks": [stack.stack_name for stack in stacks],
+        "missing_context": missing,
+        "synth_seconds": round(time.perf_counter() - started, 3)
+    }
+    if diff:
+        process = subprocess.run(["cdk", "diff", "--app", outdir], capture_output=True, text=True)
+        result["diff"] = process.stdout + process.stderr
+        result["diff_exit_code"] = process.returncode
+    return result
+
+
+def synth_fleet(entries: List[Dict] = None, workers: int = 1, outdir: str = "cdk.out.fleet", diff: bool = False,
+                context: Dict = None) -> List[Dict]:
+    """
+    Validate the fleet, split it into partitions of similar synth cost and synthesize them in parallel.
+
+    Args:
+        entries: the clusters, overrides of config/config.py, `fleet` in config/fleet.py by default.
+        workers: the number of worker processes.
+        outdir: the directory of the partition cloud assemblies.
+        diff: run `cdk diff` on every partition.
+        context: the cdk app context, cdk.json and cdk.context.json by default.
+
+    Returns:
+        List[Dict]: the partition results.
+    """
+    from cache.helper import fleet
+    from config import config_util
+
+    cache_configs = config_util.load_fleet(entries)
+    if not cache_configs:
+        raise ValueError("The fleet declares no clusters, add them to config/fleet.py")
+    fleet.validate_fleet(cache_configs)
+    partitions = fleet.partition(cache_configs, workers)
+    if context is None:
+        context = fleet.get_context(APP_DIR)
+
+    # Spawned workers do not inherit the jsii runtime of this process
+    with ProcessPoolExecutor(max_workers=len(partitions),
+                             mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [
+            executor.submit(synth_partition, index, [cache_config.to_dict() for cache_config in items],
+                            os.path.join(outdir, f"partition-{index}"), context, diff)
+            for index, items in enumerate(partitions)
+        ]
+        return [future.result() for future in futures]
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Synthesize or diff the ElastiCache fleet in parallel.")
+    parser.add_argument("command", choices=("synth", "diff"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--outdir", default=os.path.join(APP_DIR, "cdk.out.fleet"),
+                        help="directory of the partition cloud assemblies")
+    args = parser.parse_args(argv)
+
+    results = synth_fleet(None, args.workers, args.outdir, diff=args.command == "diff")
+    exit_code = 0
+    for result in results:
+        print(f"partition {result['partition']}: {len(result['stacks'])} stacks in {result['synth_seconds']}s "
+              f"-> {result['outdir']}")
+        if result["missing_context"]:
+            print(f"  missing context, run `cdk synth` to resolve: {', '.join(result['missing_context'])}")
+            exit_code = 1
+        if "diff" in result:
+            print(result["diff"])
+            exit_code = max(exit_code, result["diff_exit_code"])
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Minimal asyncio client of the Redis protocol (RESP2), standard library only so that it runs in the Lambda
+functions without a Redis client dependency. Commands are pipelined: a batch of commands is written at once
+and the replies are read in order.
+"""
+import asyncio
+import ssl as ssl_
+from typing import Any, List, Sequence, Union
+
+DEFAULT_TIMEOUT = 5.0
+
+
+class RespError(Exception):
+    """
+    An error reply, e.g. `WRONGPASS invalid username-password pair`, the first word is the error code.
+    """
+    @property
+    def code(self) -> str:
+        return str(self).split(" ", 1)[0]
+
+
+def encode(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode("utf-8")
+
+
+def encode_command(args: Sequence[Any]) -> bytes:
+    """
+    Encode a command as a RESP array of bulk strings, e.g. `("SET", "key", 1)`.
+    """
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        arg = encode(arg)
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    """
+    Read a reply: a str for a status, an int, bytes or None for a bulk string, a list for an array and
+    a RespError for an error, errors are returned and not raised so a pipeline reads all of its replies.
+    """
+    line = await reader.readuntil(b"\r\n")
+    prefix, payload = line[:1], line[1:-2]
+    if prefix == b"+":
+        return payload.decode("utf-8")
+    if prefix == b"-":
+        return RespError(payload.decode("utf-8"))
+    if prefix == b":":
+        return int(payload)
+    if prefix == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if prefix == b"*":
+        length = int(payload)
+        if length < 0:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f"Invalid RESP reply {line!r}")
+
+
+class RespClient:
+    """
+    Connection to a Redis compatible server, e.g.
+
+        client = await RespClient.connect("localhost", 6379, user="user-name-1", password="...")
+        await client.execute("SET", "key", "value")
+        replies = await client.pipeline([("GET", "key"), ("INCR", "counter")])
+    """
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 timeout: float = DEFAULT_TIMEOUT) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.timeout = timeout
+
+    @classmethod
+    async def connect(cls, host: str, port: int, ssl: Union[bool, ssl_.SSLContext] = False, user: str = None,
+                      password: str = None, timeout: float = DEFAULT_TIMEOUT,
+                      server_hostname: str = None) -> "RespClient":
+        """
+        Open a connection and authenticate.
+
+        Args:
+            host: the host name, e.g. the primary endpoint of the replication group.
+            port: the port.
+            ssl: True or an SSL context for in-transit encryption.
+            user: the user name, the default user authenticated with the password if None.
+            password: the password or the AUTH token, no authentication if None.
+            timeout: the seconds to wait for the connection and for every reply.
+            server_hostname: the host name the certificate is verified against, the host if None, e.g. the
+                configuration endpoint when the host is a node address of CLUSTER SLOTS.
+
+        Returns: RespClient
+
+        Raises:
+            RespError: if the authentication fails.
+        """
+        if ssl is True:
+            ssl = ssl_.create_default_context()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=ssl or None, server_hostname=server_hostname if ssl else None),
+            timeout
+        )
+        client = cls(reader, writer, timeout)
+        if password is not None:
+            try:
+                await client.execute(*(("AUTH", user, password) if user else ("AUTH", password)))
+            except Exception:
+                await client.close()
+                raise
+        return client
+
+    async def execute(self, *args: Any) -> Any:
+        """
+        Run a command and return its reply.
+
+        Raises:
+            RespError: if the reply is an error.
+        """
+        reply = (await self.pipeline([args]))[0]
+        if isinstance(reply, RespError):
+            raise reply
+        return reply
+
+    async def pipeline(self, commands: Sequence[Sequence[Any]]) -> List[Any]:
+        """
+        Write the commands at once and return their replies in order, error replies as RespError.
+        """
+        self.writer.write(b"".join(encode_command(args) for args in commands))
+        await self.writer.drain()
+        return await asyncio.wait_for(self.read_replies(len(commands)), self.timeout)
+
+    async def read_replies(self, count: int) -> List[Any]:
+        return [await read_reply(self.reader) for _ in range(count)]
+
+    async def close(self) -> None:
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except (ConnectionError, ssl_.SSLError):
+            pass
@@ -0,0 +1,420 @@
+"""
+Pure-Python asyncio stand-in of a Redis server for offline tests and local load tests.
+
+It speaks RESP2 with pipelining and implements the commands the functions and tools of this repository use:
+AUTH with the default user and with ACL users, ACL SETUSER/DELUSER/WHOAMI/USERS, PING, ECHO, GET, SET, MGET,
+MSET, DEL, EXISTS, DBSIZE, FLUSHALL, SELECT, CLIENT, INFO and CLUSTER SLOTS. ACL users get their passwords, key
+patterns and command categories checked like ElastiCache RBAC does, the auth tokens of the default user follow the
+ROTATE and SET strategies of ElastiCache.
+
+    python -m functions.resp.server --port 6379 --auth-token my-token
+"""
+import argparse
+import asyncio
+import fnmatch
+import ssl as ssl_
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .client import encode
+
+# Categories of the implemented commands as in Redis, e.g. a tenant user `-@all +@read` may not PING
+COMMAND_CATEGORIES = {
+    "GET": ("read",), "MGET": ("read",), "EXISTS": ("read",), "DBSIZE": ("read",),
+    "SET": ("write",), "MSET": ("write",), "DEL": ("write",),
+    "FLUSHALL": ("write", "dangerous"), "INFO": ("dangerous",), "ACL": ("admin", "dangerous"),
+    "CLUSTER": ("slow",), "PING": ("fast", "connection"), "ECHO": ("fast", "connection"),
+    "SELECT": ("keyspace", "fast"), "CLIENT": ("slow", "connection"),
+}
+# Commands every client runs whatever its ACL
+UNRESTRICTED_COMMANDS = ("AUTH", "QUIT", "HELLO")
+# Argument positions of the keys of the key commands, None for all the arguments after the command
+KEY_ARGUMENTS = {"GET": (1,), "SET": (1,), "EXISTS": None, "DEL": None, "MGET": None, "MSET": "pairs"}
+WRONGPASS = "WRONGPASS invalid username-password pair or user is disabled."
+
+
+class Error(Exception):
+    pass
+
+
+class StandInUser:
+    """
+    An ACL user, the rules of `ACL SETUSER` are applied in order.
+    """
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.enabled = False
+        self.nopass = False
+        self.passwords: Set[str] = set()
+        self.key_patterns: List[str] = []
+        self.allowed: Set[str] = set()
+        self.denied: Set[str] = set()
+        self.all_commands = False
+
+    def apply(self, rules: Iterable[str]) -> None:
+        for rule in rules:
+            lower = rule.lower()
+            if lower == "on":
+                self.enabled = True
+            elif lower == "off":
+                self.enabled = False
+            elif lower == "nopass":
+                self.nopass = True
+                self.passwords.clear()
+            elif lower == "resetpass":
+                self.nopass = False
+                self.passwords.clear()
+            elif rule.startswith(">"):
+                self.nopass = False
+                self.passwords.add(rule[1:])
+            elif rule.startswith("<"):
+                self.passwords.discard(rule[1:])
+            elif lower == "allkeys":
+                self.key_patterns = ["*"]
+            elif lower == "resetkeys":
+                self.key_patterns = []
+            elif rule.startswith("~"):
+                self.key_patterns.append(rule[1:])
+            elif lower in ("allcommands", "+@all"):
+                self.all_commands = True
+                self.allowed.clear()
+                self.denied.clear()
+            elif lower in ("nocommands", "-@all"):
+                self.all_commands = False
+                self.allowed.clear()
+                self.denied.clear()
+            elif rule.startswith("+"):
+                self.allowed.add(lower[1:])
+                self.denied.discard(lower[1:])
+            elif rule.startswith("-"):
+                self.denied.add(lower[1:])
+                self.allowed.discard(lower[1:])
+            elif lower == "reset":
+                self.__init__(self.name)
+            elif rule.startswith(("&", "%")) or lower in ("allchannels", "resetchannels"):
+                continue
+            else:
+                raise Error(f"ERR Error in ACL SETUSER modifier '{rule}': Syntax error")
+
+    def authenticate(self, password: str) -> bool:
+        return self.enabled and (self.nopass or password in self.passwords)
+
+    def can_run(self, command: str) -> bool:
+        names = {command.lower()} | {f"@{category}" for category in COMMAND_CATEGORIES.get(command, ())}
+        if names & self.denied:
+            return False
+        return self.all_commands or bool(names & self.allowed)
+
+    def can_access(self, key: str) -> bool:
+        return any(fnmatch.fnmatchcase(key, pattern) for pattern in self.key_patterns)
+
+
+class StandInServer:
+    """
+    The server, e.g. in a test:
+
+        async with StandInServer(auth_tokens=["token-1"]) as server:
+            client = await RespClient.connect(server.host, server.port, password="token-1")
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, ssl_context: ssl_.SSLContext = None,
+                 auth_tokens: Iterable[str] = None, cluster_slots: List[Tuple[int, int, str, int]] = None) -> None:
+        """
+        Constructor for StandInServer class
+
+        Args:
+            host: the address to listen on.
+            port: the port to listen on, a free port if 0.
+            ssl_context: the server SSL context for in-transit encryption.
+            auth_tokens: the passwords of the default user, the default user needs no password if None.
+            cluster_slots: the slot map of CLUSTER SLOTS, the first slot, the last slot, the host and the port
+            of the primary of every slot range, cluster mode is disabled if None. The keys are not redirected.
+        """
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self.cluster_slots = cluster_slots
+        self.data: Dict[bytes, bytes] = {}
+        self.users: Dict[str, StandInUser] = {}
+        self.commands_processed = 0
+        self.connections = 0
+        self._server = None
+        default = self.users["default"] = StandInUser("default")
+        default.apply(["on", "allkeys", "allcommands", "nopass"])
+        if auth_tokens:
+            self.set_auth_tokens(auth_tokens)
+
+    def set_auth_tokens(self, tokens: Iterable[str]) -> None:
+        """
+        Set the passwords of the default user, like ModifyReplicationGroup with the SET strategy.
+        """
+        self.users["default"].apply(["resetpass"] + [f">{token}" for token in tokens])
+
+    def rotate_auth_token(self, token: str) -> None:
+        """
+        Add a password to the default user, like ModifyReplicationGroup with the ROTATE strategy.
+        """
+        self.users["default"].apply([f">{token}"])
+
+    def set_user(self, name: str, passwords: Iterable[str], access_string: str) -> None:
+        """
+        Create or replace a user, like CreateUser and ModifyUser of ElastiCache.
+        """
+        user = self.users[name] = StandInUser(name)
+        user.apply(access_string.split() + [f">{password}" for password in passwords])
+
+    async def start(self) -> "StandInServer":
+        self._server = await asyncio.start_server(self.handle, self.host, self.port, ssl=self.ssl_context)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def __aenter__(self) -> "StandInServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        default = self.users["default"]
+        session = {"user": "default" if default.enabled and default.nopass else None}
+        buffer = bytearray()
+        try:
+            while True:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    break
+                buffer += chunk
+                # Every complete command of the chunk is answered with a single write
+                commands, consumed = parse_commands(buffer)
+                del buffer[:consumed]
+                replies = [encode_reply(self.execute(session, args)) for args in commands]
+                if replies:
+                    writer.write(b"".join(replies))
+                    await writer.drain()
+                if session.get("quit"):
+                    break
+        except (ConnectionError, Error):
+            pass
+        finally:
+            writer.close()
+
+    def execute(self, session: Dict, args: List[bytes]) -> Any:
+        self.commands_processed += 1
+        command = args[0].decode("utf-8").upper()
+        params = args[1:]
+        try:
+            if command == "AUTH":
+                return self.auth(session, params)
+            if command == "QUIT":
+                session["quit"] = True
+                return "OK"
+            if session["user"] is None:
+                return Error("NOAUTH Authentication required.")
+            user = self.users.get(session["user"])
+            if user is None or not user.enabled:
+                return Error(WRONGPASS)
+            if command not in UNRESTRICTED_COMMANDS:
+                if command not in COMMAND_CATEGORIES:
+                    return Error(f"ERR unknown command '{command}'")
+                if not user.can_run(command):
+                    return Error(f"NOPERM this user has no permissions to run the '{command.lower()}' command")
+                for key in get_keys(command, params):
+                    if not user.can_access(key.decode("utf-8", "replace")):
+                        return Error("NOPERM this user has no permissions to access one of the keys used as "
+                                     "arguments")
+            return getattr(self, f"command_{command.lower()}")(session, params)
+        except Error as error:
+            return error
+        except (IndexError, ValueError):
+            return Error(f"ERR wrong number of arguments for '{command.lower()}' command")
+
+    def auth(self, session: Dict, params: List[bytes]) -> Any:
+        if len(params) == 1:
+            name, password = "default", params[0]
+        elif len(params) == 2:
+            name, password = params[0].decode("utf-8"), params[1]
+        else:
+            raise ValueError()
+        user = self.users.get(name)
+        if user is None or not user.authenticate(password.decode("utf-8")):
+            return Error(WRONGPASS)
+        session["user"] = name
+        return "OK"
+
+    def command_ping(self, session: Dict, params: List[bytes]) -> Any:
+        return params[0] if params else "PONG"
+
+    def command_echo(self, session: Dict, params: List[bytes]) -> Any:
+        return params[0]
+
+    def command_select(self, session: Dict, params: List[bytes]) -> Any:
+        return "OK"
+
+    def command_client(self, session: Dict, params: List[bytes]) -> Any:
+        return "OK"
+
+    def command_cluster(self, session: Dict, params: List[bytes]) -> Any:
+        if params[0].upper() != b"SLOTS":
+            raise Error(f"ERR Unknown subcommand '{params[0].decode('utf-8')}'")
+        if self.cluster_slots is None:
+            raise Error("ERR This instance has cluster support disabled")
+        return [[first, last, [host.encode("utf-8"), port, f"{host}:{port}".encode("utf-8")]]
+                for first, last, host, port in self.cluster_slots]
+
+    def command_hello(self, session: Dict, params: List[bytes]) -> Any:
+        raise Error("ERR unknown command 'HELLO'")
+
+    def command_info(self, session: Dict, params: List[bytes]) -> Any:
+        return (f"# Server\r\nredis_version:6.2.0\r\n# Stats\r\n"
+                f"total_commands_processed:{self.commands_processed}\r\n"
+                f"# Keyspace\r\ndb0:keys={len(self.data)}\r\n").encode("utf-8")
+
+    def command_acl(self, session: Dict, params: List[bytes]) -> Any:
+        subcommand = params[0].decode("utf-8").upper()
+        if subcommand == "SETUSER":
+            name = params[1].decode("utf-8")
+            user = self.users.setdefault(name, StandInUser(name))
+            user.apply(param.decode("utf-8") for param in params[2:])
+            return "OK"
+        if subcommand == "DELUSER":
+            names = [param.decode("utf-8") for param in params[1:]]
+            if "default" in names:
+                raise Error("ERR The 'default' user cannot be removed")
+            return sum(self.users.pop(name, None) is not None for name in names)
+        if subcommand == "WHOAMI":
+            return session["user"].encode("utf-8")
+        if subcommand == "USERS":
+            return [name.encode("utf-8") for name in sorted(self.users)]
+        raise Error(f"ERR Unknown subcommand or wrong number of arguments for '{subcommand}'")
+
+    def command_get(self, session: Dict, params: List[bytes]) -> Any:
+        return self.data.get(params[0])
+
+    def command_set(self, session: Dict, params: List[bytes]) -> Any:
+        options = {param.upper() for param in params[2:]}
+        if (b"NX" in options and params[0] in self.data) or (b"XX" in options and params[0] not in self.data):
+            return None
+        self.data[params[0]] = params[1]
+        return "OK"
+
+    def command_mget(self, session: Dict, params: List[bytes]) -> Any:
+        return [self.data.get(key) for key in params]
+
+    def command_mset(self, session: Dict, params: List[bytes]) -> Any:
+        if not params or len(params) % 2:
+            raise ValueError()
+        for idx in range(0, len(params), 2):
+            self.data[params[idx]] = params[idx + 1]
+        return "OK"
+
+    def command_del(self, session: Dict, params: List[bytes]) -> Any:
+        return sum(self.data.pop(key, None) is not None for key in params)
+
+    def command_exists(self, session: Dict, params: List[bytes]) -> Any:
+        return sum(key in self.data for key in params)
+
+    def command_dbsize(self, session: Dict, params: List[bytes]) -> Any:
+        return len(self.data)
+
+    def command_flushall(self, session: Dict, params: List[bytes]) -> Any:
+        self.data.clear()
+        return "OK"
+
+
+def get_keys(command: str, params: List[bytes]) -> List[bytes]:
+    positions = KEY_ARGUMENTS.get(command, ())
+    if positions is None:
+        return list(params)
+    if positions == "pairs":
+        return list(params[::2])
+    return [params[position - 1] for position in positions if position <= len(params)]
+
+
+def parse_commands(buffer: bytearray) -> Tuple[List[List[bytes]], int]:
+    """
+    Parse the complete commands at the start of the buffer, RESP arrays of bulk strings or inline commands.
+
+    Args:
+        buffer: the bytes read from the connection.
+
+    Returns:
+        Tuple[List[List[bytes]], int]: the commands and the number of bytes they take.
+    """
+    commands = []
+    position = 0
+    while position < len(buffer):
+        command, end = parse_command(buffer, position)
+        if command is None:
+            break
+        if command:
+            commands.append(command)
+        position = end
+    return commands, position
+
+
+def parse_command(buffer: bytearray, position: int) -> Tuple[Optional[List[bytes]], int]:
+    line_end = buffer.find(b"\r\n", position)
+    if line_end < 0:
+        return None, position
+    if buffer[position:position + 1] != b"*":
+        return bytes(buffer[position:line_end]).split(), line_end + 2
+
+    count = int(buffer[position + 1:line_end])
+    args = []
+    position = line_end + 2
+    for _ in range(count):
+        line_end = buffer.find(b"\r\n", position)
+        if line_end < 0:
+            return None, position
+        if buffer[position:position + 1] != b"$":
+            raise Error("Protocol error: expected '$'")
+        length = int(buffer[position + 1:line_end])
+        start = line_end + 2
+        if len(buffer) < start + length + 2:
+            return None, position
+        args.append(bytes(buffer[start:start + length]))
+        position = start + length + 2
+    return args, position
+
+
+def encode_reply(reply: Any) -> bytes:
+    if isinstance(reply, Error):
+        return b"-%s\r\n" % encode(reply)
+    if isinstance(reply, str):
+        return b"+%s\r\n" % encode(reply)
+    if isinstance(reply, bool) or isinstance(reply, int):
+        return b":%d\r\n" % int(reply)
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, list):
+        return b"*%d\r\n" % len(reply) + b"".join(encode_reply(item) for item in reply)
+    return b"$%d\r\n%s\r\n" % (len(reply), reply)
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Pure-Python stand-in of a Redis server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--auth-token", action="append", help="password of the default user, repeatable")
+    parser.add_argument("--tls-cert", help="certificate file, enables TLS with --tls-key")
+    parser.add_argument("--tls-key", help="private key file")
+    args = parser.parse_args(argv)
+
+    ssl_context = None
+    if args.tls_cert:
+        ssl_context = ssl_.create_default_context(ssl_.Purpose.CLIENT_AUTH)
+        ssl_context.load_cert_chain(args.tls_cert, args.tls_key)
+    server = StandInServer(args.host, args.port, ssl_context, args.auth_token)
+    asyncio.run(server.serve_forever())
+
+
+if __name__ == "__main__":
+    main()
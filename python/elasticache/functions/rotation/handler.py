@@ -0,0 +1,295 @@
+"""
+Rotation Lambda of the ElastiCache user secrets and auth token secret, with a dual credential window.
+
+handler  invoked by Secrets Manager with the createSecret, setSecret, testSecret and finishSecret steps.
+         setSecret adds the new password next to the current one, ModifyUser with both passwords for a user and
+         ModifyReplicationGroup with the ROTATE strategy for the auth token, so both are accepted while the
+         clients pick up the new one. Invoked by the schedule without a step, it prunes the secrets rotated
+         more than GRACE_MINUTES ago: ModifyUser with the current password only, ModifyReplicationGroup with the
+         SET strategy, and the current version gets the ELASTICACHE_PRUNED stage.
+
+The secrets are identified by their tags, written by cache/elasticache_secret.py:
+elasticache:replication-group-id, elasticache:secret-type (user or auth-token) and elasticache:user-id, see tags.py.
+
+ModifyUser and ModifyReplicationGroup are asynchronous, every change waits until the user is active and the
+replication group, or the serverless cache when SERVERLESS is true, available again, so testSecret checks the applied
+passwords and the next change is accepted.
+"""
+import asyncio
+import datetime
+import json
+import os
+import time
+from typing import Dict, List, NamedTuple
+
+try:
+    from functions.resp.client import RespClient
+except ImportError:
+    # The Lambda asset is the functions directory
+    from resp.client import RespClient
+
+from .tags import TAG_REPLICATION_GROUP, TAG_SECRET_TYPE, TAG_USER_ID
+
+PRUNED_STAGE = "ELASTICACHE_PRUNED"
+# Same characters as the secrets generated by cache/elasticache_secret.py
+EXCLUDE_CHARACTERS = '$@%*()_+=`~{}|[]\\:";\'?,./'
+PASSWORD_LENGTH = 32
+
+_clients = {}
+
+
+def client(service: str):
+    if service not in _clients:
+        import boto3
+        _clients[service] = boto3.client(service)
+    return _clients[service]
+
+
+class RotationTarget(NamedTuple):
+    secret_type: str
+    replication_group_id: str
+    user_id: str
+    # The key of the credential in the secret JSON
+    key: str
+
+
+def get_target(metadata: Dict) -> RotationTarget:
+    tags = {tag["Key"]: tag["Value"] for tag in metadata.get("Tags", [])}
+    secret_type = tags.get(TAG_SECRET_TYPE)
+    if secret_type not in ("user", "auth-token") or TAG_REPLICATION_GROUP not in tags:
+        raise ValueError(f"Secret {metadata['ARN']} is not an ElastiCache secret")
+    if secret_type == "user" and TAG_USER_ID not in tags:
+        raise ValueError(f"Secret {metadata['ARN']} has no {TAG_USER_ID} tag")
+    return RotationTarget(
+        secret_type, tags[TAG_REPLICATION_GROUP], tags.get(TAG_USER_ID),
+        "password" if secret_type == "user" else "token"
+    )
+
+
+def get_version_id(metadata: Dict, stage: str) -> str:
+    for version_id, stages in metadata.get("VersionIdsToStages", {}).items():
+        if stage in stages:
+            return version_id
+    return None
+
+
+def get_secret(secret_id: str, stage: str, version_id: str = None) -> Dict:
+    kwargs = {"SecretId": secret_id, "VersionStage": stage}
+    if version_id is not None:
+        kwargs["VersionId"] = version_id
+    return json.loads(client("secretsmanager").get_secret_value(**kwargs)["SecretString"])
+
+
+def set_passwords(target: RotationTarget, passwords: List[str], strategy: str) -> None:
+    """
+    Set the passwords of a user, or set or rotate the auth token of the replication group.
+
+    Args:
+        target: the user or the replication group.
+        passwords: the passwords, the last one is the auth token.
+        strategy: ROTATE adds the auth token, SET replaces the auth tokens, ignored for a user.
+
+    Returns: None
+    """
+    if target.secret_type == "user":
+        client("elasticache").modify_user(UserId=target.user_id, Passwords=passwords)
+    else:
+        client("elasticache").modify_replication_group(
+            ReplicationGroupId=target.replication_group_id,
+            AuthToken=passwords[-1],
+            AuthTokenUpdateStrategy=strategy,
+            ApplyImmediately=True
+        )
+    wait_until_applied(target)
+
+
+def get_status(target: RotationTarget) -> str:
+    """
+    Return the status of the user, or of the replication group or the serverless cache, None once both are applied.
+    """
+    if target.secret_type == "user":
+        [user] = client("elasticache").describe_users(UserId=target.user_id)["Users"]
+        if user["Status"] != "active":
+            return f"user {target.user_id} is {user['Status']}"
+    if os.environ.get("SERVERLESS", "false") == "true":
+        # A serverless cache is named after the replication group id of the config
+        [cache] = client("elasticache").describe_serverless_caches(
+            ServerlessCacheName=target.replication_group_id
+        )["ServerlessCaches"]
+        if cache["Status"] != "available":
+            return f"serverless cache {target.replication_group_id} is {cache['Status']}"
+        return None
+    [group] = client("elasticache").describe_replication_groups(
+        ReplicationGroupId=target.replication_group_id
+    )["ReplicationGroups"]
+    if group["Status"] != "available":
+        return f"replication group {target.replication_group_id} is {group['Status']}"
+    return None
+
+
+def wait_until_applied(target: RotationTarget) -> None:
+    """
+    Wait until the user is active and the replication group available, for at most MAX_WAIT_SECONDS.
+
+    Raises:
+        TimeoutError: if the change is still being applied, the step is retried by Secrets Manager.
+    """
+    poll_seconds = float(os.environ.get("POLL_SECONDS", "5"))
+    deadline = time.monotonic() + float(os.environ.get("MAX_WAIT_SECONDS", "780"))
+    while True:
+        status = get_status(target)
+        if status is None:
+            return
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Timed out waiting for ElastiCache, the {status}")
+        time.sleep(poll_seconds)
+
+
+def create_secret(secret_id: str, token: str, metadata: Dict, target: RotationTarget) -> None:
+    current = get_secret(secret_id, "AWSCURRENT")
+    try:
+        get_secret(secret_id, "AWSPENDING", token)
+        return
+    except client("secretsmanager").exceptions.ResourceNotFoundException:
+        pass
+
+    password = client("secretsmanager").get_random_password(
+        PasswordLength=PASSWORD_LENGTH, ExcludeCharacters=EXCLUDE_CHARACTERS
+    )["RandomPassword"]
+    client("secretsmanager").put_secret_value(
+        SecretId=secret_id,
+        ClientRequestToken=token,
+        SecretString=json.dumps(dict(current, **{target.key: password})),
+        VersionStages=["AWSPENDING"]
+    )
+
+
+def set_secret(secret_id: str, token: str, metadata: Dict, target: RotationTarget) -> None:
+    current = get_secret(secret_id, "AWSCURRENT")[target.key]
+    pending = get_secret(secret_id, "AWSPENDING", token)[target.key]
+    if target.secret_type == "auth-token":
+        # ROTATE keeps two tokens at most, drop the token the previous rotation replaced first
+        prune_secret(secret_id, metadata, target, grace=datetime.timedelta(0))
+    set_passwords(target, [current, pending], "ROTATE")
+
+
+def test_secret(secret_id: str, token: str, metadata: Dict, target: RotationTarget) -> None:
+    # A retried step may follow a setSecret that timed out waiting
+    wait_until_applied(target)
+    current = get_secret(secret_id, "AWSCURRENT")
+    pending = get_secret(secret_id, "AWSPENDING", token)
+    user = current.get("user-name") if target.secret_type == "user" else None
+    # Both credentials must be accepted during the window, the clients still use the current one
+    asyncio.run(check_credentials(user, [current[target.key], pending[target.key]]))
+
+
+def finish_secret(secret_id: str, token: str, metadata: Dict, target: RotationTarget) -> None:
+    current_version = get_version_id(metadata, "AWSCURRENT")
+    if current_version == token:
+        return
+    client("secretsmanager").update_secret_version_stage(
+        SecretId=secret_id,
+        VersionStage="AWSCURRENT",
+        MoveToVersionId=token,
+        RemoveFromVersionId=current_version
+    )
+
+
+STEPS = {
+    "createSecret": create_secret,
+    "setSecret": set_secret,
+    "testSecret": test_secret,
+    "finishSecret": finish_secret
+}
+
+
+async def check_credentials(user: str, passwords: List[str]) -> None:
+    """
+    Authenticate with every password, the first failure is raised. No command is run after AUTH, the ACL of a
+    tenant user such as `-@all +@read` denies PING and every other @connection command.
+    """
+    for password in passwords:
+        redis = await RespClient.connect(
+            os.environ["REDIS_HOST"], int(os.environ["REDIS_PORT"]),
+            ssl=os.environ.get("REDIS_TLS", "true") == "true",
+            user=user, password=password
+        )
+        await redis.close()
+
+
+def prune_secret(secret_id: str, metadata: Dict, target: RotationTarget, grace: datetime.timedelta) -> bool:
+    """
+    Remove the previous password of a secret rotated more than `grace` ago.
+
+    Args:
+        secret_id: the secret ARN.
+        metadata: the DescribeSecret response.
+        target: the user or the replication group.
+        grace: the time the clients have to pick up the new password.
+
+    Returns:
+        bool: True if the previous password was removed.
+    """
+    current_version = get_version_id(metadata, "AWSCURRENT")
+    pruned_version = get_version_id(metadata, PRUNED_STAGE)
+    if get_version_id(metadata, "AWSPREVIOUS") is None or pruned_version == current_version:
+        return False
+    rotated = metadata.get("LastRotatedDate")
+    if rotated is not None and datetime.datetime.now(datetime.timezone.utc) - rotated < grace:
+        return False
+
+    current = get_secret(secret_id, "AWSCURRENT")[target.key]
+    set_passwords(target, [current], "SET")
+    kwargs = {"SecretId": secret_id, "VersionStage": PRUNED_STAGE, "MoveToVersionId": current_version}
+    if pruned_version is not None:
+        kwargs["RemoveFromVersionId"] = pruned_version
+    client("secretsmanager").update_secret_version_stage(**kwargs)
+    return True
+
+
+def list_secrets(replication_group_id: str) -> List[Dict]:
+    secrets = []
+    kwargs = {"Filters": [{"Key": "tag-key", "Values": [TAG_REPLICATION_GROUP]},
+                          {"Key": "tag-value", "Values": [replication_group_id]}]}
+    while True:
+        response = client("secretsmanager").list_secrets(**kwargs)
+        secrets += response.get("SecretList", [])
+        if not response.get("NextToken"):
+            return secrets
+        kwargs["NextToken"] = response["NextToken"]
+
+
+def prune_handler(event, context):
+    replication_group_id = os.environ["REPLICATION_GROUP_ID"]
+    grace = datetime.timedelta(minutes=float(os.environ.get("GRACE_MINUTES", "60")))
+
+    pruned = []
+    for summary in list_secrets(replication_group_id):
+        metadata = client("secretsmanager").describe_secret(SecretId=summary["ARN"])
+        if prune_secret(metadata["ARN"], metadata, get_target(metadata), grace):
+            pruned.append(metadata["Name"])
+    return {"pruned": pruned}
+
+
+def handler(event, context):
+    if "Step" not in event:
+        return prune_handler(event, context)
+
+    secret_id = event["SecretId"]
+    token = event["ClientRequestToken"]
+    step = event["Step"]
+    if step not in STEPS:
+        raise ValueError(f"Unsupported rotation step {step}")
+
+    metadata = client("secretsmanager").describe_secret(SecretId=secret_id)
+    if not metadata.get("RotationEnabled"):
+        raise ValueError(f"Secret {secret_id} is not enabled for rotation")
+    stages = metadata.get("VersionIdsToStages", {})
+    if token not in stages:
+        raise ValueError(f"Secret version {token} has no stage for rotation of secret {secret_id}")
+    if "AWSCURRENT" in stages[token]:
+        return
+    if "AWSPENDING" not in stages[token]:
+        raise ValueError(f"Secret version {token} not set as AWSPENDING for rotation of secret {secret_id}")
+
+    STEPS[step](secret_id, token, metadata, get_target(metadata))
@@ -0,0 +1,6 @@
+"""
+Tags identifying the secrets of a cluster, written by cache/elasticache_secret.py and read by the rotation function.
+"""
+TAG_REPLICATION_GROUP = "elasticache:replication-group-id"
+TAG_SECRET_TYPE = "elasticache:secret-type"
+TAG_USER_ID = "elasticache:user-id"
@@ -0,0 +1,335 @@
+"""
+Streaming aggregation of Redis slow-log entries as delivered by ElastiCache in JSON format.
+
+Entries are grouped by command name and key pattern. Durations are kept in log-bucketed histograms,
+so memory is bounded by the number of groups and not by the number of entries, percentiles are within
+the histogram precision, and histograms of separate runs can be merged.
+
+The module only uses the standard library so it runs both in the Lambda aggregator and offline on
+recorded slow-log files:
+
+    python -m functions.slowlog.aggregator slowlog-2021-10-01.jsonl.gz --top 20
+"""
+import argparse
+import gzip
+import heapq
+import json
+import math
+import re
+import sys
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Relative width of the histogram buckets, percentiles are accurate to within this precision.
+PRECISION = 0.02
+# Groups beyond this limit are folded into the OTHER group to bound memory.
+DEFAULT_MAX_GROUPS = 1000
+OTHER = ("*", "*")
+# Variable parts of keys: hex ids and UUIDs, then any run of digits.
+VARIABLE_KEY_PART = re.compile(r"[0-9a-fA-F]{8}(?:-?[0-9a-fA-F]{4}){3}-?[0-9a-fA-F]{12}|[0-9a-fA-F]{16,}|\d+")
+MAX_KEY_PATTERN_LENGTH = 128
+
+
+class SlowLogEntry(NamedTuple):
+    timestamp: int
+    node_id: str
+    duration_us: int
+    command: str
+    key_pattern: str
+
+
+class LogHistogram:
+    """
+    Sparse histogram with logarithmic buckets, bucket i holds values in [base^i, base^(i+1)).
+    """
+    __slots__ = ("buckets", "count")
+
+    def __init__(self) -> None:
+        self.buckets = {}
+        self.count = 0
+
+    @staticmethod
+    def bucket_of(value: float) -> int:
+        return int(math.log(max(value, 1)) / math.log1p(PRECISION))
+
+    @staticmethod
+    def value_of(bucket: int) -> float:
+        # Midpoint of the bucket, the error is at most half of the bucket width.
+        return (1 + PRECISION / 2) * (1 + PRECISION) ** bucket
+
+    def add(self, value: float, count: int = 1) -> None:
+        bucket = self.bucket_of(value)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += count
+
+    def merge(self, other: "LogHistogram") -> None:
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Return the value at quantile q (0 < q <= 1), None if the histogram is empty.
+        """
+        if self.count == 0:
+            return None
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return self.value_of(bucket)
+        return self.value_of(max(self.buckets))
+
+    def values_and_counts(self, max_values: int = 150) -> Tuple[List[float], List[int]]:
+        """
+        Return the histogram as values and counts arrays as accepted by CloudWatch PutMetricData, which
+        computes percentiles over any period from them. Adjacent buckets are combined to fit max_values.
+        """
+        buckets = sorted(self.buckets.items())
+        step = math.ceil(len(buckets) / max_values) if buckets else 1
+        values, counts = [], []
+        for idx in range(0, len(buckets), step):
+            chunk = buckets[idx:idx + step]
+            total = sum(count for _, count in chunk)
+            values.append(round(sum(self.value_of(bucket) * count for bucket, count in chunk) / total, 1))
+            counts.append(total)
+        return values, counts
+
+    def to_dict(self) -> Dict[str, int]:
+        return {str(bucket): count for bucket, count in self.buckets.items()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, int]) -> "LogHistogram":
+        histogram = cls()
+        for bucket, count in data.items():
+            histogram.buckets[int(bucket)] = count
+            histogram.count += count
+        return histogram
+
+
+class GroupStats:
+    """
+    Count, total and maximum duration and the duration histogram of a command and key pattern group.
+    """
+    __slots__ = ("count", "total_us", "max_us", "histogram")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+        self.histogram = LogHistogram()
+
+    def add(self, duration_us: int) -> None:
+        self.count += 1
+        self.total_us += duration_us
+        self.max_us = max(self.max_us, duration_us)
+        self.histogram.add(duration_us)
+
+    def merge(self, other: "GroupStats") -> None:
+        self.count += other.count
+        self.total_us += other.total_us
+        self.max_us = max(self.max_us, other.max_us)
+        self.histogram.merge(other.histogram)
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.count,
+            "total_us": self.total_us,
+            "max_us": self.max_us,
+            "p50_us": round(self.histogram.quantile(0.50)),
+            "p95_us": round(self.histogram.quantile(0.95)),
+            "p99_us": round(self.histogram.quantile(0.99)),
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "total_us": self.total_us,
+            "max_us": self.max_us,
+            "histogram": self.histogram.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "GroupStats":
+        stats = cls()
+        stats.count = data["count"]
+        stats.total_us = data["total_us"]
+        stats.max_us = data["max_us"]
+        stats.histogram = LogHistogram.from_dict(data["histogram"])
+        return stats
+
+
+def get_key_pattern(key: str) -> str:
+    """
+    Replace the variable parts of a key with `*`, e.g. `{tenant:42}:user:1001` becomes `{tenant:*}:user:*`.
+    """
+    return VARIABLE_KEY_PART.sub("*", key)[:MAX_KEY_PATTERN_LENGTH]
+
+
+def parse_command(command: str) -> Tuple[str, str]:
+    """
+    Split the slow-log command field, e.g. `GET user:1001` or `HSET user:1001 name ... (2 more arguments)`,
+    into the command name and the key pattern of its first argument.
+    """
+    parts = command.split(" ", 2)
+    name = parts[0].upper() if parts and parts[0] else "*"
+    if len(parts) < 2 or parts[1].startswith("("):
+        return name, ""
+    return name, get_key_pattern(parts[1])
+
+
+def parse_entry(message: str) -> Optional[SlowLogEntry]:
+    """
+    Parse a slow-log entry in the ElastiCache JSON log format, None if the message is not a slow-log entry.
+    """
+    try:
+        record = json.loads(message)
+        duration = record.get("Duration (us)", record.get("Duration(us)"))
+        command, key_pattern = parse_command(record["Command"])
+        return SlowLogEntry(
+            timestamp=int(record.get("Timestamp", 0)),
+            node_id=f"{record.get('CacheClusterId', '')}",
+            duration_us=int(duration),
+            command=command,
+            key_pattern=key_pattern
+        )
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def read_entries(lines: Iterable[str]) -> Iterator[SlowLogEntry]:
+    """
+    Parse slow-log entries from JSON lines, lines that are not slow-log entries are skipped.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        entry = parse_entry(line)
+        if entry is not None:
+            yield entry
+
+
+class SlowLogAggregator:
+    """
+    Aggregate slow-log entries by command name and key pattern in bounded memory.
+    """
+    def __init__(self, max_groups: int = DEFAULT_MAX_GROUPS) -> None:
+        self.max_groups = max_groups
+        self.groups = {}
+        self.commands = {}
+        self.overall = GroupStats()
+        self.first_timestamp = None
+        self.last_timestamp = None
+
+    def group_of(self, key: Tuple[str, str]) -> GroupStats:
+        stats = self.groups.get(key)
+        if stats is None:
+            # One slot is kept for the OTHER group.
+            if len(self.groups) >= self.max_groups - 1 and key != OTHER:
+                return self.group_of(OTHER)
+            stats = self.groups[key] = GroupStats()
+        return stats
+
+    def command_of(self, command: str) -> GroupStats:
+        stats = self.commands.get(command)
+        if stats is None:
+            stats = self.commands[command] = GroupStats()
+        return stats
+
+    def add(self, entry: SlowLogEntry) -> None:
+        self.group_of((entry.command, entry.key_pattern)).add(entry.duration_us)
+        self.command_of(entry.command).add(entry.duration_us)
+        self.overall.add(entry.duration_us)
+        if entry.timestamp:
+            if self.first_timestamp is None or entry.timestamp < self.first_timestamp:
+                self.first_timestamp = entry.timestamp
+            if self.last_timestamp is None or entry.timestamp > self.last_timestamp:
+                self.last_timestamp = entry.timestamp
+
+    def add_all(self, entries: Iterable[SlowLogEntry]) -> "SlowLogAggregator":
+        for entry in entries:
+            self.add(entry)
+        return self
+
+    def merge(self, other: "SlowLogAggregator") -> "SlowLogAggregator":
+        for key, stats in other.groups.items():
+            self.group_of(key).merge(stats)
+        for command, stats in other.commands.items():
+            self.command_of(command).merge(stats)
+        self.overall.merge(other.overall)
+        for timestamp in (other.first_timestamp, other.last_timestamp):
+            if timestamp is not None:
+                self.first_timestamp = min(self.first_timestamp or timestamp, timestamp)
+                self.last_timestamp = max(self.last_timestamp or timestamp, timestamp)
+        return self
+
+    def top(self, n: int, by: str = "total_us") -> List[Tuple[Tuple[str, str], GroupStats]]:
+        """
+        Return the n groups with the highest count, total_us or max_us.
+        """
+        return heapq.nlargest(n, self.groups.items(), key=lambda item: getattr(item[1], by))
+
+    def report(self, n: int = 20) -> Dict:
+        """
+        Return the top n report, groups are ranked by the total time spent in slow commands.
+        """
+        return {
+            "first_timestamp": self.first_timestamp,
+            "last_timestamp": self.last_timestamp,
+            "overall": self.overall.summary() if self.overall.count else None,
+            "commands": {command: stats.summary() for command, stats in sorted(self.commands.items())},
+            "top": [
+                dict(command=command, key_pattern=key_pattern, **stats.summary())
+                for (command, key_pattern), stats in self.top(n)
+            ]
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            "first_timestamp": self.first_timestamp,
+            "last_timestamp": self.last_timestamp,
+            "overall": self.overall.to_dict(),
+            "commands": {command: stats.to_dict() for command, stats in self.commands.items()},
+            "groups": [[command, key_pattern, stats.to_dict()]
+                       for (command, key_pattern), stats in self.groups.items()]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, max_groups: int = DEFAULT_MAX_GROUPS) -> "SlowLogAggregator":
+        aggregator = cls(max_groups)
+        aggregator.first_timestamp = data.get("first_timestamp")
+        aggregator.last_timestamp = data.get("last_timestamp")
+        aggregator.overall = GroupStats.from_dict(data["overall"])
+        for command, stats in data["commands"].items():
+            aggregator.commands[command] = GroupStats.from_dict(stats)
+        for command, key_pattern, stats in data["groups"]:
+            aggregator.group_of((command, key_pattern)).merge(GroupStats.from_dict(stats))
+        return aggregator
+
+
+def open_recording(path: str):
+    if path == "-":
+        return sys.stdin
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Aggregate recorded Redis slow-log JSON lines files.")
+    parser.add_argument("files", nargs="+", help="slow-log JSON lines files, optionally gzip compressed, - for stdin")
+    parser.add_argument("--top", type=int, default=20, help="number of command and key pattern groups to report")
+    parser.add_argument("--max-groups", type=int, default=DEFAULT_MAX_GROUPS, help="maximum groups kept in memory")
+    args = parser.parse_args(argv)
+
+    aggregator = SlowLogAggregator(args.max_groups)
+    for path in args.files:
+        with open_recording(path) as lines:
+            aggregator.add_all(read_entries(lines))
+    json.dump(aggregator.report(args.top), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
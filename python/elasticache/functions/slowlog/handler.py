@@ -0,0 +1,131 @@
+"""
+Lambda handlers of the slow-log analytics pipeline.
+
+handler         subscribed to the slow-log CloudWatch log group, aggregates every batch of log events,
+                publishes the duration distributions as custom metrics and stores the batch summary in S3.
+report_handler  runs daily, merges the summaries of the previous day and stores the top-N report in S3.
+"""
+import base64
+import datetime
+import gzip
+import json
+import os
+from typing import Dict, Iterator, List
+
+from .aggregator import SlowLogAggregator, read_entries
+
+NAMESPACE = "ElastiCache/SlowLog"
+SUMMARY_PREFIX = "summaries"
+REPORT_PREFIX = "reports"
+# Every metric datum carries up to 150 values and counts, keep the PutMetricData requests small.
+METRIC_DATA_PER_REQUEST = 20
+
+_clients = {}
+
+
+def client(service: str):
+    if service not in _clients:
+        import boto3
+        _clients[service] = boto3.client(service)
+    return _clients[service]
+
+
+def decode_log_events(event: Dict) -> Dict:
+    """
+    Decode the base64 encoded and gzip compressed CloudWatch Logs subscription payload.
+    """
+    return json.loads(gzip.decompress(base64.b64decode(event["awslogs"]["data"])))
+
+
+def get_metric_data(aggregator: SlowLogAggregator, replication_group_id: str) -> List[Dict]:
+    """
+    Return the duration distribution of all commands and of each command as CloudWatch metric data.
+    CloudWatch computes p50, p95 and p99 over any period from the values and counts.
+    """
+    metric_data = []
+    stats_by_dimension = [([], aggregator.overall)] + [
+        ([{"Name": "Command", "Value": command}], stats) for command, stats in aggregator.commands.items()
+    ]
+    for dimensions, stats in stats_by_dimension:
+        if stats.count == 0:
+            continue
+        values, counts = stats.histogram.values_and_counts()
+        metric_data.append({
+            "MetricName": "Duration",
+            "Dimensions": [{"Name": "ReplicationGroupId", "Value": replication_group_id}] + dimensions,
+            "Values": values,
+            "Counts": counts,
+            "Unit": "Microseconds"
+        })
+    return metric_data
+
+
+def publish_metrics(metric_data: List[Dict]) -> None:
+    for idx in range(0, len(metric_data), METRIC_DATA_PER_REQUEST):
+        client("cloudwatch").put_metric_data(
+            Namespace=NAMESPACE,
+            MetricData=metric_data[idx:idx + METRIC_DATA_PER_REQUEST]
+        )
+
+
+def handler(event, context):
+    replication_group_id = os.environ["REPLICATION_GROUP_ID"]
+    max_groups = int(os.environ.get("MAX_GROUPS", "1000"))
+
+    payload = decode_log_events(event)
+    if payload.get("messageType") != "DATA_MESSAGE":
+        return {"entries": 0}
+
+    aggregator = SlowLogAggregator(max_groups)
+    aggregator.add_all(read_entries(log_event["message"] for log_event in payload["logEvents"]))
+    if aggregator.overall.count == 0:
+        return {"entries": 0}
+
+    publish_metrics(get_metric_data(aggregator, replication_group_id))
+
+    now = datetime.datetime.utcnow()
+    client("s3").put_object(
+        Bucket=os.environ["BUCKET_NAME"],
+        Key=f"{SUMMARY_PREFIX}/{now:%Y/%m/%d}/{now:%H%M%S}-{context.aws_request_id}.json",
+        Body=json.dumps(aggregator.to_dict()).encode("utf-8")
+    )
+    return {"entries": aggregator.overall.count}
+
+
+def list_keys(bucket: str, prefix: str) -> Iterator[str]:
+    paginator = client("s3").get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for item in page.get("Contents", []):
+            yield item["Key"]
+
+
+def report_handler(event, context):
+    bucket = os.environ["BUCKET_NAME"]
+    max_groups = int(os.environ.get("MAX_GROUPS", "1000"))
+    top_n = int(os.environ.get("TOP_N", "20"))
+
+    day = datetime.datetime.utcnow().date() - datetime.timedelta(days=1)
+    if event.get("date"):
+        day = datetime.date.fromisoformat(event["date"])
+
+    # Summaries are merged one at a time, memory is bounded by max_groups.
+    aggregator = SlowLogAggregator(max_groups)
+    summaries = 0
+    for key in list_keys(bucket, f"{SUMMARY_PREFIX}/{day:%Y/%m/%d}/"):
+        body = client("s3").get_object(Bucket=bucket, Key=key)["Body"].read()
+        aggregator.merge(SlowLogAggregator.from_dict(json.loads(body), max_groups))
+        summaries += 1
+
+    report = aggregator.report(top_n)
+    report.update({
+        "date": day.isoformat(),
+        "replication_group_id": os.environ["REPLICATION_GROUP_ID"],
+        "summaries": summaries
+    })
+    client("s3").put_object(
+        Bucket=bucket,
+        Key=f"{REPORT_PREFIX}/{day:%Y-%m-%d}.json",
+        Body=json.dumps(report, indent=2).encode("utf-8"),
+        ContentType="application/json"
+    )
+    return {"date": day.isoformat(), "summaries": summaries}
@@ -0,0 +1,117 @@
+"""
+Warm-up Lambda of a new cluster, the handler of a CloudFormation custom resource created with the cluster.
+
+handler  on Create and on Update of the manifest, reads the manifest of hot keys from S3 and loads it into the
+         cluster, see loader.py. The warm-up is best effort: a failure does not roll back the cluster, it is
+         logged at the ERROR level with the `Failed` metric, and the shards that failed with the `FailedShards`
+         metric, in the embedded metric format of CloudWatch. The load stops ahead of the Lambda timeout, which
+         would fail the deployment, and a load stopped short is reported as failed. Delete does nothing.
+
+The credentials come from the secret SECRET_ARN, the `user-name` and `password` of a user secret or the `token`
+of the auth token secret written by cache/elasticache_secret.py, the default user needs no password without it.
+"""
+import asyncio
+import json
+import os
+import time
+import traceback
+from typing import Dict, Tuple
+
+from .loader import open_manifest, read_manifest, warm_up
+
+# The namespace of the metrics of the warm-up
+NAMESPACE = "ElastiCache/WarmUp"
+# Seconds kept before the Lambda timeout for the batches in flight, each bounded by the reply timeout of the client,
+# the log record and the response to CloudFormation
+DEADLINE_MARGIN_SECONDS = 20
+
+_clients = {}
+
+
+def client(service: str):
+    if service not in _clients:
+        import boto3
+        _clients[service] = boto3.client(service)
+    return _clients[service]
+
+
+def get_credentials() -> Tuple[str, str]:
+    """
+    Return the user name and the password, the user name is None for the auth token and both are None without
+    a secret.
+    """
+    secret_arn = os.environ.get("SECRET_ARN")
+    if not secret_arn:
+        return None, None
+    secret = json.loads(client("secretsmanager").get_secret_value(SecretId=secret_arn)["SecretString"])
+    if "token" in secret:
+        return None, secret["token"]
+    return secret["user-name"], secret["password"]
+
+
+def get_deadline(context) -> float:
+    """
+    Return the `time.monotonic()` value the load stops at, DEADLINE_MARGIN_SECONDS before the Lambda timeout,
+    None without a Lambda context.
+    """
+    if context is None:
+        return None
+    return time.monotonic() + context.get_remaining_time_in_millis() / 1000 - DEADLINE_MARGIN_SECONDS
+
+
+def load_manifest(bucket: str, key: str, deadline: float = None) -> Dict:
+    body = client("s3").get_object(Bucket=bucket, Key=key)["Body"]
+    user, password = get_credentials()
+    return asyncio.run(warm_up(
+        os.environ["REDIS_HOST"], int(os.environ["REDIS_PORT"]), read_manifest(open_manifest(body, key)),
+        cluster_mode=os.environ.get("CLUSTER_MODE", "false") == "true",
+        ssl=os.environ.get("REDIS_TLS", "true") == "true",
+        user=user, password=password,
+        parallelism=int(os.environ["PARALLELISM"]),
+        pipeline=int(os.environ["PIPELINE"]),
+        deadline=deadline
+    ))
+
+
+def get_log_record(stats: Dict) -> Dict:
+    """
+    Return the log record of the warm-up stats, with the `Failed` and `FailedShards` metrics in the embedded
+    metric format, an ERROR record if the warm-up failed or was stopped at the deadline.
+    """
+    failed = stats["errors"] < 0 or stats["timed_out"]
+    return dict(
+        stats,
+        level="ERROR" if failed else "INFO",
+        replication_group_id=os.environ["REPLICATION_GROUP_ID"],
+        ReplicationGroupId=os.environ["REPLICATION_GROUP_ID"],
+        Failed=int(failed),
+        FailedShards=stats["failed_shards"],
+        _aws={
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": NAMESPACE,
+                "Dimensions": [["ReplicationGroupId"]],
+                "Metrics": [{"Name": "Failed", "Unit": "Count"}, {"Name": "FailedShards", "Unit": "Count"}]
+            }]
+        }
+    )
+
+
+def handler(event: Dict, context) -> Dict:
+    physical_resource_id = event.get("PhysicalResourceId") or f"{os.environ['REPLICATION_GROUP_ID']}-warm-up"
+    if event["RequestType"] == "Delete":
+        return {"PhysicalResourceId": physical_resource_id}
+
+    properties = event["ResourceProperties"]
+    try:
+        stats = load_manifest(properties["ManifestBucket"], properties["ManifestKey"], get_deadline(context))
+    except Exception:
+        # A cold cache is better than no cache, the deployment goes on and the failure is reported by the metric
+        traceback.print_exc()
+        stats = {"shards": 0, "failed_shards": 0, "keys": 0, "errors": -1, "skipped": 0, "timed_out": False,
+                 "seconds": 0}
+    print(json.dumps(get_log_record(stats)))
+    return {
+        "PhysicalResourceId": physical_resource_id,
+        "Data": {"Keys": stats["keys"], "Errors": stats["errors"]}
+    }
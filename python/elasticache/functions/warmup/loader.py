@@ -0,0 +1,271 @@
+"""
+Warm-up of a new cluster from a manifest of hot keys, so that the first requests hit the cache instead of sending
+a thundering herd to the databases behind it.
+
+Every line of the manifest is a JSON object with the `key`, its `value` and an optional `ttl` in seconds. The keys
+are grouped by shard, in cluster mode with the slot map of CLUSTER SLOTS and the hash slot of every key, and every
+shard is written by `parallelism` connections sending pipelined batches of SET commands, so a large manifest loads
+at the pace of the shards and not of a single connection. The manifest is read as a stream, gzip compressed or not,
+and with TLS the certificates of the shards, whose CLUSTER SLOTS addresses are IPs, are verified against the host
+name of the configuration endpoint. With a deadline the load stops once it is reached and returns the partial stats.
+
+The module only uses the standard library, it runs in the warm-up Lambda and locally against the Redis stand-in:
+
+    python -m functions.warmup.loader hot-keys.jsonl.gz --host 127.0.0.1 --port 6379 --parallelism 4
+"""
+import argparse
+import asyncio
+import binascii
+import gzip
+import json
+import ssl as ssl_
+import sys
+import time
+import traceback
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Tuple, Union
+
+try:
+    from functions.resp.client import RespClient, RespError
+except ImportError:
+    # The Lambda asset is the functions directory
+    from resp.client import RespClient, RespError
+
+SLOT_COUNT = 16384
+DEFAULT_PARALLELISM = 4
+DEFAULT_PIPELINE = 100
+# Bytes read from the manifest stream at a time.
+READ_SIZE = 1024 * 1024
+
+
+class Shard(NamedTuple):
+    host: str
+    port: int
+    # The slot ranges of the shard, empty for a cluster with cluster mode disabled
+    slots: Tuple[Tuple[int, int], ...] = ()
+
+
+def key_slot(key: bytes) -> int:
+    """
+    Return the hash slot of the key, CRC16 (XMODEM) of its hash tag or of the whole key,
+    as cache/helper/slot_analyzer.py does.
+    """
+    start = key.find(b"{")
+    if start != -1:
+        end = key.find(b"}", start + 1)
+        if end > start + 1:
+            key = key[start + 1:end]
+    return binascii.crc_hqx(key, 0) & (SLOT_COUNT - 1)
+
+
+def read_manifest(lines: Iterable[bytes]) -> Iterator[Tuple]:
+    """
+    Yield the SET command of every non empty manifest line, with EX when the entry has a `ttl`.
+
+    Raises:
+        ValueError: if a line is not a JSON object with a key and a value.
+    """
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+            command = ("SET", entry["key"], entry["value"])
+        except (ValueError, KeyError, TypeError):
+            raise ValueError(f"Invalid manifest line {number}, expected a JSON object with a key and a value")
+        if entry.get("ttl"):
+            command += ("EX", int(entry["ttl"]))
+        yield command
+
+
+def open_manifest(stream: BinaryIO, name: str) -> Iterator[bytes]:
+    """
+    Yield the lines of a manifest stream, e.g. an open file or the body of an S3 object, gzip compressed if the name
+    ends with .gz. The stream is read `READ_SIZE` bytes at a time instead of whole.
+    """
+    if name.endswith(".gz"):
+        stream = gzip.GzipFile(fileobj=stream, mode="rb")
+    pending = b""
+    while True:
+        chunk = stream.read(READ_SIZE)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+
+def until(commands: Iterable[Tuple], deadline: float, stats: Dict[str, Any]) -> Iterator[Tuple]:
+    """
+    Yield the commands until the deadline, a `time.monotonic()` value, `timed_out` is set in the stats when the
+    deadline stops the reading.
+    """
+    for command in commands:
+        if deadline is not None and time.monotonic() >= deadline:
+            stats["timed_out"] = True
+            return
+        yield command
+
+
+def parse_cluster_slots(reply: List, host: str) -> List[Shard]:
+    """
+    Return the shards of a CLUSTER SLOTS reply, `[[first, last, [host, port, id], replicas...], ...]`, the slot
+    ranges of a primary are gathered in one shard. An empty host is the host that answered.
+    """
+    shards = {}
+    for slot_range in reply:
+        first, last, primary = slot_range[0], slot_range[1], slot_range[2]
+        address = ((primary[0].decode("utf-8") if isinstance(primary[0], bytes) else primary[0]) or host,
+                   int(primary[1]))
+        shards.setdefault(address, []).append((int(first), int(last)))
+    return [Shard(address[0], address[1], tuple(sorted(ranges))) for address, ranges in shards.items()]
+
+
+def get_shard_commands(shards: List[Shard], commands: Iterable[Tuple]) -> List[List[Tuple]]:
+    """
+    Group the commands by the shard of their key, every command goes to the single shard of a cluster with
+    cluster mode disabled.
+    """
+    shard_commands = [[] for _ in shards]
+    if len(shards) == 1:
+        shard_commands[0].extend(commands)
+        return shard_commands
+
+    owners = [0] * SLOT_COUNT
+    for idx, shard in enumerate(shards):
+        for first, last in shard.slots:
+            owners[first:last + 1] = [idx] * (last - first + 1)
+    for command in commands:
+        key = command[1] if isinstance(command[1], bytes) else str(command[1]).encode("utf-8")
+        shard_commands[owners[key_slot(key)]].append(command)
+    return shard_commands
+
+
+async def load_shard(connect: Callable[[str, int], Awaitable[RespClient]], shard: Shard, commands: List[Tuple],
+                     parallelism: int, pipeline: int, deadline: float = None) -> Dict[str, int]:
+    """
+    Write the commands of a shard with `parallelism` connections, every connection takes the next batch of
+    `pipeline` commands until none is left or the deadline, a `time.monotonic()` value, is reached.
+
+    Returns:
+        Dict[str, int]: the commands written, the error replies, e.g. MOVED after a resharding, and the commands
+        skipped at the deadline.
+    """
+    batches = [commands[start:start + pipeline] for start in range(0, len(commands), pipeline)]
+    batches.reverse()
+    stats = {"keys": 0, "errors": 0}
+
+    def in_time() -> bool:
+        return deadline is None or time.monotonic() < deadline
+
+    async def worker() -> None:
+        if not in_time():
+            return
+        client = await connect(shard.host, shard.port)
+        try:
+            while batches and in_time():
+                batch = batches.pop()
+                replies = await client.pipeline(batch)
+                stats["keys"] += len(batch)
+                stats["errors"] += sum(isinstance(reply, RespError) for reply in replies)
+        finally:
+            await client.close()
+
+    await asyncio.gather(*[worker() for _ in range(min(parallelism, len(batches)))])
+    stats["skipped"] = sum(len(batch) for batch in batches)
+    return stats
+
+
+async def warm_up(host: str, port: int, commands: Iterable[Tuple], cluster_mode: bool = False,
+                  ssl: Union[bool, ssl_.SSLContext] = False, user: str = None, password: str = None,
+                  parallelism: int = DEFAULT_PARALLELISM, pipeline: int = DEFAULT_PIPELINE,
+                  deadline: float = None) -> Dict[str, Any]:
+    """
+    Write the commands to the cluster, the shards are loaded concurrently. A shard failing, e.g. on a connection
+    error, does not stop the others, its keys are counted as errors. Once the deadline is reached no more manifest
+    line is read and no more batch is sent, the batches in flight complete.
+
+    Args:
+        host: the configuration endpoint in cluster mode, the primary endpoint otherwise.
+        port: the port.
+        commands: the SET commands, see read_manifest.
+        cluster_mode: whether the keys are spread across shards with the slot map of CLUSTER SLOTS.
+        ssl: True or an SSL context if the cluster requires TLS, the certificates of the shards are verified
+            against the host.
+        user: the user name, the default user if None.
+        password: the password or the AUTH token, no authentication if None.
+        parallelism: the connections per shard.
+        pipeline: the commands per pipelined batch.
+        deadline: the `time.monotonic()` value to stop at, no deadline if None.
+
+    Returns:
+        Dict[str, Any]: the shards, the shards that failed, the keys written, the error replies, the commands skipped
+        at the deadline, whether the deadline stopped the load and the seconds it took.
+
+    Raises:
+        RuntimeError: if every shard failed.
+    """
+    async def connect(shard_host: str, shard_port: int) -> RespClient:
+        # The addresses of CLUSTER SLOTS are IPs, the certificate names the endpoints
+        return await RespClient.connect(shard_host, shard_port, ssl=ssl, user=user, password=password,
+                                        server_hostname=host)
+
+    started = time.perf_counter()
+    if cluster_mode:
+        client = await connect(host, port)
+        try:
+            shards = parse_cluster_slots(await client.execute("CLUSTER", "SLOTS"), host)
+        finally:
+            await client.close()
+    else:
+        shards = [Shard(host, port)]
+
+    stats = {"shards": len(shards), "failed_shards": 0, "keys": 0, "errors": 0, "skipped": 0, "timed_out": False}
+    shard_commands = [item for item in zip(shards, get_shard_commands(shards, until(commands, deadline, stats)))
+                      if item[1]]
+    results = await asyncio.gather(*[
+        load_shard(connect, shard, writes, parallelism, pipeline, deadline) for shard, writes in shard_commands
+    ], return_exceptions=True)
+
+    failures = []
+    for (shard, writes), result in zip(shard_commands, results):
+        if isinstance(result, Exception):
+            traceback.print_exception(type(result), result, result.__traceback__)
+            failures.append(f"{shard.host}:{shard.port} {result!r}")
+            stats["errors"] += len(writes)
+        else:
+            stats["keys"] += result["keys"]
+            stats["errors"] += result["errors"]
+            stats["skipped"] += result["skipped"]
+    stats["timed_out"] = stats["timed_out"] or stats["skipped"] > 0
+    if failures and len(failures) == len(shard_commands):
+        raise RuntimeError("Every shard failed: " + ", ".join(failures))
+    stats["failed_shards"] = len(failures)
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    return stats
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load a manifest of hot keys into a Redis cluster.")
+    parser.add_argument("manifest", help="JSON lines manifest, optionally gzip compressed")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--cluster-mode", action="store_true", help="spread the keys with CLUSTER SLOTS")
+    parser.add_argument("--tls", action="store_true")
+    parser.add_argument("--user", help="user name, the default user by default")
+    parser.add_argument("--password", help="password or AUTH token")
+    parser.add_argument("--parallelism", type=int, default=DEFAULT_PARALLELISM, help="connections per shard")
+    parser.add_argument("--pipeline", type=int, default=DEFAULT_PIPELINE, help="commands per pipelined batch")
+    args = parser.parse_args(argv)
+
+    with open(args.manifest, "rb") as fp:
+        stats = asyncio.run(warm_up(args.host, args.port, read_manifest(open_manifest(fp, args.manifest)),
+                                    args.cluster_mode, args.tls, args.user, args.password, args.parallelism,
+                                    args.pipeline))
+    json.dump(stats, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -18,10 +18,26 @@ setuptools.setup(
 
     install_requires=[
         "aws-cdk.core==1.122.0",
+        "aws-cdk.aws_applicationautoscaling==1.122.0",
+        "aws-cdk.aws_cloudwatch==1.122.0",
+        "aws-cdk.aws_cloudwatch_actions==1.122.0",
         "aws-cdk.aws_ec2==1.122.0",
         "aws-cdk.aws_kms==1.122.0",
         "aws-cdk.aws_elasticache==1.122.0",
+        "aws-cdk.aws_events==1.122.0",
+        "aws-cdk.aws_events_targets==1.122.0",
+        "aws-cdk.aws_glue==1.122.0",
+        "aws-cdk.aws_iam==1.122.0",
+        "aws-cdk.aws_kinesisfirehose==1.122.0",
+        "aws-cdk.aws_lambda==1.122.0",
+        "aws-cdk.aws_logs==1.122.0",
+        "aws-cdk.aws_logs_destinations==1.122.0",
+        "aws-cdk.aws_s3==1.122.0",
         "aws-cdk.aws_secretsmanager==1.122.00",
+        "aws-cdk.aws_sns==1.122.0",
+        "aws-cdk.aws_sns_subscriptions==1.122.0",
+        "aws-cdk.aws_ssm==1.122.0",
+        "aws-cdk.custom_resources==1.122.0",
     ],
 
     python_requires=">=3.7",
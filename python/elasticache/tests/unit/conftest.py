@@ -0,0 +1,160 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import os
+import threading
+from typing import Callable, Dict, List, Tuple
+
+import pytest
+from aws_cdk import core
+
+from config.config import config
+from config import config_util
+from cache.elasticache_stack import ElastiCacheStack
+from functions.resp.server import StandInServer
+
+ACCOUNT = "123456789012"
+REGION = "us-east-2"
+STACK_DESCRIPTION = "CDK Managed CF template for deploying ElastiCache."
+
+
+class Template:
+    """
+    Synthesized CloudFormation template indexed by resource type and by logical id, lookups by logical id prefix
+    are a binary search over the sorted logical ids instead of a scan of all resources.
+    """
+    def __init__(self, template: Dict) -> None:
+        self.template = template
+        self.resources_by_id = template.get("Resources", {})
+        self.outputs = template.get("Outputs", {})
+        self.logical_ids = sorted(self.resources_by_id)
+        self.resources_by_type = {}
+        for logical_id in self.logical_ids:
+            resource = self.resources_by_id[logical_id]
+            self.resources_by_type.setdefault(resource["Type"], []).append(resource)
+
+    def of_type(self, resource_type: str) -> List[Dict]:
+        """
+        Return the resources of the type, e.g. AWS::ElastiCache::ReplicationGroup, in logical id order.
+        """
+        return self.resources_by_type.get(resource_type, [])
+
+    def items(self, prefix: str) -> List[Tuple[str, Dict]]:
+        """
+        Return the logical ids and resources whose logical id starts with the prefix, in logical id order.
+        """
+        start = bisect.bisect_left(self.logical_ids, prefix)
+        items = []
+        for logical_id in self.logical_ids[start:]:
+            if not logical_id.startswith(prefix):
+                break
+            items.append((logical_id, self.resources_by_id[logical_id]))
+        return items
+
+    def resources(self, prefix: str) -> List[Dict]:
+        return [resource for _, resource in self.items(prefix)]
+
+    def resource(self, prefix: str) -> Dict:
+        """
+        Return the first resource whose logical id starts with the prefix.
+        """
+        resources = self.resources(prefix)
+        assert resources, f"no resource with a logical id starting with {prefix}"
+        return resources[0]
+
+
+# Stacks and templates synthesized in this test session, keyed by the hash of the config and the stack name
+_synth_cache = {}
+
+
+def get_config_hash(data: Dict, stack_name: str) -> str:
+    payload = json.dumps({"config": data, "stack_name": stack_name}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def synth(data: Dict = None, stack_name: str = None) -> Tuple[ElastiCacheStack, Template]:
+    """
+    Return the stack and the template of the config, synthesized once per config and stack name.
+
+    Args:
+        data: the config dict, `config` in config/config.py by default.
+        stack_name: the stack name, the `stack_name` of the config by default.
+
+    Returns:
+        Tuple[ElastiCacheStack, Template]: the stack and its template.
+    """
+    cache_config = config_util.load(data)
+    stack_name = stack_name or cache_config.stack_name.lower()
+    key = get_config_hash(cache_config.to_dict(), stack_name)
+    if key not in _synth_cache:
+        app = core.App()
+        stack = ElastiCacheStack(
+            app, stack_name,
+            cache_config=cache_config,
+            env=core.Environment(account=ACCOUNT, region=REGION),
+            description=STACK_DESCRIPTION
+        )
+        template = app.synth().get_stack_by_name(stack_name).template
+        _synth_cache[key] = (stack, Template(template))
+    return _synth_cache[key]
+
+
+@pytest.fixture
+def synth_stack() -> Callable[..., Tuple[ElastiCacheStack, Template]]:
+    """
+    Return a function synthesizing `config` in config/config.py with the given keys overridden,
+    e.g. `stack, template = synth_stack(node_type="cache.r6g.large")`, a monkeypatched `config` is honored.
+    """
+    def synth_overrides(stack_name: str = None, **overrides) -> Tuple[ElastiCacheStack, Template]:
+        return synth(dict(config, **overrides), stack_name)
+    return synth_overrides
+
+
+@pytest.fixture
+def nested_template() -> Callable[[core.NestedStack], Template]:
+    """
+    Return a function reading the template of a nested stack of a synthesized stack,
+    e.g. `monitoring = nested_template(stack.monitoring)`.
+    """
+    def read(nested_stack: core.NestedStack) -> Template:
+        outdir = core.Stage.of(nested_stack).outdir
+        with open(os.path.join(outdir, nested_stack.template_file)) as template_file:
+            return Template(json.load(template_file))
+    return read
+
+
+@pytest.fixture
+def stack() -> ElastiCacheStack:
+    return synth()[0]
+
+
+@pytest.fixture
+def template() -> Template:
+    return synth()[1]
+
+
+@pytest.fixture
+def stand_in_server() -> Callable[..., StandInServer]:
+    """
+    Return a function starting a Redis stand-in server in a background event loop, e.g.
+    `server = stand_in_server(auth_tokens=["token-1"])`, so that code running its own event loop can connect to it.
+    The servers are stopped at the end of the test.
+    """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    servers = []
+
+    def start(**kwargs) -> StandInServer:
+        server = StandInServer(**kwargs)
+        asyncio.run_coroutine_threadsafe(server.start(), loop).result(5)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        asyncio.run_coroutine_threadsafe(server.stop(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
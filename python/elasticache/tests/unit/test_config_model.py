@@ -0,0 +1,151 @@
+import dataclasses
+
+import pytest
+
+from config.config import config
+from config.config_model import ElastiCacheConfig, parse_engine_version
+from config import config_util
+
+
+def test_from_dict_round_trip():
+    cache_config = ElastiCacheConfig.from_dict(config)
+
+    assert cache_config.replication_group_id == f"{config['environment']}-{config['cluster_name']}".lower()
+    assert cache_config.num_nodes == cache_config.num_node_groups * (cache_config.replicas_per_node_group + 1)
+    assert ElastiCacheConfig.from_dict(cache_config.to_dict()) == cache_config
+
+
+def test_frozen():
+    cache_config = ElastiCacheConfig.from_dict(config)
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        cache_config.node_type = "cache.r6g.large"
+    with pytest.raises(TypeError):
+        cache_config.secrets["users"][0]["user_acl"] = "on ~* +@all"
+
+
+def test_unknown_keys_are_rejected():
+    data = dict(config, replicasPerNodeGroup=2, monitoring={"enabled": True, "alarms": {"cpu": 90}})
+
+    with pytest.raises(ValueError) as error:
+        ElastiCacheConfig.from_dict(data)
+
+    message = str(error.value)
+    assert "unknown key 'replicasPerNodeGroup', did you mean 'replicas_per_node_group'?" in message
+    assert "unknown key 'monitoring.alarms.cpu'" in message
+
+
+def test_sizing_is_validated():
+    data = dict(config, num_node_groups=0, replicas_per_node_group=6, port_number="6379")
+    data.pop("vpc_id")
+
+    with pytest.raises(ValueError) as error:
+        ElastiCacheConfig.from_dict(data)
+
+    message = str(error.value)
+    assert "missing key 'vpc_id'" in message
+    assert "'port_number' must be a int" in message
+
+    with pytest.raises(ValueError) as error:
+        ElastiCacheConfig.from_dict(dict(config, num_node_groups=0, replicas_per_node_group=6))
+
+    message = str(error.value)
+    assert "'num_node_groups' must be between 1 and 500" in message
+    assert "'replicas_per_node_group' must be between 0 and 5" in message
+
+    # 300 shards are within the shard limit, not with a replica each
+    with pytest.raises(ValueError) as error:
+        ElastiCacheConfig.from_dict(dict(config, num_node_groups=300, replicas_per_node_group=1))
+    assert "must be at most 500 nodes, got 600" in str(error.value)
+
+
+def test_getters_read_the_config_in_use():
+    cache_config = ElastiCacheConfig.from_dict(dict(config, node_type="cache.r6g.large"))
+
+    with config_util.use(cache_config):
+        assert config_util.get_node_type() == "cache.r6g.large"
+        assert config_util.get_cluster_name() is cache_config.replication_group_id
+    assert config_util.get_node_type() == config["node_type"]
+
+
+def test_default_config_is_parsed_once(monkeypatch):
+    calls = []
+    from_dict = ElastiCacheConfig.from_dict
+    monkeypatch.setattr(ElastiCacheConfig, "from_dict", lambda data: calls.append(data) or from_dict(data))
+    config_util.load_default.cache_clear()
+
+    assert config_util.get_config() is config_util.get_config() is config_util.load()
+    config_util.get_node_type()
+    config_util.get_cluster_name()
+    assert len(calls) == 1
+
+    # use() still overrides the default configuration
+    cache_config = ElastiCacheConfig.from_dict(dict(config, node_type="cache.r6g.large"))
+    with config_util.use(cache_config):
+        assert config_util.get_config() is cache_config
+    config_util.load_default.cache_clear()
+
+
+def test_parse_engine_version():
+    assert parse_engine_version("5.0.6") == (5, 0, 6)
+    assert parse_engine_version("6.x") == (6, 99, 99)
+    assert parse_engine_version("6.2") > (6, 2) > parse_engine_version("6.0")
+    assert parse_engine_version("7") == (7, 99, 99)
+
+
+def test_data_tiering_is_validated():
+    with pytest.raises(ValueError) as error:
+        ElastiCacheConfig.from_dict(dict(config, node_type="cache.r6g.xlarge", data_tiering_enabled=True,
+                                         engine_version="6.0"))
+
+    message = str(error.value)
+    assert "'data_tiering_enabled' needs a data tiering node type" in message
+    assert "'data_tiering_enabled' needs Redis 6.2 or later" in message
+
+    with pytest.raises(ValueError) as error:
+        ElastiCacheConfig.from_dict(dict(config, node_type="cache.r6gd.xlarge"))
+    assert "'node_type' 'cache.r6gd.xlarge' needs 'data_tiering_enabled'" in str(error.value)
+
+    ElastiCacheConfig.from_dict(dict(config, node_type="cache.r6gd.xlarge", data_tiering_enabled=True))
+
+
+def test_serverless_is_validated():
+    with pytest.raises(ValueError) as error:
+        ElastiCacheConfig.from_dict(dict(config, deployment_mode="serverless", engine_version="6.2",
+                                         autoscaling={"enabled": True}, transit_encryption_enabled=False,
+                                         cache_usage_limits={"data_storage": {"minimum": 20, "maximum": 10},
+                                                             "ecpu_per_second": {"maximum": 100}}))
+
+    message = str(error.value)
+    assert "'deployment_mode' serverless needs Redis 7 or later" in message
+    assert "'autoscaling.enabled' is not supported with 'deployment_mode' serverless" in message
+    assert "'transit_encryption_enabled' can not be disabled" in message
+    assert "'cache_usage_limits.data_storage.minimum' is above 'maximum'" in message
+    assert "'cache_usage_limits.ecpu_per_second.maximum' must be between 1000 and 15000000, got 100" in message
+
+    with pytest.raises(ValueError) as error:
+        ElastiCacheConfig.from_dict(dict(config, cache_usage_limits={"data_storage": {"maximum": 10}}))
+    assert "'cache_usage_limits' needs 'deployment_mode' serverless" in str(error.value)
+
+
+def test_slowlog_analytics_is_validated():
+    slowlog_analytics = dict(config["slowlog_analytics"], enabled=True)
+    ElastiCacheConfig.from_dict(dict(config, slowlog_analytics=slowlog_analytics))
+
+    with pytest.raises(ValueError) as error:
+        ElastiCacheConfig.from_dict(dict(config, slowlog_analytics=slowlog_analytics, log_delivery={
+            "slow-log": {"destination": "kinesis-firehose"}
+        }))
+    assert "'slowlog_analytics' needs 'log_delivery.slow-log.destination' cloudwatch-logs" in str(error.value)
+
+    with pytest.raises(ValueError) as error:
+        ElastiCacheConfig.from_dict(dict(config, slowlog_analytics=slowlog_analytics, engine_version="5.0.6",
+                                         parameter_group=None))
+    assert "'slowlog_analytics' needs Redis 6.0 or later" in str(error.value)
+
+
+def test_stack_name_defaults():
+    data = dict(config)
+    data.pop("stack_name")
+
+    assert ElastiCacheConfig.from_dict(data).stack_name == "ElastiCache-Stack"
@@ -0,0 +1,107 @@
+import json
+import threading
+
+import pytest
+
+from cache.credentials import (
+    CredentialCache,
+    CredentialError,
+    InMemoryBackend,
+    get_auth_token_secret_name,
+    get_user_secret_name
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def get_backend(users=45, batch_size=20):
+    secrets = {
+        get_user_secret_name("dev-cluster", f"tenant-{idx}"): json.dumps({"user-name": f"tenant-{idx}",
+                                                                         "password": f"password-{idx}"})
+        for idx in range(users)
+    }
+    secrets[get_auth_token_secret_name("dev-cluster")] = json.dumps({"token": "token-1"})
+    return InMemoryBackend(secrets, batch_size=batch_size)
+
+
+def test_secret_names():
+    assert get_user_secret_name("dev-cluster", "user-name-1") == "/elasticache/dev-cluster/user-name-1"
+    assert get_auth_token_secret_name("dev-cluster") == "/elasticache/dev-cluster/auth-token"
+
+
+def test_users_are_fetched_in_batches():
+    backend = get_backend()
+    cache = CredentialCache(backend, background_refresh=False)
+
+    users = cache.get_users("dev-cluster", [f"tenant-{idx}" for idx in range(45)])
+    assert users["tenant-44"].password == "password-44"
+    assert [len(batch) for batch in backend.batches] == [20, 20, 5]
+
+    assert cache.get_user("dev-cluster", "tenant-3").user_name == "tenant-3"
+    assert cache.get_auth_token("dev-cluster") == "token-1"
+    assert len(backend.batches) == 4
+
+
+def test_refresh_ahead_and_expiry():
+    backend = get_backend(users=1)
+    clock = Clock()
+    cache = CredentialCache(backend, ttl=300, refresh_ahead=60, background_refresh=False, clock=clock)
+    cache.get_auth_token("dev-cluster")
+
+    # Within the refresh window the cached token is served and a refresh is scheduled
+    clock.now = 271
+    backend.secrets[get_auth_token_secret_name("dev-cluster")] = json.dumps({"token": "token-2"})
+    assert cache.get_auth_token("dev-cluster") == "token-1"
+    assert len(backend.batches) == 1
+    assert cache.refresh_pending() == 1
+    assert cache.get_auth_token("dev-cluster") == "token-2"
+
+    # Past the expiry the token is fetched before it is returned
+    clock.now = 271 + 301
+    backend.secrets[get_auth_token_secret_name("dev-cluster")] = json.dumps({"token": "token-3"})
+    assert cache.get_auth_token("dev-cluster") == "token-3"
+
+
+def test_failed_refresh_serves_cached_value():
+    backend = get_backend(users=1)
+    clock = Clock()
+    cache = CredentialCache(backend, ttl=300, refresh_ahead=60, background_refresh=False, clock=clock)
+    cache.get_auth_token("dev-cluster")
+
+    clock.now = 280
+    backend.secrets.clear()
+    assert cache.get_auth_token("dev-cluster") == "token-1"
+    assert cache.refresh_pending() == 0
+    assert cache.get_auth_token("dev-cluster") == "token-1"
+
+    clock.now = 301
+    with pytest.raises(CredentialError) as error:
+        cache.get_auth_token("dev-cluster")
+    assert "/elasticache/dev-cluster/auth-token" in str(error.value)
+
+
+def test_background_refresh():
+    refreshed = threading.Event()
+
+    class Backend(InMemoryBackend):
+        def fetch_batch(self, secret_ids):
+            if self.batches:
+                refreshed.set()
+            return super().fetch_batch(secret_ids)
+
+    backend = Backend(get_backend(users=1).secrets)
+    clock = Clock()
+    cache = CredentialCache(backend, ttl=300, refresh_ahead=60, clock=clock)
+    try:
+        cache.get_auth_token("dev-cluster")
+        clock.now = 290
+        cache.get_auth_token("dev-cluster")
+        assert refreshed.wait(5)
+    finally:
+        cache.close()
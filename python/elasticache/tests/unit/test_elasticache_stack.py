@@ -1,27 +1,13 @@
+import json
+
 import pytest
 from aws_cdk import core
 
 from config.default import default
 from config.config import config
-from config import config_util as configUtil
-from cache.elasticache_stack import ElastiCacheStack
-
-
-@pytest.fixture
-def app():
-    return core.App()
-
-
-@pytest.fixture
-def env():
-    return core.Environment(account='123456789012', region='us-east-2')
-
-
-@pytest.fixture
-def stack(app, env):
-    stack_name = config['stack_name'].lower()
-    stack_description = "CDK Managed CF template for deploying ElastiCache."
-    return ElastiCacheStack(app, stack_name, env=env, description=stack_description)
+from config import config_model, config_util as configUtil
+from cache import elasticache_monitoring
+from cache.helper import log_delivery_stream, log_group, parameter_group, topology
 
 
 def test_synth(stack):
@@ -30,123 +16,386 @@ def test_synth(stack):
     assert core.ConstructNode.validate(stack.node) == []
 
 
-def test_security_group(stack):
-    template = core.ConstructNode.synth(stack.node).stacks[0].template
-    resources = template["Resources"]
+def test_security_group(template):
+    security_group = template.resource("ElastiCacheSecurityGroup")
+    assert security_group["Type"] == "AWS::EC2::SecurityGroup"
 
-    def start_with(x):
-        return x[0].startswith("ElastiCacheSecurityGroup")
 
-    security_group = list(filter(start_with, resources.items()))[0][1]
-    assert security_group["Type"] == "AWS::EC2::SecurityGroup"
+def test_subnet_group(template):
+    subnet_group = template.resource("ElastiCacheSubnetGroup")
+    assert subnet_group["Type"] == "AWS::ElastiCache::SubnetGroup"
 
 
-def test_subnet_group(stack):
-    template = core.ConstructNode.synth(stack.node).stacks[0].template
-    resources = template["Resources"]
+def test_parameter_group(template):
+    parameter_group = template.resources("ElastiCacheParameterGroup")
+    if config.get('parameter_group', None) is None:
+        assert len(parameter_group) == 0
+    else:
+        parameter_group = parameter_group[0]
+        assert parameter_group["Type"] == "AWS::ElastiCache::ParameterGroup"
+        assert parameter_group["Properties"]["CacheParameterGroupFamily"] == configUtil.get_parameter_group_family()
+        assert parameter_group["Properties"]["Properties"]["maxmemory-policy"] is not None
+        if configUtil.get_num_node_groups() > 1:
+            assert parameter_group["Properties"]["Properties"]["cluster-enabled"] == "yes"
 
-    def start_with(x):
-        return x[0].startswith("ElastiCacheSubnetGroup")
 
-    subnet_group = list(filter(start_with, resources.items()))[0][1]
-    assert subnet_group["Type"] == "AWS::ElastiCache::SubnetGroup"
+def test_parameter_group_family(synth_stack):
+    _, template = synth_stack("redis7-stack", engine_version="7.1", parameter_group={"profile": "low-latency"})
+    assert template.resource("ElastiCacheParameterGroup")["Properties"]["CacheParameterGroupFamily"] == "redis7"
 
+    with pytest.raises(ValueError) as error:
+        configUtil.load(dict(config, engine_version="7.1"))
+    assert "'parameter_group.family' 'redis6.x' does not match the engine version '7.1', expected 'redis7'" in \
+        str(error.value)
 
-def test_parameter_group(stack):
-    template = core.ConstructNode.synth(stack.node).stacks[0].template
-    resources = template["Resources"]
 
-    def start_with(x):
-        return x[0].startswith("ElastiCacheParameterGroup")
+def test_parameter_group_profiles():
+    for profile in parameter_group.PROFILES:
+        parameters = parameter_group.get_parameters(profile, overrides={"timeout": 30})
+        for name in ("maxmemory-policy", "activedefrag", "lazyfree-lazy-eviction", "tcp-keepalive",
+                     "slowlog-log-slower-than", "client-output-buffer-limit-normal-hard-limit"):
+            assert name in parameters
+        assert parameters["timeout"] == "30"
+        assert "cluster-enabled" not in parameters
 
-    parameter_group = list(filter(start_with, resources.items()))
-    assert len(parameter_group) == 0
+    with pytest.raises(ValueError):
+        parameter_group.get_parameters("unknown-profile")
 
 
-def test_slow_log_group(stack):
+def test_slow_log_group(stack, template):
     if config.get('engine_version', default['engine_version']) != "6.x":
         assert True
     else:
-        template = core.ConstructNode.synth(stack.node).stacks[0].template
-        resources = template["Resources"]
-
-        def start_with(x):
-            return x[0].startswith("ElastiCacheCloudWatchLogGroup")
-
-        slowlogGroup = list(filter(start_with, resources.items()))[0][1]
+        slowlogGroup = template.resource("ElastiCacheCloudWatchLogGroup")
         assert slowlogGroup["Type"] == "AWS::Logs::LogGroup"
         assert slowlogGroup["Properties"]["LogGroupName"] == f"/aws/elasticache/redis-slowlog/{stack.cluster_name}"
 
 
-def test_user(stack):
+def test_user(template):
     if config.get('engine_version', default['engine_version']) != "6.x":
         assert True
     else:
-        template = core.ConstructNode.synth(stack.node).stacks[0].template
-        resources = template["Resources"]
-
-        def start_with(x):
-            return x[0].startswith("ElastiCacheRedisUser")
-
-        redis_user = list(filter(start_with, resources.items()))[0][1]
+        redis_user = template.resource("ElastiCacheRedisUser")
 
         assert redis_user["Type"] == "AWS::ElastiCache::User"
         assert redis_user["Properties"]["UserName"] == config["secrets"]["users"][0]["user_name"]
 
 
-def test_user_group(stack):
+def test_user_group(template):
     if config.get('engine_version', default['engine_version']) != "6.x":
         assert True
     else:
-        template = core.ConstructNode.synth(stack.node).stacks[0].template
-        resources = template["Resources"]
-
-        def start_with(x):
-            return x[0].startswith("ElastiCacheRedisUserGroup")
-
-        user_group = list(filter(start_with, resources.items()))[0][1]
+        user_group = template.resource("ElastiCacheRedisUserGroup")
 
         assert user_group["Type"] == "AWS::ElastiCache::UserGroup"
         assert user_group["Properties"]["UserIds"][0] == "default"
 
 
-def test_node_group(stack):
-    template = core.ConstructNode.synth(stack.node).stacks[0].template
-    resources = template["Resources"]
+def test_users_by_engine_version(synth_stack):
+    # The parameter group takes the family of the engine version
+    parameter_group = {"profile": "low-latency"}
+    for engine_version in ("6.2", "7.0"):
+        _, template = synth_stack(f"rbac-{engine_version.replace('.', '-')}-stack", engine_version=engine_version,
+                                  parameter_group=parameter_group)
+        assert len(template.of_type("AWS::ElastiCache::User")) == len(config["secrets"]["users"])
+        assert template.of_type("AWS::ElastiCache::UserGroup")
+
+    _, template = synth_stack("auth-token-stack", engine_version="5.0.6", parameter_group=parameter_group)
+    assert not template.of_type("AWS::ElastiCache::User")
+    assert not template.of_type("AWS::ElastiCache::UserGroup")
 
-    def start_with(x):
-        return x[0].startswith("ElastiCacheReplicationGroup")
 
-    replication_group = list(filter(start_with, resources.items()))[0][1]
+def test_node_group(template):
+    replication_group = template.resource("ElastiCacheReplicationGroup")
 
     assert replication_group["Type"] == "AWS::ElastiCache::ReplicationGroup"
     assert replication_group["Properties"]["NumNodeGroups"] >= 2
 
 
-def test_replication_group(stack):
-    template = core.ConstructNode.synth(stack.node).stacks[0].template
-    resources = template["Resources"]
-
-    def start_with(x):
-        return x[0].startswith("ElastiCacheReplicationGroup")
-
-    replication_group = list(filter(start_with, resources.items()))[0][1]
+def test_replication_group(template):
+    replication_group = template.resource("ElastiCacheReplicationGroup")
 
     assert replication_group["Type"] == "AWS::ElastiCache::ReplicationGroup"
     assert replication_group["Properties"]["Engine"] == "redis"
     assert replication_group["Properties"]["EngineVersion"] == config["engine_version"]
 
 
-def test_snap_shot(stack):
-    template = core.ConstructNode.synth(stack.node).stacks[0].template
-    resources = template["Resources"]
-
-    def start_with(x):
-        return x[0].startswith("ElastiCacheReplicationGroup")
-
-    replication_group = list(filter(start_with, resources.items()))[0][1]
+def test_snap_shot(template):
+    replication_group = template.resource("ElastiCacheReplicationGroup")
 
     assert replication_group["Type"] == "AWS::ElastiCache::ReplicationGroup"
     assert replication_group["Properties"]["SnapshotWindow"] == config.get('snapshot_window', None)
     assert replication_group["Properties"]["SnapshotRetentionLimit"] == config.get('snapshot_retention_limit',
                                                                                    default['snapshot_retention_limit'])
+
+
+def test_sizing_plan(synth_stack):
+    stack, template = synth_stack("sizing-stack", workload={
+        "dataset_size_gb": 200,
+        "peak_read_ops": 200000,
+        "peak_write_ops": 50000,
+        "avg_value_size_bytes": 1024,
+        "target_p99_latency_ms": 2
+    })
+    replication_group = template.resource("ElastiCacheReplicationGroup")
+
+    assert replication_group["Properties"]["CacheNodeType"] == stack.sizing_plan.node_type
+    assert replication_group["Properties"]["NumNodeGroups"] == stack.sizing_plan.num_node_groups
+    assert replication_group["Properties"]["ReplicasPerNodeGroup"] == stack.sizing_plan.replicas_per_node_group
+    assert "outputsizingheadroom" in template.outputs
+
+
+def test_data_tiering(synth_stack):
+    stack, template = synth_stack("data-tiering-stack", engine_version="6.2", data_tiering_enabled=True,
+                                  parameter_group={"family": "redis6.x", "profile": "low-latency"}, workload={
+        "dataset_size_gb": 2000,
+        "peak_read_ops": 100000,
+        "peak_write_ops": 20000,
+        "avg_value_size_bytes": 1024,
+        "target_p99_latency_ms": 5,
+        "hot_set_fraction": 0.1
+    })
+    replication_group = template.resource("ElastiCacheReplicationGroup")
+
+    assert replication_group["Properties"]["CacheNodeType"].startswith("cache.r6gd.")
+    assert replication_group["Properties"]["DataTieringEnabled"] is True
+
+    with pytest.raises(ValueError):
+        parameter_group.get_parameters("low-latency", overrides={"maxmemory-policy": "allkeys-lfu"},
+                                       data_tiering=True)
+
+
+def test_autoscaling(synth_stack):
+    _, template = synth_stack("autoscaling-stack", node_type="cache.r6g.large", autoscaling={
+        "enabled": True,
+        "node_groups": {"min_capacity": 2, "max_capacity": 10},
+        "replicas": {"min_capacity": 1, "max_capacity": 5, "target_engine_cpu": 50}
+    })
+
+    scalable_targets = template.of_type("AWS::ApplicationAutoScaling::ScalableTarget")
+    dimensions = sorted(target["Properties"]["ScalableDimension"] for target in scalable_targets)
+    assert dimensions == ["elasticache:replication-group:NodeGroups", "elasticache:replication-group:Replicas"]
+
+    policies = template.of_type("AWS::ApplicationAutoScaling::ScalingPolicy")
+    metrics = sorted(
+        policy["Properties"]["TargetTrackingScalingPolicyConfiguration"]["PredefinedMetricSpecification"][
+            "PredefinedMetricType"] for policy in policies
+    )
+    assert metrics == ["ElastiCacheDatabaseMemoryUsageCountedForEvictPercentage",
+                       "ElastiCachePrimaryEngineCPUUtilization",
+                       "ElastiCacheReplicaEngineCPUUtilization"]
+
+
+def test_autoscaling_unsupported_node_type(synth_stack):
+    with pytest.raises(ValueError):
+        synth_stack("autoscaling-stack", node_type="cache.t3.small", autoscaling={
+            "enabled": True,
+            "node_groups": {"min_capacity": 2, "max_capacity": 10}
+        })
+
+
+def test_monitoring(synth_stack, nested_template, stack):
+    assert stack.monitoring is None
+
+    stack, template = synth_stack("monitoring-stack", monitoring=dict(config["monitoring"], enabled=True))
+    assert len(template.of_type("AWS::CloudFormation::Stack")) == 1
+    assert not template.of_type("AWS::CloudWatch::Alarm")
+    monitoring = nested_template(stack.monitoring)
+
+    dashboards = monitoring.of_type("AWS::CloudWatch::Dashboard")
+    assert len(dashboards) == 1
+
+    topics = monitoring.of_type("AWS::SNS::Topic")
+    assert len(topics) == 1
+
+    # An alarm per node group and metric, watching the worst of the member nodes
+    alarms = monitoring.of_type("AWS::CloudWatch::Alarm")
+    assert len(alarms) == stack.num_node_groups * len(elasticache_monitoring.ALARMS)
+    for alarm in alarms:
+        metrics = alarm["Properties"]["Metrics"]
+        expression = metrics[0]["Expression"]
+        nodes = [metric["MetricStat"]["Metric"]["Dimensions"][0]["Value"] for metric in metrics[1:]]
+        if alarm["Properties"]["AlarmName"].endswith("-ReplicationLag"):
+            assert len(nodes) == stack.replicas_per_node_group
+        else:
+            assert len(nodes) == stack.replicas_per_node_group + 1
+        assert expression.startswith("MIN(" if alarm["Properties"]["AlarmName"].endswith("-CacheHitRate") else "MAX(")
+
+
+def test_monitoring_shard_count(synth_stack, nested_template):
+    monitoring_config = dict(config["monitoring"], enabled=True)
+    stack, template = synth_stack("monitoring-shards-stack", num_node_groups=45, replicas_per_node_group=2,
+                                  monitoring=monitoring_config)
+    assert len(template.resources_by_id) < config_model.MAX_TEMPLATE_RESOURCES
+    monitoring = nested_template(stack.monitoring)
+    assert len(monitoring.of_type("AWS::CloudWatch::Alarm")) == 45 * len(elasticache_monitoring.ALARMS)
+    assert len(monitoring.resources_by_id) <= config_model.MAX_TEMPLATE_RESOURCES
+
+    with pytest.raises(ValueError) as error:
+        configUtil.load(dict(config, num_node_groups=50, replicas_per_node_group=2, monitoring=monitoring_config))
+    assert "'monitoring' needs 502 resources for 50 node groups" in str(error.value)
+
+
+def test_node_group_topology():
+    cluster_mode = topology.get_node_groups("my-cluster", 2, 1)
+    assert [node_group.nodes for node_group in cluster_mode] == [
+        ["my-cluster-0001-001", "my-cluster-0001-002"],
+        ["my-cluster-0002-001", "my-cluster-0002-002"]
+    ]
+
+    cluster_mode_disabled = topology.get_node_groups("my-cluster", 1, 2)
+    assert cluster_mode_disabled[0].primary == "my-cluster-001"
+    assert cluster_mode_disabled[0].replicas == ["my-cluster-002", "my-cluster-003"]
+
+
+def test_slow_log_analytics(synth_stack, template):
+    assert not template.of_type("AWS::Logs::SubscriptionFilter")
+
+    _, template = synth_stack("slowlog-analytics-stack",
+                              slowlog_analytics=dict(config["slowlog_analytics"], enabled=True))
+    subscription_filters = template.of_type("AWS::Logs::SubscriptionFilter")
+    assert len(subscription_filters) == 1
+
+    handlers = sorted(r["Properties"]["Handler"] for r in template.of_type("AWS::Lambda::Function"))
+    assert handlers == ["slowlog.handler.handler", "slowlog.handler.report_handler"]
+
+
+def test_log_delivery_engine_version():
+    assert log_group.supports_log_delivery("6.x", "engine-log")
+    assert log_group.supports_log_delivery("6.0", "slow-log")
+    assert not log_group.supports_log_delivery("6.0", "engine-log")
+    assert not log_group.supports_log_delivery("5.0.6", "slow-log")
+    assert log_group.supports_log_delivery("7", "engine-log")
+    assert log_group.supports_log_delivery("6.2.6", "engine-log")
+
+    with pytest.raises(ValueError):
+        log_group.supports_log_delivery("6.x", "audit-log")
+
+
+def test_log_delivery_firehose(synth_stack):
+    stack, template = synth_stack("log-delivery-stack", engine_version="6.x", log_delivery={
+        "slow-log": {"destination": "kinesis-firehose", "format": "parquet"},
+        "engine-log": {"destination": "kinesis-firehose", "format": "gzip-json"}
+    })
+
+    replication_group = template.resource("ElastiCacheReplicationGroup")
+    log_delivery = replication_group["Properties"]["LogDeliveryConfigurations"]
+    assert sorted(request["LogType"] for request in log_delivery) == ["engine-log", "slow-log"]
+    for request in log_delivery:
+        assert request["DestinationType"] == "kinesis-firehose"
+        assert "KinesisFirehoseDetails" in request["DestinationDetails"]
+
+    streams = {r["Properties"]["DeliveryStreamName"]: r["Properties"]["ExtendedS3DestinationConfiguration"]
+               for r in template.of_type("AWS::KinesisFirehose::DeliveryStream")}
+    slowlog_stream = streams[f"elasticache-{stack.cluster_name}-slow-log"]
+    enginelog_stream = streams[f"elasticache-{stack.cluster_name}-engine-log"]
+    assert slowlog_stream["CompressionFormat"] == "UNCOMPRESSED"
+    assert slowlog_stream["DataFormatConversionConfiguration"]["Enabled"]
+    assert slowlog_stream["BufferingHints"]["SizeInMBs"] >= log_delivery_stream.PARQUET_MIN_BUFFER_SIZE_MB
+    assert enginelog_stream["CompressionFormat"] == "GZIP"
+    assert "DataFormatConversionConfiguration" not in enginelog_stream
+
+    assert len(template.of_type("AWS::S3::Bucket")) == 1
+    assert len(template.of_type("AWS::Glue::Table")) == 1
+    # Without a slow-log CloudWatch log group there is nothing to subscribe the analytics pipeline to
+    assert not template.of_type("AWS::Logs::SubscriptionFilter")
+
+
+def test_log_delivery_unsupported_engine_version(synth_stack):
+    _, template = synth_stack("log-delivery-stack", engine_version="5.0.6", parameter_group={"profile": "low-latency"})
+
+    replication_group = template.resource("ElastiCacheReplicationGroup")
+    assert "LogDeliveryConfigurations" not in replication_group["Properties"]
+
+
+def test_synth_cache(synth_stack, stack, template):
+    assert synth_stack() == (stack, template)
+    assert synth_stack(node_type="cache.r6g.large")[0] is not stack
+    assert template.items("ElastiCacheReplicationGroup")[0][0].startswith("ElastiCacheReplicationGroup")
+    assert template.resources("NoSuchLogicalIdPrefix") == []
+
+
+def test_bulk_tenant_users(synth_stack):
+    secrets = dict(config["secrets"], cmk=True, users_per_stack=2,
+                   tenants=[{"id": f"tenant{idx}"} for idx in range(5)])
+    stack, template = synth_stack("bulk-users-stack", engine_version="6.x", secrets=secrets)
+
+    users = len(config["secrets"]["users"]) + 5
+    assert len(stack.user_stacks) == (users + 1) // 2
+    assert len(template.of_type("AWS::CloudFormation::Stack")) == len(stack.user_stacks)
+    assert not template.of_type("AWS::ElastiCache::User")
+    # One CMK for all the user secrets instead of one per secret
+    assert len(template.of_type("AWS::KMS::Key")) == 1
+
+    user_group = template.resource("ElastiCacheRedisUserGroup")
+    assert user_group["Properties"]["UserIds"][-1] == "tenant-tenant4"
+    assert len(user_group["Properties"]["UserIds"]) == users + 1
+
+    replication_group = template.resource("ElastiCacheReplicationGroup")
+    assert replication_group["Properties"]["UserGroupIds"] == [secrets["user_group_id"]]
+    assert "outputusersecretprefix" in template.outputs
+
+
+def test_slot_ranges():
+    assert topology.get_slot_ranges(1) == [(0, 16383)]
+    assert topology.get_slot_ranges(3) == [(0, 5461), (5462, 10922), (10923, 16383)]
+    ranges = topology.get_slot_ranges(500)
+    assert ranges[-1][1] == 16383
+    assert all(previous[1] + 1 == current[0] for previous, current in zip(ranges, ranges[1:]))
+
+
+def test_endpoint_outputs(synth_stack):
+    _, template = synth_stack("endpoints-stack", num_node_groups=1)
+    assert template.outputs["outputendpoint"]["Value"]["Fn::GetAtt"][1] == "PrimaryEndPoint.Address"
+    assert template.outputs["outputreaderendpoint"]["Value"]["Fn::GetAtt"][1] == "ReaderEndPoint.Address"
+    assert not [name for name in template.outputs if name.startswith("outputnodegroup")]
+
+    _, template = synth_stack("endpoints-cluster-stack", num_node_groups=3, replicas_per_node_group=2)
+    assert template.outputs["outputendpoint"]["Value"]["Fn::GetAtt"][1] == "ConfigurationEndPoint.Address"
+    node_group = json.dumps(template.outputs["outputnodegroup0001"]["Value"])
+    assert "slots=0-5461;primary=" in node_group
+    assert "-0001-001" in node_group and "-0001-003" in node_group
+
+    [parameter] = template.resources("ElastiCacheTopologyParameter")
+    assert parameter["Properties"]["Name"].endswith("/topology")
+    assert parameter["Properties"]["Tier"] == "Standard"
+
+
+def test_topology_pages():
+    node_groups = topology.get_node_groups("my-cluster", 300, 1)
+    node_group_slots = topology.get_node_group_slots(None, 300)
+    documents = topology.get_topology_documents(node_groups, node_group_slots, {"port": 6379})
+
+    assert documents[0]["pages"] == len(documents) - 1 > 1
+    assert [entry["id"] for page in documents[1:] for entry in page["node_groups"]] == \
+        [node_group.node_group_id for node_group in node_groups]
+    assert all(topology.get_document_bytes(document) <= topology.MAX_DOCUMENT_BYTES for document in documents)
+
+
+def test_serverless(synth_stack):
+    _, provisioned = synth_stack("endpoints-stack", num_node_groups=1)
+    _, template = synth_stack(
+        "serverless-stack", deployment_mode="serverless", engine_version="7.1", parameter_group=None,
+        log_delivery={},
+        cache_usage_limits={"data_storage": {"maximum": 100}, "ecpu_per_second": {"minimum": 1000, "maximum": 50000}}
+    )
+
+    [cache] = template.of_type("AWS::ElastiCache::ServerlessCache")
+    properties = cache["Properties"]
+    assert properties["MajorEngineVersion"] == "7"
+    assert properties["CacheUsageLimits"] == {"DataStorage": {"Maximum": 100, "Unit": "GB"},
+                                              "ECPUPerSecond": {"Minimum": 1000, "Maximum": 50000}}
+    assert properties["SubnetIds"] == config["subnet_ids"]
+    assert properties["UserGroupId"] == config["secrets"]["user_group_id"]
+    assert "KmsKeyId" in properties and "DailySnapshotTime" in properties
+    assert not template.of_type("AWS::ElastiCache::ReplicationGroup")
+    assert not template.of_type("AWS::ElastiCache::SubnetGroup")
+    assert len(template.of_type("AWS::ElastiCache::User")) == len(config["secrets"]["users"])
+
+    # The clients read the same outputs in both modes
+    assert set(template.outputs) == set(provisioned.outputs)
+    assert template.outputs["outputendpoint"]["Value"]["Fn::GetAtt"][1] == "Endpoint.Address"
+    assert template.outputs["outputreaderportnumber"]["Value"]["Fn::GetAtt"][1] == "ReaderEndpoint.Port"
+    ingress = template.resource("ElastiCacheSecurityGroup")["Properties"]["SecurityGroupIngress"]
+    ports = {rule["FromPort"] for rule in ingress}
+    assert ports == {6379, 6380}
@@ -0,0 +1,98 @@
+import json
+import os
+
+import pytest
+from aws_cdk import core
+
+import fleet_synth
+from config.config import config
+from config import config_util
+from cache.helper import fleet
+
+ACCOUNT = "123456789012"
+
+
+def fleet_entries():
+    return [
+        {"account_id": ACCOUNT, "region": "us-east-1", "cluster_name": "orders", "num_node_groups": 3},
+        {"account_id": ACCOUNT, "region": "us-east-1", "cluster_name": "sessions", "num_node_groups": 1},
+        {"account_id": ACCOUNT, "region": "eu-west-1", "cluster_name": "orders"},
+    ]
+
+
+def test_fleet_shares_kms_key_per_account_region():
+    app = core.App()
+    stacks = fleet.create_fleet(app, config_util.load_fleet(fleet_entries()))
+    assembly = core.ConstructNode.synth(app.node)
+
+    assert [stack.cluster_name for stack in stacks] == ["dev-orders", "dev-sessions", "dev-orders"]
+    shared = [stack for stack in assembly.stacks if stack.stack_name.startswith("elasticache-shared-")]
+    assert sorted(stack.stack_name for stack in shared) == [
+        f"elasticache-shared-{ACCOUNT}-eu-west-1", f"elasticache-shared-{ACCOUNT}-us-east-1"
+    ]
+    for stack in shared:
+        keys = [r for r in stack.template["Resources"].values() if r["Type"] == "AWS::KMS::Key"]
+        assert len(keys) == 1
+
+    for stack in stacks:
+        resources = assembly.get_stack_artifact(stack.artifact_id).template["Resources"]
+        assert not [r for r in resources.values() if r["Type"] == "AWS::KMS::Key"]
+        secrets = [r for r in resources.values() if r["Type"] == "AWS::SecretsManager::Secret"]
+        assert secrets
+        for secret in secrets:
+            assert "Fn::ImportValue" in secret["Properties"]["KmsKeyId"]
+
+
+def test_fleet_key_grants_go_to_the_principals():
+    warm_up = {"enabled": True, "manifest_bucket": "manifests", "manifest_key": "hot-keys.jsonl",
+               "user_name": "user-name-2"}
+    entries = [{"account_id": ACCOUNT, "region": "us-east-1", "cluster_name": "orders", "warm_up": warm_up}]
+    app = core.App()
+    [stack] = fleet.create_fleet(app, config_util.load_fleet(entries))
+    assembly = core.ConstructNode.synth(app.node)
+
+    [shared] = [stack for stack in assembly.stacks if stack.stack_name.startswith("elasticache-shared-")]
+    [key] = [r for r in shared.template["Resources"].values() if r["Type"] == "AWS::KMS::Key"]
+    assert "kms:*" in json.dumps(key["Properties"]["KeyPolicy"])
+    # The warm-up reads the user secret, encrypted with the fleet key
+    policies = [r for r in assembly.get_stack_artifact(stack.artifact_id).template["Resources"].values()
+                if r["Type"] == "AWS::IAM::Policy"]
+    statements = [statement for policy in policies for statement in policy["Properties"]["PolicyDocument"]["Statement"]
+                  if "kms:Decrypt" in statement["Action"]]
+    assert [statement for statement in statements if "Fn::ImportValue" in statement["Resource"]]
+
+
+def test_fleet_rejects_duplicate_clusters():
+    entries = fleet_entries() + [{"account_id": ACCOUNT, "region": "us-east-1", "cluster_name": "Orders"}]
+
+    with pytest.raises(ValueError) as error:
+        fleet.create_fleet(core.App(), config_util.load_fleet(entries))
+
+    assert "duplicate cluster 'dev-orders'" in str(error.value)
+
+
+def test_fleet_partition_is_balanced():
+    entries = [{"cluster_name": f"cluster-{idx}", "num_node_groups": 1 + idx % 4} for idx in range(10)]
+    cache_configs = config_util.load_fleet(entries)
+
+    partitions = fleet.partition(cache_configs, 3)
+
+    weights = [sum(fleet.get_weight(item) for item in items) for items in partitions]
+    assert len(partitions) == 3
+    assert sum(len(items) for items in partitions) == 10
+    assert max(weights) - min(weights) <= max(fleet.get_weight(item) for item in cache_configs)
+    assert len(fleet.partition(cache_configs[:2], 8)) == 2
+
+
+def test_parallel_synth(tmp_path):
+    results = fleet_synth.synth_fleet(fleet_entries(), workers=2, outdir=str(tmp_path), context={})
+
+    assert len(results) == 2
+    assert sorted(stack for result in results for stack in result["stacks"]) == sorted(
+        f"{config['stack_name']}-dev-{name}".lower() for name in ("orders", "sessions", "orders")
+    )
+    for result in results:
+        manifest = os.path.join(result["outdir"], "manifest.json")
+        assert os.path.exists(manifest)
+        # Every partition looks up the same VPC
+        assert all(key.startswith("vpc-provider:") for key in result["missing_context"])
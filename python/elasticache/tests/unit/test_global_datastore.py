@@ -0,0 +1,104 @@
+import json
+
+import pytest
+from aws_cdk import core
+
+from config.config import config
+from config import config_util
+from cache.elasticache_stack import ElastiCacheStack
+from cache.helper import fleet, global_datastore
+
+ACCOUNT = "123456789012"
+
+
+def global_config(**overrides):
+    return dict(config, **dict({"engine_version": "6.2", "node_type": "cache.r6g.large", "global_datastore": {
+        "regions": [
+            {"region": "us-west-2", "vpc_id": "vpc-west", "subnet_ids": ["subnet-west-1", "subnet-west-2"]},
+            {"region": "eu-west-1", "vpc_id": "vpc-eu", "subnet_ids": ["subnet-eu-1"], "replicas_per_node_group": 2}
+        ]
+    }}, **overrides))
+
+
+def test_global_datastore():
+    app = core.App()
+    cache_config = config_util.load(global_config())
+    primary = ElastiCacheStack(app, "global-stack", cache_config=cache_config,
+                               env=core.Environment(account=ACCOUNT, region="us-east-1"))
+    secondaries = fleet.create_secondaries(app, primary, "global-stack")
+    assembly = app.synth()
+
+    template = assembly.get_stack_by_name("global-stack").template
+    resources = template["Resources"].values()
+    [global_group] = [r for r in resources if r["Type"] == "AWS::ElastiCache::GlobalReplicationGroup"]
+    assert global_group["Properties"]["Members"][0]["Role"] == "PRIMARY"
+    parameters = [r["Properties"]["Name"] for r in resources if r["Type"] == "AWS::SSM::Parameter"]
+    assert global_datastore.get_parameter_name(primary.cluster_name) in parameters
+    assert "outputreaderendpoint" in template["Outputs"]
+
+    assert [stack.region for stack in secondaries] == ["us-west-2", "eu-west-1"]
+    for stack, replicas in zip(secondaries, (cache_config.replicas_per_node_group, 2)):
+        assert primary in stack.dependencies
+        template = assembly.get_stack_by_name(f"global-stack-{stack.region}").template
+        resources = template["Resources"].values()
+        [cluster] = [r for r in resources if r["Type"] == "AWS::ElastiCache::ReplicationGroup"]
+        assert "GlobalReplicationGroupId" in cluster["Properties"]
+        assert "CacheNodeType" not in cluster["Properties"]
+        assert "AuthToken" not in cluster["Properties"]
+        assert cluster["Properties"]["ReplicasPerNodeGroup"] == replicas
+        # The id is read from the parameter in the primary region
+        [reader] = [r for r in resources if r["Type"] == "Custom::AWS"]
+        assert json.loads(reader["Properties"]["Create"])["region"] == "us-east-1"
+        assert [r for r in resources if r["Type"] == "AWS::ElastiCache::SubnetGroup"]
+        assert [r for r in resources if r["Type"] == "AWS::EC2::SecurityGroup"]
+        assert "outputreaderendpoint" in template["Outputs"]
+
+
+def test_global_datastore_is_validated():
+    data = global_config(engine_version="5.0.5", node_type="cache.t3.small", region="us-west-2")
+    data["global_datastore"]["regions"].append({"region": "ap-south-1"})
+
+    with pytest.raises(ValueError) as error:
+        config_util.load(data)
+
+    message = str(error.value)
+    assert "region 'us-west-2' appears twice in the global datastore" in message
+    assert "missing key 'global_datastore.regions[2].vpc_id'" in message
+    assert "'global_datastore' needs Redis 5.0.6 or later" in message
+    assert "burstable node type 'cache.t3.small'" in message
+
+
+def test_sizing_skips_burstable_node_types():
+    workload = {"dataset_size_gb": 0.1, "peak_read_ops": 1000, "peak_write_ops": 100, "target_p99_latency_ms": 5}
+    primary = ElastiCacheStack(core.App(), "small-global-stack", cache_config=config_util.load(global_config(
+        workload=workload
+    )), env=core.Environment(account=ACCOUNT, region="us-east-1"))
+    assert not primary.sizing_plan.node_type.startswith(("cache.t3.", "cache.t4g."))
+
+    # The node type of the config is checked even though the sizing picks the node type
+    with pytest.raises(ValueError) as error:
+        config_util.load(global_config(workload=dict(workload, node_types=["cache.t4g.micro"]),
+                                       node_type="cache.t3.small"))
+    message = str(error.value)
+    assert "burstable node type 'cache.t3.small'" in message
+    assert "burstable node type 'cache.t4g.micro' of 'workload.node_types'" in message
+
+
+def test_secondaries_skip_the_sizing_plan():
+    app = core.App()
+    cache_config = config_util.load(global_config(workload={
+        "dataset_size_gb": 200,
+        "peak_read_ops": 200000,
+        "peak_write_ops": 50000,
+        "avg_value_size_bytes": 1024,
+        "target_p99_latency_ms": 2,
+        "min_replicas": 3
+    }))
+    primary = ElastiCacheStack(app, "sized-global-stack", cache_config=cache_config,
+                               env=core.Environment(account=ACCOUNT, region="us-east-1"))
+    secondaries = fleet.create_secondaries(app, primary, "sized-global-stack")
+
+    assert primary.sizing_plan is not None
+    for stack, replicas in zip(secondaries, (cache_config.replicas_per_node_group, 2)):
+        assert stack.sizing_plan is None
+        assert stack.replicas_per_node_group == replicas
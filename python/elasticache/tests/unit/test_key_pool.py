@@ -0,0 +1,76 @@
+import json
+
+import pytest
+from aws_cdk import core
+import aws_cdk.aws_iam as iam
+import aws_cdk.aws_kms as kms
+
+from config.config import config
+from cache.elasticache_key_pool import ElastiCacheKeyPool
+from cache.elasticache_secret import UserSecret
+
+
+def get_secrets(**overrides):
+    return dict(config["secrets"], cmk=True, **overrides)
+
+
+@pytest.mark.parametrize("key_scope", ["cluster", "secret-type", "secret"])
+def test_key_scope(synth_stack, key_scope):
+    _, template = synth_stack("key-pool-stack", secrets=get_secrets(kms_key_scope=key_scope))
+
+    keys = len(config["secrets"]["users"]) if key_scope == "secret" else 1
+    assert len(template.of_type("AWS::KMS::Key")) == keys
+    key_ids = {secret["Properties"]["KmsKeyId"]["Fn::GetAtt"][0]
+               for secret in template.of_type("AWS::SecretsManager::Secret")}
+    assert len(key_ids) == keys
+
+
+def test_unknown_key_scope(synth_stack):
+    with pytest.raises(ValueError):
+        synth_stack("key-pool-stack", secrets=get_secrets(kms_key_scope="user"))
+
+
+def test_grant_once_per_principal():
+    app = core.App()
+    stack = core.Stack(app, "key-pool-grant-stack")
+    key_pool = ElastiCacheKeyPool(stack, "KeyPool", cluster_name="my-cluster")
+    # A principal granted before the key is created is granted on the key as well
+    key_pool.grant(iam.AccountPrincipal("111122223333"))
+    user_secrets = [
+        UserSecret(stack, f"UserSecret-{idx}", secret_name=f"/elasticache/my-cluster/user-{idx}",
+                   user_id=f"user-{idx}", user_name=f"user-{idx}", user_acl="on ~* +@all",
+                   cluster_name="my-cluster", cmk=True, key_pool=key_pool)
+        for idx in range(3)
+    ]
+    for user_secret in user_secrets:
+        user_secret.grant_kms_access(iam.AccountPrincipal("210987654321"))
+
+    assert len({id(user_secret.kms_key) for user_secret in user_secrets}) == 1
+    template = app.synth().get_stack_by_name("key-pool-grant-stack").template
+    keys = [r for r in template["Resources"].values() if r["Type"] == "AWS::KMS::Key"]
+    assert len(keys) == 1
+    statements = keys[0]["Properties"]["KeyPolicy"]["Statement"]
+    for account in ("111122223333", "210987654321"):
+        assert len([statement for statement in statements if account in json.dumps(statement["Principal"])]) == 1
+
+
+def test_imported_key_is_granted_in_the_principal_policy():
+    app = core.App()
+    stack = core.Stack(app, "key-pool-import-stack", env=core.Environment(account="123456789012", region="us-east-1"))
+    key_arn = "arn:aws:kms:us-east-1:123456789012:key/1234abcd-12ab-34cd-56ef-1234567890ab"
+    key_pool = ElastiCacheKeyPool(stack, "KeyPool", cluster_name="my-cluster",
+                                  kms_key=kms.Key.from_key_arn(stack, "FleetKey", key_arn))
+    role = iam.Role(stack, "Reader", assumed_by=iam.ServicePrincipal("lambda.amazonaws.com"))
+
+    # Every scope gets the key itself, not an alias
+    assert key_pool.get_key("cache", "my-cluster").key_arn == key_arn
+    key_pool.grant(role)
+    key_pool.grant(iam.AccountPrincipal("123456789012"))
+    with pytest.raises(ValueError):
+        key_pool.grant(iam.AccountPrincipal("210987654321"))
+
+    template = app.synth().get_stack_by_name("key-pool-import-stack").template
+    statements = [statement for r in template["Resources"].values() if r["Type"] == "AWS::IAM::Policy"
+                  for statement in r["Properties"]["PolicyDocument"]["Statement"]]
+    assert [statement for statement in statements
+            if statement["Resource"] == key_arn and "kms:Decrypt" in statement["Action"]]
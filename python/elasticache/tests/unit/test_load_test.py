@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+import pytest
+
+from benchmarks import load_test
+
+
+def test_variants_of_the_settings():
+    users = [{"user_name": "user-name-1", "user_acl": "on ~* +@all"},
+             {"user_name": "tenant-acme", "user_acl": "on ~tenant:acme:* -@all +@read"}]
+
+    assert [variant.name for variant in load_test.get_variants(True, users)] == ["plain", "tls", "acl", "tls+acl"]
+    assert [variant.name for variant in load_test.get_variants(False, [])] == ["plain"]
+    assert load_test.get_variants(False, users, "tenant-acme")[1].user == users[1]
+    with pytest.raises(ValueError):
+        load_test.get_variants(False, users, "unknown")
+
+    assert load_test.get_key_prefix("on ~tenant:acme:* -@all +@read") == "tenant:acme:"
+    assert load_test.get_key_prefix("on ~* +@all") == ""
+    assert load_test.get_key_prefix("on allkeys +@all") == ""
+
+
+def test_summary_percentiles():
+    summary = load_test.summarize([idx / 1000 for idx in range(1000, 0, -1)], operations=2000, errors=0, seconds=2)
+
+    assert summary["ops_per_second"] == 1000
+    assert (summary["p50_ms"], summary["p99_ms"], summary["p999_ms"]) == (500, 990, 999)
+
+
+def test_restrictive_acl_against_the_stand_in(stand_in_server):
+    server = stand_in_server(auth_tokens=["token-1"])
+    users = [{"user_name": "tenant-acme", "user_acl": "on ~tenant:acme:* -@all +@read +@write"},
+             {"user_name": "reader", "user_acl": "on ~tenant:acme:* -@all +@read"}]
+    target = load_test.Target(server.host, server.port, auth_token="token-1")
+    workload = load_test.Workload(requests=500, connections=2, pipeline=8, read_ratio=0.5, keyspace=50)
+
+    results = asyncio.run(load_test.run_load_test(
+        {False: target}, load_test.get_variants(False, users) + [load_test.Variant("read-only", False, users[1])],
+        users, workload
+    ))
+
+    plain, acl, read_only = results["variants"]
+    assert (plain["user"], acl["user"], read_only["user"]) == ("default", "tenant-acme", "reader")
+    assert plain["operations"] == acl["operations"] == 500
+    assert plain["errors"] == acl["errors"] == 0
+    assert plain["fill_errors"] == acl["fill_errors"] == 0
+    # The SET commands of the workload and of the keyspace fill are denied to the reader
+    assert read_only["errors"] > 0
+    assert read_only["fill_errors"] == 50
+    assert b"tenant:acme:load:0" in server.data
+    assert 0 < acl["p50_ms"] <= acl["p99_ms"] <= acl["p999_ms"]
+
+
+def test_main_starts_the_stand_in_with_tls(tmp_path, capsys):
+    output = tmp_path / "results.json"
+
+    # The stand-in listens on a free port, not on the port of the config
+    assert load_test.main(["--requests", "200", "--connections", "2", "--keyspace", "20",
+                           "--output", str(output)]) == 0
+
+    results = json.loads(output.read_text())
+    assert results["environment"]["server"] == "stand-in"
+    assert results["note"] == load_test.STAND_IN_NOTE
+    assert load_test.STAND_IN_NOTE in capsys.readouterr().err
+    assert [variant["name"] for variant in results["variants"]] == ["plain", "tls", "acl", "tls+acl"]
+    assert all(variant["errors"] == 0 for variant in results["variants"])
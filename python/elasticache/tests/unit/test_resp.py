@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from functions.resp.client import RespClient, RespError
+from functions.resp.server import StandInServer, parse_commands
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_pipeline_and_acl():
+    async def scenario():
+        async with StandInServer(auth_tokens=["token-1"]) as server:
+            admin = await RespClient.connect(server.host, server.port, password="token-1")
+            await admin.execute("ACL", "SETUSER", "tenant-acme", "on", ">password-1", "~tenant:acme:*", "-@all",
+                                "+@read", "+@write", "-@dangerous")
+            replies = await admin.pipeline([("SET", f"key-{idx}", idx) for idx in range(100)] + [("DBSIZE",)])
+            assert replies[-1] == 100
+
+            tenant = await RespClient.connect(server.host, server.port, user="tenant-acme", password="password-1")
+            replies = await tenant.pipeline([
+                ("MSET", "tenant:acme:a", "1", "tenant:acme:b", "2"),
+                ("MGET", "tenant:acme:a", "tenant:acme:b"),
+                ("GET", "tenant:globex:a"),
+                ("FLUSHALL",)
+            ])
+            assert replies[:2] == ["OK", [b"1", b"2"]]
+            assert [reply.code for reply in replies[2:]] == ["NOPERM", "NOPERM"]
+
+            with pytest.raises(RespError) as error:
+                await RespClient.connect(server.host, server.port, password="wrong")
+            assert error.value.code == "WRONGPASS"
+            await admin.close()
+            await tenant.close()
+
+    run(scenario())
+
+
+def test_partial_commands_are_buffered():
+    commands, consumed = parse_commands(bytearray(b"*1\r\n$4\r\nPING\r\n*2\r\n$3\r\nGET\r\n$3\r\nke"))
+    assert commands == [[b"PING"]]
+    assert consumed == 14
@@ -0,0 +1,349 @@
+import asyncio
+import datetime
+import json
+import uuid
+
+import pytest
+
+from config.config import config
+from functions.resp.client import RespClient, RespError
+from functions.rotation import handler, tags
+
+CLUSTER = "dev-cluster"
+
+
+class ResourceNotFoundException(Exception):
+    pass
+
+
+class FakeSecretsManager:
+    """
+    Secrets Manager with the versions and stages of the secrets, enough for the rotation steps.
+    """
+    class exceptions:
+        ResourceNotFoundException = ResourceNotFoundException
+
+    def __init__(self):
+        self.secrets = {}
+        self.passwords = 0
+
+    def add_secret(self, name, value, tags):
+        version_id = str(uuid.uuid4())
+        self.secrets[name] = {
+            "ARN": name, "Name": name, "Tags": [{"Key": key, "Value": value} for key, value in tags.items()],
+            "RotationEnabled": True, "LastRotatedDate": None,
+            "versions": {version_id: json.dumps(value)}, "stages": {version_id: ["AWSCURRENT"]}
+        }
+
+    def rotate_secret(self, SecretId, ClientRequestToken):
+        # The pending version gets its value in the createSecret step
+        self.secrets[SecretId]["stages"][ClientRequestToken] = ["AWSPENDING"]
+
+    def describe_secret(self, SecretId):
+        secret = self.secrets[SecretId]
+        metadata = {key: value for key, value in secret.items() if key not in ("versions", "stages")}
+        metadata["VersionIdsToStages"] = {version: list(stages) for version, stages in secret["stages"].items()
+                                          if stages}
+        return metadata
+
+    def get_secret_value(self, SecretId, VersionStage="AWSCURRENT", VersionId=None):
+        secret = self.secrets[SecretId]
+        for version_id, stages in secret["stages"].items():
+            if VersionStage in stages and VersionId in (None, version_id) and version_id in secret["versions"]:
+                return {"SecretString": secret["versions"][version_id], "VersionId": version_id}
+        raise ResourceNotFoundException(SecretId)
+
+    def get_random_password(self, PasswordLength, ExcludeCharacters):
+        self.passwords += 1
+        return {"RandomPassword": f"rotated-password-{self.passwords}".ljust(PasswordLength, "x")}
+
+    def put_secret_value(self, SecretId, ClientRequestToken, SecretString, VersionStages):
+        secret = self.secrets[SecretId]
+        secret["versions"][ClientRequestToken] = SecretString
+        for stages in secret["stages"].values():
+            for stage in VersionStages:
+                if stage in stages:
+                    stages.remove(stage)
+        secret["stages"][ClientRequestToken] = list(VersionStages)
+
+    def update_secret_version_stage(self, SecretId, VersionStage, MoveToVersionId, RemoveFromVersionId=None):
+        secret = self.secrets[SecretId]
+        for version_id, stages in secret["stages"].items():
+            if VersionStage in stages:
+                assert version_id == RemoveFromVersionId, "the stage must be removed from its version"
+                stages.remove(VersionStage)
+                if VersionStage == "AWSCURRENT":
+                    for stage_version, previous in secret["stages"].items():
+                        if "AWSPREVIOUS" in previous:
+                            previous.remove("AWSPREVIOUS")
+                    stages.append("AWSPREVIOUS")
+        secret["stages"][MoveToVersionId].append(VersionStage)
+        if VersionStage == "AWSCURRENT":
+            secret["stages"][MoveToVersionId].remove("AWSPENDING")
+            secret["LastRotatedDate"] = datetime.datetime.now(datetime.timezone.utc)
+
+    def list_secrets(self, Filters):
+        return {"SecretList": [{"ARN": name} for name in self.secrets]}
+
+
+class InvalidReplicationGroupStateFault(Exception):
+    pass
+
+
+class ReplicationGroupNotFoundFault(Exception):
+    pass
+
+
+class FakeElastiCache:
+    """
+    ElastiCache applying ModifyUser and ModifyReplicationGroup to the stand-in server asynchronously, a change is
+    applied after `delay` describe calls and the user and the replication group are modifying until then.
+    """
+    def __init__(self, server, users):
+        self.server = server
+        self.users = users
+        self.calls = []
+        self.delay = 0
+        self.pending = []
+        self.serverless = False
+
+    def modify_user(self, UserId, Passwords):
+        self.calls.append(("ModifyUser", UserId, len(Passwords)))
+        user_name, access_string = self.users[UserId]
+        self.pending.append([self.delay, lambda: self.server.set_user(user_name, Passwords, access_string)])
+
+    def modify_replication_group(self, ReplicationGroupId, AuthToken, AuthTokenUpdateStrategy, ApplyImmediately):
+        if self.pending:
+            raise InvalidReplicationGroupStateFault(f"{ReplicationGroupId} is modifying")
+        self.calls.append(("ModifyReplicationGroup", ReplicationGroupId, AuthTokenUpdateStrategy))
+        if AuthTokenUpdateStrategy == "ROTATE":
+            self.pending.append([self.delay, lambda: self.server.rotate_auth_token(AuthToken)])
+        else:
+            self.pending.append([self.delay, lambda: self.server.set_auth_tokens([AuthToken])])
+
+    def modifying(self):
+        self.calls.append(("Describe",))
+        for change in self.pending:
+            change[0] -= 1
+        while self.pending and self.pending[0][0] < 0:
+            self.pending.pop(0)[1]()
+        return bool(self.pending)
+
+    def describe_users(self, UserId):
+        return {"Users": [{"UserId": UserId, "Status": "modifying" if self.modifying() else "active"}]}
+
+    def describe_replication_groups(self, ReplicationGroupId):
+        if self.serverless:
+            raise ReplicationGroupNotFoundFault(ReplicationGroupId)
+        status = "modifying" if self.modifying() else "available"
+        return {"ReplicationGroups": [{"ReplicationGroupId": ReplicationGroupId, "Status": status}]}
+
+    def describe_serverless_caches(self, ServerlessCacheName):
+        assert self.serverless, "a replication group is not a serverless cache"
+        return {"ServerlessCaches": [{"ServerlessCacheName": ServerlessCacheName, "Status": "available"}]}
+
+
+@pytest.fixture
+def rotation(stand_in_server, monkeypatch):
+    server = stand_in_server(auth_tokens=["token-1"])
+    server.set_user("user-name-1", ["password-1"], "on ~* +@all")
+
+    secretsmanager = FakeSecretsManager()
+    secretsmanager.add_secret(f"/elasticache/{CLUSTER}/user-name-1",
+                              {"user-name": "user-name-1", "password": "password-1"},
+                              {tags.TAG_REPLICATION_GROUP: CLUSTER, tags.TAG_SECRET_TYPE: "user",
+                               tags.TAG_USER_ID: "user-id-1"})
+    secretsmanager.add_secret(f"/elasticache/{CLUSTER}/auth-token", {"token": "token-1"},
+                              {tags.TAG_REPLICATION_GROUP: CLUSTER, tags.TAG_SECRET_TYPE: "auth-token"})
+    elasticache = FakeElastiCache(server, {"user-id-1": ("user-name-1", "on ~* +@all")})
+
+    monkeypatch.setattr(handler, "_clients", {"secretsmanager": secretsmanager, "elasticache": elasticache})
+    monkeypatch.setenv("REPLICATION_GROUP_ID", CLUSTER)
+    monkeypatch.setenv("REDIS_HOST", server.host)
+    monkeypatch.setenv("REDIS_PORT", str(server.port))
+    monkeypatch.setenv("REDIS_TLS", "false")
+    monkeypatch.setenv("GRACE_MINUTES", "0")
+    monkeypatch.setenv("POLL_SECONDS", "0")
+    return server, secretsmanager, elasticache
+
+
+def rotate(secret_id):
+    token = str(uuid.uuid4())
+    handler.client("secretsmanager").rotate_secret(secret_id, token)
+    for step in ("createSecret", "setSecret", "testSecret", "finishSecret"):
+        handler.handler({"SecretId": secret_id, "ClientRequestToken": token, "Step": step}, None)
+    return token
+
+
+def authenticate(server, user, password):
+    async def connect():
+        redis = await RespClient.connect(server.host, server.port, user=user, password=password)
+        await redis.close()
+
+    try:
+        asyncio.run(connect())
+        return True
+    except RespError as error:
+        assert error.code == "WRONGPASS"
+        return False
+
+
+def test_user_password_rotation(rotation):
+    server, secretsmanager, elasticache = rotation
+    secret_id = f"/elasticache/{CLUSTER}/user-name-1"
+
+    rotate(secret_id)
+    new_password = json.loads(secretsmanager.get_secret_value(secret_id)["SecretString"])["password"]
+
+    # Both passwords are accepted until the prune
+    assert authenticate(server, "user-name-1", "password-1")
+    assert authenticate(server, "user-name-1", new_password)
+    assert ("ModifyUser", "user-id-1", 2) in elasticache.calls
+
+    assert handler.handler({}, None) == {"pruned": [secret_id]}
+    assert not authenticate(server, "user-name-1", "password-1")
+    assert authenticate(server, "user-name-1", new_password)
+    # A pruned secret is not pruned again
+    assert handler.handler({}, None) == {"pruned": []}
+
+
+def test_auth_token_rotation(rotation):
+    server, secretsmanager, elasticache = rotation
+    secret_id = f"/elasticache/{CLUSTER}/auth-token"
+
+    rotate(secret_id)
+    assert authenticate(server, None, "token-1")
+    assert ("ModifyReplicationGroup", CLUSTER, "ROTATE") in elasticache.calls
+
+    token = json.loads(secretsmanager.get_secret_value(secret_id)["SecretString"])["token"]
+    handler.handler({}, None)
+    assert ("ModifyReplicationGroup", CLUSTER, "SET") in elasticache.calls
+    assert not authenticate(server, None, "token-1")
+    assert authenticate(server, None, token)
+
+
+def test_read_only_tenant_rotation(rotation):
+    server, secretsmanager, elasticache = rotation
+    access_string = "on ~tenant:acme:* -@all +@read"
+    server.set_user("tenant-acme", ["password-1"], access_string)
+    elasticache.users["tenant-acme"] = ("tenant-acme", access_string)
+    secret_id = f"/elasticache/{CLUSTER}/tenant-acme"
+    secretsmanager.add_secret(secret_id, {"user-name": "tenant-acme", "password": "password-1"},
+                              {tags.TAG_REPLICATION_GROUP: CLUSTER, tags.TAG_SECRET_TYPE: "user",
+                               tags.TAG_USER_ID: "tenant-acme"})
+
+    async def ping():
+        redis = await RespClient.connect(server.host, server.port, user="tenant-acme", password="password-1")
+        try:
+            await redis.execute("PING")
+        finally:
+            await redis.close()
+
+    # Like Redis, the tenant ACL denies the @connection commands such as PING
+    with pytest.raises(RespError) as error:
+        asyncio.run(ping())
+    assert error.value.code == "NOPERM"
+
+    rotate(secret_id)
+    new_password = json.loads(secretsmanager.get_secret_value(secret_id)["SecretString"])["password"]
+    assert authenticate(server, "tenant-acme", "password-1")
+    assert authenticate(server, "tenant-acme", new_password)
+
+
+def test_serverless_user_rotation(rotation, monkeypatch):
+    server, secretsmanager, elasticache = rotation
+    monkeypatch.setenv("SERVERLESS", "true")
+    elasticache.serverless = True
+    secret_id = f"/elasticache/{CLUSTER}/user-name-1"
+
+    rotate(secret_id)
+    new_password = json.loads(secretsmanager.get_secret_value(secret_id)["SecretString"])["password"]
+    assert authenticate(server, "user-name-1", new_password)
+    assert handler.handler({}, None) == {"pruned": [secret_id]}
+    assert not authenticate(server, "user-name-1", "password-1")
+
+
+def test_grace_period(rotation, monkeypatch):
+    server, secretsmanager, _ = rotation
+    monkeypatch.setenv("GRACE_MINUTES", "60")
+
+    rotate(f"/elasticache/{CLUSTER}/user-name-1")
+    assert handler.handler({}, None) == {"pruned": []}
+    assert authenticate(server, "user-name-1", "password-1")
+
+
+def test_steps_wait_for_the_changes(rotation):
+    server, secretsmanager, elasticache = rotation
+    elasticache.delay = 3
+
+    # testSecret checks the passwords once the user is active again
+    user_secret_id = f"/elasticache/{CLUSTER}/user-name-1"
+    rotate(user_secret_id)
+    assert authenticate(server, "user-name-1", "password-1")
+    assert elasticache.calls.count(("Describe",)) >= 4
+
+    # The second auth token rotation prunes the first token, ROTATE waits for the group to be available again
+    token_secret_id = f"/elasticache/{CLUSTER}/auth-token"
+    rotate(token_secret_id)
+    rotate(token_secret_id)
+    token = json.loads(secretsmanager.get_secret_value(token_secret_id)["SecretString"])["token"]
+    assert [call[2] for call in elasticache.calls if call[0] == "ModifyReplicationGroup"] == \
+        ["ROTATE", "SET", "ROTATE"]
+    assert not authenticate(server, None, "token-1")
+    assert authenticate(server, None, token)
+
+
+def test_change_still_applying_keeps_current_password(rotation, monkeypatch):
+    server, secretsmanager, elasticache = rotation
+    monkeypatch.setenv("MAX_WAIT_SECONDS", "0")
+    secret_id = f"/elasticache/{CLUSTER}/user-name-1"
+    # The user is still modifying when the step gives up, Secrets Manager retries the rotation later
+    elasticache.delay = 100
+
+    with pytest.raises(TimeoutError):
+        rotate(secret_id)
+    assert json.loads(secretsmanager.get_secret_value(secret_id)["SecretString"])["password"] == "password-1"
+    assert authenticate(server, "user-name-1", "password-1")
+
+
+def test_failed_test_step_keeps_current_password(rotation):
+    server, secretsmanager, elasticache = rotation
+    secret_id = f"/elasticache/{CLUSTER}/user-name-1"
+    # The user is active again but the new password was not applied
+    elasticache.modify_user = lambda UserId, Passwords: None
+
+    with pytest.raises(RespError):
+        rotate(secret_id)
+    assert json.loads(secretsmanager.get_secret_value(secret_id)["SecretString"])["password"] == "password-1"
+    assert authenticate(server, "user-name-1", "password-1")
+
+
+def test_rotation_stack(synth_stack):
+    secrets = dict(config["secrets"], rotation={"enabled": True, "schedule_days": 7, "prune_interval_minutes": 30})
+    _, template = synth_stack("rotation-stack", secrets=secrets)
+
+    schedules = template.of_type("AWS::SecretsManager::RotationSchedule")
+    assert len(schedules) == len(config["secrets"]["users"])
+    for schedule in schedules:
+        assert schedule["Properties"]["RotationRules"] == {"AutomaticallyAfterDays": 7}
+        assert schedule["Properties"]["RotateImmediatelyOnUpdate"] is False
+    functions = [function for function in template.of_type("AWS::Lambda::Function")
+                 if function["Properties"]["Handler"] == "rotation.handler.handler"]
+    assert len(functions) == 1
+    # The steps wait for ModifyUser and ModifyReplicationGroup
+    assert functions[0]["Properties"]["Timeout"] == 900
+    rules = [rule for rule in template.of_type("AWS::Events::Rule")
+             if rule["Properties"].get("ScheduleExpression") == "rate(30 minutes)"]
+    assert len(rules) == 1
+    # Secrets Manager may invoke the function
+    assert any(permission["Properties"]["Principal"] == "secretsmanager.amazonaws.com"
+               for permission in template.of_type("AWS::Lambda::Permission"))
+    assert functions[0]["Properties"]["Environment"]["Variables"]["SERVERLESS"] == "false"
+
+    # The steps of a serverless cache wait for the cache instead of a replication group
+    _, template = synth_stack("serverless-rotation-stack", deployment_mode="serverless", engine_version="7.1",
+                              parameter_group=None, log_delivery={}, secrets=secrets)
+    [function] = [function for function in template.of_type("AWS::Lambda::Function")
+                  if function["Properties"]["Handler"] == "rotation.handler.handler"]
+    assert function["Properties"]["Environment"]["Variables"]["SERVERLESS"] == "true"
+    assert "elasticache:DescribeServerlessCaches" in json.dumps(template.of_type("AWS::IAM::Policy"))
@@ -0,0 +1,129 @@
+import pytest
+
+from cache.helper import sizing
+
+
+def test_small_workload_fits_one_shard():
+    workload = sizing.Workload(
+        dataset_size_gb=0.5, peak_read_ops=5000, peak_write_ops=1000,
+        avg_value_size_bytes=512, target_p99_latency_ms=5
+    )
+    plan = sizing.plan_capacity(workload)
+
+    assert plan.num_node_groups == 1
+    assert plan.replicas_per_node_group == 1
+    assert 0 < plan.memory_headroom < 1
+    assert 0 < plan.cpu_headroom < 1
+
+
+def test_large_dataset_is_sharded_by_memory():
+    workload = sizing.Workload(
+        dataset_size_gb=1000, peak_read_ops=1000, peak_write_ops=1000,
+        avg_value_size_bytes=1024, target_p99_latency_ms=5
+    )
+    plan = sizing.plan_node_type(workload, "cache.r6g.large")
+    usable_memory_gib = sizing.NODE_TYPES["cache.r6g.large"].memory_gib * 0.75
+
+    assert plan.num_node_groups * usable_memory_gib * sizing.MEMORY_TARGET_UTILIZATION >= 1000
+    assert plan.memory_headroom > 0
+
+
+def test_write_heavy_workload_is_sharded_by_cpu():
+    workload = sizing.Workload(
+        dataset_size_gb=1, peak_read_ops=0, peak_write_ops=400000,
+        avg_value_size_bytes=100, target_p99_latency_ms=1
+    )
+    plan = sizing.plan_node_type(workload, "cache.m6g.large")
+    node_ops = sizing.get_node_ops_capacity("cache.m6g.large", 100)
+
+    assert plan.num_node_groups >= 400000 / (node_ops * 0.5)
+    assert plan.cpu_headroom >= 0.5
+
+
+def test_read_heavy_workload_adds_replicas():
+    workload = sizing.Workload(
+        dataset_size_gb=1, peak_read_ops=150000, peak_write_ops=1000,
+        avg_value_size_bytes=100, target_p99_latency_ms=5
+    )
+    plan = sizing.plan_node_type(workload, "cache.m6g.large")
+
+    assert plan.num_node_groups == 1
+    assert plan.replicas_per_node_group > 1
+
+
+def test_node_limit_counts_the_replicas():
+    workload = sizing.Workload(
+        dataset_size_gb=1200, peak_read_ops=1000, peak_write_ops=1000,
+        avg_value_size_bytes=100, target_p99_latency_ms=5
+    )
+    without_replicas = sizing.plan_node_type(workload, "cache.m6g.large", min_replicas=0)
+
+    assert 250 < without_replicas.num_node_groups <= sizing.MAX_NODE_GROUPS
+    assert sizing.plan_node_type(workload, "cache.m6g.large", min_replicas=1) is None
+
+
+def test_large_values_are_bound_by_network():
+    small = sizing.get_node_ops_capacity("cache.r6g.large", 100)
+    large = sizing.get_node_ops_capacity("cache.r6g.large", 100000)
+
+    assert large < small
+
+
+def test_tighter_latency_target_needs_more_nodes():
+    relaxed = sizing.Workload(1, 300000, 100000, 256, 10)
+    strict = relaxed._replace(target_p99_latency_ms=1)
+
+    relaxed_plan = sizing.plan_node_type(relaxed, "cache.r6g.xlarge")
+    strict_plan = sizing.plan_node_type(strict, "cache.r6g.xlarge")
+
+    relaxed_nodes = relaxed_plan.num_node_groups * (relaxed_plan.replicas_per_node_group + 1)
+    strict_nodes = strict_plan.num_node_groups * (strict_plan.replicas_per_node_group + 1)
+    assert strict_nodes > relaxed_nodes
+
+
+def test_unknown_node_type():
+    workload = sizing.Workload(1, 1000, 1000, 100, 5)
+
+    with pytest.raises(ValueError):
+        sizing.plan_capacity(workload, node_types=["cache.x1.huge"])
+
+
+def test_data_tiering_for_a_small_hot_set():
+    workload = sizing.Workload(
+        dataset_size_gb=2000, peak_read_ops=100000, peak_write_ops=20000,
+        avg_value_size_bytes=1024, target_p99_latency_ms=5, hot_set_fraction=0.1
+    )
+    in_memory = sizing.plan_capacity(workload)
+    tiered = sizing.plan_capacity(workload, data_tiering=True)
+
+    assert not sizing.is_data_tiering(in_memory.node_type)
+    assert sizing.is_data_tiering(tiered.node_type)
+    assert tiered.hourly_price < in_memory.hourly_price
+
+
+def test_data_tiering_only_when_it_lowers_cost():
+    # The whole dataset is hot, the SSD does not save any memory
+    workload = sizing.Workload(2000, 100000, 20000, 1024, 5, hot_set_fraction=1.0)
+    assert not sizing.is_data_tiering(sizing.plan_capacity(workload, data_tiering=True).node_type)
+
+    # The reads served from SSD exceed the latency target
+    workload = workload._replace(hot_set_fraction=0.1, target_p99_latency_ms=1)
+    assert sizing.plan_node_type(workload, "cache.r6gd.xlarge") is None
+    assert not sizing.is_data_tiering(sizing.plan_capacity(workload, data_tiering=True).node_type)
+
+
+def test_data_tiering_node_type_needs_data_tiering():
+    workload = sizing.Workload(1, 1000, 1000, 100, 5)
+
+    with pytest.raises(ValueError):
+        sizing.plan_capacity(workload, node_types=["cache.r6gd.xlarge"])
+
+
+def test_burstable_node_types_can_be_excluded():
+    workload = sizing.Workload(0.1, 1000, 100, 100, 5)
+    assert sizing.is_burstable(sizing.plan_capacity(workload).node_type)
+
+    plan = sizing.plan_capacity(workload, burstable=False)
+    assert not sizing.is_burstable(plan.node_type)
+    with pytest.raises(ValueError):
+        sizing.plan_capacity(workload, node_types=["cache.t4g.micro"], burstable=False)
@@ -0,0 +1,84 @@
+import gzip
+
+import pytest
+
+from cache.helper import slot_analyzer, topology
+from config import config_util
+from config.config import config
+
+
+def test_key_slot():
+    # CLUSTER KEYSLOT of a Redis server
+    assert slot_analyzer.key_slot(b"foo") == 12182
+    assert slot_analyzer.key_slot(b"123456789") == 0x31C3 & 16383
+    assert slot_analyzer.key_slot(b"{user1000}.following") == slot_analyzer.key_slot(b"user1000")
+    # An empty hash tag hashes the whole key
+    assert slot_analyzer.get_hash_key(b"{}foo") == b"{}foo"
+    assert slot_analyzer.get_hash_key(b"foo{}{bar}") == b"foo{}{bar}"
+    assert slot_analyzer.get_hash_key(b"foo{{bar}}") == b"{bar"
+
+
+def test_skewed_hash_tags_are_balanced(tmp_path):
+    path = tmp_path / "keys.txt.gz"
+    with gzip.open(path, "wt") as sample:
+        for idx in range(20000):
+            sample.write(f"session:{idx}\n")
+            if idx % 2 == 0:
+                sample.write(f"{{tenant:acme}}:user:{idx}\t2\n")
+
+    slot_load = slot_analyzer.SlotLoad()
+    with slot_analyzer.open_sample(str(path)) as lines:
+        slot_load.add_all(slot_analyzer.read_sample(lines), batch_size=3000)
+    assert slot_load.keys == 30000
+
+    node_group_slots = [[slot_range] for slot_range in slot_analyzer.split_slots(slot_load.loads, 4)]
+    report = slot_analyzer.report(slot_load, node_group_slots, top=1)
+
+    assert report["hot_hash_keys"][0]["hash_key"] == "tenant:acme"
+    assert report["balanced"]["imbalance"] < report["even"]["imbalance"]
+    # The hot slot alone is half of the load, the other node groups share the rest
+    assert report["balanced"]["imbalance"] == pytest.approx(2, rel=0.01)
+    configuration = slot_analyzer.get_node_group_configuration(node_group_slots)
+    assert topology.get_node_group_slots(configuration, 4) == node_group_slots
+
+
+def test_split_without_load():
+    ranges = slot_analyzer.split_slots([0.0] * topology.SLOT_COUNT, 3)
+
+    assert ranges == topology.get_slot_ranges(3)
+
+    # The slots without load are spread around the hot slot instead of filling the first node groups
+    loads = [0.0] * topology.SLOT_COUNT
+    loads[12182] = 1.0
+    assert slot_analyzer.split_slots(loads, 3) == topology.get_slot_ranges(3)
+
+
+def test_node_group_configuration(synth_stack):
+    configuration = [{"node_group_id": "0001", "slots": "0-999"}, {"node_group_id": "0002", "slots": "1000-16383"}]
+    _, template = synth_stack("slots-stack", num_node_groups=2, node_group_configuration=configuration)
+
+    replication_group = template.resource("ElastiCacheReplicationGroup")
+    assert [(group["NodeGroupId"], group["Slots"]) for group in
+            replication_group["Properties"]["NodeGroupConfiguration"]] == [("0001", "0-999"), ("0002", "1000-16383")]
+
+    with pytest.raises(ValueError) as error:
+        topology.get_node_group_slots([{"slots": "0-999"}, {"slots": "900-16000"}], 2)
+    assert "slot 900 is in node groups '0001' and '0002'" in str(error.value)
+
+
+def test_slot_layout_is_validated():
+    with pytest.raises(ValueError) as error:
+        config_util.load(dict(config, num_node_groups=3, node_group_configuration=[
+            {"node_group_id": "0001", "slots": "0-5000"},
+            {"node_group_id": "0002", "slots": "4000-9000"},
+            {"node_group_id": "0003", "slots": "9001-16400"}
+        ]))
+    message = str(error.value)
+    assert "'node_group_configuration': slot 4000 is in node groups '0001' and '0002'" in message
+    assert "'node_group_configuration': node group '0003' has invalid slots 9001-16400" in message
+
+    with pytest.raises(ValueError) as error:
+        config_util.load(dict(config, num_node_groups=2, node_group_configuration=[
+            {"node_group_id": "0001", "slots": "0-999"}, {"node_group_id": "0002", "slots": "1001-16383"}
+        ]))
+    assert "1 slots are in no node group, starting at slot 1000" in str(error.value)
@@ -0,0 +1,120 @@
+import base64
+import gzip
+import io
+import json
+import random
+
+from functions.slowlog import aggregator, handler
+
+
+def slowlog_line(duration_us, command, timestamp=1633046400, node="dev-cluster-0001-001"):
+    return json.dumps({
+        "CacheClusterId": node,
+        "CacheNodeId": "0001",
+        "Id": 1,
+        "Timestamp": timestamp,
+        "Duration (us)": duration_us,
+        "Command": command,
+        "ClientAddress": "10.0.0.1:6379",
+        "ClientName": ""
+    })
+
+
+def test_parse_entry():
+    entry = aggregator.parse_entry(slowlog_line(1500, "hset {tenant:42}:user:1001 name ... (2 more arguments)"))
+
+    assert entry.command == "HSET"
+    assert entry.key_pattern == "{tenant:*}:user:*"
+    assert entry.duration_us == 1500
+    assert aggregator.parse_entry("not json") is None
+    assert aggregator.parse_entry(json.dumps({"Command": "GET k"})) is None
+
+
+def test_key_pattern():
+    assert aggregator.get_key_pattern("session:3f2b9c1e-8d4a-4b7e-9f00-123456789abc") == "session:*"
+    assert aggregator.get_key_pattern("cache:page:42:en") == "cache:page:*:en"
+    assert aggregator.parse_command("KEYS") == ("KEYS", "")
+
+
+def test_percentiles_within_precision():
+    rng = random.Random(7)
+    durations = [int(rng.lognormvariate(8, 1)) + 1 for _ in range(20000)]
+    lines = [slowlog_line(duration, "GET user:1") for duration in durations]
+
+    result = aggregator.SlowLogAggregator().add_all(aggregator.read_entries(lines))
+    summary = result.overall.summary()
+
+    durations.sort()
+    for q, key in ((0.50, "p50_us"), (0.95, "p95_us"), (0.99, "p99_us")):
+        exact = durations[int(q * len(durations)) - 1]
+        assert abs(summary[key] - exact) / exact <= aggregator.PRECISION
+    assert summary["count"] == len(durations)
+    assert summary["max_us"] == durations[-1]
+
+
+def test_groups_are_bounded():
+    lines = (slowlog_line(100, f"GET tenant-{chr(97 + idx % 26)}{chr(97 + idx // 26 % 26)}:x")
+             for idx in range(5000))
+
+    result = aggregator.SlowLogAggregator(max_groups=50).add_all(aggregator.read_entries(lines))
+
+    assert len(result.groups) == 50
+    assert sum(stats.count for stats in result.groups.values()) == 5000
+    assert result.groups[aggregator.OTHER].count > 5000 - 49 * 10
+    assert result.overall.count == 5000
+
+
+def test_top_and_merge_round_trip():
+    first = aggregator.SlowLogAggregator().add_all(aggregator.read_entries([
+        slowlog_line(50000, "KEYS *", timestamp=100),
+        slowlog_line(2000, "GET user:1", timestamp=200),
+    ]))
+    second = aggregator.SlowLogAggregator().add_all(aggregator.read_entries([
+        slowlog_line(3000, "GET user:2", timestamp=50),
+        slowlog_line(1000, "SET user:3 x", timestamp=300),
+    ]))
+
+    merged = aggregator.SlowLogAggregator.from_dict(json.loads(json.dumps(first.to_dict())))
+    merged.merge(second)
+    report = merged.report(2)
+
+    assert report["first_timestamp"] == 50
+    assert report["last_timestamp"] == 300
+    assert [(top["command"], top["key_pattern"]) for top in report["top"]] == [("KEYS", "*"), ("GET", "user:*")]
+    assert report["commands"]["GET"]["count"] == 2
+
+
+def test_cli_report(tmp_path, capsys):
+    recording = tmp_path / "slowlog.jsonl.gz"
+    with gzip.open(recording, "wt") as fp:
+        for idx in range(100):
+            fp.write(slowlog_line(1000 + idx, f"ZRANGE leaderboard:{idx} 0 -1") + "\n")
+
+    aggregator.main([str(recording), "--top", "1"])
+    report = json.loads(capsys.readouterr().out)
+
+    assert report["top"][0]["key_pattern"] == "leaderboard:*"
+    assert report["top"][0]["count"] == 100
+
+
+def test_handler_metric_data():
+    payload = {
+        "messageType": "DATA_MESSAGE",
+        "logEvents": [{"id": str(idx), "timestamp": 0, "message": slowlog_line(1000 * (idx + 1), "GET k:1")}
+                      for idx in range(300)]
+    }
+    data = io.BytesIO()
+    with gzip.GzipFile(fileobj=data, mode="wb") as fp:
+        fp.write(json.dumps(payload).encode("utf-8"))
+    event = {"awslogs": {"data": base64.b64encode(data.getvalue()).decode("ascii")}}
+
+    decoded = handler.decode_log_events(event)
+    result = aggregator.SlowLogAggregator().add_all(
+        aggregator.read_entries(log_event["message"] for log_event in decoded["logEvents"])
+    )
+    metric_data = handler.get_metric_data(result, "dev-cluster")
+
+    assert len(metric_data) == 2
+    for datum in metric_data:
+        assert len(datum["Values"]) <= 150
+        assert sum(datum["Counts"]) == 300
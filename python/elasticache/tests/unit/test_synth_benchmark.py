@@ -0,0 +1,34 @@
+from benchmarks import synth_benchmark
+
+
+def test_scenarios_sweep_one_dimension_at_a_time():
+    scenarios = synth_benchmark.get_scenarios([1, 10], [1, 5], [1, 2])
+
+    assert [scenario.name for scenario in scenarios] == [
+        "users=1,cidrs=1,clusters=1",
+        "users=10,cidrs=1,clusters=1",
+        "users=1,cidrs=5,clusters=1",
+        "users=1,cidrs=1,clusters=2",
+    ]
+
+
+def test_vpc_lookup_is_answered_from_context(tmp_path):
+    result = synth_benchmark.run_scenario(synth_benchmark.Scenario(users=3, cidrs=4, clusters=2), str(tmp_path))
+
+    assert result["template_bytes"] > 0
+    assert result["resources"] > 0
+
+
+def test_compare_with_baseline():
+    baseline = {"scenarios": [{"name": "users=1,cidrs=1,clusters=1", "wall_seconds": 2.0, "synth_seconds": 1.0,
+                               "peak_rss_mb": 200, "template_bytes": 1000}]}
+    results = {"scenarios": [
+        {"name": "users=1,cidrs=1,clusters=1", "wall_seconds": 2.2, "synth_seconds": 1.5,
+         "peak_rss_mb": 190, "template_bytes": 1000},
+        {"name": "users=10,cidrs=1,clusters=1", "wall_seconds": 9.0, "synth_seconds": 9.0,
+         "peak_rss_mb": 900, "template_bytes": 9000}
+    ]}
+
+    regressions = synth_benchmark.compare(results, baseline, tolerance=0.25)
+
+    assert regressions == ["users=1,cidrs=1,clusters=1: synth_seconds 1.5 > 1.0 (+25%)"]
@@ -0,0 +1,50 @@
+import pytest
+
+from config.config import config
+from config import config_util
+from cache.helper import tenant
+
+
+def get_secrets(**overrides):
+    return dict(config["secrets"], **overrides)
+
+
+def test_tenant_acl_templates():
+    users = tenant.get_tenant_users(get_secrets(
+        acl_templates={"reports": "on ~tenant:{id}:reports:* -@all +@read"},
+        tenants=[{"id": "acme"}, {"id": "globex", "acl_template": "reports"}]
+    ))
+
+    assert [user["user_id"] for user in users] == ["tenant-acme", "tenant-globex"]
+    assert users[0]["user_acl"] == "on ~tenant:acme:* -@all +@read +@write -@dangerous"
+    assert users[1]["user_acl"] == "on ~tenant:globex:reports:* -@all +@read"
+
+
+def test_all_user_errors_are_reported():
+    data = dict(config, secrets=get_secrets(
+        users=[{"user_id": "user-id-1", "user_name": "user-name-1"}, {"user_name": "user-name-2"}],
+        tenants=[{"id": "acme"}, {"id": "acme"}, {"id": "bad_id"}, {"id": "initech", "acl_template": "missing"}]
+    ))
+
+    with config_util.use(config_util.load(data)), pytest.raises(ValueError) as error:
+        tenant.get_users()
+
+    message = str(error.value)
+    assert "user 2: missing user_id" in message
+    assert "tenant 'acme': duplicate user_id 'tenant-acme'" in message
+    assert "tenant 'bad_id': invalid user_id 'tenant-bad_id'" in message
+    assert "tenant 'initech': unknown ACL template 'missing'" in message
+
+
+def test_user_group_limit():
+    tenants = [{"id": f"t{idx}"} for idx in range(5)]
+    data = dict(config, secrets=get_secrets(users=[], tenants=tenants, max_users_per_group=5))
+
+    with config_util.use(config_util.load(data)), pytest.raises(ValueError) as error:
+        tenant.get_users()
+    assert "5 users and the default user exceed the 5 users of the user group" in str(error.value)
+
+
+def test_invalid_acl_rules():
+    assert tenant.get_acl_errors("on ~tenant:a:* -@all +@read") == []
+    assert tenant.get_acl_errors("on keys:* +@read") == ["keys:*"]
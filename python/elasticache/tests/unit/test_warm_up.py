@@ -0,0 +1,271 @@
+import asyncio
+import gzip
+import io
+import json
+import ssl
+import subprocess
+import time
+
+import pytest
+
+from config.config import config
+from config.config_model import ElastiCacheConfig
+from functions.warmup import handler, loader
+
+MANIFEST = [{"key": f"product:{idx}", "value": f"value-{idx}"} for idx in range(500)] + \
+           [{"key": "{user:42}:profile", "value": "profile", "ttl": 3600},
+            {"key": "{user:42}:cart", "value": "cart"}]
+
+
+def get_lines(entries):
+    return [json.dumps(entry).encode("utf-8") for entry in entries]
+
+
+def test_cluster_mode_writes_every_key_to_its_shard(stand_in_server):
+    second = stand_in_server(auth_tokens=["token-1"])
+    first = stand_in_server(auth_tokens=["token-1"], cluster_slots=[(8192, 16383, second.host, second.port)])
+    first.cluster_slots.insert(0, (0, 8191, first.host, first.port))
+
+    stats = asyncio.run(loader.warm_up(first.host, first.port, loader.read_manifest(get_lines(MANIFEST)),
+                                       cluster_mode=True, password="token-1", parallelism=3, pipeline=16))
+
+    assert stats["shards"] == 2
+    assert (stats["keys"], stats["errors"]) == (len(MANIFEST), 0)
+    assert len(first.data) + len(second.data) == len(MANIFEST)
+    for entry in MANIFEST:
+        key = entry["key"].encode("utf-8")
+        shard = first if loader.key_slot(key) < 8192 else second
+        assert shard.data[key] == entry["value"].encode("utf-8")
+    # The keys of a hash tag share a slot
+    assert loader.key_slot(b"{user:42}:profile") == loader.key_slot(b"{user:42}:cart")
+    # Every shard is written by several connections, one more connection asks for the slot map
+    assert first.connections == 4
+    assert second.connections == 3
+
+
+def test_manifest_errors():
+    with pytest.raises(ValueError) as error:
+        list(loader.read_manifest([b'{"key": "a", "value": "1"}', b"", b'{"key": "b"}']))
+    assert "line 3" in str(error.value)
+
+    # An empty host is the host that answered CLUSTER SLOTS
+    assert loader.parse_cluster_slots([[0, 100, [b"", 6379, b"id-1"]], [101, 200, [b"", 6379, b"id-1"]]],
+                                      "cfg.cache") == [loader.Shard("cfg.cache", 6379, ((0, 100), (101, 200)))]
+
+    lines = loader.open_manifest(io.BytesIO(gzip.compress(b'{"key": "a", "value": "1", "ttl": 60}\n')),
+                                 "hot-keys.jsonl.gz")
+    assert list(loader.read_manifest(lines)) == [("SET", "a", "1", "EX", 60)]
+
+
+def test_manifest_is_streamed(monkeypatch):
+    monkeypatch.setattr(loader, "READ_SIZE", 7)
+    body = b"\n".join(get_lines(MANIFEST))
+
+    assert list(loader.open_manifest(io.BytesIO(body), "hot-keys.jsonl")) == get_lines(MANIFEST)
+    assert list(loader.open_manifest(io.BytesIO(gzip.compress(body + b"\n")), "hot-keys.jsonl.gz")) == \
+        get_lines(MANIFEST)
+
+
+class FakeS3:
+    def __init__(self, objects):
+        self.objects = objects
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+
+class FakeSecretsManager:
+    def __init__(self, secrets):
+        self.secrets = secrets
+
+    def get_secret_value(self, SecretId):
+        return {"SecretString": json.dumps(self.secrets[SecretId])}
+
+
+def test_handler_loads_the_manifest_with_the_user_secret(stand_in_server, monkeypatch, capsys):
+    server = stand_in_server()
+    server.set_user("warm-up", ["password-1"], "on ~* +@write")
+    body = gzip.compress(b"\n".join(get_lines(MANIFEST)))
+    monkeypatch.setattr(handler, "_clients", {
+        "s3": FakeS3({("manifests", "hot-keys.jsonl.gz"): body}),
+        "secretsmanager": FakeSecretsManager({"secret-arn": {"user-name": "warm-up", "password": "password-1"}})
+    })
+    for name, value in {"REPLICATION_GROUP_ID": "dev-cluster", "REDIS_HOST": server.host,
+                        "REDIS_PORT": str(server.port), "REDIS_TLS": "false", "CLUSTER_MODE": "false",
+                        "PARALLELISM": "2", "PIPELINE": "50", "SECRET_ARN": "secret-arn"}.items():
+        monkeypatch.setenv(name, value)
+    event = {"RequestType": "Create",
+             "ResourceProperties": {"ManifestBucket": "manifests", "ManifestKey": "hot-keys.jsonl.gz"}}
+
+    response = handler.handler(event, None)
+
+    assert response == {"PhysicalResourceId": "dev-cluster-warm-up",
+                         "Data": {"Keys": len(MANIFEST), "Errors": 0}}
+    assert len(server.data) == len(MANIFEST)
+
+    # A failed warm-up does not fail the deployment, it is logged at the ERROR level with the Failed metric
+    capsys.readouterr()
+    event["ResourceProperties"]["ManifestKey"] = "missing.jsonl"
+    assert handler.handler(event, None)["Data"] == {"Keys": 0, "Errors": -1}
+    record = json.loads(capsys.readouterr().out.splitlines()[-1])
+    assert (record["level"], record["Failed"], record["ReplicationGroupId"]) == ("ERROR", 1, "dev-cluster")
+    assert record["_aws"]["CloudWatchMetrics"][0]["Namespace"] == handler.NAMESPACE
+    assert handler.handler({"RequestType": "Delete", "PhysicalResourceId": "dev-cluster-warm-up"}, None) == \
+        {"PhysicalResourceId": "dev-cluster-warm-up"}
+
+
+def create_certificate(directory) -> str:
+    """
+    Create a self-signed certificate naming localhost only, as the certificate of a cluster names its endpoints
+    and not the IPs of CLUSTER SLOTS, and return the directory holding `cert.pem` and `key.pem`.
+    """
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=localhost",
+         "-addext", "subjectAltName=DNS:localhost", "-keyout", str(directory / "key.pem"),
+         "-out", str(directory / "cert.pem")],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return str(directory)
+
+
+def test_handler_loads_the_shards_over_tls(stand_in_server, monkeypatch, tmp_path):
+    directory = create_certificate(tmp_path)
+    server_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    server_context.load_cert_chain(f"{directory}/cert.pem", f"{directory}/key.pem")
+    second = stand_in_server(ssl_context=server_context)
+    first = stand_in_server(ssl_context=server_context, cluster_slots=[(8192, 16383, second.host, second.port)])
+    first.cluster_slots.insert(0, (0, 8191, first.host, first.port))
+
+    # The default SSL context of the Lambda trusts the self-signed certificate
+    monkeypatch.setenv("SSL_CERT_FILE", f"{directory}/cert.pem")
+    monkeypatch.setattr(handler, "_clients", {
+        "s3": FakeS3({("manifests", "hot-keys.jsonl"): b"\n".join(get_lines(MANIFEST))})
+    })
+    for name, value in {"REPLICATION_GROUP_ID": "dev-cluster", "REDIS_HOST": "localhost",
+                        "REDIS_PORT": str(first.port), "REDIS_TLS": "true", "CLUSTER_MODE": "true",
+                        "PARALLELISM": "2", "PIPELINE": "50"}.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv("SECRET_ARN", raising=False)
+    event = {"RequestType": "Create",
+             "ResourceProperties": {"ManifestBucket": "manifests", "ManifestKey": "hot-keys.jsonl"}}
+
+    # The shards are at 127.0.0.1, their certificate is verified against the configuration endpoint
+    assert handler.handler(event, None)["Data"] == {"Keys": len(MANIFEST), "Errors": 0}
+    assert len(first.data) + len(second.data) == len(MANIFEST)
+
+
+def test_failed_shards(stand_in_server):
+    first = stand_in_server(cluster_slots=[(8192, 16383, "127.0.0.1", 1)])
+    first.cluster_slots.insert(0, (0, 8191, first.host, first.port))
+    commands = list(loader.read_manifest(get_lines(MANIFEST)))
+
+    stats = asyncio.run(loader.warm_up(first.host, first.port, commands, cluster_mode=True))
+    assert stats["failed_shards"] == 1
+    assert stats["keys"] == len(first.data)
+    assert stats["errors"] == len(MANIFEST) - len(first.data) > 0
+
+    with pytest.raises(RuntimeError) as error:
+        asyncio.run(loader.warm_up(first.host, 1, commands))
+    assert "Every shard failed" in str(error.value)
+
+
+class SlowClient:
+    async def pipeline(self, batch):
+        await asyncio.sleep(0.05)
+        return ["OK"] * len(batch)
+
+    async def close(self):
+        pass
+
+
+def test_load_stops_at_the_deadline():
+    commands = list(loader.read_manifest(get_lines(MANIFEST)))
+
+    async def connect(host, port):
+        return SlowClient()
+
+    async def load():
+        return await loader.load_shard(connect, loader.Shard("127.0.0.1", 6379), commands, parallelism=1,
+                                       pipeline=10, deadline=time.monotonic() + 0.12)
+
+    stats = asyncio.run(load())
+    assert stats["keys"] > 0 and stats["skipped"] > 0
+    assert stats["keys"] + stats["skipped"] == len(MANIFEST)
+
+    def manifest():
+        yield from commands[:100]
+        time.sleep(0.2)
+        yield from commands[100:]
+
+    stats = asyncio.run(loader.warm_up("127.0.0.1", 1, manifest(), deadline=time.monotonic() + 0.1))
+    assert stats["timed_out"]
+    assert (stats["keys"], stats["skipped"]) == (0, 100)
+
+
+class FakeContext:
+    def __init__(self, remaining_millis):
+        self.remaining_millis = remaining_millis
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_millis
+
+
+def test_handler_stops_ahead_of_the_lambda_timeout(stand_in_server, monkeypatch, capsys):
+    server = stand_in_server()
+    monkeypatch.setattr(handler, "_clients", {
+        "s3": FakeS3({("manifests", "hot-keys.jsonl"): b"\n".join(get_lines(MANIFEST))})
+    })
+    for name, value in {"REPLICATION_GROUP_ID": "dev-cluster", "REDIS_HOST": server.host,
+                        "REDIS_PORT": str(server.port), "REDIS_TLS": "false", "CLUSTER_MODE": "false",
+                        "PARALLELISM": "2", "PIPELINE": "50"}.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv("SECRET_ARN", raising=False)
+    event = {"RequestType": "Create",
+             "ResourceProperties": {"ManifestBucket": "manifests", "ManifestKey": "hot-keys.jsonl"}}
+
+    # Less time left than the margin, the deployment goes on with the partial stats reported as failed
+    response = handler.handler(event, FakeContext(handler.DEADLINE_MARGIN_SECONDS * 1000 - 1000))
+    assert response["Data"] == {"Keys": 0, "Errors": 0}
+    record = json.loads(capsys.readouterr().out.splitlines()[-1])
+    assert (record["level"], record["Failed"], record["timed_out"]) == ("ERROR", 1, True)
+
+    response = handler.handler(event, FakeContext(handler.DEADLINE_MARGIN_SECONDS * 1000 + 60000))
+    assert response["Data"] == {"Keys": len(MANIFEST), "Errors": 0}
+    record = json.loads(capsys.readouterr().out.splitlines()[-1])
+    assert (record["level"], record["Failed"], record["skipped"]) == ("INFO", 0, 0)
+
+
+def test_seeding_is_validated():
+    with pytest.raises(ValueError) as error:
+        ElastiCacheConfig.from_dict(dict(config, snapshot_arns=["s3://bucket/dump.rdb"], snapshot_name="nightly",
+                                         warm_up={"enabled": True, "parallelism_per_shard": 0}))
+
+    message = str(error.value)
+    assert "'snapshot_arns' and 'snapshot_name' are exclusive" in message
+    assert "'snapshot_arns' must hold S3 object ARNs" in message
+    assert "missing key 'warm_up.manifest_bucket'" in message
+    assert "'warm_up.parallelism_per_shard' must be a positive int, got 0" in message
+    assert "'snapshot_arns' in cluster mode needs 'node_group_configuration'" in message
+
+
+def test_warm_up_stack(synth_stack):
+    warm_up = {"enabled": True, "manifest_bucket": "manifests", "manifest_key": "orders/hot-keys.jsonl.gz",
+               "user_name": "user-name-2", "parallelism_per_shard": 8}
+    node_group_configuration = [{"node_group_id": "0001", "slots": "0-8191"},
+                                {"node_group_id": "0002", "slots": "8192-16383"}]
+    _, template = synth_stack("warm-up-stack", snapshot_arns=["arn:aws:s3:::backups/orders.rdb"], warm_up=warm_up,
+                              node_group_configuration=node_group_configuration)
+
+    cluster = template.of_type("AWS::ElastiCache::ReplicationGroup")[0]["Properties"]
+    assert cluster["SnapshotArns"] == ["arn:aws:s3:::backups/orders.rdb"]
+    functions = [function for function in template.of_type("AWS::Lambda::Function")
+                 if function["Properties"]["Handler"] == "warmup.handler.handler"]
+    assert len(functions) == 1
+    environment = functions[0]["Properties"]["Environment"]["Variables"]
+    assert (environment["CLUSTER_MODE"], environment["PARALLELISM"]) == ("true", "8")
+    assert "SECRET_ARN" in environment
+    resource = template.of_type("Custom::ElastiCacheWarmUp")[0]["Properties"]
+    assert (resource["ManifestBucket"], resource["ManifestKey"]) == ("manifests", "orders/hot-keys.jsonl.gz")
+
+    with pytest.raises(ValueError):
+        synth_stack("warm-up-unknown-user", warm_up=dict(warm_up, user_name="unknown"))